@@ -0,0 +1,111 @@
+"""Compare an async view served through the WSGI sync bridge against the ASGI adapter.
+
+The backend of the view waits `--latency` seconds. The test client serves the WSGI requests one after the other,
+while the ASGI adapter is sent `--concurrency` requests at a time, so their waits overlap.
+
+Usage:
+    python benchmarks/async_views.py --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from flask import Flask
+from flask.views import MethodView
+from pydantic import BaseModel
+
+from flask_restapi import Api
+
+
+class QuerySpec(BaseModel):
+    name: str
+
+
+class ResponseSpec(BaseModel):
+    name: str
+    results: int
+
+
+def create_app(latency: float) -> Api:
+    app = Flask(__name__)
+    api = Api(app)
+
+    async def backend(index: int) -> int:
+        await asyncio.sleep(latency)
+        return index
+
+    class User(MethodView):
+        @api.query(QuerySpec)
+        @api.response(ResponseSpec)
+        async def get(self, parameters):
+            results = await asyncio.gather(*(backend(i) for i in range(3)))
+            return ResponseSpec(name=parameters.query.name, results=len(results))
+
+    app.add_url_rule("/user", view_func=User.as_view("user"))
+    return api
+
+
+def bench_wsgi(api: Api, requests: int, concurrency: int) -> float:
+    client = api.app.test_client()
+    start = time.perf_counter()
+    for _ in range(requests):
+        assert client.get("/user?name=a").status_code == 200
+    return time.perf_counter() - start
+
+
+def bench_asgi(api: Api, requests: int, concurrency: int) -> float:
+    asgi_app = api.asgi_app()
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/user",
+        "raw_path": b"/user",
+        "query_string": b"name=a",
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def run() -> float:
+        statuses = []
+        slots = asyncio.Semaphore(concurrency)
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        async def request():
+            async with slots:
+                await asgi_app(dict(scope), receive, send)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        assert len(statuses) == requests and set(statuses) == {200}
+        return elapsed
+
+    return asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    api = create_app(args.latency)
+    for name, bench in (("wsgi sync bridge", bench_wsgi), ("asgi adapter", bench_asgi)):
+        elapsed = bench(api, args.requests, args.concurrency)
+        print(f"{name}: {elapsed / args.requests * 1e6:.0f}us per request")
+
+
+if __name__ == "__main__":
+    main()
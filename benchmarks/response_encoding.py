@@ -0,0 +1,60 @@
+"""Compare the default response path against OrjsonEncoder for a large list payload.
+
+Usage:
+    python benchmarks/response_encoding.py --items 10000
+"""
+
+import argparse
+import timeit
+import uuid
+from datetime import datetime
+from typing import List
+
+from flask import Flask
+from pydantic import BaseModel
+
+from flask_restapi import Api, OrjsonEncoder
+
+
+class ItemSpec(BaseModel):
+    id: int
+    uid: uuid.UUID
+    name: str
+    created_at: datetime
+    tags: List[str]
+
+
+class ItemListSpec(BaseModel):
+    items: List[ItemSpec]
+
+
+def make_view(api: Api):
+    @api.response(ItemListSpec, endpoint="items", method_name="get")
+    def view(self, parameters, result):
+        return result
+
+    return view
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = ItemListSpec(
+        items=[
+            ItemSpec(id=i, uid=uuid.uuid4(), name=f"item {i}", created_at=datetime.utcnow(), tags=["a", "b"])
+            for i in range(args.items)
+        ]
+    )
+    for name, encoder in (("default", None), ("orjson", OrjsonEncoder())):
+        app = Flask(__name__)
+        view = make_view(Api(app, response_encoder=encoder))
+        with app.test_request_context("/items"):
+            elapsed = min(timeit.repeat(lambda: view(result=result), number=1, repeat=args.repeat))
+        print(f"{name}: {elapsed * 1000:.1f}ms for {args.items} items")
+
+
+if __name__ == "__main__":
+    main()
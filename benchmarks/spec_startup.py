@@ -0,0 +1,70 @@
+"""Measure how long registering synthetic operations and building the spec takes.
+
+Usage:
+    python benchmarks/spec_startup.py --operations 5000 [--lazy]
+"""
+
+import argparse
+import time
+
+from flask import Flask
+from pydantic import BaseModel
+
+from flask_restapi import Api, TagModel
+
+
+class QuerySpec(BaseModel):
+    name: str
+    limit: int = 10
+
+
+class BodySpec(BaseModel):
+    name: str
+    password: str
+
+
+class ResponseSpec(BaseModel):
+    id: int
+    name: str
+
+
+def register_operations(app: Flask, api: Api, operations: int) -> None:
+    tag = TagModel(name="bench", description="Benchmark operations")
+    for index in range(operations):
+        endpoint = f"endpoint_{index // 2}"
+        method_name = "get" if index % 2 == 0 else "post"
+
+        def view(self, parameters):
+            pass
+
+        view = api.response(ResponseSpec, endpoint=endpoint, method_name=method_name)(view)
+        if method_name == "get":
+            view = api.query(QuerySpec, endpoint=endpoint, method_name=method_name, tag=tag)(view)
+        else:
+            view = api.body(BodySpec, endpoint=endpoint, method_name=method_name, tag=tag)(view)
+        view = api.auth(endpoint=endpoint, method_name=method_name)(view)
+        if method_name == "get":
+            app.add_url_rule(f"/{endpoint}/<int:id>", endpoint=endpoint, view_func=view)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--lazy", action="store_true", help="defer schema generation to the spec build")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    api = Api(app, lazy_spec=args.lazy)
+    start = time.perf_counter()
+    register_operations(app, api, args.operations)
+    elapsed = time.perf_counter() - start
+    print(f"registered {args.operations} operations in {elapsed:.3f}s")
+
+    start = time.perf_counter()
+    api.build_spec()
+    elapsed = time.perf_counter() - start
+    print(f"built spec in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Benchmark the hot paths of the extension and write machine readable results.
+
+Every case runs offline through the Flask test client or directly on the Api. Decorator cases also report
+their overhead over a view without decorators. Compare two runs, e.g. of two commits, with --compare.
+
+Usage:
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --output new.json --compare results.json [--threshold 0.1]
+    python benchmarks/suite.py --filter decorator --quick
+"""
+
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask
+from flask.views import MethodView
+from pydantic import BaseModel
+
+from flask_restapi import Api, FileStorageType, RequestParametersType
+from spec_startup import register_operations
+
+SPEC_SIZES = (100, 1000, 5000)
+JWT_KEY = "benchmark-key-of-at-least-32-bytes"
+
+
+class HeaderSpec(BaseModel):
+    x_token: str
+
+
+class PathSpec(BaseModel):
+    id: int
+
+
+class QuerySpec(BaseModel):
+    name: str
+    limit: int = 10
+
+
+class BodySpec(BaseModel):
+    name: str
+    password: str
+    tags: List[str] = []
+
+
+class FormSpec(BaseModel):
+    name: str
+    file: FileStorageType
+
+
+class ResponseSpec(BaseModel):
+    id: int
+    name: str
+
+
+class ListResponseSpec(BaseModel):
+    items: List[ResponseSpec]
+
+
+Case = Tuple[str, Callable[[], Any], Optional[str]]
+
+
+def create_app() -> Api:
+    app = Flask(__name__)
+    app.config.update(RESTAPI_ENCODE_KEY=JWT_KEY, RESTAPI_DECODE_KEY=JWT_KEY)
+    api = Api(app)
+
+    class Plain(MethodView):
+        def get(self, id: int):
+            return {"id": id}
+
+    class Header(MethodView):
+        @api.header(HeaderSpec)
+        def get(self, parameters: RequestParametersType, id: int):
+            return {"id": id}
+
+    class Path(MethodView):
+        @api.path(PathSpec)
+        def get(self, parameters: RequestParametersType, id: int):
+            return {"id": id}
+
+    class Query(MethodView):
+        @api.query(QuerySpec)
+        def get(self, parameters: RequestParametersType, id: int):
+            return {"id": id}
+
+    class Body(MethodView):
+        @api.body(BodySpec)
+        def post(self, parameters: RequestParametersType, id: int):
+            return {"id": id}
+
+    class Form(MethodView):
+        @api.form(FormSpec)
+        def post(self, parameters: RequestParametersType, id: int):
+            return {"id": id}
+
+    class Auth(MethodView):
+        @api.auth()
+        def get(self, parameters: RequestParametersType, id: int):
+            return {"id": id}
+
+    class Response(MethodView):
+        @api.response(ResponseSpec)
+        def get(self, parameters: RequestParametersType, id: int):
+            return ResponseSpec(id=id, name="name")
+
+    class All(MethodView):
+        @api.header(HeaderSpec)
+        @api.path(PathSpec)
+        @api.query(QuerySpec)
+        @api.body(BodySpec)
+        @api.auth()
+        @api.response(ResponseSpec)
+        def post(self, parameters: RequestParametersType, id: int):
+            return ResponseSpec(id=id, name=parameters.body.name)
+
+    class Large(MethodView):
+        @api.response(ListResponseSpec)
+        def get(self, parameters: RequestParametersType, id: int):
+            return ListResponseSpec(items=[ResponseSpec(id=i, name=f"name {i}") for i in range(id)])
+
+    for view in (Plain, Header, Path, Query, Body, Form, Auth, Response, All, Large):
+        name = view.__name__.lower()
+        app.add_url_rule(f"/{name}/<int:id>", view_func=view.as_view(name))
+
+    return api
+
+
+def request_cases(api: Api) -> List[Case]:
+    client = api.app.test_client()
+    headers = {"X-Token": "token", "Authorization": "Bearer token"}
+    body = {"name": "name", "password": "password", "tags": ["a", "b"]}
+
+    def get(url: str, **kwargs) -> Callable[[], Any]:
+        return lambda: client.get(url, **kwargs)
+
+    def post(url: str, **kwargs) -> Callable[[], Any]:
+        return lambda: client.post(url, **kwargs)
+
+    def post_form() -> Any:
+        data = {"name": "name", "file": (io.BytesIO(b"x" * 1024), "file.txt")}
+        return client.post("/form/1", data=data, content_type="multipart/form-data")
+
+    cases = [
+        ("decorator.none", get("/plain/1"), None),
+        ("decorator.header", get("/header/1", headers=headers), "decorator.none"),
+        ("decorator.path", get("/path/1"), "decorator.none"),
+        ("decorator.query", get("/query/1?name=name&limit=5"), "decorator.none"),
+        ("decorator.body", post("/body/1", json=body), "decorator.none"),
+        ("decorator.form", post_form, "decorator.none"),
+        ("decorator.auth", get("/auth/1", headers=headers), "decorator.none"),
+        ("decorator.response", get("/response/1"), "decorator.none"),
+        ("decorator.all", post("/all/1?name=name", json=body, headers=headers), "decorator.none"),
+        ("validation_error.query", get("/query/1?limit=x"), "decorator.query"),
+        ("validation_error.body", post("/body/1", json={"tags": "a"}), "decorator.body"),
+        ("compression.identity_100", get("/large/100"), None),
+        ("compression.gzip_100", get("/large/100", headers={"Accept-Encoding": "gzip"}), "compression.identity_100"),
+    ]
+    # A case that fails for another reason would measure the wrong path.
+    for name, func, _ in cases:
+        status = func().status_code
+        expected = 422 if name.startswith("validation_error") else 200
+        assert status == expected, f"{name} returned {status}, expected {expected}"
+
+    return cases
+
+
+def spec_fetch_cases(operations: int) -> List[Case]:
+    app = Flask(__name__)
+    api = Api(app)
+    register_operations(app, api, operations)
+    client = app.test_client()
+    api.build_spec()
+    etag = client.get(api.app.config["SPEC_URL"]).headers["ETag"]
+    url = api.app.config["SPEC_URL"]
+    return [
+        (f"spec.fetch_{operations}", lambda: client.get(url), None),
+        (f"spec.fetch_gzip_{operations}", lambda: client.get(url, headers={"Accept-Encoding": "gzip"}), None),
+        (f"spec.fetch_not_modified_{operations}", lambda: client.get(url, headers={"If-None-Match": etag}), None),
+    ]
+
+
+def jwt_cases(api: Api) -> List[Case]:
+    app = api.app
+    with app.app_context():
+        token = api.encode_jwt(expiration_time=timedelta(days=1), sub="user")
+
+    def encode() -> Any:
+        with app.app_context():
+            return api.encode_jwt(expiration_time=timedelta(days=1), sub="user")
+
+    def decode() -> Any:
+        with app.app_context():
+            return api.decode_jwt(token)
+
+    def decode_cached() -> Any:
+        with app.app_context():
+            app.config["RESTAPI_CLAIMS_CACHE_SIZE"] = 128
+            try:
+                return api.decode_jwt(token)
+            finally:
+                app.config["RESTAPI_CLAIMS_CACHE_SIZE"] = 0
+
+    return [("jwt.encode", encode, None), ("jwt.decode", decode, None), ("jwt.decode_cached", decode_cached, None)]
+
+
+def spec_build_cases(sizes: Tuple[int, ...]) -> List[Case]:
+    def build(operations: int) -> Callable[[], Any]:
+        def run() -> Any:
+            app = Flask(__name__)
+            api = Api(app)
+            register_operations(app, api, operations)
+            api.build_spec()
+
+        return run
+
+    return [(f"spec.register_and_build_{operations}", build(operations), None) for operations in sizes]
+
+
+def measure(func: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, Any]:
+    # Calibrate the number of calls per sample, so that a sample lasts about min_time seconds.
+    number = 1
+    while True:
+        elapsed = timeit.timeit(func, number=number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    samples = [elapsed / number * 1e6 for elapsed in timeit.repeat(func, number=number, repeat=repeat)]
+    return {
+        "unit": "us",
+        "number": number,
+        "repeat": repeat,
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Print the change of each case against the baseline and return the cases slower than the threshold."""
+    regressions = []
+    print(f"\n{'case':40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        old, new = baseline[name]["min"], result["min"]
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  slower"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:40} {old:>10.1f}us {new:>10.1f}us {change:>+7.1%}{flag}")
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as a regression")
+    parser.add_argument("--filter", default="", help="only run the cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per sample")
+    parser.add_argument("--quick", action="store_true", help="fewer samples and only the smallest spec size")
+    args = parser.parse_args()
+
+    repeat, min_time, sizes = args.repeat, args.min_time, SPEC_SIZES
+    if args.quick:
+        repeat, min_time, sizes = 3, 0.05, SPEC_SIZES[:1]
+
+    api = create_app()
+    cases = request_cases(api) + spec_fetch_cases(sizes[0]) + jwt_cases(api) + spec_build_cases(sizes)
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, func, reference in cases:
+        if args.filter not in name:
+            continue
+
+        # Spec builds take seconds, a single call per sample is enough.
+        result = (
+            measure(func, min(repeat, 3), 0) if name.startswith("spec.register") else measure(func, repeat, min_time)
+        )
+        if reference in results:
+            result["overhead"] = result["min"] - results[reference]["min"]
+        results[name] = result
+        overhead = f"  (+{result['overhead']:.1f}us)" if "overhead" in result else ""
+        print(f"{name:40} {result['min']:>10.1f}us  median {result['median']:.1f}us{overhead}")
+
+    report = {
+        "meta": {
+            "commit": get_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
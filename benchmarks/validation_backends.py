@@ -0,0 +1,110 @@
+"""Compare request validation and response dumping of the installed validation backends.
+
+pydantic v1 models always run, pydantic v2 models run when pydantic>=2 is installed, and msgspec structs
+when msgspec is installed.
+
+Usage:
+    python benchmarks/validation_backends.py --items 100
+"""
+
+import argparse
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+from flask import Flask
+
+from flask_restapi import Api, MsgspecBackend, PydanticV2Backend, ValidationBackend
+from flask_restapi.compat import BaseModel
+
+
+def pydantic_v1_models() -> type:
+    class Item(BaseModel):
+        id: int
+        name: str
+        price: float
+        tags: List[str]
+
+    class Order(BaseModel):
+        customer: str
+        items: List[Item]
+
+    return Order
+
+
+def pydantic_v2_models() -> type:
+    import pydantic
+
+    class Item(pydantic.BaseModel):
+        id: int
+        name: str
+        price: float
+        tags: List[str]
+
+    class Order(pydantic.BaseModel):
+        customer: str
+        items: List[Item]
+
+    return Order
+
+
+def msgspec_models() -> type:
+    import msgspec
+
+    class Item(msgspec.Struct):
+        id: int
+        name: str
+        price: float
+        tags: List[str]
+
+    class Order(msgspec.Struct):
+        customer: str
+        items: List[Item]
+
+    return Order
+
+
+def get_backends() -> List[Tuple[str, Callable[[], ValidationBackend], Callable[[], type]]]:
+    backends = [("pydantic v1", ValidationBackend, pydantic_v1_models)]
+    for name, backend, models in (
+        ("pydantic v2", PydanticV2Backend, pydantic_v2_models),
+        ("msgspec", MsgspecBackend, msgspec_models),
+    ):
+        try:
+            backend()
+        except ImportError as e:
+            print(f"{name}: skipped, {e}")
+            continue
+
+        backends.append((name, backend, models))
+
+    return backends
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body: Dict[str, Any] = {
+        "customer": "customer",
+        "items": [{"id": i, "name": f"item {i}", "price": i * 1.5, "tags": ["a", "b"]} for i in range(args.items)],
+    }
+    for name, backend, models in get_backends():
+        schema = models()
+        app = Flask(__name__)
+        api = Api(app, validation_backend=backend())
+
+        @api.body(schema, endpoint="orders", method_name="post")
+        @api.response(schema, endpoint="orders", method_name="post")
+        def view(self, parameters):
+            return parameters.body
+
+        with app.test_request_context("/orders", method="POST", json=body):
+            elapsed = min(timeit.repeat(lambda: view(), number=args.number, repeat=args.repeat))
+        print(f"{name}: {elapsed / args.number * 1e6:.1f}us per request with {args.items} items")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,17 @@
 from .core import Api  # noqa: F401
+from .encoders import OrjsonEncoder, ResponseEncoder  # noqa: F401
 from .exceptions import ApiException  # noqa: F401
+from .pagination import Cursor, CursorPage, CursorQuery  # noqa: F401
 from .spec.models import TagModel  # noqa: F401
 from .types import FileStorageType, RequestParametersType  # noqa: F401
+from .uploads import (  # noqa: F401
+    UploadFile,
+    UploadFileType,
+    UploadRequestMixin,
+    upload_file,
+)
+from .validation import (  # noqa: F401
+    MsgspecBackend,
+    PydanticV2Backend,
+    ValidationBackend,
+)
@@ -0,0 +1,100 @@
+import threading
+from typing import Dict
+
+from .compat import BaseModel
+from .exceptions import ApiException
+
+ADMISSION_CODES = (429, 503)
+RETRY_AFTER_HEADERS = {
+    "Retry-After": {"description": "Seconds to wait before retrying the request.", "schema": {"type": "integer"}}
+}
+
+
+class OverloadResponse(BaseModel):
+    """The endpoint is at its concurrency limit, retry after the Retry-After seconds."""
+
+    description: str
+    http_code: int
+
+
+class AdmissionLimiter:
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int = 0,
+        queue_timeout: float = 1.0,
+        code: int = 503,
+        retry_after: int = 1,
+    ) -> None:
+        """Bound the requests one view handles at once, and how many wait for a slot.
+
+        Args:
+            max_concurrency (int): Requests running the view at once.
+            max_queue (int, optional): Requests waiting for a slot, more are rejected at once. Defaults to 0.
+            queue_timeout (float, optional): Seconds a request waits for a slot before it is rejected. Defaults to 1.0.
+            code (int, optional): Status code of rejected requests, 503 or 429. Defaults to 503.
+            retry_after (int, optional): Seconds sent in the Retry-After header of rejected requests. Defaults to 1.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if code not in ADMISSION_CODES:
+            raise ValueError(f"code must be one of {', '.join(map(str, ADMISSION_CODES))}")
+
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.code = code
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, blocking: bool = True) -> None:
+        """Take a slot, waiting in the queue when there is room in it, or raise ApiException.
+
+        Args:
+            blocking (bool, optional): Whether the request may wait in the queue. Defaults to True.
+        """
+        with self._condition:
+            if self.in_flight < self.max_concurrency:
+                self.in_flight += 1
+                return
+
+            if not blocking or self.queued >= self.max_queue:
+                self.rejected += 1
+                raise self._reject()
+
+            self.queued += 1
+            try:
+                has_slot = self._condition.wait_for(lambda: self.in_flight < self.max_concurrency, self.queue_timeout)
+            finally:
+                self.queued -= 1
+
+            if not has_slot:
+                self.rejected += 1
+                raise self._reject()
+
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+            }
+
+    def _reject(self) -> ApiException:
+        return ApiException(
+            self.code,
+            description="The endpoint is overloaded, retry later.",
+            headers={"Retry-After": str(self.retry_after)},
+        )
@@ -0,0 +1,150 @@
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import AsyncToSync, sync_to_async
+
+
+class ReceiveStream:
+    def __init__(self, receive: Callable) -> None:
+        """`wsgi.input` of a request, reading the body from the ASGI server as the app consumes it.
+
+        Called from the worker thread running the app, each read waits for the next body message on the event loop.
+
+        Args:
+            receive (Callable): ASGI receive callable of the request.
+        """
+        self._receive = AsyncToSync(receive)
+        self._buffer = bytearray()
+        self._more_body = True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        size = -1 if size is None else size
+        while self._more_body and (size < 0 or len(self._buffer) < size):
+            self._fill()
+
+        return self._take(len(self._buffer) if size < 0 else size)
+
+    def readline(self, size: Optional[int] = -1) -> bytes:
+        size = -1 if size is None else size
+        while self._more_body and b"\n" not in self._buffer and (size < 0 or len(self._buffer) < size):
+            self._fill()
+
+        end = self._buffer.find(b"\n") + 1 or len(self._buffer)
+        return self._take(end if size < 0 else min(end, size))
+
+    def close(self) -> None:
+        self._buffer.clear()
+
+    def _fill(self) -> None:
+        message = self._receive()
+        if message["type"] != "http.request":
+            # The client disconnected, the short body is reported by Werkzeug.
+            self._more_body = False
+            return
+
+        self._buffer += message.get("body", b"")
+        self._more_body = message.get("more_body", False)
+
+    def _take(self, size: int) -> bytes:
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+class AsgiAdapter:
+    def __init__(self, wsgi_app: Callable) -> None:
+        """ASGI application running a WSGI application.
+
+        Each request runs in a thread of the event loop's default executor, so requests are handled concurrently.
+        The body is streamed to the app as it reads it, and the response is sent as the app yields it.
+
+        Args:
+            wsgi_app (Callable): WSGI application, e.g. `app.wsgi_app` or the Flask app.
+        """
+        self.wsgi_app = wsgi_app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            raise ValueError("The ASGI adapter only serves http scopes")
+
+        # Not thread sensitive, the default of asgiref would run every request on one shared thread.
+        await sync_to_async(self.run, thread_sensitive=False)(scope, ReceiveStream(receive), AsyncToSync(send))
+
+    def run(self, scope: Dict[str, Any], body: ReceiveStream, send: Callable) -> None:
+        response_start: Dict[str, Any] = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> Callable:
+            if exc_info is not None and response_start.get("sent"):
+                raise exc_info[1].with_traceback(exc_info[2])
+
+            response_start.update(
+                status=int(status.split(" ", 1)[0]),
+                headers=[(name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers],
+            )
+            return lambda data: send_body(data)
+
+        def send_start() -> None:
+            if not response_start.get("sent"):
+                response_start["sent"] = True
+                send(
+                    {
+                        "type": "http.response.start",
+                        "status": response_start["status"],
+                        "headers": response_start["headers"],
+                    }
+                )
+
+        def send_body(data: bytes) -> None:
+            send_start()
+            if data:
+                send({"type": "http.response.body", "body": data, "more_body": True})
+
+        result = self.wsgi_app(self.make_environ(scope, body), start_response)
+        try:
+            for data in result:
+                send_body(data)
+        finally:
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()
+
+        send_start()
+        send({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    def make_environ(scope: Dict[str, Any], body: ReceiveStream) -> Dict[str, Any]:
+        script_name = scope.get("root_path", "").encode("utf8").decode("latin1")
+        path_info = scope["path"].encode("utf8").decode("latin1")
+        if script_name and path_info.startswith(script_name):
+            path_info = path_info.replace(script_name, "", 1)
+
+        server = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": script_name,
+            "PATH_INFO": path_info,
+            "QUERY_STRING": scope["query_string"].decode("latin1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            # The body ends with the last ASGI message, also when the request has no Content-Length.
+            "wsgi.input_terminated": True,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        if scope.get("client"):
+            environ["REMOTE_ADDR"] = scope["client"][0]
+            environ["REMOTE_PORT"] = str(scope["client"][1])
+
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin1").upper().replace("-", "_")
+            key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+            value = value.decode("latin1")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+        return environ
@@ -0,0 +1,71 @@
+import mimetypes
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from .compression import StaticContent
+
+# Swagger UI 4.15.5, Apache License 2.0, see static/swagger-ui/LICENSE.
+SWAGGER_UI_DIRECTORY = os.path.join(os.path.dirname(__file__), "static", "swagger-ui")
+# Precompressed variants shipped next to the assets.
+PRECOMPRESSED_SUFFIXES = {".br": "br", ".gz": "gzip"}
+# Fingerprinted URLs change with the content, so clients may keep them forever.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class AssetBundle:
+    def __init__(self, directory: str = SWAGGER_UI_DIRECTORY) -> None:
+        """Static files served from memory under fingerprinted names, e.g. `swagger-ui.3f2a9c1b04d5.css`.
+
+        The files and their precompressed variants are read once, on first use.
+
+        Args:
+            directory (str, optional): Directory of the files. Defaults to the bundled Swagger UI.
+        """
+        self.directory = directory
+        self._names: Dict[str, str] = {}
+        self._assets: Dict[str, Tuple[StaticContent, str]] = {}
+        self._is_loaded = False
+        self._lock = threading.Lock()
+
+    def get_names(self) -> Dict[str, str]:
+        """Fingerprinted names by file name."""
+        self._load()
+        return dict(self._names)
+
+    def get(self, fingerprinted_name: str) -> Optional[Tuple[StaticContent, str]]:
+        """Content and mimetype of a fingerprinted file, or None when there is no such file."""
+        self._load()
+        return self._assets.get(fingerprinted_name)
+
+    def _load(self) -> None:
+        if self._is_loaded:
+            return
+
+        with self._lock:
+            if self._is_loaded:
+                return
+
+            for name in sorted(os.listdir(self.directory)):
+                stem, suffix = os.path.splitext(name)
+                mimetype = mimetypes.guess_type(name)[0]
+                if suffix in PRECOMPRESSED_SUFFIXES or mimetype is None:
+                    continue
+
+                content = StaticContent(self._read(name), encodings=self._read_variants(name))
+                fingerprinted_name = f"{stem}.{content.etag[:12]}{suffix}"
+                self._names[name] = fingerprinted_name
+                self._assets[fingerprinted_name] = (content, mimetype)
+
+            self._is_loaded = True
+
+    def _read(self, name: str) -> bytes:
+        with open(os.path.join(self.directory, name), "rb") as f:
+            return f.read()
+
+    def _read_variants(self, name: str) -> Dict[str, bytes]:
+        return {
+            encoding: self._read(name + suffix)
+            for suffix, encoding in PRECOMPRESSED_SUFFIXES.items()
+            if os.path.exists(os.path.join(self.directory, name + suffix))
+        }
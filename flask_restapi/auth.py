@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import jwt
+
+
+class ClaimsCache:
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """Bounded LRU cache of verified JWT claims, keyed by a hash of the token.
+
+        An entry expires after `ttl` seconds or at the token `exp`, whichever comes first.
+
+        Args:
+            max_size (int): Maximum number of cached tokens.
+            ttl (float): Maximum age of an entry in seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(encoded_token: str, *args: Any) -> Hashable:
+        return (hashlib.sha256(encoded_token.encode()).digest(), *args)
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, claims = entry
+            if now >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(claims)
+
+    def set(self, key: Hashable, claims: Dict[str, Any]) -> None:
+        now = time.time()
+        expires_at = now + self.ttl
+        if isinstance(claims.get("exp"), (int, float)):
+            expires_at = min(expires_at, claims["exp"])
+        # Tokens that are not valid yet are never cached, they must be verified again once they are.
+        if isinstance(claims.get("nbf"), (int, float)) and claims["nbf"] > now:
+            return
+        if expires_at <= now:
+            return
+
+        with self._lock:
+            self._entries[key] = (expires_at, dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+class KeySet:
+    def __init__(self, path: str, check_interval: float = 1.0) -> None:
+        """Signing keys loaded from a local JWKS file, parsed once and reloaded when the file changes.
+
+        Args:
+            path (str): Path of the JWKS file.
+            check_interval (float, optional): Minimum seconds between checks of the file. Defaults to 1.0.
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.version = 0
+        self._keys: Dict[Optional[str], jwt.PyJWK] = {}
+        self._stat: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def get(self, kid: Optional[str]) -> jwt.PyJWK:
+        """Return the key for `kid`. Tokens without kid are accepted when the set holds a single key."""
+        keys = self._keys
+        if kid is None and len(keys) == 1:
+            return next(iter(keys.values()))
+
+        try:
+            return keys[kid]
+        except KeyError:
+            raise jwt.InvalidTokenError(f"Unknown key id {kid!r}")
+
+    def reload(self) -> None:
+        stat = os.stat(self.path)
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        keys = {jwk.get("kid"): jwt.PyJWK(jwk) for jwk in data.get("keys", [])}
+        with self._lock:
+            self._keys = keys
+            self._stat = (stat.st_mtime_ns, stat.st_size)
+            self.version += 1
+
+    def refresh(self) -> None:
+        """Reload the keys if the file changed, checking it at most every `check_interval` seconds."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+            if (stat.st_mtime_ns, stat.st_size) != self._stat:
+                self.reload()
+        except (OSError, ValueError, jwt.PyJWTError):
+            # Keep the current keys while the file is missing or half written, it is checked again later.
+            pass
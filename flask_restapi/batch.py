@@ -0,0 +1,185 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import Flask, Response, request
+from werkzeug.datastructures import EnvironHeaders, Headers
+from werkzeug.test import EnvironBuilder
+from werkzeug.wsgi import get_current_url
+
+from .compat import BaseModel, Field
+
+# Sub-requests with these methods do not change state, consecutive ones run concurrently.
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Headers of the batch request which describe its own body or would make a sub-response unreadable.
+SKIPPED_HEADERS = {
+    "content-type",
+    "content-length",
+    "transfer-encoding",
+    "accept-encoding",
+    "if-none-match",
+    "if-modified-since",
+}
+# Headers describing the client, which sub-requests take from the batch request and cannot set themselves.
+PROTECTED_HEADER_PREFIXES = ("x-forwarded-", "forwarded", "x-real-ip")
+# Server environ of the batch request kept by the sub-requests, so the client address and mount point stay the same.
+INHERITED_ENVIRON = {"REMOTE_ADDR", "REMOTE_PORT", "SCRIPT_NAME", "wsgi.url_scheme"}
+INHERITED_ENVIRON_PREFIXES = ("HTTP_X_FORWARDED_", "HTTP_FORWARDED", "HTTP_X_REAL_IP")
+
+
+class BatchRequestItem(BaseModel):
+    method: str = Field("GET", description="HTTP method of the sub-request.")
+    path: str = Field(..., description="Path of the sub-request, e.g. /users/1.")
+    query: Optional[Dict[str, Any]] = Field(None, description="Query parameters.")
+    body: Optional[Any] = Field(None, description="JSON body.")
+    headers: Optional[Dict[str, str]] = Field(
+        None, description="Headers, added to those of the batch request, e.g. its Authorization."
+    )
+
+
+class BatchRequest(BaseModel):
+    """Sub-requests dispatched in one HTTP call."""
+
+    requests: List[BatchRequestItem]
+
+
+class BatchResponseItem(BaseModel):
+    status: int
+    headers: Dict[str, str]
+    body: Optional[Any] = Field(None, description="Parsed JSON body, or the body as text.")
+
+
+class BatchResponse(BaseModel):
+    """Responses of the sub-requests, in the order of the requests."""
+
+    responses: List[BatchResponseItem]
+
+
+class BatchContext:
+    __slots__ = ("headers", "base_url", "environ")
+
+    def __init__(self, environ: Dict[str, Any]) -> None:
+        """What the sub-requests of a batch take from the batch request."""
+        self.headers = [
+            (key, value) for key, value in EnvironHeaders(environ).items() if key.lower() not in SKIPPED_HEADERS
+        ]
+        self.base_url = get_current_url(environ, root_only=True)
+        self.environ = {
+            key: value
+            for key, value in environ.items()
+            if key in INHERITED_ENVIRON or key.startswith(INHERITED_ENVIRON_PREFIXES)
+        }
+
+
+class BatchDispatcher:
+    def __init__(self, app: Flask, max_workers: int = 8, excluded_endpoints: Iterable[str] = ()) -> None:
+        """Dispatch sub-requests through the full Flask request handling, without going through the network.
+
+        Args:
+            app (Flask): Flask application.
+            max_workers (int, optional): Threads running concurrent sub-requests, shared by all batches. Defaults to 8.
+            excluded_endpoints (Iterable[str], optional): Flask endpoints rejected with 400, e.g. the batch view itself. Defaults to ().
+        """
+        self.app = app
+        self.max_workers = max_workers
+        self.excluded_endpoints = set(excluded_endpoints)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def dispatch(self, items: List[BatchRequestItem], environ: Dict[str, Any]) -> List[BatchResponseItem]:
+        """Run the sub-requests, safe ones concurrently until the next one which may change state.
+
+        Args:
+            items (List[BatchRequestItem]): Sub-requests in order.
+            environ (Dict[str, Any]): WSGI environ of the batch request, whose headers, client address, scheme and
+                script root the sub-requests inherit.
+        """
+        inherited = BatchContext(environ)
+        results: List[BatchResponseItem] = []
+        group: List[BatchRequestItem] = []
+        for item in items:
+            if item.method.upper() in SAFE_METHODS:
+                group.append(item)
+                continue
+
+            results += self._dispatch_group(group, inherited)
+            group = []
+            results.append(self._dispatch_item(item, inherited))
+
+        results += self._dispatch_group(group, inherited)
+        return results
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _dispatch_group(self, group: List[BatchRequestItem], inherited: "BatchContext") -> List[BatchResponseItem]:
+        if len(group) < 2 or self.max_workers < 2:
+            return [self._dispatch_item(item, inherited) for item in group]
+
+        executor = self._get_executor()
+        futures = [executor.submit(self._dispatch_item, item, inherited) for item in group]
+        return [future.result() for future in futures]
+
+    def _dispatch_item(self, item: BatchRequestItem, inherited: "BatchContext") -> BatchResponseItem:
+        headers = Headers(inherited.headers)
+        for key, value in (item.headers or {}).items():
+            key_lower = key.lower()
+            if key_lower not in SKIPPED_HEADERS and not key_lower.startswith(PROTECTED_HEADER_PREFIXES):
+                headers[key] = value
+
+        try:
+            builder = EnvironBuilder(
+                path=item.path,
+                base_url=inherited.base_url,
+                method=item.method.upper(),
+                query_string=item.query,
+                headers=headers,
+                json=item.body,
+                environ_overrides=inherited.environ,
+            )
+        except (TypeError, ValueError) as e:
+            return self._error(400, str(e))
+
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+
+        # The same steps as Flask's wsgi_app, minus the WSGI response: the sub-request gets its own contexts,
+        # before and after request functions, error handlers and teardown. A fresh app context keeps `g` and the
+        # teardown_appcontext functions per sub-request, instead of sharing those of the batch request.
+        with self.app.app_context(), self.app.request_context(environ):
+            # Matched on the resolved endpoint, so another spelling of the path or mount point is rejected too.
+            if request.endpoint in self.excluded_endpoints:
+                return self._error(400, f"{item.path} cannot be called in a batch")
+
+            try:
+                response = self.app.full_dispatch_request()
+            except Exception as e:
+                response = self.app.make_response(self.app.handle_exception(e))
+
+            return self._to_item(response)
+
+    @staticmethod
+    def _to_item(response: Response) -> BatchResponseItem:
+        try:
+            body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True) or None
+            headers = {key: value for key, value in response.headers.items() if key.lower() != "content-length"}
+            return BatchResponseItem(status=response.status_code, headers=headers, body=body)
+        finally:
+            response.close()
+
+    @staticmethod
+    def _error(status: int, description: str) -> BatchResponseItem:
+        return BatchResponseItem(status=status, headers={}, body={"description": description})
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="restapi-batch")
+
+        return self._executor
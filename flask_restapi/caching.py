@@ -0,0 +1,293 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+from flask import Response
+
+from .types import RequestParametersType
+
+CACHE_HEADERS = {
+    "X-Cache": {
+        "description": "HIT when the response was served from the cache, MISS otherwise.",
+        "schema": {"type": "string", "enum": ["HIT", "MISS"]},
+    },
+    "Age": {"description": "Seconds since the cached response was stored.", "schema": {"type": "integer"}},
+}
+# Headers recomputed for every response made from a cached entry.
+SKIPPED_HEADERS = {"content-length", "date", "x-cache", "age"}
+# Seconds after which a partially written entry of the FileSystemCache is considered abandoned.
+TMP_FILE_TTL = 60
+# Parameters filled by the auth decorator, which identify the caller.
+IDENTITY_PARAMETERS = ("auth", "claims")
+
+
+class CachedResponse:
+    __slots__ = ("body", "status", "headers", "stored_at", "expires_at", "variants")
+
+    def __init__(self, body: bytes, status: int, headers: List[Tuple[str, str]], stored_at: float, expires_at: float):
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        # Compressed bodies by encoding, filled as clients ask for them.
+        self.variants: Dict[str, bytes] = {}
+
+    @classmethod
+    def from_response(cls, response: Response, ttl: float) -> "CachedResponse":
+        headers = [(key, value) for key, value in response.headers.items() if key.lower() not in SKIPPED_HEADERS]
+        now = time.time()
+        return cls(response.get_data(), response.status_code, headers, now, now + ttl)
+
+    def to_response(self) -> Response:
+        response = Response(self.body, self.status, self.headers)
+        response.headers["X-Cache"] = "HIT"
+        response.headers["Age"] = str(max(0, int(time.time() - self.stored_at)))
+        return response
+
+
+class MemoryCache:
+    def __init__(self, max_size: int = 1024) -> None:
+        """Bounded in-process LRU store of encoded responses.
+
+        Args:
+            max_size (int, optional): Maximum number of cached responses. Defaults to 1024.
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get((endpoint, key))
+            if entry is None:
+                return None
+
+            if time.time() >= entry.expires_at:
+                del self._entries[(endpoint, key)]
+                return None
+
+            self._entries.move_to_end((endpoint, key))
+            return entry
+
+    def set(self, endpoint: str, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            self._entries[(endpoint, key)] = entry
+            self._entries.move_to_end((endpoint, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, endpoint: str = None) -> None:
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+                return
+
+            for cache_key in [cache_key for cache_key in self._entries if cache_key[0] == endpoint]:
+                del self._entries[cache_key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FileSystemCache:
+    def __init__(self, directory: str, max_size: int = 1024) -> None:
+        """Store of encoded responses in a local directory, shared by the worker processes of a host.
+
+        Point it to a tmpfs such as `/dev/shm` to keep the entries in shared memory. Expired entries are
+        removed when they are read, and by a sweep run by each process every `max_size // 8` stored entries,
+        which also removes the entries closest to expiry beyond `max_size`.
+
+        Args:
+            directory (str): Cache directory, created if it does not exist.
+            max_size (int, optional): Maximum number of cached responses kept by a sweep. Defaults to 1024.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.sweep_interval = max(1, max_size // 8)
+        self._sets_since_sweep = 0
+        self._sweep_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, endpoint: str, key: str) -> Optional[CachedResponse]:
+        path = self._get_path(endpoint, key)
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+
+        if time.time() >= meta["expires_at"]:
+            self._remove(path)
+            return None
+
+        headers = [(name, value) for name, value in meta["headers"]]
+        return CachedResponse(body, meta["status"], headers, meta["stored_at"], meta["expires_at"])
+
+    def set(self, endpoint: str, key: str, entry: CachedResponse) -> None:
+        path = self._get_path(endpoint, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {
+            "status": entry.status,
+            "headers": entry.headers,
+            "stored_at": entry.stored_at,
+            "expires_at": entry.expires_at,
+        }
+        # Written to a temporary file and renamed, so other processes never read a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(meta).encode() + b"\n")
+                f.write(entry.body)
+            # The modification time is the expiry, so a sweep finds expired entries without reading them.
+            os.utime(tmp_path, (entry.expires_at, entry.expires_at))
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+
+        self._sets_since_sweep += 1
+        if self._sets_since_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def sweep(self) -> None:
+        """Remove the expired entries, then the entries closest to expiry beyond `max_size`."""
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+
+        try:
+            self._sets_since_sweep = 0
+            now = time.time()
+            entries = []
+            for directory in self._list_directories():
+                try:
+                    names = os.listdir(directory)
+                except OSError:
+                    continue
+
+                for name in names:
+                    path = os.path.join(directory, name)
+                    try:
+                        expires_at = os.stat(path).st_mtime
+                    except OSError:
+                        continue
+
+                    if name.startswith(tempfile.gettempprefix()):
+                        # Being written by another process, or left behind by one which crashed.
+                        expires_at += TMP_FILE_TTL
+
+                    if expires_at <= now:
+                        self._remove(path)
+                    else:
+                        entries.append((expires_at, path))
+
+            if len(entries) > self.max_size:
+                entries.sort()
+                for _, path in entries[: len(entries) - self.max_size]:
+                    self._remove(path)
+        finally:
+            self._sweep_lock.release()
+
+    def invalidate(self, endpoint: str = None) -> None:
+        directories = [self._get_directory(endpoint)] if endpoint is not None else self._list_directories()
+        for directory in directories:
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+
+            for name in names:
+                self._remove(os.path.join(directory, name))
+
+    def _get_directory(self, endpoint: str) -> str:
+        return os.path.join(self.directory, quote(endpoint, safe=""))
+
+    def _get_path(self, endpoint: str, key: str) -> str:
+        return os.path.join(self._get_directory(endpoint), key)
+
+    def _list_directories(self) -> Iterable[str]:
+        try:
+            return [os.path.join(self.directory, name) for name in os.listdir(self.directory)]
+        except OSError:
+            return []
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class ResponseCache:
+    def __init__(self, store: Any) -> None:
+        """Cache of the responses of the views under the cache decorator, with hit and miss counts per endpoint.
+
+        Args:
+            store (MemoryCache | FileSystemCache): Where the encoded responses are kept.
+        """
+        self.store = store
+        self._stats: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, key: str) -> Optional[CachedResponse]:
+        entry = self.store.get(endpoint, key)
+        with self._lock:
+            counts = self._stats.setdefault(endpoint, [0, 0])
+            counts[0 if entry is not None else 1] += 1
+
+        return entry
+
+    def set(self, endpoint: str, key: str, entry: CachedResponse) -> None:
+        self.store.set(endpoint, key, entry)
+
+    def invalidate(self, endpoint: str = None) -> None:
+        """Drop the cached responses of one Flask endpoint, or of all of them."""
+        self.store.invalidate(endpoint)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {endpoint: {"hits": hits, "misses": misses} for endpoint, (hits, misses) in self._stats.items()}
+
+
+class CacheRule:
+    def __init__(self, ttl: float, vary_on: Iterable[str]) -> None:
+        """How the responses of one view are cached.
+
+        Args:
+            ttl (float): Seconds a response is served from the cache.
+            vary_on (Iterable[str]): Parameters the key is built from, e.g. "query" or "header.accept_language".
+        """
+        self.ttl = ttl
+        self.vary_on = [tuple(item.split(".", 1)) for item in vary_on]
+
+    def make_key(self, parameters: RequestParametersType, method: str, backend: Any) -> str:
+        values = []
+        for path in self.vary_on:
+            value = getattr(parameters, path[0])
+            if len(path) > 1:
+                # The claims are a dictionary, the other parameters are models.
+                value = value.get(path[1]) if isinstance(value, dict) else getattr(value, path[1], None)
+            if backend.is_model(value):
+                value = backend.dump(value)
+            values.append(value)
+
+        # Responses of authenticated views depend on the caller, who is part of the key unless vary_on names it.
+        if not any(path[0] in IDENTITY_PARAMETERS for path in self.vary_on):
+            values.append(parameters.claims if parameters.claims is not None else parameters.auth)
+
+        data = json.dumps([method, values], sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    @staticmethod
+    def is_cacheable(response: Response) -> bool:
+        if not 200 <= response.status_code < 300 or response.is_streamed:
+            return False
+
+        return "Set-Cookie" not in response.headers and "no-store" not in response.headers.get("Cache-Control", "")
@@ -1,6 +1,10 @@
+import json
+
 import click
+from flask import current_app
 from flask.cli import AppGroup
 
+from .spec.diff import diff_specs
 from .tool import core, template
 
 api_cli = AppGroup("api")
@@ -25,3 +29,26 @@ def create(name: str):
     # Create services
     core.create_directory(f"{name}/services")
     core.create_file(f"{name}/services/__init__.py")
+
+
+@api_cli.command("export-spec")
+@click.argument("path", required=True, type=click.Path(dir_okay=False, writable=True))
+def export_spec(path: str):
+    """Write the spec with its compressed variants, for SPEC_FILE."""
+    document = current_app.extensions["restapi"].export_spec(path)
+    click.echo(f"Exported the spec to {path} ({len(document.body)} bytes, {', '.join(document.encodings)})")
+
+
+@api_cli.command("diff-spec", with_appcontext=False)
+@click.argument("old", required=True, type=click.File("r", encoding="utf-8"))
+@click.argument("new", required=True, type=click.File("r", encoding="utf-8"))
+@click.option("--exit-code", is_flag=True, help="Exit with 1 when the specs differ.")
+def diff_spec(old, new, exit_code: bool):
+    """Show the operations and schemas removed, added or changed between two exported specs."""
+    lines = diff_specs(json.load(old), json.load(new))
+    for line in lines:
+        click.echo(line)
+    if not lines:
+        click.echo("No differences")
+    elif exit_code:
+        raise SystemExit(1)
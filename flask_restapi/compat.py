@@ -0,0 +1,58 @@
+"""The pydantic v1 API used by the spec models and the default validation backend.
+
+pydantic v2 and the latest v1 releases also ship it as `pydantic.v1`, so the package keeps working when
+the application models are written for pydantic v2.
+"""
+
+try:
+    from pydantic.v1 import BaseModel, Extra, Field, ValidationError, validator
+    from pydantic.v1.fields import (
+        SHAPE_DEQUE,
+        SHAPE_FROZENSET,
+        SHAPE_ITERABLE,
+        SHAPE_LIST,
+        SHAPE_SEQUENCE,
+        SHAPE_SET,
+        SHAPE_TUPLE,
+        SHAPE_TUPLE_ELLIPSIS,
+    )
+    from pydantic.v1.generics import GenericModel
+    from pydantic.v1.json import pydantic_encoder
+except ImportError:  # pragma: no cover
+    from pydantic import (  # type: ignore
+        BaseModel,
+        Extra,
+        Field,
+        ValidationError,
+        validator,
+    )
+    from pydantic.fields import (  # type: ignore
+        SHAPE_DEQUE,
+        SHAPE_FROZENSET,
+        SHAPE_ITERABLE,
+        SHAPE_LIST,
+        SHAPE_SEQUENCE,
+        SHAPE_SET,
+        SHAPE_TUPLE,
+        SHAPE_TUPLE_ELLIPSIS,
+    )
+    from pydantic.generics import GenericModel  # type: ignore
+    from pydantic.json import pydantic_encoder  # type: ignore
+
+__all__ = [
+    "BaseModel",
+    "Extra",
+    "Field",
+    "GenericModel",
+    "ValidationError",
+    "validator",
+    "SHAPE_DEQUE",
+    "SHAPE_FROZENSET",
+    "SHAPE_ITERABLE",
+    "SHAPE_LIST",
+    "SHAPE_SEQUENCE",
+    "SHAPE_SET",
+    "SHAPE_TUPLE",
+    "SHAPE_TUPLE_ELLIPSIS",
+    "pydantic_encoder",
+]
@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Response, request
+
+# Optional encodings, installed with `pip install flask-restapi[brotli,zstandard]`.
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# Preferred first, when the client accepts several with the same quality.
+DEFAULT_ENCODINGS = ("br", "zstd", "gzip", "deflate")
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    # Fixed mtime, so the same data always compresses to the same bytes.
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _deflate(data: bytes, level: int) -> bytes:
+    return zlib.compress(data, level)
+
+
+def _brotli(data: bytes, level: int) -> bytes:
+    return brotli.compress(data, quality=level)
+
+
+def _zstd(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# Encoding name, compress function, level for responses compressed per request, for static content compressed once
+# at runtime, e.g. on every spec rebuild, and for artifacts exported at build time, where the highest level pays off.
+_COMPRESSORS: Dict[str, Tuple[Callable[[bytes, int], bytes], int, int, int]] = {
+    "gzip": (_gzip, 6, 9, 9),
+    "deflate": (_deflate, 6, 9, 9),
+}
+if brotli is not None:
+    _COMPRESSORS["br"] = (_brotli, 4, 6, 11)
+if zstandard is not None:
+    _COMPRESSORS["zstd"] = (_zstd, 3, 9, 19)
+
+
+def get_available_encodings(encodings: Iterable[str] = DEFAULT_ENCODINGS) -> List[str]:
+    """The encodings among `encodings` whose compressor is installed, in the same order."""
+    return [encoding for encoding in encodings if encoding in _COMPRESSORS]
+
+
+def compress(data: bytes, encoding: str, static: bool = False, export: bool = False) -> bytes:
+    """Compress `data`, with a higher level for static content compressed once, the highest for exported artifacts."""
+    func, level, static_level, export_level = _COMPRESSORS[encoding]
+    return func(data, export_level if export else static_level if static else level)
+
+
+def compress_static(
+    data: bytes, encodings: Iterable[str] = DEFAULT_ENCODINGS, export: bool = False
+) -> Dict[str, bytes]:
+    """Every available compressed variant of static content, or of an artifact exported at build time."""
+    return {
+        encoding: compress(data, encoding, static=True, export=export)
+        for encoding in get_available_encodings(encodings)
+    }
+
+
+class StaticContent:
+    __slots__ = ("body", "etag", "encodings")
+
+    def __init__(self, body: Any, etag: str = None, encodings: Dict[str, Any] = None) -> None:
+        """Content made once and served as is, with its strong ETag and compressed variants.
+
+        Args:
+            body (bytes | mmap.mmap): The identity content.
+            etag (str, optional): Strong ETag of the body. Defaults to None, which hashes the body.
+            encodings (Dict[str, bytes | mmap.mmap], optional): Compressed variants. Defaults to None, which compresses the body.
+        """
+        self.body = body
+        self.etag: str = etag or hashlib.sha256(body).hexdigest()[:32]
+        self.encodings = encodings if encodings is not None else compress_static(body)
+
+    def get(self, encoding: Optional[str]) -> bytes:
+        data = self.encodings[encoding] if encoding else self.body
+        # A mapped file is copied into each response, its pages stay shared in the page cache.
+        return data if isinstance(data, bytes) else data[:]
+
+    def get_etag(self, encoding: Optional[str]) -> str:
+        return f"{self.etag}-{encoding}" if encoding else self.etag
+
+
+class Compression:
+    def __init__(self, encodings: Iterable[str] = DEFAULT_ENCODINGS, min_size: int = 500) -> None:
+        """Compress the responses of the views with the best encoding the client accepts.
+
+        Args:
+            encodings (Iterable[str], optional): Allowed encodings in order of preference, unavailable ones are skipped. Defaults to DEFAULT_ENCODINGS.
+            min_size (int, optional): Bodies smaller than this many bytes are sent uncompressed. Defaults to 500.
+        """
+        self.allowed_encodings = list(encodings)
+        self.encodings = get_available_encodings(encodings)
+        self.min_size = min_size
+
+    def negotiate(self, encodings: Iterable[str] = None) -> Optional[str]:
+        """The encoding of the current request, among the allowed ones in `encodings` or the available ones, or
+        None for identity. Precompressed `encodings` need no compressor installed.
+        """
+        if encodings is None:
+            candidates = self.encodings
+        else:
+            candidates = [encoding for encoding in self.allowed_encodings if encoding in encodings]
+        best = request.accept_encodings.best_match(candidates + ["identity"], default="identity")
+        return None if best == "identity" else best
+
+    def is_compressible(self, response: Response) -> bool:
+        if response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers:
+            return False
+
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+
+        mimetype = response.mimetype or ""
+        if not (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES or mimetype.endswith("+json")):
+            return False
+
+        return response.content_length is not None and response.content_length >= self.min_size
+
+    def apply(self, response: Response, variants: Dict[str, bytes] = None) -> Optional[str]:
+        """Compress the body of `response` in place when it is worth it and the client accepts an encoding.
+
+        Args:
+            response (Response): Response with a buffered body.
+            variants (Dict[str, bytes], optional): Compressed bodies by encoding, read and filled so an unchanged body, e.g. a cached one, is compressed once. Defaults to None.
+
+        Returns:
+            The encoding used, or None when the body was left as is.
+        """
+        if not self.is_compressible(response):
+            return None
+
+        # Caches must keep the variants apart, also for clients which get the identity body.
+        response.vary.add("Accept-Encoding")
+        encoding = self.negotiate()
+        if encoding is None:
+            return None
+
+        data = variants.get(encoding) if variants is not None else None
+        if data is None:
+            data = compress(response.get_data(), encoding)
+            if variants is not None:
+                variants[encoding] = data
+
+        response.set_data(data)
+        response.headers["Content-Encoding"] = encoding
+        etag, is_weak = response.get_etag()
+        # A strong ETag identifies the exact bytes, so each encoding gets its own.
+        if etag is not None and not is_weak:
+            response.set_etag(f"{etag}-{encoding}")
+        return encoding
+
+    def get_etag_variants(self, etag: str) -> List[str]:
+        """The ETags a client may hold for the identity or a compressed body tagged `etag`."""
+        return [etag] + [f"{etag}-{encoding}" for encoding in self.encodings]
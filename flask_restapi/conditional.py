@@ -0,0 +1,42 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+
+from flask import Request
+
+ETAG_TYPES = ("strong", "weak")
+ETAG_HEADERS = {
+    "ETag": {"description": "Entity tag of the response, send it back in If-None-Match.", "schema": {"type": "string"}},
+    "Last-Modified": {
+        "description": "Time the resource last changed, when the version is a datetime.",
+        "schema": {"type": "string"},
+    },
+}
+
+
+def make_version_etag(version: Any) -> str:
+    """ETag of the value returned by a version callable, e.g. a row version or an update time."""
+    return hashlib.sha256(repr(version).encode()).hexdigest()[:32]
+
+
+def is_precondition_failed(request: Request, etags: List[str], last_modified: Optional[datetime]) -> bool:
+    """Whether the preconditions of a request with an unsafe method fail for the current version (RFC 9110 13.2.2).
+
+    Args:
+        request (Request): The request, e.g. a PUT or DELETE.
+        etags (List[str]): ETags of the current version, one per encoding of the response.
+        last_modified (Optional[datetime]): Time the resource last changed, when the version is a datetime.
+    """
+    if request.if_match:
+        if not request.if_match.star_tag and not any(request.if_match.contains(etag) for etag in etags):
+            return True
+    elif request.if_unmodified_since is not None and last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        if last_modified.replace(microsecond=0) > request.if_unmodified_since:
+            return True
+
+    if request.if_none_match:
+        return request.if_none_match.star_tag or any(request.if_none_match.contains_weak(etag) for etag in etags)
+
+    return False
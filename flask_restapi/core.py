@@ -1,35 +1,89 @@
-import functools
-from typing import Any, Dict, Type
+from typing import Any, Callable, Dict, Iterable, Tuple, Type
 
-from flask import Flask, current_app, make_response, request
-from pydantic import BaseModel
+import jwt
+from flask import Flask, request
 
 from . import commands
-from .exceptions import ValidationErrorResponses
-from .mixins import HandlerMixin, SpecMixin, AuthMixin
+from .admission import RETRY_AFTER_HEADERS, AdmissionLimiter, OverloadResponse
+from .caching import CACHE_HEADERS, CacheRule
+from .compat import BaseModel
+from .conditional import ETAG_HEADERS, ETAG_TYPES
+from .decoders import HeaderDecoder, QueryDecoder
+from .encoders import ResponseEncoder
+from .exceptions import ApiException, ValidationErrorResponses
+from .mixins import (
+    AuthMixin,
+    BatchMixin,
+    CacheMixin,
+    CompressionMixin,
+    HandlerMixin,
+    MetricsMixin,
+    SpecMixin,
+    UploadMixin,
+)
+from .pagination import PAGE_HEADERS, CursorPage
+from .pipeline import Pipeline
 from .spec.core import Spec
 from .spec.models import BlueprintMap, TagModel
+from .streaming import (
+    NDJSON,
+    STREAM_MIMETYPES,
+    iter_request_items,
+    raise_too_large,
+    read_json,
+)
 from .types import RequestParametersType
+from .uploads import get_spool_size, get_upload_fields, set_spool_size
+from .validation import ValidationBackend, get_default_backend
 
 
-class Api(SpecMixin, AuthMixin, HandlerMixin):
-    def __init__(self, app: Flask = None) -> None:
-        self.spec = Spec()
+class Api(SpecMixin, AuthMixin, BatchMixin, CacheMixin, CompressionMixin, MetricsMixin, UploadMixin, HandlerMixin):
+    def __init__(
+        self,
+        app: Flask = None,
+        lazy_spec: bool = False,
+        response_encoder: ResponseEncoder = None,
+        validation_backend: ValidationBackend = None,
+    ) -> None:
+        """Flask extension for validating requests and making the OpenAPI document.
+
+        Args:
+            app (Flask, optional): Flask application. Defaults to None.
+            lazy_spec (bool, optional): Generate the JSON schemas only when the spec is first built. Defaults to False.
+            response_encoder (ResponseEncoder, optional): Encode returned models to bytes, e.g. `OrjsonEncoder()`. Defaults to None, which uses Flask's JSON provider.
+            validation_backend (ValidationBackend, optional): Library of the schemas, e.g. `PydanticV2Backend()` or `MsgspecBackend()`. Defaults to None, which picks the backend of the installed pydantic version.
+        """
+        self.validation_backend = validation_backend or get_default_backend()
+        self.spec = Spec(lazy=lazy_spec, validation_backend=self.validation_backend)
+        self.response_encoder = response_encoder
+        self.limiters: Dict[Tuple[str, str], AdmissionLimiter] = {}
         self.app = app
         if app is not None:
             self.init_app(app)
 
     def init_app(self, app: Flask) -> None:
         self.app = app
+        app.extensions["restapi"] = self
         super().init_app()
 
-        self.app.before_first_request(self._register_spec)
         with self.app.app_context():
             self._register_blueprint()
 
         self._register_handlers()
+        self._register_metrics()
         self.app.cli.add_command(commands.api_cli)
 
+    def asgi_app(self) -> Callable:
+        """ASGI application serving the Flask app.
+
+        Requests run concurrently in the threads of the event loop's default executor, while async views are
+        awaited on the event loop of the ASGI server instead of a new event loop per request. Request bodies
+        are streamed to the app as it reads them.
+        """
+        from .asgi import AsgiAdapter
+
+        return AsgiAdapter(self.app)
+
     def bp_map(self, blueprint_name: str = None, endpoint_name: str = None):
         """Bind the URL endpoint to the blueprint name.
 
@@ -43,6 +97,7 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
                 endpoint_name=endpoint_name or cls.__name__.lower(), blueprint_name=blueprint_name
             )
             self.spec.blueprint_maps.append(blueprint_map)
+            self.spec.invalidate()
 
             return cls
 
@@ -65,6 +120,7 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
             tag (Type[TagModel], optional): List of tags to each API operation. Defaults to None.
             summary (str, optional): Override spec summary. Defaults to None.
         """
+        decoder = HeaderDecoder(schema, self.validation_backend)
 
         def decorator(func):
             ep = endpoint if endpoint else self._generate_endpoint(func.__qualname__)
@@ -72,14 +128,10 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
             _summary = summary or func.__doc__ or None
             self.spec.store_parameters("header", schema, ep, _method_name, tag, _summary)
 
-            @functools.wraps(func)
-            def wrapper(func_self=None, *args, **kwargs):
-                request.parameters = self._get_request_parameters()
-                _headers = dict((k.lower(), v) for k, v in request.headers.items())
-                request.parameters.header = schema(**_headers)
-                return current_app.ensure_sync(func)(func_self, request.parameters, **kwargs)
+            def load():
+                return decoder(request.headers)
 
-            return wrapper
+            return self._add_step(func, "header", load, schema)
 
         return decorator
 
@@ -107,13 +159,10 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
             _summary = summary or func.__doc__ or None
             self.spec.store_parameters("path", schema, ep, _method_name, tag, _summary)
 
-            @functools.wraps(func)
-            def wrapper(func_self=None, *args, **kwargs):
-                request.parameters = self._get_request_parameters()
-                request.parameters.path = schema(**request.view_args)
-                return current_app.ensure_sync(func)(func_self, request.parameters, **kwargs)
+            def load():
+                return request.view_args
 
-            return wrapper
+            return self._add_step(func, "path", load, schema)
 
         return decorator
 
@@ -124,6 +173,7 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
         method_name: str = None,
         tag: Type[TagModel] = None,
         summary: str = None,
+        comma_separated: bool = False,
     ):
         """Receive request query string.
 
@@ -133,29 +183,22 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
             method_name (str, optional): Endpoint method name. Defaults to None.
             tag (Type[TagModel], optional): List of tags to each API operation. Defaults to None.
             summary (str, optional): Override spec summary. Defaults to None.
+            comma_separated (bool, optional): Also accept comma separated values for list fields, e.g. `?ids=1,2`. Defaults to False.
         """
+        decoder = QueryDecoder(schema, self.validation_backend, comma_separated)
 
         def decorator(func):
             ep = endpoint if endpoint else self._generate_endpoint(func.__qualname__)
             _method_name = method_name or func.__name__
             _summary = summary or func.__doc__ or None
-            self.spec.store_parameters("query", schema, ep, _method_name, tag, _summary)
-
-            @functools.wraps(func)
-            def wrapper(func_self=None, *args, **kwargs):
-                request.parameters = self._get_request_parameters()
-                req_args = request.args.to_dict(flat=False)
-                normalize_query = {}
-                for key, value in req_args.items():
-                    if len(value) > 1:
-                        normalize_query.update({key: value})
-                    else:
-                        normalize_query.update({key: value[0]})
+            self.spec.store_parameters(
+                "query", schema, ep, _method_name, tag, _summary, explode=False if comma_separated else None
+            )
 
-                request.parameters.query = schema(**normalize_query)
-                return current_app.ensure_sync(func)(func_self, request.parameters, **kwargs)
+            def load():
+                return decoder(request.args)
 
-            return wrapper
+            return self._add_step(func, "query", load, schema)
 
         return decorator
 
@@ -167,6 +210,8 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
         content_type: list = ["application/json"],
         tag: Type[TagModel] = None,
         summary: str = None,
+        max_bytes: int = None,
+        stream: str = None,
     ):
         """Receive request body.
 
@@ -177,22 +222,37 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
             content_type (list, optional): HTTP content-type. Defaults to "application/json".
             tag (Type[TagModel], optional): List of tags to each API operation. Defaults to None.
             summary (str, optional): Override spec summary. Defaults to None.
+            max_bytes (int, optional): Reject larger bodies with 413 before parsing them. Defaults to None.
+            stream (str, optional): Parse an "ndjson" or "json" array body incrementally, the view receives a lazy iterator of `schema` items. Defaults to None.
         """
+        if stream is not None and stream not in STREAM_MIMETYPES:
+            raise ValueError(f"stream must be one of {', '.join(STREAM_MIMETYPES)}")
 
         def decorator(func):
             ep = endpoint if endpoint else self._generate_endpoint(func.__qualname__)
             _method_name = method_name or func.__name__
             _summary = summary or func.__doc__ or None
-            self.spec.store_body(schema, ep, _method_name, content_type, tag, _summary)
+            _content_type = [STREAM_MIMETYPES[stream]] if stream == NDJSON else content_type
+            self.spec.store_body(schema, ep, _method_name, _content_type, tag, _summary, is_array=stream is not None)
+
+            def load():
+                if max_bytes is not None and (request.content_length or 0) > max_bytes:
+                    raise_too_large(max_bytes)
 
-            @functools.wraps(func)
-            def wrapper(func_self=None, *args, **kwargs):
-                request.parameters = self._get_request_parameters()
-                body: dict = request.get_json() or dict()
-                request.parameters.body = schema(**body)
-                return current_app.ensure_sync(func)(func_self, request.parameters, **kwargs)
+                if stream:
+                    return iter_request_items(request.stream, schema, stream, max_bytes, self.validation_backend)
 
-            return wrapper
+                if max_bytes is not None:
+                    if not request.is_json:
+                        # The same 400 or 415 error `get_json` raises for another content type.
+                        return request.on_json_loading_failed(None)
+                    # Empty and invalid bodies get the same error as from `get_json`.
+                    return read_json(request.stream, max_bytes, request.on_json_loading_failed) or dict()
+
+                return request.get_json() or dict()
+
+            # Streamed items are validated one at a time by the iterator.
+            return self._add_step(func, "body", load, None if stream else schema)
 
         return decorator
 
@@ -204,6 +264,7 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
         content_type: list = ["multipart/form-data"],
         tag: Type[TagModel] = None,
         summary: str = None,
+        max_bytes: int = None,
     ):
         """Receive request form data.
 
@@ -214,37 +275,51 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
             content_type (list, optional): HTTP content-type]. Defaults to "application/json".
             tag (Type[TagModel], optional): List of tags to each API operation. Defaults to None.
             summary (str, optional): Override spec summary. Defaults to None.
+            max_bytes (int, optional): Reject larger requests with 413 before parsing them. Defaults to None.
         """
+        upload_fields = get_upload_fields(schema)
+        spool_size = get_spool_size(schema)
+        encoding = {
+            name: {"contentType": ", ".join(field.content_types)}
+            for name, field in upload_fields.items()
+            if field.content_types
+        }
 
         def decorator(func):
             ep = endpoint if endpoint else self._generate_endpoint(func.__qualname__)
             _method_name = method_name or func.__name__
             _summary = summary or func.__doc__ or None
-            self.spec.store_body(schema, ep, _method_name, content_type, tag, _summary)
+            self.spec.store_body(schema, ep, _method_name, content_type, tag, _summary, encoding=encoding or None)
+
+            def load():
+                if max_bytes is not None and (request.content_length or 0) > max_bytes:
+                    raise_too_large(max_bytes)
+
+                if spool_size is not None:
+                    # Read by the request class when Werkzeug asks for the stream of each uploaded file.
+                    set_spool_size(request._get_current_object(), spool_size)
 
-            @functools.wraps(func)
-            def wrapper(func_self=None, *args, **kwargs):
-                request.parameters = self._get_request_parameters()
                 _form = {}
-                if request.files.to_dict():
+                if request.files:
                     _form.update(request.files.to_dict())
 
-                if request.form.to_dict():
+                if request.form:
                     _form.update(request.form.to_dict())
 
-                request.parameters.form = schema(**_form)
-                return current_app.ensure_sync(func)(func_self, request.parameters, **kwargs)
+                return _form
 
-            return wrapper
+            return self._add_step(func, "form", load, schema)
 
         return decorator
 
-    def auth(self, endpoint: str = None, method_name: str = None):
+    def auth(self, endpoint: str = None, method_name: str = None, verify: bool = False, audience: Iterable = [""]):
         """Receive authorization token by headers. This auth decorator will get the Authorization of Flask request.headers and mark the endpoint on the spec as requiring verification.
 
         Args:
             endpoint (str, optional): Flask url endpoint name. Defaults to None.
             method_name (str, optional): Endpoint method name. Defaults to None.
+            verify (bool, optional): Verify the token with `decode_jwt` and pass its claims as `parameters.claims`, missing or invalid tokens are rejected with 401. Defaults to False.
+            audience (Iterable, optional): Audience passed to `decode_jwt` when verifying. Defaults to [""].
         """
 
         def decorator(func):
@@ -252,20 +327,31 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
             _method_name = method_name or func.__name__
             self.spec.store_auth(ep, _method_name)
 
-            @functools.wraps(func)
-            def wrapper(func_self=None, *args, **kwargs):
-                request.parameters = self._get_request_parameters()
+            def load():
                 auth_header = request.headers.get("Authorization")
-                if auth_header is not None:
-                    if "Bearer" in auth_header:
-                        _token = auth_header.split(" ")[1]
-                        request.parameters.auth = _token
-                    else:
-                        request.parameters.auth = auth_header
+                if auth_header is None:
+                    return None
+
+                scheme, _, token = auth_header.partition(" ")
+                if scheme.lower() == "bearer":
+                    return token.strip() or None
+
+                return auth_header
+
+            def load_claims():
+                token = load()
+                if not token:
+                    raise ApiException(401, description="Authorization token is missing")
 
-                return current_app.ensure_sync(func)(func_self, request.parameters, **kwargs)
+                try:
+                    return self.decode_jwt(token, audience=audience)
+                except jwt.PyJWTError as e:
+                    raise ApiException(401, description=str(e))
 
-            return wrapper
+            if verify:
+                func = self._add_step(func, "claims", load_claims)
+
+            return self._add_step(func, "auth", load)
 
         return decorator
 
@@ -278,6 +364,10 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
         headers: Dict[str, Any] = None,
         code: int = 200,
         default_validation_error: bool = True,
+        stream: str = None,
+        etag: str = None,
+        version: Callable[..., Any] = None,
+        compress: bool = True,
     ):
         """Make response schema to spec document and auto converted to dictionary.
 
@@ -289,46 +379,123 @@ class Api(SpecMixin, AuthMixin, HandlerMixin):
             headers (Dict[str, Any], optional): Response additional headers. Defaults to None.
             code (int, optional): HTTP status code. Defaults to 200.
             default_validation_error (bool, optional): Whether to show on spec. Defaults to True.
+            stream (str, optional): Stream an iterable of `schema` items returned by the view, as "ndjson" or as a "json" array. Defaults to None.
+            etag (str, optional): Send a "strong" or "weak" ETag computed from the encoded body and answer matching conditional requests with 304. Defaults to None.
+            version (Callable[..., Any], optional): Called with the parameters and view arguments before the view, the ETag is derived from its result and a datetime result also sets Last-Modified. A matching conditional request skips the view. Defaults to None.
+            compress (bool, optional): Whether the response may be compressed, see `RESTAPI_COMPRESSION`. Defaults to True.
         """
+        if stream is not None and stream not in STREAM_MIMETYPES:
+            raise ValueError(f"stream must be one of {', '.join(STREAM_MIMETYPES)}")
+        if etag is not None and etag not in ETAG_TYPES:
+            raise ValueError(f"etag must be one of {', '.join(ETAG_TYPES)}")
 
         def decorator(func):
             ep = endpoint if endpoint else self._generate_endpoint(func.__qualname__)
             _method_name = method_name or func.__name__
-            self.spec.store_responses(code, schema, ep, _method_name, content_type)
+            _content_type = [STREAM_MIMETYPES[stream]] if stream else content_type
+            self.spec.store_responses(code, schema, ep, _method_name, _content_type, is_array=stream is not None)
             if default_validation_error:
                 self.spec.store_responses(422, ValidationErrorResponses, ep, _method_name, content_type)
+            if etag or version:
+                self.spec.store_conditional(ETAG_HEADERS, ep, _method_name, precondition=version is not None)
+            if isinstance(schema, type) and issubclass(schema, CursorPage):
+                self.spec.store_response_headers(PAGE_HEADERS, ep, _method_name)
+
+            pipeline = Pipeline.of(self, func)
+            pipeline.add_response(code, headers, schema, stream, etag, version, compress)
+            return pipeline.wrapper
+
+        return decorator
+
+    def cache(
+        self,
+        ttl: float = 60,
+        vary_on: Iterable[str] = ("path", "query"),
+        endpoint: str = None,
+        method_name: str = None,
+    ):
+        """Serve the encoded response from the cache while the validated parameters in `vary_on` are unchanged.
 
-            @functools.wraps(func)
-            def wrapper(func_self=None, *args, **kwargs):
-                request.parameters = self._get_request_parameters()
-                result = current_app.ensure_sync(func)(func_self, request.parameters, **kwargs)
-                if isinstance(result, BaseModel):
-                    response = make_response(result.dict(exclude={"headers"}), code)
-                else:
-                    response = make_response(result, code)
+        The request is still parsed and validated, only the view and the response encoding are skipped.
+        Successful responses which are not streamed and set no cookie are cached. On views under the auth
+        decorator the verified claims, or the token without `verify`, are part of the key unless `vary_on`
+        names "auth" or "claims".
 
-                # Add header from result
-                if hasattr(result, "headers"):
-                    if isinstance(result.headers, dict):
-                        for key, value in result.headers.items():
-                            response.headers[key] = value
+        Args:
+            ttl (float, optional): Seconds a response is served from the cache. Defaults to 60.
+            vary_on (Iterable[str], optional): Parameters the cache key is built from, e.g. "query" or "header.accept_language". Defaults to ("path", "query").
+            endpoint (str, optional): Flask url endpoint name. Defaults to None.
+            method_name (str, optional): Endpoint method name. Defaults to None.
+        """
+        for item in vary_on:
+            if item.split(".", 1)[0] not in RequestParametersType.__slots__:
+                raise ValueError(f"vary_on must name request parameters, got {item!r}")
 
-                # Add header from decorator
-                if isinstance(headers, dict):
-                    for key, value in headers.items():
-                        response.headers[key] = value
+        cache_rule = CacheRule(ttl, vary_on)
 
-                return response
+        def decorator(func):
+            ep = endpoint if endpoint else self._generate_endpoint(func.__qualname__)
+            _method_name = method_name or func.__name__
+            self.spec.store_response_headers(CACHE_HEADERS, ep, _method_name)
 
-            return wrapper
+            pipeline = Pipeline.of(self, func)
+            pipeline.cache_rule = cache_rule
+            return pipeline.wrapper
 
         return decorator
 
-    def _get_request_parameters(self) -> RequestParametersType:
-        if not hasattr(request, "parameters"):
-            request.parameters = RequestParametersType()
+    def limit(
+        self,
+        max_concurrency: int,
+        max_queue: int = 0,
+        queue_timeout: float = 1.0,
+        code: int = 503,
+        retry_after: int = 1,
+        endpoint: str = None,
+        method_name: str = None,
+    ):
+        """Reject requests with `code` and a Retry-After header while the view runs `max_concurrency` requests.
+
+        Checked before any request data is read or validated. Up to `max_queue` requests wait up to `queue_timeout`
+        seconds for a slot, async views never wait.
+
+        Args:
+            max_concurrency (int): Requests running the view at once.
+            max_queue (int, optional): Requests waiting for a slot. Defaults to 0.
+            queue_timeout (float, optional): Seconds a request waits for a slot. Defaults to 1.0.
+            code (int, optional): Status code of rejected requests, 503 or 429. Defaults to 503.
+            retry_after (int, optional): Seconds sent in the Retry-After header. Defaults to 1.
+            endpoint (str, optional): Flask url endpoint name. Defaults to None.
+            method_name (str, optional): Endpoint method name. Defaults to None.
+        """
+        limiter = AdmissionLimiter(max_concurrency, max_queue, queue_timeout, code, retry_after)
+
+        def decorator(func):
+            ep = endpoint if endpoint else self._generate_endpoint(func.__qualname__)
+            _method_name = method_name or func.__name__
+            self.spec.store_responses(
+                code, OverloadResponse, ep, _method_name, ["application/json"], headers=RETRY_AFTER_HEADERS
+            )
+            self.limiters[(ep, _method_name)] = limiter
+
+            pipeline = Pipeline.of(self, func)
+            pipeline.limiter = limiter
+            return pipeline.wrapper
+
+        return decorator
+
+    def admission_stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Live in-flight, queued and rejected counts of the views under the limit decorator, by endpoint and method."""
+        stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for (endpoint, method_name), limiter in self.limiters.items():
+            stats.setdefault(endpoint, {})[method_name] = limiter.stats()
+
+        return stats
 
-        return request.parameters
+    def _add_step(self, func: Callable, name: str, loader: Callable[[], Any], schema: Type[Any] = None) -> Callable:
+        pipeline = Pipeline.of(self, func)
+        pipeline.add_step(name, loader, schema)
+        return pipeline.wrapper
 
     def _generate_endpoint(self, endpoint: str) -> str:
         return endpoint.split(".")[0].lower()
@@ -0,0 +1,81 @@
+from typing import Any, Dict, Type
+
+from werkzeug.datastructures import Headers, MultiDict
+
+from .validation import ValidationBackend
+
+
+class QueryDecoder:
+    def __init__(self, schema: Type[Any], backend: ValidationBackend, comma_separated: bool = False) -> None:
+        """Query string decoder compiled once per schema, reading only the declared keys.
+
+        Sequence fields always receive a list and accept repeated keys, `key[]` keys and, with
+        `comma_separated`, comma separated values. Other fields receive a single value.
+
+        Args:
+            schema (Type[Any]): Query model.
+            backend (ValidationBackend): Validation backend of the model.
+            comma_separated (bool, optional): Split the values of sequence fields on commas. Defaults to False.
+        """
+        self.comma_separated = comma_separated
+        self.fields = [(name, f"{name}[]", is_sequence) for name, is_sequence in backend.field_names(schema)]
+        # Undeclared keys still reach models that allow or forbid extra fields.
+        self.include_extra = backend.allows_extra(schema)
+        self.declared = {key for name, bracket_name, _ in self.fields for key in (name, bracket_name)}
+
+    def __call__(self, args: MultiDict) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        for name, bracket_name, is_sequence in self.fields:
+            if is_sequence:
+                values = args.getlist(name) if name in args else []
+                if bracket_name in args:
+                    values += args.getlist(bracket_name)
+                if values:
+                    if self.comma_separated:
+                        values = [item for value in values for item in value.split(",")]
+                    data[name] = values
+            elif name in args:
+                values = args.getlist(name)
+                data[name] = values[0] if len(values) == 1 else values
+
+        if self.include_extra:
+            for key, values in args.lists():
+                if key not in self.declared:
+                    data[key] = values[0] if len(values) == 1 else values
+
+        return data
+
+
+class HeaderDecoder:
+    def __init__(self, schema: Type[Any], backend: ValidationBackend) -> None:
+        """Header decoder compiled once per schema, looking up only the declared headers.
+
+        Header names are matched case-insensitively, and `x_token` also matches the `X-Token` header.
+
+        Args:
+            schema (Type[Any]): Header model.
+            backend (ValidationBackend): Validation backend of the model.
+        """
+        self.fields = [
+            (name, tuple(dict.fromkeys((name, name.replace("_", "-"))))) for name, _ in backend.field_names(schema)
+        ]
+        # Undeclared headers still reach models that allow or forbid extra fields.
+        self.include_extra = backend.allows_extra(schema)
+        self.declared = {lookup.lower() for _, lookups in self.fields for lookup in lookups}
+
+    def __call__(self, headers: Headers) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        for name, lookups in self.fields:
+            for lookup in lookups:
+                value = headers.get(lookup)
+                if value is not None:
+                    data[name] = value
+                    break
+
+        if self.include_extra:
+            for key, value in headers.items():
+                key = key.lower()
+                if key not in self.declared:
+                    data[key] = value
+
+        return data
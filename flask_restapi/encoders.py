@@ -0,0 +1,62 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+from .compat import BaseModel, pydantic_encoder
+
+
+class ResponseEncoder(ABC):
+    """Encode the model returned by a view under the response decorator straight to bytes."""
+
+    mimetype = "application/json"
+
+    @abstractmethod
+    def encode(self, result: Any) -> bytes:
+        """Encode `result`, a model returned by a view, without its `headers` field."""
+
+
+class OrjsonEncoder(ResponseEncoder):
+    def __init__(self, option: int = None) -> None:
+        """Response encoder backed by orjson. Datetimes, UUIDs, enums and dataclasses are encoded natively,
+        nested models are encoded without building an intermediate dictionary.
+
+        Args:
+            option (int, optional): Additional `orjson.OPT_*` flags. Defaults to None.
+        """
+        try:
+            import orjson
+        except ImportError as e:  # pragma: no cover
+            raise ImportError(
+                "OrjsonEncoder requires orjson, install it with `pip install flask-restapi[orjson]`"
+            ) from e
+
+        self._dumps = orjson.dumps
+        self.option = orjson.OPT_NON_STR_KEYS | (option or 0)
+
+    def encode(self, result: Any) -> bytes:
+        content = {key: value for key, value in self._fields(result).items() if key != "headers"}
+        return self._dumps(content, default=self._default, option=self.option)
+
+    @staticmethod
+    def _fields(obj: Any) -> Dict[str, Any]:
+        # Field values of a pydantic model or of a msgspec struct, which has no __dict__.
+        struct_fields = getattr(obj, "__struct_fields__", None)
+        if struct_fields is not None:
+            return {name: getattr(obj, name) for name in struct_fields}
+
+        return obj.__dict__
+
+    @classmethod
+    def _default(cls, obj: Any) -> Any:
+        # Nested models are encoded field by field, custom root models by their root.
+        if isinstance(obj, BaseModel):
+            if obj.__custom_root_type__:
+                return obj.__root__
+            return obj.__dict__
+
+        if getattr(obj, "__pydantic_root_model__", False):
+            return obj.root
+
+        if hasattr(type(obj), "model_fields") or hasattr(obj, "__struct_fields__"):
+            return cls._fields(obj)
+
+        return pydantic_encoder(obj)
@@ -1,17 +1,19 @@
 import json
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from .compat import BaseModel
 
 
 class ApiException(Exception):
-    def __init__(self, http_code: int, **options) -> None:
+    def __init__(self, http_code: int, headers: Dict[str, str] = None, **options) -> None:
         """HTTP responses with errors to the client
 
         Args:
             http_code (int): HTTP response status code.
+            headers (Dict[str, str], optional): Response headers, e.g. Retry-After. Defaults to None.
         """
         self.http_code = http_code
+        self.headers = headers
         for key, value in options.items():
             setattr(self, key, value)
 
@@ -21,7 +23,7 @@ class ApiException(Exception):
         Returns:
             All attributes but excluding http_code
         """
-        return self.__dict__
+        return {key: value for key, value in self.__dict__.items() if key != "headers"}
 
     def to_json(self) -> str:
         """Convert all attributes to json and exclude http_code of the key.
@@ -29,7 +31,7 @@ class ApiException(Exception):
         Returns:
             All attributes but excluding http_code
         """
-        return json.dumps(self.__dict__)
+        return json.dumps(self.to_dict())
 
 
 class ValidationErrorResult(BaseModel):
@@ -0,0 +1,133 @@
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds in seconds, from parsing a header to a slow view.
+DEFAULT_BUCKETS = (
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # One count per bucket plus +Inf, they are only made cumulative when rendered.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """Latency histograms per endpoint and phase and response counts per endpoint and status code.
+
+        Args:
+            buckets (Tuple[float, ...], optional): Histogram upper bounds in seconds. Defaults to DEFAULT_BUCKETS.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._responses: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint: Optional[str], timings: Iterable[Tuple[str, float]]) -> None:
+        """Record the phase timings of one request, under a single lock."""
+        endpoint = endpoint or ""
+        with self._lock:
+            for phase, seconds in timings:
+                histogram = self._histograms.get((endpoint, phase))
+                if histogram is None:
+                    histogram = self._histograms[(endpoint, phase)] = Histogram(self.buckets)
+                histogram.observe(seconds)
+
+    def count_response(self, endpoint: Optional[str], code: int) -> None:
+        key = (endpoint or "", code)
+        with self._lock:
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = [(key, list(h.counts), h.sum, h.count) for key, h in sorted(self._histograms.items())]
+            responses = sorted(self._responses.items())
+
+        bounds = [_format_float(bound) for bound in self.buckets] + ["+Inf"]
+        lines: List[str] = [
+            "# HELP restapi_phase_seconds Time spent in each phase of the API views.",
+            "# TYPE restapi_phase_seconds histogram",
+        ]
+        for (endpoint, phase), counts, total, count in histograms:
+            labels = f'endpoint="{_escape(endpoint)}",phase="{_escape(phase)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append(f'restapi_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"restapi_phase_seconds_sum{{{labels}}} {_format_float(total)}")
+            lines.append(f"restapi_phase_seconds_count{{{labels}}} {count}")
+
+        lines.append("# HELP restapi_responses_total Responses by endpoint and status code.")
+        lines.append("# TYPE restapi_responses_total counter")
+        for (endpoint, code), count in responses:
+            lines.append(f'restapi_responses_total{{endpoint="{_escape(endpoint)}",code="{code}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._responses.clear()
+
+
+# Metric name, type, help and key of the admission stats it is read from.
+ADMISSION_METRICS = (
+    ("restapi_in_flight", "gauge", "Requests running the view.", "in_flight"),
+    ("restapi_queued", "gauge", "Requests waiting for a slot.", "queued"),
+    ("restapi_rejected_total", "counter", "Requests rejected by admission control.", "rejected"),
+    ("restapi_max_concurrency", "gauge", "Concurrency limit of the view.", "max_concurrency"),
+)
+
+
+def render_admission(stats: Dict[str, Dict[str, Dict[str, Any]]]) -> str:
+    """Admission control counts, see `Api.admission_stats`, in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for name, metric_type, description, key in ADMISSION_METRICS:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for endpoint, methods in sorted(stats.items()):
+            for method_name, values in sorted(methods.items()):
+                labels = f'endpoint="{_escape(endpoint)}",method="{_escape(method_name)}"'
+                lines.append(f"{name}{{{labels}}} {values[key]}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
@@ -1,13 +1,25 @@
+import hashlib
+import json
+import posixpath
+import threading
 from datetime import datetime, timedelta
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import jwt
-from flask import Blueprint, Response, current_app, render_template
+from flask import Blueprint, Response, abort, current_app, render_template, request
 from flask.helpers import make_response
-from pydantic import ValidationError
+from jwt.algorithms import get_default_algorithms
 
+from .assets import IMMUTABLE_CACHE_CONTROL, AssetBundle
+from .auth import ClaimsCache, KeySet
+from .batch import BatchDispatcher, BatchRequest, BatchResponse
+from .caching import FileSystemCache, MemoryCache, ResponseCache
+from .compression import DEFAULT_ENCODINGS, Compression, StaticContent
 from .exceptions import ApiException, ValidationErrorResponses
-from .spec.models import InfoModel, SpecPath, UrlMapModel
+from .metrics import CONTENT_TYPE, Metrics, render_admission
+from .spec.core import SpecDocument
+from .spec.models import EndPointMap, InfoModel, UrlMapModel, convert_url_rule
+from .uploads import UploadRequestMixin, close_uploads
 
 
 class SpecMixin:
@@ -18,76 +30,285 @@ class SpecMixin:
         self.app.config.setdefault("API_VERSION", "0.1.0")
         self.app.config.setdefault("SPEC_URL", "/api/spec.json")
         self.app.config.setdefault("SWAGGER_UI_URL", "/docs")
+        self.app.config.setdefault("SWAGGER_UI_ASSETS_URL", None)
+        self.app.config.setdefault("SPEC_FILE", None)
+        self.app.config.setdefault("SPEC_FILE_MISMATCH", "warn")
+        self._spec_lock = threading.Lock()
+        self.swagger_assets = AssetBundle()
+        # Swagger UI page rendered once, its urls are relative so it does not depend on the script root.
+        self._swagger_page: Optional[StaticContent] = None
+        if self.app.config["SPEC_FILE"] and self.app.config["SPEC_FILE_MISMATCH"] == "error":
+            # A stale spec must stop the app, not only its first spec request.
+            self.app.before_request(self._ensure_spec)
+
+    def build_spec(self) -> None:
+        """Assemble the spec document from the registered url rules and decorators, or load `SPEC_FILE`.
+
+        Call it once all views are registered, e.g. at the end of the app factory. Otherwise it runs
+        on the first request to the spec, never on a user request, unless a `SPEC_FILE` must match with
+        `SPEC_FILE_MISMATCH = "error"`, which is checked before the first request of any kind.
+        """
+        with self._spec_lock:
+            self._register_spec()
+
+    def _ensure_spec(self) -> None:
+        if not self.spec.is_built:
+            with self._spec_lock:
+                if not self.spec.is_built:
+                    self._register_spec()
+
+    def export_spec(self, path: str) -> SpecDocument:
+        """Generate the spec from the decorators and write it with its compressed variants, to be loaded
+        through `SPEC_FILE`.
+
+        Args:
+            path (str): File of the spec json, the variants and the metadata are written next to it.
+        """
+        with self._spec_lock:
+            self.spec.prebuilt = None
+            self._generate_spec()
+            document = self.spec.document
+            document.save(path, routes=self._get_routes_fingerprint())
+
+        return document
 
     def _register_spec(self) -> None:
+        spec_file = self.app.config["SPEC_FILE"]
+        if spec_file:
+            if self.spec.prebuilt is None:
+                self.spec.prebuilt = self._load_spec_file(spec_file)
+            self.spec.invalidate()
+            self.spec.is_built = True
+            return
+
+        self._generate_spec()
+
+    def _load_spec_file(self, path: str) -> SpecDocument:
+        document, meta = SpecDocument.load(path)
+        if meta.get("routes") != self._get_routes_fingerprint():
+            message = f"The spec in {path} was exported for other url rules than the registered ones, export it again"
+            if self.app.config["SPEC_FILE_MISMATCH"] == "error":
+                raise RuntimeError(message)
+            self.app.logger.warning(message)
+
+        return document
+
+    def _get_routes_fingerprint(self) -> str:
+        rules = sorted((rule.rule, rule.endpoint, sorted(rule.methods or ())) for rule in self.app.url_map.iter_rules())
+        return hashlib.sha256(json.dumps(rules).encode()).hexdigest()
+
+    def _generate_spec(self) -> None:
+        self.spec.resolve()
+
         # Add url rules and endpoint to url_maps.
-        for url_map in self.app.url_map.iter_rules():
-            self.spec.url_maps.append(UrlMapModel(url=url_map.rule, endpoint=url_map.endpoint))
+        self.spec.url_maps = [
+            UrlMapModel.construct(url=convert_url_rule(url_map.rule), endpoint=url_map.endpoint)
+            for url_map in self.app.url_map.iter_rules()
+        ]
 
-        # Mapping blueprint_map, endpoint_map in name,
-        # and override endpoint_map name.
+        # Mapping blueprint_map, endpoint_map in name.
+        blueprint_names: Dict[str, str] = {}
         for blueprint_map in self.spec.blueprint_maps:
-            for index, endpoint_map in enumerate(self.spec.endpoint_maps):
-                if endpoint_map.endpoint_name == blueprint_map.endpoint_name:
-                    self.spec.endpoint_maps[
-                        index
-                    ].endpoint_name = f"{blueprint_map.blueprint_name}.{endpoint_map.endpoint_name}"
+            blueprint_names.setdefault(
+                blueprint_map.endpoint_name, f"{blueprint_map.blueprint_name}.{blueprint_map.endpoint_name}"
+            )
+
+        endpoint_groups: Dict[str, List[EndPointMap]] = {}
+        for endpoint_map in self.spec.endpoint_maps:
+            endpoint_name = blueprint_names.get(endpoint_map.endpoint_name, endpoint_map.endpoint_name)
+            endpoint_groups.setdefault(endpoint_name, []).append(endpoint_map)
 
         # Mapping url_map.endpoint, endpoint_map.endpoint_name,
         # and register endpoint_map to spec document.
+        paths: Dict[str, Any] = {}
         for url_map in self.spec.url_maps:
-            for endpoint_map in self.spec.endpoint_maps:
-                if url_map.endpoint == endpoint_map.endpoint_name:
-                    spec_path = SpecPath(
-                        url=url_map.url,
-                        method_name=endpoint_map.method_name,
-                        endpoint_model=endpoint_map.model,
-                    )
-                    _paths = {
-                        spec_path.method_name: spec_path.endpoint_model.dict(
-                            by_alias=True, exclude_none=True, exclude={"method_name"}
-                        )
-                    }
-                    if self.spec.spec_model.paths.get(spec_path.url):
-                        self.spec.spec_model.paths[spec_path.url].update(_paths)
-                    else:
-                        self.spec.spec_model.paths.update({spec_path.url: _paths})
-
-        # Register openapi, info, components, tags to spec document.
-        self.spec.spec_model.openapi = current_app.config["OPENAPI_VERSION"]
+            for endpoint_map in endpoint_groups.get(url_map.endpoint, ()):
+                _paths = {endpoint_map.method_name: endpoint_map.model.dict(by_alias=True, exclude_none=True)}
+                paths.setdefault(url_map.url, {}).update(_paths)
+
+        # Register openapi, info, paths, components, tags to spec document.
+        self.spec.spec_model.openapi = self.app.config["OPENAPI_VERSION"]
         self.spec.spec_model.info = InfoModel(
-            title=current_app.config["API_TITLE"],
-            version=current_app.config["API_VERSION"],
+            title=self.app.config["API_TITLE"],
+            version=self.app.config["API_VERSION"],
         )
+        self.spec.spec_model.paths = paths
         self.spec.spec_model.components = self.spec.components
         self.spec.spec_model.tags = self.spec.tags
+        self.spec.invalidate()
+        self.spec.is_built = True
+
+    def _get_spec(self) -> Response:
+        self._ensure_spec()
+        return self._send_static(self.spec.document, "application/json")
+
+    def _get_swagger_docs(self) -> Response:
+        page = self._swagger_page
+        if page is None:
+            page = self._swagger_page = StaticContent(self._render_swagger_docs().encode())
+
+        # Revalidated on every load, which is a 304 until the page changes with a new release or config.
+        return self._send_static(page, "text/html", "no-cache")
 
-    def _get_spec(self) -> Dict[str, Any]:
-        return self.spec.spec_model.dict(exclude_none=True)
+    def _render_swagger_docs(self) -> str:
+        # Urls are built without script root and made relative to the page, which works under any mount point.
+        adapter = self.app.url_map.bind("localhost")
+        page_directory = adapter.build("restapi._get_swagger_docs").rsplit("/", 1)[0] or "/"
 
-    def _get_swagger_docs(self) -> str:
-        return render_template("swagger_ui.html")
+        def relative_url(endpoint: str, **values: Any) -> str:
+            return posixpath.relpath(adapter.build(endpoint, values), page_directory)
+
+        assets = {
+            name: relative_url("restapi._get_swagger_asset", filename=fingerprinted_name)
+            for name, fingerprinted_name in self.swagger_assets.get_names().items()
+        }
+        return render_template("swagger_ui.html", assets=assets, spec_url=relative_url("restapi._get_spec"))
+
+    def _get_swagger_asset(self, filename: str) -> Response:
+        asset = self.swagger_assets.get(filename)
+        if asset is None:
+            abort(404)
+
+        content, mimetype = asset
+        return self._send_static(content, mimetype, IMMUTABLE_CACHE_CONTROL)
+
+    def _send_static(self, content: StaticContent, mimetype: str, cache_control: str = None) -> Response:
+        encoding = self.compression.negotiate(content.encodings) if self.compression is not None else None
+        etag = content.get_etag(encoding)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(content.get(encoding), mimetype=mimetype)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+
+        response.set_etag(etag)
+        response.vary.add("Accept-Encoding")
+        if cache_control:
+            response.headers["Cache-Control"] = cache_control
+        return response
 
     def _register_blueprint(self) -> None:
         restapi_bp = Blueprint("restapi", __name__, template_folder="templates")
         restapi_bp.add_url_rule(current_app.config["SPEC_URL"], view_func=self._get_spec)
         restapi_bp.add_url_rule(current_app.config["SWAGGER_UI_URL"], view_func=self._get_swagger_docs)
+        assets_url = (
+            current_app.config["SWAGGER_UI_ASSETS_URL"] or f"{current_app.config['SWAGGER_UI_URL'].rstrip('/')}/assets"
+        )
+        restapi_bp.add_url_rule(f"{assets_url}/<path:filename>", view_func=self._get_swagger_asset)
+        if current_app.config["METRICS_URL"]:
+            restapi_bp.add_url_rule(current_app.config["METRICS_URL"], view_func=self._get_metrics)
+        if current_app.config["BATCH_URL"]:
+            restapi_bp.add_url_rule(
+                current_app.config["BATCH_URL"], "batch", view_func=self._make_batch_view(), methods=["POST"]
+            )
         self.app.register_blueprint(restapi_bp)
 
 
+class BatchMixin:
+    def init_app(self) -> None:
+        super().init_app()
+        self.app.config.setdefault("BATCH_URL", None)
+        self.app.config.setdefault("BATCH_MAX_ITEMS", 50)
+        self.app.config.setdefault("BATCH_MAX_WORKERS", 8)
+        self.batch_dispatcher: Optional[BatchDispatcher] = None
+        if self.app.config["BATCH_URL"]:
+            self.batch_dispatcher = BatchDispatcher(
+                self.app, self.app.config["BATCH_MAX_WORKERS"], excluded_endpoints=["restapi.batch"]
+            )
+
+    def _make_batch_view(self):
+        @self.body(BatchRequest, endpoint="restapi.batch", method_name="post")
+        @self.response(BatchResponse, endpoint="restapi.batch", method_name="post")
+        def batch(func_self, parameters):
+            """Run many sub-requests in one call."""
+            items = parameters.body.requests
+            max_items = current_app.config["BATCH_MAX_ITEMS"]
+            if len(items) > max_items:
+                raise ApiException(413, description=f"A batch holds at most {max_items} requests")
+
+            return BatchResponse(responses=self.batch_dispatcher.dispatch(items, request.environ))
+
+        return batch
+
+
+class CacheMixin:
+    def init_app(self) -> None:
+        super().init_app()
+        self.app.config.setdefault("RESTAPI_CACHE_SIZE", 1024)
+        self.app.config.setdefault("RESTAPI_CACHE_DIR", None)
+        cache_dir = self.app.config["RESTAPI_CACHE_DIR"]
+        if cache_dir:
+            store = FileSystemCache(cache_dir, self.app.config["RESTAPI_CACHE_SIZE"])
+        else:
+            store = MemoryCache(self.app.config["RESTAPI_CACHE_SIZE"])
+        self.response_cache = ResponseCache(store)
+
+
+class CompressionMixin:
+    def init_app(self) -> None:
+        super().init_app()
+        self.app.config.setdefault("RESTAPI_COMPRESSION", True)
+        self.app.config.setdefault("RESTAPI_COMPRESSION_ENCODINGS", DEFAULT_ENCODINGS)
+        self.app.config.setdefault("RESTAPI_COMPRESSION_MIN_SIZE", 500)
+        self.compression: Optional[Compression] = None
+        if self.app.config["RESTAPI_COMPRESSION"]:
+            self.compression = Compression(
+                self.app.config["RESTAPI_COMPRESSION_ENCODINGS"], self.app.config["RESTAPI_COMPRESSION_MIN_SIZE"]
+            )
+
+
+class MetricsMixin:
+    def init_app(self) -> None:
+        super().init_app()
+        self.app.config.setdefault("METRICS_URL", None)
+        self.metrics: Optional[Metrics] = Metrics() if self.app.config["METRICS_URL"] else None
+
+    def _register_metrics(self) -> None:
+        if self.metrics is not None:
+            self.app.after_request(self._count_response)
+
+    def _count_response(self, response: Response) -> Response:
+        # Error responses, e.g. 422 from validation and the codes of ApiException, pass here as well.
+        self.metrics.count_response(request.endpoint, response.status_code)
+        return response
+
+    def _get_metrics(self) -> Response:
+        body = self.metrics.render()
+        if self.limiters:
+            body += render_admission(self.admission_stats())
+        return Response(body, content_type=CONTENT_TYPE)
+
+
+class UploadMixin:
+    def init_app(self) -> None:
+        super().init_app()
+        if not issubclass(self.app.request_class, UploadRequestMixin):
+            self.app.request_class = type(
+                self.app.request_class.__name__, (UploadRequestMixin, self.app.request_class), {}
+            )
+        self.app.teardown_request(self._close_uploads)
+
+    def _close_uploads(self, error: Optional[BaseException] = None) -> None:
+        parameters = getattr(request, "parameters", None)
+        if parameters is not None and parameters.form is not None:
+            close_uploads(parameters.form)
+
+
 class HandlerMixin:
     def init_app(self) -> None:
         pass
 
     def _register_handlers(self) -> None:
         self.app.register_error_handler(ApiException, self._handle_api_exception)
-        self.app.register_error_handler(ValidationError, self._handle_validation_error)
+        for error in self.validation_backend.validation_errors:
+            self.app.register_error_handler(error, self._handle_validation_error)
 
-    def _handle_validation_error(self, error: ValidationError) -> Response:
-        return make_response(ValidationErrorResponses(results=error.errors()).dict(), 422)
+    def _handle_validation_error(self, error: Exception) -> Response:
+        return make_response(ValidationErrorResponses(results=self.validation_backend.errors(error)).dict(), 422)
 
     def _handle_api_exception(self, error: ApiException) -> Response:
-        return make_response(error.to_dict(), error.http_code)
+        return make_response(error.to_dict(), error.http_code, error.headers or {})
 
 
 class AuthMixin:
@@ -96,9 +317,20 @@ class AuthMixin:
         self.algorithm = "HS256"
         self.app.config.setdefault("RESTAPI_ENCODE_KEY", "FlaskRESTAPIKey")
         self.app.config.setdefault("RESTAPI_DECODE_KEY", "FlaskRESTAPIKey")
+        self.app.config.setdefault("RESTAPI_CLAIMS_CACHE_SIZE", 0)
+        self.app.config.setdefault("RESTAPI_CLAIMS_CACHE_TTL", 60)
+        self.app.config.setdefault("RESTAPI_JWKS_FILE", None)
+        # Signs the pagination cursors, RESTAPI_ENCODE_KEY is used when it is not set.
+        self.app.config.setdefault("RESTAPI_CURSOR_KEY", None)
+        self.claims_cache: Optional[ClaimsCache] = None
+        self.key_set: Optional[KeySet] = None
+        self._claims_cache_key_version: Any = None
+        self._prepared_key: Tuple[Any, str, Any] = (None, "", None)
 
     def set_algorithm(self, algorithm: str) -> None:
         self.algorithm = algorithm
+        if self.claims_cache is not None:
+            self.claims_cache.clear()
 
     def encode_jwt(self, expiration_time: timedelta = None, **payloads) -> str:
         payload = {
@@ -116,6 +348,61 @@ class AuthMixin:
         return jwt.encode(payload, current_app.config["RESTAPI_ENCODE_KEY"], self.algorithm)
 
     def decode_jwt(self, encoded_token: str, audience: Iterable = [""], **options) -> Dict[str, Any]:
-        return jwt.decode(
-            encoded_token, current_app.config["RESTAPI_DECODE_KEY"], self.algorithm, audience=audience, **options
-        )
+        key_version = self._get_key_version()
+        cache = self._get_claims_cache(key_version)
+        if cache is None:
+            return self._decode_jwt(encoded_token, audience, **options)
+
+        _audience = audience if isinstance(audience, str) or audience is None else tuple(audience)
+        key = cache.make_key(encoded_token, _audience, repr(sorted(options.items())))
+        claims = cache.get(key)
+        if claims is None:
+            claims = self._decode_jwt(encoded_token, audience, **options)
+            cache.set(key, claims)
+
+        return claims
+
+    def _decode_jwt(self, encoded_token: str, audience: Iterable, **options) -> Dict[str, Any]:
+        if self.key_set is not None:
+            jwk = self.key_set.get(jwt.get_unverified_header(encoded_token).get("kid"))
+            return jwt.decode(encoded_token, jwk.key, [jwk.algorithm_name], audience=audience, **options)
+
+        decode_key = self._get_prepared_key(current_app.config["RESTAPI_DECODE_KEY"])
+        return jwt.decode(encoded_token, decode_key, [self.algorithm], audience=audience, **options)
+
+    def _get_prepared_key(self, decode_key: Any) -> Any:
+        # PEM keys are parsed into key objects once, not on every decode.
+        raw_key, algorithm, prepared_key = self._prepared_key
+        if raw_key != decode_key or algorithm != self.algorithm:
+            prepared_key = get_default_algorithms()[self.algorithm].prepare_key(decode_key)
+            self._prepared_key = (decode_key, self.algorithm, prepared_key)
+
+        return prepared_key
+
+    def _get_key_version(self) -> Any:
+        jwks_file = current_app.config["RESTAPI_JWKS_FILE"]
+        if not jwks_file:
+            self.key_set = None
+            return current_app.config["RESTAPI_DECODE_KEY"]
+
+        if self.key_set is None or self.key_set.path != jwks_file:
+            self.key_set = KeySet(jwks_file)
+        else:
+            self.key_set.refresh()
+
+        return (jwks_file, self.key_set.version)
+
+    def _get_claims_cache(self, key_version: Any) -> Optional[ClaimsCache]:
+        max_size = current_app.config["RESTAPI_CLAIMS_CACHE_SIZE"]
+        if not max_size:
+            return None
+
+        if self.claims_cache is None:
+            self.claims_cache = ClaimsCache(max_size, current_app.config["RESTAPI_CLAIMS_CACHE_TTL"])
+
+        # Claims verified with a replaced key must not be served anymore.
+        if key_version != self._claims_cache_key_version:
+            self.claims_cache.clear()
+            self._claims_cache_key_version = key_version
+
+        return self.claims_cache
@@ -0,0 +1,191 @@
+import base64
+import hashlib
+import hmac
+import json
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import urlencode
+
+from flask import current_app, request
+
+from .compat import BaseModel, Field, GenericModel, pydantic_encoder
+
+ItemT = TypeVar("ItemT")
+
+NEXT = "next"
+PREV = "prev"
+PAGE_HEADERS = {
+    "Link": {
+        "description": 'URLs of the adjacent pages, as `<url>; rel="next"` and `<url>; rel="prev"`.',
+        "schema": {"type": "string"},
+    }
+}
+
+
+def _get_key() -> bytes:
+    key = current_app.config["RESTAPI_CURSOR_KEY"] or current_app.config["RESTAPI_ENCODE_KEY"]
+    return key.encode() if isinstance(key, str) else key
+
+
+def _sign(payload: bytes) -> bytes:
+    # Bound to the endpoint, so a cursor of one listing is rejected by another.
+    message = f"{request.endpoint}.".encode() + payload
+    return hmac.new(_get_key(), message, hashlib.sha256).digest()[:16]
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class Cursor:
+    __slots__ = ("values", "direction")
+
+    def __init__(self, values: Sequence[Any], direction: str = NEXT) -> None:
+        """Position in a listing: the sort key of the last item seen, and which way to read from it.
+
+        Args:
+            values (Sequence[Any]): Sort key values of the item, e.g. `(created_at, id)`.
+            direction (str, optional): NEXT reads the items after the key, PREV the items before it. Defaults to NEXT.
+        """
+        self.values = list(values)
+        self.direction = direction
+
+    @property
+    def is_prev(self) -> bool:
+        return self.direction == PREV
+
+    def encode(self) -> str:
+        """Opaque token of the cursor, signed with `RESTAPI_CURSOR_KEY`."""
+        payload = json.dumps([self.direction, self.values], default=pydantic_encoder, separators=(",", ":")).encode()
+        return f"{_b64encode(payload)}.{_b64encode(_sign(payload))}"
+
+    @classmethod
+    def decode(cls, token: str) -> "Cursor":
+        try:
+            encoded_payload, encoded_signature = token.split(".")
+            payload = _b64decode(encoded_payload)
+            signature = _b64decode(encoded_signature)
+        except ValueError:
+            raise ValueError("malformed cursor")
+
+        if not hmac.compare_digest(signature, _sign(payload)):
+            raise ValueError("invalid cursor signature")
+
+        direction, values = json.loads(payload)
+        return cls(values, direction)
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v: Any) -> "Cursor":
+        if isinstance(v, Cursor):
+            return v
+        if not isinstance(v, str):
+            raise TypeError("string required")
+        return cls.decode(v)
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: Dict[str, Any]) -> None:
+        field_schema.update(type="string", description="Opaque cursor of the page, from next_cursor or prev_cursor.")
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Cursor):
+            return NotImplemented
+        return (self.values, self.direction) == (other.values, other.direction)
+
+    def __repr__(self) -> str:
+        return f"Cursor({self.values!r}, {self.direction!r})"
+
+
+class CursorQuery(BaseModel):
+    """Query parameters of a keyset paginated listing, subclass it to add filters or change the page size cap.
+
+    Redefine `limit` to change the cap, e.g. `limit: int = Field(50, ge=1, le=500)`.
+    """
+
+    cursor: Optional[Cursor] = None
+    limit: int = Field(20, ge=1, le=100, description="Maximum number of items in the page.")
+
+
+class CursorPage(GenericModel, Generic[ItemT]):
+    """A page of a keyset paginated listing, e.g. `CursorPage[UserSpec]`.
+
+    Build it with `paginate`, the adjacent pages are sent as `next`/`prev` URLs, cursors and a `Link` header.
+    """
+
+    items: List[ItemT]
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, absent on the last page.")
+    prev_cursor: Optional[str] = Field(None, description="Cursor of the previous page, absent on the first page.")
+    next: Optional[str] = Field(None, description="URL of the next page.")
+    prev: Optional[str] = Field(None, description="URL of the previous page.")
+
+    @classmethod
+    def __concrete_name__(cls, params: Tuple[Any, ...]) -> str:
+        # The default "CursorPage[UserSpec]" is not a valid component name of the spec.
+        return "_".join([cls.__name__] + [getattr(param, "__name__", str(param)) for param in params])
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        links = [f'<{url}>; rel="{rel}"' for rel, url in ((NEXT, self.next), (PREV, self.prev)) if url]
+        return {"Link": ", ".join(links)} if links else {}
+
+    @classmethod
+    def paginate(cls, items: Sequence[Any], query: CursorQuery, key: Callable[[Any], Sequence[Any]]) -> "CursorPage":
+        """Make the page from the items the view fetched for `query`.
+
+        Fetch `query.limit + 1` items, so the page knows whether there are more. Without a cursor or with a
+        next cursor, fetch the items after `query.cursor.values` in sort order. With a prev cursor, fetch the
+        items before them in reverse sort order, e.g. `WHERE (created_at, id) < :values ORDER BY created_at
+        DESC, id DESC`. Either way the query is an index seek, so every page costs the same.
+
+        Args:
+            items (Sequence[Any]): Up to `query.limit + 1` items.
+            query (CursorQuery): Validated query of the request.
+            key (Callable[[Any], Sequence[Any]]): Sort key values of an item, unique across the listing, e.g. `(created_at, id)`.
+        """
+        cursor, limit = query.cursor, query.limit
+        has_more = len(items) > limit
+        items = list(items[:limit])
+        is_prev = cursor is not None and cursor.is_prev
+        if is_prev:
+            items.reverse()
+
+        next_cursor = prev_cursor = None
+        if items:
+            # Reading backwards, there is always a next page: the one the cursor came from.
+            if has_more or is_prev:
+                next_cursor = Cursor(key(items[-1]), NEXT).encode()
+            if (has_more and is_prev) or (cursor is not None and not is_prev):
+                prev_cursor = Cursor(key(items[0]), PREV).encode()
+
+        return cls(
+            items=items,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            next=_page_url(next_cursor, limit),
+            prev=_page_url(prev_cursor, limit),
+        )
+
+
+def _page_url(cursor: Optional[str], limit: int) -> Optional[str]:
+    if cursor is None:
+        return None
+
+    args = [(name, value) for name, value in request.args.items(multi=True) if name not in ("cursor", "limit")]
+    args += [("cursor", cursor), ("limit", str(limit))]
+    return f"{request.base_url}?{urlencode(args)}"
@@ -0,0 +1,298 @@
+import functools
+import inspect
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from flask import Response, current_app, make_response, request, stream_with_context
+from werkzeug.http import is_resource_modified
+
+from .admission import AdmissionLimiter
+from .caching import CachedResponse, CacheRule
+from .compression import Compression
+from .conditional import is_precondition_failed, make_version_etag
+from .streaming import STREAM_MIMETYPES, is_streamable, stream_items
+from .types import RequestParametersType
+
+# Cache key, version ETag and last modified time of a request, handed from before_view to finish.
+ViewState = Tuple[Optional[str], Optional[str], Optional[datetime]]
+
+
+class Pipeline:
+    def __init__(self, api: Any, func: Callable) -> None:
+        """All steps collected from the Api decorators of one view, run by a single wrapper.
+
+        Args:
+            api (Api): The Api the decorators belong to.
+            func (Callable): The undecorated view function.
+        """
+        self.api = api
+        self.func = func
+        self.is_coroutine = inspect.iscoroutinefunction(func)
+        self.steps: List[Tuple[str, Callable[[], Any], Optional[Type[Any]], str]] = []
+        self.has_response = False
+        self.code = 200
+        self.headers: Dict[str, Any] = {}
+        self.stream: Optional[str] = None
+        self.stream_schema: Optional[Type[Any]] = None
+        self.cache_rule: Optional[CacheRule] = None
+        self.etag: Optional[str] = None
+        self.version: Optional[Callable[..., Any]] = None
+        self.compress = True
+        self.limiter: Optional[AdmissionLimiter] = None
+
+        # Coroutine views get a coroutine wrapper, so the view is awaited on the loop running the wrapper
+        # instead of being bridged to sync by every layer.
+        if self.is_coroutine:
+
+            @functools.wraps(func)
+            async def wrapper(func_self=None, *args, **kwargs):
+                return await self.run_async(func_self, kwargs)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(func_self=None, *args, **kwargs):
+                return self.run(func_self, kwargs)
+
+        wrapper.__restapi_pipeline__ = self
+        self.wrapper = wrapper
+
+    @classmethod
+    def of(cls, api: Any, func: Callable) -> "Pipeline":
+        """Return the pipeline `func` is the wrapper of, or start a new one around `func`."""
+        pipeline = getattr(func, "__restapi_pipeline__", None)
+        if pipeline is not None and pipeline.wrapper is func and pipeline.api is api:
+            return pipeline
+
+        return cls(api, func)
+
+    def add_step(self, name: str, loader: Callable[[], Any], schema: Type[Any] = None) -> None:
+        """Add a step which loads request data, validated against `schema` when one is given."""
+        # Decorators are applied from the inside out, but the outermost one must parse first.
+        self.steps.insert(0, (name, loader, schema, f"{name}_validation"))
+
+    def add_response(
+        self,
+        code: int,
+        headers: Dict[str, Any] = None,
+        schema: Type[Any] = None,
+        stream: str = None,
+        etag: str = None,
+        version: Callable[..., Any] = None,
+        compress: bool = True,
+    ) -> None:
+        # The outermost response decorator sets the status code, headers are applied inside out.
+        self.has_response = True
+        self.code = code
+        if isinstance(headers, dict):
+            self.headers.update(headers)
+
+        if stream:
+            self.stream = stream
+            self.stream_schema = schema
+
+        if etag or version:
+            self.etag = etag or "strong"
+        if version:
+            self.version = version
+        if not compress:
+            self.compress = False
+
+    def run(self, func_self: Any, kwargs: Dict[str, Any]) -> Any:
+        # Admission is decided before any request data is read.
+        limiter = self.limiter
+        if limiter is None:
+            return self.run_view(func_self, kwargs)
+
+        limiter.acquire()
+        try:
+            return self.run_view(func_self, kwargs)
+        finally:
+            limiter.release()
+
+    async def run_async(self, func_self: Any, kwargs: Dict[str, Any]) -> Any:
+        # Waiting for a slot would block the event loop, so async views are rejected at once when full.
+        limiter = self.limiter
+        if limiter is None:
+            return await self.run_view_async(func_self, kwargs)
+
+        limiter.acquire(blocking=False)
+        try:
+            return await self.run_view_async(func_self, kwargs)
+        finally:
+            limiter.release()
+
+    def run_view(self, func_self: Any, kwargs: Dict[str, Any]) -> Any:
+        # Phase timings are only collected when metrics are enabled, and recorded once per request.
+        metrics = self.api.metrics
+        timings: Optional[List[Tuple[str, float]]] = None if metrics is None else []
+        try:
+            parameters = self.load_parameters(timings)
+            response, state = self.before_view(parameters, kwargs)
+            if response is not None:
+                return response
+
+            start = perf_counter()
+            result = self.func(func_self, parameters, **kwargs)
+            if timings is not None:
+                timings.append(("view", perf_counter() - start))
+            return self.finish(result, timings, state)
+        finally:
+            if timings:
+                metrics.observe(request.endpoint, timings)
+
+    async def run_view_async(self, func_self: Any, kwargs: Dict[str, Any]) -> Any:
+        metrics = self.api.metrics
+        timings: Optional[List[Tuple[str, float]]] = None if metrics is None else []
+        try:
+            parameters = self.load_parameters(timings)
+            response, state = self.before_view(parameters, kwargs)
+            if response is not None:
+                return response
+
+            start = perf_counter()
+            result = await self.func(func_self, parameters, **kwargs)
+            if timings is not None:
+                timings.append(("view", perf_counter() - start))
+            return self.finish(result, timings, state)
+        finally:
+            if timings:
+                metrics.observe(request.endpoint, timings)
+
+    def load_parameters(self, timings: List[Tuple[str, float]] = None) -> RequestParametersType:
+        parameters = getattr(request, "parameters", None)
+        if parameters is None:
+            parameters = request.parameters = RequestParametersType()
+
+        validate = self.api.validation_backend.validate
+        for name, loader, schema, validation_phase in self.steps:
+            start = perf_counter()
+            value = loader()
+            if timings is not None:
+                timings.append((name, perf_counter() - start))
+
+            if schema is not None:
+                start = perf_counter()
+                value = validate(schema, value)
+                if timings is not None:
+                    timings.append((validation_phase, perf_counter() - start))
+
+            setattr(parameters, name, value)
+
+        return parameters
+
+    def before_view(
+        self, parameters: RequestParametersType, kwargs: Dict[str, Any]
+    ) -> Tuple[Optional[Response], ViewState]:
+        """Answer the request without running the view when the resource is not modified or its response is cached.
+
+        A GET or HEAD request for an unchanged version gets a 304. Other methods change the resource, so when their
+        preconditions fail they get a 412 instead of running the view.
+
+        Returns:
+            The early response or None, and the cache key and version validators for `finish`.
+        """
+        version_etag = last_modified = None
+        if self.version is not None:
+            version = self.version(parameters, **kwargs)
+            version_etag = make_version_etag(version)
+            last_modified = version if isinstance(version, datetime) else None
+            # The client may hold the ETag of a compressed body, which has the encoding appended.
+            compression = self.get_compression()
+            etags = compression.get_etag_variants(version_etag) if compression is not None else [version_etag]
+            if request.method not in ("GET", "HEAD"):
+                if is_precondition_failed(request, etags, last_modified):
+                    response = Response(status=412, headers=self.headers)
+                    self.set_validators(response, version_etag, last_modified)
+                    return response, (None, None, None)
+            else:
+                for etag in etags:
+                    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                        response = Response(status=304, headers=self.headers)
+                        self.set_validators(response, etag, last_modified)
+                        return response, (None, None, None)
+
+        cache_key = None
+        if self.cache_rule is not None:
+            cache_key = self.cache_rule.make_key(parameters, request.method, self.api.validation_backend)
+            entry = self.api.response_cache.get(request.endpoint, cache_key)
+            if entry is not None:
+                response = entry.to_response()
+                compression = self.get_compression()
+                if compression is not None:
+                    compression.apply(response, entry.variants)
+                if self.etag is not None:
+                    response.make_conditional(request)
+                return response, (None, None, None)
+
+        return None, (cache_key, version_etag, last_modified)
+
+    def finish(self, result: Any, timings: Optional[List[Tuple[str, float]]], state: ViewState) -> Any:
+        if self.has_response:
+            start = perf_counter()
+            result = self.make_response(result)
+            if timings is not None:
+                timings.append(("response", perf_counter() - start))
+
+        cache_key, version_etag, last_modified = state
+        compression = self.get_compression()
+        if cache_key is None and self.etag is None and compression is None:
+            return result
+
+        response = current_app.make_response(result)
+        if self.etag is not None and 200 <= response.status_code < 300:
+            if version_etag is not None:
+                self.set_validators(response, version_etag, last_modified)
+            elif not response.is_streamed and "ETag" not in response.headers:
+                response.add_etag(weak=self.etag == "weak")
+
+        # The identity body is cached, compressed variants are added to the entry as clients ask for them.
+        entry = None
+        if cache_key is not None:
+            if self.cache_rule.is_cacheable(response):
+                entry = CachedResponse.from_response(response, self.cache_rule.ttl)
+                self.api.response_cache.set(request.endpoint, cache_key, entry)
+            response.headers["X-Cache"] = "MISS"
+
+        if compression is not None:
+            compression.apply(response, entry.variants if entry is not None else None)
+
+        if self.etag is not None:
+            # Turns the response into a 304 when If-None-Match or If-Modified-Since match it.
+            response.make_conditional(request)
+        return response
+
+    def get_compression(self) -> Optional[Compression]:
+        return self.api.compression if self.compress else None
+
+    def set_validators(self, response: Response, etag: str, last_modified: Optional[datetime]) -> None:
+        response.set_etag(etag, weak=self.etag == "weak")
+        if last_modified is not None:
+            response.last_modified = last_modified
+
+    def make_response(self, result: Any):
+        encoder = self.api.response_encoder
+        backend = self.api.validation_backend
+        is_model = backend.is_model(result)
+        if self.stream and not is_model and is_streamable(result):
+            content = stream_items(result, self.stream_schema, encoder, self.stream, backend)
+            response = Response(stream_with_context(content), self.code, mimetype=STREAM_MIMETYPES[self.stream])
+        elif is_model and encoder is not None:
+            response = Response(encoder.encode(result), self.code, mimetype=encoder.mimetype)
+        elif is_model:
+            response = make_response(backend.dump(result), self.code)
+        else:
+            response = make_response(result, self.code)
+
+        # Add header from result
+        if hasattr(result, "headers"):
+            if isinstance(result.headers, dict):
+                for key, value in result.headers.items():
+                    response.headers[key] = value
+
+        # Add header from decorator
+        for key, value in self.headers.items():
+            response.headers[key] = value
+
+        return response
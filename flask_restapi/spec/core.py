@@ -1,9 +1,15 @@
-from typing import Any, Dict, List, Optional, Type
-
-from pydantic import BaseModel
+import functools
+import json
+import mmap
+import os
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
 
+from ..compat import BaseModel
+from ..compression import StaticContent, compress_static
+from ..validation import ValidationBackend
 from .models import (
     BlueprintMap,
+    CommonArraySchema,
     CommonContent,
     CommonRef,
     CommonSchema,
@@ -17,6 +23,12 @@ from .models import (
     UrlMapModel,
 )
 
+COMPONENTS_REF_TEMPLATE = "#/components/schemas/{model}"
+DEFINITIONS_REF_TEMPLATE = "#/definitions/{model}"
+# Files of an exported spec: the document, one per compressed variant and the metadata.
+ENCODING_SUFFIXES = {"gzip": ".gz", "deflate": ".zz", "br": ".br", "zstd": ".zst"}
+META_SUFFIX = ".meta"
+
 
 class SpecModel(BaseModel):
     openapi: Optional[str]
@@ -26,15 +38,110 @@ class SpecModel(BaseModel):
     tags: Optional[List[TagModel]]
 
 
+class SpecDocument(StaticContent):
+    """Spec document serialized once, with its strong ETag and compressed variants."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_model(cls, spec_model: SpecModel) -> "SpecDocument":
+        return cls(json.dumps(spec_model.dict(exclude_none=True), separators=(",", ":")).encode())
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["SpecDocument", Dict[str, Any]]:
+        """Map the files written by `save` into memory, so worker processes share their pages.
+
+        Returns:
+            The document and the metadata it was saved with.
+        """
+        with open(path + META_SUFFIX, encoding="utf-8") as f:
+            meta = json.load(f)
+
+        encodings = {encoding: _map_file(path + ENCODING_SUFFIXES[encoding]) for encoding in meta["encodings"]}
+        return cls(_map_file(path), meta["etag"], encodings), meta
+
+    def save(self, path: str, **meta: Any) -> None:
+        """Write the document, its compressed variants and `meta` next to each other, see `load`.
+
+        The variants are compressed again at the highest levels, as the export is made once at build time.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(self.body)
+        for encoding, data in compress_static(self.body, self.encodings, export=True).items():
+            with open(path + ENCODING_SUFFIXES[encoding], "wb") as f:
+                f.write(data)
+
+        with open(path + META_SUFFIX, "w", encoding="utf-8") as f:
+            json.dump({**meta, "etag": self.etag, "encodings": list(self.encodings)}, f, indent=2, sort_keys=True)
+
+
+def _map_file(path: str) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def deferrable(method: Callable) -> Callable:
+    """Record the call instead of running it when the spec is lazy, see `Spec.resolve`."""
+
+    @functools.wraps(method)
+    def wrapper(self: "Spec", *args, **kwargs) -> None:
+        if self.lazy:
+            self.invalidate()
+            self._pending.append((method, args, kwargs))
+        else:
+            method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class Spec:
-    def __init__(self) -> None:
+    def __init__(self, lazy: bool = False, validation_backend: ValidationBackend = None) -> None:
+        """Collect the spec document from the decorators.
+
+        Args:
+            lazy (bool, optional): Only record the decorators and generate the schemas when the spec is built. Defaults to False.
+            validation_backend (ValidationBackend, optional): Generates the JSON schemas of the models. Defaults to None, which uses pydantic v1.
+        """
+        self.lazy = lazy
+        self.validation_backend = validation_backend or ValidationBackend()
         self.url_maps: List[UrlMapModel] = []
         self.blueprint_maps: List[BlueprintMap] = []
         self.endpoint_maps: List[EndPointMap] = []
         self.components = SpecComponents(schemas={})
         self.tags: List[TagModel] = []
         self.spec_model = SpecModel(paths={})
+        self._endpoint_index: Dict[Tuple[str, Optional[str]], EndPointMap] = {}
+        self._tag_names: Set[str] = set()
+        self._document: Optional[SpecDocument] = None
+        # Loaded from SPEC_FILE, served instead of the document generated from the decorators.
+        self.prebuilt: Optional[SpecDocument] = None
+        self.is_built = False
+        self._pending: List[Tuple[Callable, tuple, dict]] = []
+        self._schemas: Dict[Tuple[Type[BaseModel], str], Dict[str, Any]] = {}
+        self._component_models: Set[Type[BaseModel]] = set()
+        self._response_headers: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+
+    @property
+    def document(self) -> SpecDocument:
+        """Serialized spec document, built on first use and kept until the spec changes."""
+        if self._document is None:
+            self._document = self.prebuilt if self.prebuilt is not None else SpecDocument.from_model(self.spec_model)
+
+        return self._document
 
+    def invalidate(self) -> None:
+        """Drop the serialized document and mark the spec to be built again."""
+        self._document = None
+        self.is_built = False
+
+    def resolve(self) -> None:
+        """Run the decorator calls recorded in lazy mode, in the order they were made."""
+        pending, self._pending = self._pending, []
+        for method, args, kwargs in pending:
+            method(self, *args, **kwargs)
+
+    @deferrable
     def store_parameters(
         self,
         location: str,
@@ -43,14 +150,19 @@ class Spec:
         method_name: str,
         tag: TagModel = None,
         summary: str = None,
+        explode: bool = None,
     ) -> None:
-        schema_dict = schema.schema()
+        schema_dict = self._get_schema(schema, DEFINITIONS_REF_TEMPLATE)
         description = schema_dict.get("description") or "No description"
         parameters: List[ParameterModel] = []
         required = schema_dict.get("required") or []
         for key, value in schema_dict["properties"].items():
             parameter = ParameterModel(
-                name=key, location=location, required=True if key in required else False, api_schema=value
+                name=key,
+                location=location,
+                required=True if key in required else False,
+                api_schema=value,
+                explode=explode if value.get("type") == "array" else None,
             )
             parameters.append(parameter)
 
@@ -58,6 +170,7 @@ class Spec:
             endpoint_name, method_name, parameters=parameters, tag=tag, description=description, summary=summary
         )
 
+    @deferrable
     def store_body(
         self,
         schema: Type[BaseModel],
@@ -66,12 +179,17 @@ class Spec:
         content_type: list,
         tag: TagModel = None,
         summary: str = None,
+        is_array: bool = False,
+        encoding: Dict[str, Any] = None,
     ):
         self._store_components(schema)
-        schema_dict = schema.schema()
+        schema_dict = self._get_schema(schema, COMPONENTS_REF_TEMPLATE)
         description = schema_dict.get("description") or "No description"
         common_ref = CommonRef(api_ref=f"#/components/schemas/{schema_dict['title']}")
-        common_schema = CommonSchema(api_schema=common_ref)
+        if is_array:
+            common_schema = CommonSchema(api_schema=CommonArraySchema(items=common_ref), encoding=encoding)
+        else:
+            common_schema = CommonSchema(api_schema=common_ref, encoding=encoding)
         content = {}
         for ct in content_type:
             content.update({ct: common_schema})
@@ -79,6 +197,7 @@ class Spec:
         request_body = RequestBodyModel(description=description, content=content)
         self._inject_endpoint(endpoint_name, method_name, request_body=request_body, tag=tag, summary=summary)
 
+    @deferrable
     def store_auth(self, endpoint_name: str, method_name: str) -> None:
         if not self.components.securitySchemes:
             self.components.securitySchemes = {
@@ -87,6 +206,7 @@ class Spec:
         security = [{"bearerAuth": []}]
         self._inject_endpoint(endpoint_name, method_name, security=security)
 
+    @deferrable
     def store_responses(
         self,
         code: int,
@@ -94,39 +214,81 @@ class Spec:
         endpoint_name: str,
         method_name: str,
         content_type: list,
+        is_array: bool = False,
+        headers: Dict[str, Any] = None,
     ):
         self._store_components(schema)
-        schema_dict = schema.schema()
+        schema_dict = self._get_schema(schema, COMPONENTS_REF_TEMPLATE)
         description = schema_dict.get("description") or "No description"
         common_ref = CommonRef(api_ref=f"#/components/schemas/{schema_dict['title']}")
-        common_schema = CommonSchema(api_schema=common_ref)
+        if is_array:
+            common_schema = CommonSchema(api_schema=CommonArraySchema(items=common_ref))
+        else:
+            common_schema = CommonSchema(api_schema=common_ref)
         content = {}
         for ct in content_type:
             content.update({ct: common_schema})
 
-        common_content = CommonContent(description=description, content=content)
+        common_content = CommonContent(description=description, content=content, headers=headers)
         responses = {str(code): common_content}
 
         self._inject_endpoint(endpoint_name, method_name, responses=responses)
 
+    @deferrable
+    def store_response_headers(self, headers: Dict[str, Any], endpoint_name: str, method_name: str) -> None:
+        """Document headers sent with every successful response of the operation."""
+        self._inject_endpoint(endpoint_name, method_name, response_headers=headers)
+
+    @deferrable
+    def store_conditional(
+        self, headers: Dict[str, Any], endpoint_name: str, method_name: str, precondition: bool = False
+    ) -> None:
+        """Document the validators of a conditional operation, with its 304 response or the 412 of an unsafe method."""
+        responses = {}
+        if method_name in ("get", "head"):
+            responses["304"] = CommonContent(description="Not Modified", content={})
+        elif precondition:
+            responses["412"] = CommonContent(description="Precondition Failed", content={})
+        self._inject_endpoint(endpoint_name, method_name, responses=responses, response_headers=headers)
+
+    def _get_schema(self, schema: Type[BaseModel], ref_template: str) -> Dict[str, Any]:
+        key = (schema, ref_template)
+        schema_dict = self._schemas.get(key)
+        if schema_dict is None:
+            schema_dict = self._schemas[key] = self.validation_backend.json_schema(schema, ref_template)
+
+        return schema_dict
+
     def _store_components(self, schema: Type[BaseModel]) -> None:
-        schema_dict = schema.schema(ref_template="#/components/schemas/{model}")
-        definitions = schema_dict.pop("definitions", None)
+        if schema in self._component_models:
+            return
+
+        self.invalidate()
+        self._component_models.add(schema)
+        schema_dict = self._get_schema(schema, COMPONENTS_REF_TEMPLATE)
+        definitions = schema_dict.get("definitions")
         if definitions:
             self.components.schemas.update(definitions)
 
-        self.components.schemas.update({schema_dict["title"]: schema_dict})
+        self.components.schemas.update(
+            {schema_dict["title"]: {k: v for k, v in schema_dict.items() if k != "definitions"}}
+        )
 
     def _store_tags(self, tag: TagModel) -> None:
-        if self.tags:
-            for _tag in self.tags:
-                if tag.name == _tag.name:
-                    break
-            else:
-                self.tags.append(tag)
-        else:
+        if tag.name not in self._tag_names:
+            self._tag_names.add(tag.name)
             self.tags.append(tag)
 
+    def _get_endpoint_map(self, endpoint_name: str, method_name: str) -> EndPointMap:
+        key = (endpoint_name, method_name)
+        endpoint_map = self._endpoint_index.get(key)
+        if endpoint_map is None:
+            endpoint_map = EndPointMap(endpoint_name=endpoint_name, method_name=method_name, model=EndPointModel())
+            self._endpoint_index[key] = endpoint_map
+            self.endpoint_maps.append(endpoint_map)
+
+        return endpoint_map
+
     def _inject_endpoint(
         self,
         endpoint_name: str,
@@ -138,54 +300,46 @@ class Spec:
         security: List[dict] = None,
         description: str = None,
         summary: str = None,
+        response_headers: Dict[str, Any] = None,
     ):
-        for index, em in enumerate(self.endpoint_maps):
-            if endpoint_name == em.endpoint_name and method_name == em.method_name:
-                if isinstance(parameters, list):
-                    if isinstance(em.model.parameters, list):
-                        em.model.parameters += parameters
-                    else:
-                        em.model.parameters = parameters
-
-                if isinstance(responses, dict):
-                    if isinstance(em.model.responses, dict):
-                        em.model.responses.update(responses)
-                    else:
-                        em.model.responses = responses
-
-                if isinstance(request_body, RequestBodyModel):
-                    em.model.requestBody = request_body
-
-                if isinstance(tag, TagModel):
-                    self._store_tags(tag)
-                    if not em.model.tags:
-                        em.model.tags = []
-                    if tag.name not in em.model.tags:
-                        em.model.tags.append(tag.name)
-
-                if isinstance(security, list):
-                    em.model.security = security
-
-                if isinstance(description, str):
-                    em.model.description = description
-
-                if isinstance(summary, str):
-                    em.model.summary = summary
-
-                self.endpoint_maps[index] = em
-                break
-        else:
-            endpoint_map = EndPointMap(
-                endpoint_name=endpoint_name,
-                method_name=method_name,
-                model=EndPointModel(
-                    parameters=parameters,
-                    request_body=request_body,
-                    responses=responses,
-                    tags=tag,
-                    security=security,
-                    description=description,
-                    summary=summary,
-                ),
-            )
-            self.endpoint_maps.append(endpoint_map)
+        self.invalidate()
+        em = self._get_endpoint_map(endpoint_name, method_name)
+        if isinstance(parameters, list):
+            if isinstance(em.model.parameters, list):
+                em.model.parameters += parameters
+            else:
+                em.model.parameters = parameters
+
+        if isinstance(responses, dict):
+            if isinstance(em.model.responses, dict):
+                em.model.responses.update(responses)
+            else:
+                em.model.responses = responses
+
+        # Headers apply to the successful responses, also those stored by a later decorator.
+        if isinstance(response_headers, dict):
+            self._response_headers.setdefault((endpoint_name, method_name), {}).update(response_headers)
+        headers = self._response_headers.get((endpoint_name, method_name))
+        if headers and em.model.responses:
+            for code, common_content in em.model.responses.items():
+                if code.startswith("2"):
+                    common_content.headers = {**(common_content.headers or {}), **headers}
+
+        if isinstance(request_body, RequestBodyModel):
+            em.model.requestBody = request_body
+
+        if isinstance(tag, TagModel):
+            self._store_tags(tag)
+            if not em.model.tags:
+                em.model.tags = []
+            if tag.name not in em.model.tags:
+                em.model.tags.append(tag.name)
+
+        if isinstance(security, list):
+            em.model.security = security
+
+        if isinstance(description, str):
+            em.model.description = description
+
+        if isinstance(summary, str):
+            em.model.summary = summary
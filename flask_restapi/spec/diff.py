@@ -0,0 +1,33 @@
+from typing import Any, Dict, List, Tuple
+
+HTTP_METHODS = {"get", "put", "post", "delete", "options", "head", "patch", "trace"}
+
+
+def _get_operations(spec: Dict[str, Any]) -> Dict[Tuple[str, str], Any]:
+    operations = {}
+    for path, item in (spec.get("paths") or {}).items():
+        for method, operation in item.items():
+            if method in HTTP_METHODS:
+                operations[(path, method)] = operation
+
+    return operations
+
+
+def _diff_keys(old: Dict[Any, Any], new: Dict[Any, Any], label: Any) -> List[str]:
+    lines = [f"- {label(key)}" for key in sorted(old.keys() - new.keys())]
+    lines += [f"+ {label(key)}" for key in sorted(new.keys() - old.keys())]
+    lines += [f"~ {label(key)}" for key in sorted(old.keys() & new.keys()) if old[key] != new[key]]
+    return lines
+
+
+def diff_specs(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Operations and component schemas removed (-), added (+) or changed (~) from `old` to `new`."""
+    lines = _diff_keys(_get_operations(old), _get_operations(new), lambda key: f"{key[1].upper()} {key[0]}")
+    old_schemas = (old.get("components") or {}).get("schemas") or {}
+    new_schemas = (new.get("components") or {}).get("schemas") or {}
+    lines += _diff_keys(old_schemas, new_schemas, lambda key: f"schema {key}")
+    for key in ("openapi", "info"):
+        if old.get(key) != new.get(key):
+            lines.append(f"~ {key}")
+
+    return lines
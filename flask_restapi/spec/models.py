@@ -1,7 +1,7 @@
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
-from pydantic import BaseModel, Field, validator
+from ..compat import BaseModel, Field, validator
 
 
 class ExternalDocs(BaseModel):
@@ -32,8 +32,14 @@ class CommonRef(BaseModel):
         allow_population_by_field_name = True
 
 
+class CommonArraySchema(BaseModel):
+    type: str = "array"
+    items: CommonRef
+
+
 class CommonSchema(BaseModel):
-    api_schema: CommonRef = Field(alias="schema")
+    api_schema: Union[CommonRef, CommonArraySchema] = Field(alias="schema")
+    encoding: Optional[Dict[str, Any]]
 
     class Config:
         allow_population_by_field_name = True
@@ -42,6 +48,15 @@ class CommonSchema(BaseModel):
 class CommonContent(BaseModel):
     description: Optional[str]
     content: Dict[str, CommonSchema]
+    headers: Optional[Dict[str, Any]]
+
+
+RULE_VARIABLE_PATTERN = re.compile(r"<(?:[^<>]*:)?([^<>:]+)>")
+
+
+def convert_url_rule(rule: str) -> str:
+    """Convert Flask url rule to OpenAPI path, e.g. `/user/<int:user_id>` to `/user/{user_id}`."""
+    return RULE_VARIABLE_PATTERN.sub(r"{\1}", rule)
 
 
 class UrlMapModel(BaseModel):
@@ -50,17 +65,7 @@ class UrlMapModel(BaseModel):
 
     @validator("url")
     def convert(cls, value):
-        original_rules = re.findall("<.*?>", value)
-        for rule in original_rules:
-            rule_splits = rule.split(":")
-            if len(rule_splits) == 2:
-                converted_rule = "{" + rule_splits[1][:-1] + "}"
-            else:
-                converted_rule = "{" + rule_splits[0][1:-1] + "}"
-
-            value = value.replace(rule, converted_rule)
-
-        return value
+        return convert_url_rule(value)
 
 
 class ParameterModel(BaseModel):
@@ -69,6 +74,7 @@ class ParameterModel(BaseModel):
     required: bool
     api_schema: dict = Field(alias="schema")
     description: Optional[str]
+    explode: Optional[bool]
 
     class Config:
         allow_population_by_field_name = True
@@ -0,0 +1,3 @@
+/*! For license information please see swagger-ui-standalone-preset.js.LICENSE.txt */
+!function(t,e){"object"==typeof exports&&"object"==typeof module?module.exports=e():"function"==typeof define&&define.amd?define([],e):"object"==typeof exports?exports.SwaggerUIStandalonePreset=e():t.SwaggerUIStandalonePreset=e()}(this,(function(){return(()=>{var t={7967:(t,e)=>{"use strict";var r=/^([^\w]*)(javascript|data|vbscript)/im,n=/&#(\w+)(^\w|;)?/g,i=/[\u0000-\u001F\u007F-\u009F\u2000-\u200D\uFEFF]/gim,o=/^([^:]+):/gm,s=[".","/"]},9742:(t,e)=>{"use strict";e.byteLength=function(t){var e=a(t),r=e[0],n=e[1];return 3*(r+n)/4-n},e.toByteArray=function(t){var e,r,o=a(t),s=o[0],u=o[1],c=new i(function(t,e,r){return 3*(e+r)/4-r}(0,s,u)),f=0,l=u>0?s-4:s;for(r=0;r<l;r+=4)e=n[t.charCodeAt(r)]<<18|n[t.charCodeAt(r+1)]<<12|n[t.charCodeAt(r+2)]<<6|n[t.charCodeAt(r+3)],c[f++]=e>>16&255,c[f++]=e>>8&255,c[f++]=255&e;2===u&&(e=n[t.charCodeAt(r)]<<2|n[t.charCodeAt(r+1)]>>4,c[f++]=255&e);1===u&&(e=n[t.charCodeAt(r)]<<10|n[t.charCodeAt(r+1)]<<4|n[t.charCodeAt(r+2)]>>2,c[f++]=e>>8&255,c[f++]=255&e);return c},e.fromByteArray=function(t){for(var e,n=t.length,i=n%3,o=[],s=16383,u=0,a=n-i;u<a;u+=s)o.push(c(t,u,u+s>a?a:u+s));1===i?(e=t[n-1],o.push(r[e>>2]+r[e<<4&63]+"==")):2===i&&(e=(t[n-2]<<8)+t[n-1],o.push(r[e>>10]+r[e>>4&63]+r[e<<2&63]+"="));return o.join("")};for(var r=[],n=[],i="undefined"!=typeof Uint8Array?Uint8Array:Array,o="ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",s=0,u=o.length;s<u;++s)r[s]=o[s],n[o.charCodeAt(s)]=s;function a(t){var e=t.length;if(e%4>0)throw new Error("Invalid string. Length must be a multiple of 4");var r=t.indexOf("=");return-1===r&&(r=e),[r,r===e?0:4-r%4]}function c(t,e,n){for(var i,o,s=[],u=e;u<n;u+=3)i=(t[u]<<16&16711680)+(t[u+1]<<8&65280)+(255&t[u+2]),s.push(r[(o=i)>>18&63]+r[o>>12&63]+r[o>>6&63]+r[63&o]);return s.join("")}n["-".charCodeAt(0)]=62,n["_".charCodeAt(0)]=63},8764:(t,e,r)=>{"use strict";const n=r(9742),i=r(645),o="function"==typeof Symbol&&"function"==typeof Symbol.for?Symbol.for("nodejs.util.inspect.custom"):null;e.Buffer=a,e.SlowBuffer=function(t){+t!=t&&(t=0);return a.alloc(+t)},e.INSPECT_MAX_BYTES=50;const s=2147483647;function u(t){if(t>s)throw new RangeError('The value "'+t+'" is invalid for option "size"');const e=new Uint8Array(t);return Object.setPrototypeOf(e,a.prototype),e}function a(t,e,r){if("number"==typeof t){if("string"==typeof e)throw new TypeError('The "string" argument must be of type string. Received type number');return l(t)}return c(t,e,r)}function c(t,e,r){if("string"==typeof t)return function(t,e){"string"==typeof e&&""!==e||(e="utf8");if(!a.isEncoding(e))throw new TypeError("Unknown encoding: "+e);const r=0|y(t,e);let n=u(r);const i=n.write(t,e);i!==r&&(n=n.slice(0,i));return n}(t,e);if(ArrayBuffer.isView(t))return function(t){if($(t,Uint8Array)){const e=new Uint8Array(t);return p(e.buffer,e.byteOffset,e.byteLength)}return h(t)}(t);if(null==t)throw new TypeError("The first argument must be one of type string, Buffer, ArrayBuffer, Array, or Array-like Object. Received type "+typeof t);if($(t,ArrayBuffer)||t&&$(t.buffer,ArrayBuffer))return p(t,e,r);if("undefined"!=typeof SharedArrayBuffer&&($(t,SharedArrayBuffer)||t&&$(t.buffer,SharedArrayBuffer)))return p(t,e,r);if("number"==typeof t)throw new TypeError('The "value" argument must not be of type number. Received type number');const n=t.valueOf&&t.valueOf();if(null!=n&&n!==t)return a.from(n,e,r);const i=function(t){if(a.isBuffer(t)){const e=0|d(t.length),r=u(e);return 0===r.length||t.copy(r,0,0,e),r}if(void 0!==t.length)return"number"!=typeof t.length||Z(t.length)?u(0):h(t);if("Buffer"===t.type&&Array.isArray(t.data))return h(t.data)}(t);if(i)return i;if("undefined"!=typeof Symbol&&null!=Symbol.toPrimitive&&"function"==typeof t[Symbol.toPrimitive])return a.from(t[Symbol.toPrimitive]("string"),e,r);throw new TypeError("The first argument must be one of type string, Buffer, ArrayBuffer, Array, or Array-like Object. Received type "+typeof t)}function f(t){if("number"!=typeof t)throw new TypeError('"size" argument must be of type number');if(t<0)throw new RangeError('The value "'+t+'" is invalid for option "size"')}function l(t){return f(t),u(t<0?0:0|d(t))}function h(t){const e=t.length<0?0:0|d(t.length),r=u(e);for(let n=0;n<e;n+=1)r[n]=255&t[n];return r}function p(t,e,r){if(e<0||t.byteLength<e)throw new RangeError('"offset" is outside of buffer bounds');if(t.byteLength<e+(r||0))throw new RangeError('"length" is outside of buffer bounds');let n;return n=void 0===e&&void 0===r?new Uint8Array(t):void 0===r?new Uint8Array(t,e):new Uint8Array(t,e,r),Object.setPrototypeOf(n,a.prototype),n}function d(t){if(t>=s)throw new RangeError("Attempt to allocate Buffer larger than maximum size: 0x"+s.toString(16)+" bytes");return 0|t}function y(t,e){if(a.isBuffer(t))return t.length;if(ArrayBuffer.isView(t)||$(t,ArrayBuffer))return t.byteLength;if("string"!=typeof t)throw new TypeError('The "string" argument must be one of type string, Buffer, or ArrayBuffer. Received type '+typeof t);const r=t.length,n=arguments.length>2&&!0===arguments[2];if(!n&&0===r)return 0;let i=!1;for(;;)switch(e){case"ascii":case"latin1":case"binary":return r;case"utf8":case"utf-8":return q(t).length;case"ucs2":case"ucs-2":case"utf16le":case"utf-16le":return 2*r;case"hex":return r>>>1;case"base64":return H(t).length;default:if(i)return n?-1:q(t).length;e=(""+e).toLowerCase(),i=!0}}function g(t,e,r){let n=!1;if((void 0===e||e<0)&&(e=0),e>this.length)return"";if((void 0===r||r>this.length)&&(r=this.length),r<=0)return"";if((r>>>=0)<=(e>>>=0))return"";for(t||(t="utf8");;)switch(t){case"hex":return E(this,e,r);case"utf8":case"utf-8":return N(this,e,r);case"ascii":return D(this,e,r);case"latin1":case"binary":return I(this,e,r);case"base64":return x(this,e,r);case"ucs2":case"ucs-2":case"utf16le":case"utf-16le":return A(this,e,r);default:if(n)throw new TypeError("Unknown encoding: "+t);t=(t+"").toLowerCase(),n=!0}}function v(t,e,r){const n=t[e];t[e]=t[r],t[r]=n}function w(t,e,r,n,i){if(0===t.length)return-1;if("string"==typeof r?(n=r,r=0):r>2147483647?r=2147483647:r<-2147483648&&(r=-2147483648),Z(r=+r)&&(r=i?0:t.length-1),r<0&&(r=t.length+r),r>=t.length){if(i)return-1;r=t.length-1}else if(r<0){if(!i)return-1;r=0}if("string"==typeof e&&(e=a.from(e,n)),a.isBuffer(e))return 0===e.length?-1:M(t,e,r,n,i);if("number"==typeof e)return e&=255,"function"==typeof Uint8Array.prototype.indexOf?i?Uint8Array.prototype.indexOf.call(t,e,r):Uint8Array.prototype.lastIndexOf.call(t,e,r):M(t,[e],r,n,i);throw new TypeError("val must be string, number or Buffer")}function M(t,e,r,n,i){let o,s=1,u=t.length,a=e.length;if(void 0!==n&&("ucs2"===(n=String(n).toLowerCase())||"ucs-2"===n||"utf16le"===n||"utf-16le"===n)){if(t.length<2||e.length<2)return-1;s=2,u/=2,a/=2,r/=2}function c(t,e){return 1===s?t[e]:t.readUInt16BE(e*s)}if(i){let n=-1;for(o=r;o<u;o++)if(c(t,o)===c(e,-1===n?0:o-n)){if(-1===n&&(n=o),o-n+1===a)return n*s}else-1!==n&&(o-=o-n),n=-1}else for(r+a>u&&(r=u-a),o=r;o>=0;o--){let r=!0;for(let n=0;n<a;n++)if(c(t,o+n)!==c(e,n)){r=!1;break}if(r)return o}return-1}function L(t,e,r,n){r=Number(r)||0;const i=t.length-r;n?(n=Number(n))>i&&(n=i):n=i;const o=e.length;let s;for(n>o/2&&(n=o/2),s=0;s<n;++s){const n=parseInt(e.substr(2*s,2),16);if(Z(n))return s;t[r+s]=n}return s}function _(t,e,r,n){return J(q(e,t.length-r),t,r,n)}function m(t,e,r,n){return J(function(t){const e=[];for(let r=0;r<t.length;++r)e.push(255&t.charCodeAt(r));return e}(e),t,r,n)}function b(t,e,r,n){return J(H(e),t,r,n)}function j(t,e,r,n){return J(function(t,e){let r,n,i;const o=[];for(let s=0;s<t.length&&!((e-=2)<0);++s)r=t.charCodeAt(s),n=r>>8,i=r%256,o.push(i),o.push(n);return o}(e,t.length-r),t,r,n)}function x(t,e,r){return 0===e&&r===t.length?n.fromByteArray(t):n.fromByteArray(t.slice(e,r))}function N(t,e,r){r=Math.min(t.length,r);const n=[];let i=e;for(;i<r;){const e=t[i];let o=null,s=e>239?4:e>223?3:e>191?2:1;if(i+s<=r){let r,n,u,a;switch(s){case 1:e<128&&(o=e);break;case 2:r=t[i+1],128==(192&r)&&(a=(31&e)<<6|63&r,a>127&&(o=a));break;case 3:r=t[i+1],n=t[i+2],128==(192&r)&&128==(192&n)&&(a=(15&e)<<12|(63&r)<<6|63&n,a>2047&&(a<55296||a>57343)&&(o=a));break;case 4:r=t[i+1],n=t[i+2],u=t[i+3],128==(192&r)&&128==(192&n)&&128==(192&u)&&(a=(15&e)<<18|(63&r)<<12|(63&n)<<6|63&u,a>65535&&a<1114112&&(o=a))}}null===o?(o=65533,s=1):o>65535&&(o-=65536,n.push(o>>>10&1023|55296),o=56320|1023&o),n.push(o),i+=s}return function(t){const e=t.length;if(e<=S)return String.fromCharCode.apply(String,t);let r="",n=0;for(;n<e;)r+=String.fromCharCode.apply(String,t.slice(n,n+=S));return r}(n)}e.kMaxLength=s,a.TYPED_ARRAY_SUPPORT=function(){try{const t=new Uint8Array(1),e={foo:function(){return 42}};return Object.setPrototypeOf(e,Uint8Array.prototype),Object.setPrototypeOf(t,e),42===t.foo()}catch(t){return!1}}(),a.TYPED_ARRAY_SUPPORT||"undefined"==typeof console||"function"!=typeof console.error||console.error("This browser lacks typed array (Uint8Array) support which is required by `buffer` v5.x. Use `buffer` v4.x if you require old browser support."),Object.defineProperty(a.prototype,"parent",{enumerable:!0,get:function(){if(a.isBuffer(this))return this.buffer}}),Object.defineProperty(a.prototype,"offset",{enumerable:!0,get:function(){if(a.isBuffer(this))return this.byteOffset}}),a.poolSize=8192,a.from=function(t,e,r){return c(t,e,r)},Object.setPrototypeOf(a.prototype,Uint8Array.prototype),Object.setPrototypeOf(a,Uint8Array),a.alloc=function(t,e,r){return function(t,e,r){return f(t),t<=0?u(t):void 0!==e?"string"==typeof r?u(t).fill(e,r):u(t).fill(e):u(t)}(t,e,r)},a.allocUnsafe=function(t){return l(t)},a.allocUnsafeSlow=function(t){return l(t)},a.isBuffer=function(t){return null!=t&&!0===t._isBuffer&&t!==a.prototype},a.compare=function(t,e){if($(t,Uint8Array)&&(t=a.from(t,t.offset,t.byteLength)),$(e,Uint8Array)&&(e=a.from(e,e.offset,e.byteLength)),!a.isBuffer(t)||!a.isBuffer(e))throw new TypeError('The "buf1", "buf2" arguments must be one of type Buffer or Uint8Array');if(t===e)return 0;let r=t.length,n=e.length;for(let i=0,o=Math.min(r,n);i<o;++i)if(t[i]!==e[i]){r=t[i],n=e[i];break}return r<n?-1:n<r?1:0},a.isEncoding=function(t){switch(String(t).toLowerCase()){case"hex":case"utf8":case"utf-8":case"ascii":case"latin1":case"binary":case"base64":case"ucs2":case"ucs-2":case"utf16le":case"utf-16le":return!0;default:return!1}},a.concat=function(t,e){if(!Array.isArray(t))throw new TypeError('"list" argument must be an Array of Buffers');if(0===t.length)return a.alloc(0);let r;if(void 0===e)for(e=0,r=0;r<t.length;++r)e+=t[r].length;const n=a.allocUnsafe(e);let i=0;for(r=0;r<t.length;++r){let e=t[r];if($(e,Uint8Array))i+e.length>n.length?(a.isBuffer(e)||(e=a.from(e)),e.copy(n,i)):Uint8Array.prototype.set.call(n,e,i);else{if(!a.isBuffer(e))throw new TypeError('"list" argument must be an Array of Buffers');e.copy(n,i)}i+=e.length}return n},a.byteLength=y,a.prototype._isBuffer=!0,a.prototype.swap16=function(){const t=this.length;if(t%2!=0)throw new RangeError("Buffer size must be a multiple of 16-bits");for(let e=0;e<t;e+=2)v(this,e,e+1);return this},a.prototype.swap32=function(){const t=this.length;if(t%4!=0)throw new RangeError("Buffer size must be a multiple of 32-bits");for(let e=0;e<t;e+=4)v(this,e,e+3),v(this,e+1,e+2);return this},a.prototype.swap64=function(){const t=this.length;if(t%8!=0)throw new RangeError("Buffer size must be a multiple of 64-bits");for(let e=0;e<t;e+=8)v(this,e,e+7),v(this,e+1,e+6),v(this,e+2,e+5),v(this,e+3,e+4);return this},a.prototype.toString=function(){const t=this.length;return 0===t?"":0===arguments.length?N(this,0,t):g.apply(this,arguments)},a.prototype.toLocaleString=a.prototype.toString,a.prototype.equals=function(t){if(!a.isBuffer(t))throw new TypeError("Argument must be a Buffer");return this===t||0===a.compare(this,t)},a.prototype.inspect=function(){let t="";const r=e.INSPECT_MAX_BYTES;return t=this.toString("hex",0,r).replace(/(.{2})/g,"$1 ").trim(),this.length>r&&(t+=" ... "),"<Buffer "+t+">"},o&&(a.prototype[o]=a.prototype.inspect),a.prototype.compare=function(t,e,r,n,i){if($(t,Uint8Array)&&(t=a.from(t,t.offset,t.byteLength)),!a.isBuffer(t))throw new TypeError('The "target" argument must be one of type Buffer or Uint8Array. Received type '+typeof t);if(void 0===e&&(e=0),void 0===r&&(r=t?t.length:0),void 0===n&&(n=0),void 0===i&&(i=this.length),e<0||r>t.length||n<0||i>this.length)throw new RangeError("out of range index");if(n>=i&&e>=r)return 0;if(n>=i)return-1;if(e>=r)return 1;if(this===t)return 0;let o=(i>>>=0)-(n>>>=0),s=(r>>>=0)-(e>>>=0);const u=Math.min(o,s),c=this.slice(n,i),f=t.slice(e,r);for(let t=0;t<u;++t)if(c[t]!==f[t]){o=c[t],s=f[t];break}return o<s?-1:s<o?1:0},a.prototype.includes=function(t,e,r){return-1!==this.indexOf(t,e,r)},a.prototype.indexOf=function(t,e,r){return w(this,t,e,r,!0)},a.prototype.lastIndexOf=function(t,e,r){return w(this,t,e,r,!1)},a.prototype.write=function(t,e,r,n){if(void 0===e)n="utf8",r=this.length,e=0;else if(void 0===r&&"string"==typeof e)n=e,r=this.length,e=0;else{if(!isFinite(e))throw new Error("Buffer.write(string, encoding, offset[, length]) is no longer supported");e>>>=0,isFinite(r)?(r>>>=0,void 0===n&&(n="utf8")):(n=r,r=void 0)}const i=this.length-e;if((void 0===r||r>i)&&(r=i),t.length>0&&(r<0||e<0)||e>this.length)throw new RangeError("Attempt to write outside buffer bounds");n||(n="utf8");let o=!1;for(;;)switch(n){case"hex":return L(this,t,e,r);case"utf8":case"utf-8":return _(this,t,e,r);case"ascii":case"latin1":case"binary":return m(this,t,e,r);case"base64":return b(this,t,e,r);case"ucs2":case"ucs-2":case"utf16le":case"utf-16le":return j(this,t,e,r);default:if(o)throw new TypeError("Unknown encoding: "+n);n=(""+n).toLowerCase(),o=!0}},a.prototype.toJSON=function(){return{type:"Buffer",data:Array.prototype.slice.call(this._arr||this,0)}};const S=4096;function D(t,e,r){let n="";r=Math.min(t.length,r);for(let i=e;i<r;++i)n+=String.fromCharCode(127&t[i]);return n}function I(t,e,r){let n="";r=Math.min(t.length,r);for(let i=e;i<r;++i)n+=String.fromCharCode(t[i]);return n}function E(t,e,r){const n=t.length;(!e||e<0)&&(e=0),(!r||r<0||r>n)&&(r=n);let i="";for(let n=e;n<r;++n)i+=V[t[n]];return i}function A(t,e,r){const n=t.slice(e,r);let i="";for(let t=0;t<n.length-1;t+=2)i+=String.fromCharCode(n[t]+256*n[t+1]);return i}function C(t,e,r){if(t%1!=0||t<0)throw new RangeError("offset is not uint");if(t+e>r)throw new RangeError("Trying to access beyond buffer length")}function T(t,e,r,n,i,o){if(!a.isBuffer(t))throw new TypeError('"buffer" argument must be a Buffer instance');if(e>i||e<o)throw new RangeError('"value" argument is out of bounds');if(r+n>t.length)throw new RangeError("Index out of range")}function O(t,e,r,n,i){Q(e,n,i,t,r,7);let o=Number(e&BigInt(4294967295));t[r++]=o,o>>=8,t[r++]=o,o>>=8,t[r++]=o,o>>=8,t[r++]=o;let s=Number(e>>BigInt(32)&BigInt(4294967295));return t[r++]=s,s>>=8,t[r++]=s,s>>=8,t[r++]=s,s>>=8,t[r++]=s,r}function z(t,e,r,n,i){Q(e,n,i,t,r,7);let o=Number(e&BigInt(4294967295));t[r+7]=o,o>>=8,t[r+6]=o,o>>=8,t[r+5]=o,o>>=8,t[r+4]=o;let s=Number(e>>BigInt(32)&BigInt(4294967295));return t[r+3]=s,s>>=8,t[r+2]=s,s>>=8,t[r+1]=s,s>>=8,t[r]=s,r+8}function k(t,e,r,n,i,o){if(r+n>t.length)throw new RangeError("Index out of range");if(r<0)throw new RangeError("Index out of range")}function U(t,e,r,n,o){return e=+e,r>>>=0,o||k(t,0,r,4),i.write(t,e,r,n,23,4),r+4}function R(t,e,r,n,o){return e=+e,r>>>=0,o||k(t,0,r,8),i.write(t,e,r,n,52,8),r+8}a.prototype.slice=function(t,e){const r=this.length;(t=~~t)<0?(t+=r)<0&&(t=0):t>r&&(t=r),(e=void 0===e?r:~~e)<0?(e+=r)<0&&(e=0):e>r&&(e=r),e<t&&(e=t);const n=this.subarray(t,e);return Object.setPrototypeOf(n,a.prototype),n},a.prototype.readUintLE=a.prototype.readUIntLE=function(t,e,r){t>>>=0,e>>>=0,r||C(t,e,this.length);let n=this[t],i=1,o=0;for(;++o<e&&(i*=256);)n+=this[t+o]*i;return n},a.prototype.readUintBE=a.prototype.readUIntBE=function(t,e,r){t>>>=0,e>>>=0,r||C(t,e,this.length);let n=this[t+--e],i=1;for(;e>0&&(i*=256);)n+=this[t+--e]*i;return n},a.prototype.readUint8=a.prototype.readUInt8=function(t,e){return t>>>=0,e||C(t,1,this.length),this[t]},a.prototype.readUint16LE=a.prototype.readUInt16LE=function(t,e){return t>>>=0,e||C(t,2,this.length),this[t]|this[t+1]<<8},a.prototype.readUint16BE=a.prototype.readUInt16BE=function(t,e){return t>>>=0,e||C(t,2,this.length),this[t]<<8|this[t+1]},a.prototype.readUint32LE=a.prototype.readUInt32LE=function(t,e){return t>>>=0,e||C(t,4,this.length),(this[t]|this[t+1]<<8|this[t+2]<<16)+16777216*this[t+3]},a.prototype.readUint32BE=a.prototype.readUInt32BE=function(t,e){return t>>>=0,e||C(t,4,this.length),16777216*this[t]+(this[t+1]<<16|this[t+2]<<8|this[t+3])},a.prototype.readBigUInt64LE=X((function(t){F(t>>>=0,"offset");const e=this[t],r=this[t+7];void 0!==e&&void 0!==r||G(t,this.length-8);const n=e+256*this[++t]+65536*this[++t]+this[++t]*2**24,i=this[++t]+256*this[++t]+65536*this[++t]+r*2**24;return BigInt(n)+(BigInt(i)<<BigInt(32))})),a.prototype.readBigUInt64BE=X((function(t){F(t>>>=0,"offset");const e=this[t],r=this[t+7];void 0!==e&&void 0!==r||G(t,this.length-8);const n=e*2**24+65536*this[++t]+256*this[++t]+this[++t],i=this[++t]*2**24+65536*this[++t]+256*this[++t]+r;return(BigInt(n)<<BigInt(32))+BigInt(i)})),a.prototype.readIntLE=function(t,e,r){t>>>=0,e>>>=0,r||C(t,e,this.length);let n=this[t],i=1,o=0;for(;++o<e&&(i*=256);)n+=this[t+o]*i;return i*=128,n>=i&&(n-=Math.pow(2,8*e)),n},a.prototype.readIntBE=function(t,e,r){t>>>=0,e>>>=0,r||C(t,e,this.length);let n=e,i=1,o=this[t+--n];for(;n>0&&(i*=256);)o+=this[t+--n]*i;return i*=128,o>=i&&(o-=Math.pow(2,8*e)),o},a.prototype.readInt8=function(t,e){return t>>>=0,e||C(t,1,this.length),128&this[t]?-1*(255-this[t]+1):this[t]},a.prototype.readInt16LE=function(t,e){t>>>=0,e||C(t,2,this.length);const r=this[t]|this[t+1]<<8;return 32768&r?4294901760|r:r},a.prototype.readInt16BE=function(t,e){t>>>=0,e||C(t,2,this.length);const r=this[t+1]|this[t]<<8;return 32768&r?4294901760|r:r},a.prototype.readInt32LE=function(t,e){return t>>>=0,e||C(t,4,this.length),this[t]|this[t+1]<<8|this[t+2]<<16|this[t+3]<<24},a.prototype.readInt32BE=function(t,e){return t>>>=0,e||C(t,4,this.length),this[t]<<24|this[t+1]<<16|this[t+2]<<8|this[t+3]},a.prototype.readBigInt64LE=X((function(t){F(t>>>=0,"offset");const e=this[t],r=this[t+7];void 0!==e&&void 0!==r||G(t,this.length-8);const n=this[t+4]+256*this[t+5]+65536*this[t+6]+(r<<24);return(BigInt(n)<<BigInt(32))+BigInt(e+256*this[++t]+65536*this[++t]+this[++t]*2**24)})),a.prototype.readBigInt64BE=X((function(t){F(t>>>=0,"offset");const e=this[t],r=this[t+7];void 0!==e&&void 0!==r||G(t,this.length-8);const n=(e<<24)+65536*this[++t]+256*this[++t]+this[++t];return(BigInt(n)<<BigInt(32))+BigInt(this[++t]*2**24+65536*this[++t]+256*this[++t]+r)})),a.prototype.readFloatLE=function(t,e){return t>>>=0,e||C(t,4,this.length),i.read(this,t,!0,23,4)},a.prototype.readFloatBE=function(t,e){return t>>>=0,e||C(t,4,this.length),i.read(this,t,!1,23,4)},a.prototype.readDoubleLE=function(t,e){return t>>>=0,e||C(t,8,this.length),i.read(this,t,!0,52,8)},a.prototype.readDoubleBE=function(t,e){return t>>>=0,e||C(t,8,this.length),i.read(this,t,!1,52,8)},a.prototype.writeUintLE=a.prototype.writeUIntLE=function(t,e,r,n){if(t=+t,e>>>=0,r>>>=0,!n){T(this,t,e,r,Math.pow(2,8*r)-1,0)}let i=1,o=0;for(this[e]=255&t;++o<r&&(i*=256);)this[e+o]=t/i&255;return e+r},a.prototype.writeUintBE=a.prototype.writeUIntBE=function(t,e,r,n){if(t=+t,e>>>=0,r>>>=0,!n){T(this,t,e,r,Math.pow(2,8*r)-1,0)}let i=r-1,o=1;for(this[e+i]=255&t;--i>=0&&(o*=256);)this[e+i]=t/o&255;return e+r},a.prototype.writeUint8=a.prototype.writeUInt8=function(t,e,r){return t=+t,e>>>=0,r||T(this,t,e,1,255,0),this[e]=255&t,e+1},a.prototype.writeUint16LE=a.prototype.writeUInt16LE=function(t,e,r){return t=+t,e>>>=0,r||T(this,t,e,2,65535,0),this[e]=255&t,this[e+1]=t>>>8,e+2},a.prototype.writeUint16BE=a.prototype.writeUInt16BE=function(t,e,r){return t=+t,e>>>=0,r||T(this,t,e,2,65535,0),this[e]=t>>>8,this[e+1]=255&t,e+2},a.prototype.writeUint32LE=a.prototype.writeUInt32LE=function(t,e,r){return t=+t,e>>>=0,r||T(this,t,e,4,4294967295,0),this[e+3]=t>>>24,this[e+2]=t>>>16,this[e+1]=t>>>8,this[e]=255&t,e+4},a.prototype.writeUint32BE=a.prototype.writeUInt32BE=function(t,e,r){return t=+t,e>>>=0,r||T(this,t,e,4,4294967295,0),this[e]=t>>>24,this[e+1]=t>>>16,this[e+2]=t>>>8,this[e+3]=255&t,e+4},a.prototype.writeBigUInt64LE=X((function(t,e=0){return O(this,t,e,BigInt(0),BigInt("0xffffffffffffffff"))})),a.prototype.writeBigUInt64BE=X((function(t,e=0){return z(this,t,e,BigInt(0),BigInt("0xffffffffffffffff"))})),a.prototype.writeIntLE=function(t,e,r,n){if(t=+t,e>>>=0,!n){const n=Math.pow(2,8*r-1);T(this,t,e,r,n-1,-n)}let i=0,o=1,s=0;for(this[e]=255&t;++i<r&&(o*=256);)t<0&&0===s&&0!==this[e+i-1]&&(s=1),this[e+i]=(t/o>>0)-s&255;return e+r},a.prototype.writeIntBE=function(t,e,r,n){if(t=+t,e>>>=0,!n){const n=Math.pow(2,8*r-1);T(this,t,e,r,n-1,-n)}let i=r-1,o=1,s=0;for(this[e+i]=255&t;--i>=0&&(o*=256);)t<0&&0===s&&0!==this[e+i+1]&&(s=1),this[e+i]=(t/o>>0)-s&255;return e+r},a.prototype.writeInt8=function(t,e,r){return t=+t,e>>>=0,r||T(this,t,e,1,127,-128),t<0&&(t=255+t+1),this[e]=255&t,e+1},a.prototype.writeInt16LE=function(t,e,r){return t=+t,e>>>=0,r||T(this,t,e,2,32767,-32768),this[e]=255&t,this[e+1]=t>>>8,e+2},a.prototype.writeInt16BE=function(t,e,r){return t=+t,e>>>=0,r||T(this,t,e,2,32767,-32768),this[e]=t>>>8,this[e+1]=255&t,e+2},a.prototype.writeInt32LE=function(t,e,r){return t=+t,e>>>=0,r||T(this,t,e,4,2147483647,-2147483648),this[e]=255&t,this[e+1]=t>>>8,this[e+2]=t>>>16,this[e+3]=t>>>24,e+4},a.prototype.writeInt32BE=function(t,e,r){return t=+t,e>>>=0,r||T(this,t,e,4,2147483647,-2147483648),t<0&&(t=4294967295+t+1),this[e]=t>>>24,this[e+1]=t>>>16,this[e+2]=t>>>8,this[e+3]=255&t,e+4},a.prototype.writeBigInt64LE=X((function(t,e=0){return O(this,t,e,-BigInt("0x8000000000000000"),BigInt("0x7fffffffffffffff"))})),a.prototype.writeBigInt64BE=X((function(t,e=0){return z(this,t,e,-BigInt("0x8000000000000000"),BigInt("0x7fffffffffffffff"))})),a.prototype.writeFloatLE=function(t,e,r){return U(this,t,e,!0,r)},a.prototype.writeFloatBE=function(t,e,r){return U(this,t,e,!1,r)},a.prototype.writeDoubleLE=function(t,e,r){return R(this,t,e,!0,r)},a.prototype.writeDoubleBE=function(t,e,r){return R(this,t,e,!1,r)},a.prototype.copy=function(t,e,r,n){if(!a.isBuffer(t))throw new TypeError("argument should be a Buffer");if(r||(r=0),n||0===n||(n=this.length),e>=t.length&&(e=t.length),e||(e=0),n>0&&n<r&&(n=r),n===r)return 0;if(0===t.length||0===this.length)return 0;if(e<0)throw new RangeError("targetStart out of bounds");if(r<0||r>=this.length)throw new RangeError("Index out of range");if(n<0)throw new RangeError("sourceEnd out of bounds");n>this.length&&(n=this.length),t.length-e<n-r&&(n=t.length-e+r);const i=n-r;return this===t&&"function"==typeof Uint8Array.prototype.copyWithin?this.copyWithin(e,r,n):Uint8Array.prototype.set.call(t,this.subarray(r,n),e),i},a.prototype.fill=function(t,e,r,n){if("string"==typeof t){if("string"==typeof e?(n=e,e=0,r=this.length):"string"==typeof r&&(n=r,r=this.length),void 0!==n&&"string"!=typeof n)throw new TypeError("encoding must be a string");if("string"==typeof n&&!a.isEncoding(n))throw new TypeError("Unknown encoding: "+n);if(1===t.length){const e=t.charCodeAt(0);("utf8"===n&&e<128||"latin1"===n)&&(t=e)}}else"number"==typeof t?t&=255:"boolean"==typeof t&&(t=Number(t));if(e<0||this.length<e||this.length<r)throw new RangeError("Out of range index");if(r<=e)return this;let i;if(e>>>=0,r=void 0===r?this.length:r>>>0,t||(t=0),"number"==typeof t)for(i=e;i<r;++i)this[i]=t;else{const o=a.isBuffer(t)?t:a.from(t,n),s=o.length;if(0===s)throw new TypeError('The value "'+t+'" is invalid for argument "value"');for(i=0;i<r-e;++i)this[i+e]=o[i%s]}return this};const Y={};function B(t,e,r){Y[t]=class extends r{constructor(){super(),Object.defineProperty(this,"message",{value:e.apply(this,arguments),writable:!0,configurable:!0}),this.name=`${this.name} [${t}]`,this.stack,delete this.name}get code(){return t}set code(t){Object.defineProperty(this,"code",{configurable:!0,enumerable:!0,value:t,writable:!0})}toString(){return`${this.name} [${t}]: ${this.message}`}}}function P(t){let e="",r=t.length;const n="-"===t[0]?1:0;for(;r>=n+4;r-=3)e=`_${t.slice(r-3,r)}${e}`;return`${t.slice(0,r)}${e}`}function Q(t,e,r,n,i,o){if(t>r||t<e){const n="bigint"==typeof e?"n":"";let i;throw i=o>3?0===e||e===BigInt(0)?`>= 0${n} and < 2${n} ** ${8*(o+1)}${n}`:`>= -(2${n} ** ${8*(o+1)-1}${n}) and < 2 ** ${8*(o+1)-1}${n}`:`>= ${e}${n} and <= ${r}${n}`,new Y.ERR_OUT_OF_RANGE("value",i,t)}!function(t,e,r){F(e,"offset"),void 0!==t[e]&&void 0!==t[e+r]||G(e,t.length-(r+1))}(n,i,o)}function F(t,e){if("number"!=typeof t)throw new Y.ERR_INVALID_ARG_TYPE(e,"number",t)}function G(t,e,r){if(Math.floor(t)!==t)throw F(t,r),new Y.ERR_OUT_OF_RANGE(r||"offset","an integer",t);if(e<0)throw new Y.ERR_BUFFER_OUT_OF_BOUNDS;throw new Y.ERR_OUT_OF_RANGE(r||"offset",`>= ${r?1:0} and <= ${e}`,t)}B("ERR_BUFFER_OUT_OF_BOUNDS",(function(t){return t?`${t} is outside of buffer bounds`:"Attempt to access memory outside buffer bounds"}),RangeError),B("ERR_INVALID_ARG_TYPE",(function(t,e){return`The "${t}" argument must be of type number. Received type ${typeof e}`}),TypeError),B("ERR_OUT_OF_RANGE",(function(t,e,r){let n=`The value of "${t}" is out of range.`,i=r;return Number.isInteger(r)&&Math.abs(r)>2**32?i=P(String(r)):"bigint"==typeof r&&(i=String(r),(r>BigInt(2)**BigInt(32)||r<-(BigInt(2)**BigInt(32)))&&(i=P(i)),i+="n"),n+=` It must be ${e}. Received ${i}`,n}),RangeError);const W=/[^+/0-9A-Za-z-_]/g;function q(t,e){let r;e=e||1/0;const n=t.length;let i=null;const o=[];for(let s=0;s<n;++s){if(r=t.charCodeAt(s),r>55295&&r<57344){if(!i){if(r>56319){(e-=3)>-1&&o.push(239,191,189);continue}if(s+1===n){(e-=3)>-1&&o.push(239,191,189);continue}i=r;continue}if(r<56320){(e-=3)>-1&&o.push(239,191,189),i=r;continue}r=65536+(i-55296<<10|r-56320)}else i&&(e-=3)>-1&&o.push(239,191,189);if(i=null,r<128){if((e-=1)<0)break;o.push(r)}else if(r<2048){if((e-=2)<0)break;o.push(r>>6|192,63&r|128)}else if(r<65536){if((e-=3)<0)break;o.push(r>>12|224,r>>6&63|128,63&r|128)}else{if(!(r<1114112))throw new Error("Invalid code point");if((e-=4)<0)break;o.push(r>>18|240,r>>12&63|128,r>>6&63|128,63&r|128)}}return o}function H(t){return n.toByteArray(function(t){if((t=(t=t.split("=")[0]).trim().replace(W,"")).length<2)return"";for(;t.length%4!=0;)t+="=";return t}(t))}function J(t,e,r,n){let i;for(i=0;i<n&&!(i+r>=e.length||i>=t.length);++i)e[i+r]=t[i];return i}function $(t,e){return t instanceof e||null!=t&&null!=t.constructor&&null!=t.constructor.name&&t.constructor.name===e.name}function Z(t){return t!=t}const V=function(){const t="0123456789abcdef",e=new Array(256);for(let r=0;r<16;++r){const n=16*r;for(let i=0;i<16;++i)e[n+i]=t[r]+t[i]}return e}();function X(t){return"undefined"==typeof BigInt?K:t}function K(){throw new Error("BigInt not supported")}},93:(t,e,r)=>{var n=r(8196);t.exports=n},5362:(t,e,r)=>{var n=r(3383);t.exports=n},3536:(t,e,r)=>{var n=r(1910);t.exports=n},4493:(t,e,r)=>{r(7971),r(3242);var n=r(4058);t.exports=n.Array.from},4034:(t,e,r)=>{r(2737);var n=r(4058);t.exports=n.Array.isArray},5367:(t,e,r)=>{r(5906);var n=r(5703);t.exports=n("Array").concat},2710:(t,e,r)=>{r(6274),r(5967);var n=r(5703);t.exports=n("Array").entries},1459:(t,e,r)=>{r(8851);var n=r(5703);t.exports=n("Array").every},6172:(t,e,r)=>{r(290);var n=r(5703);t.exports=n("Array").fill},2383:(t,e,r)=>{r(1501);var n=r(5703);t.exports=n("Array").filter},9:(t,e,r)=>{r(4929);var n=r(5703);t.exports=n("Array").findIndex},7671:(t,e,r)=>{r(833);var n=r(5703);t.exports=n("Array").find},9324:(t,e,r)=>{r(2437);var n=r(5703);t.exports=n("Array").forEach},991:(t,e,r)=>{r(7690);var n=r(5703);t.exports=n("Array").includes},8700:(t,e,r)=>{r(9076);var n=r(5703);t.exports=n("Array").indexOf},5909:(t,e,r)=>{r(6274),r(5967);var n=r(5703);t.exports=n("Array").keys},3866:(t,e,r)=>{r(8787);var n=r(5703);t.exports=n("Array").map},2999:(t,e,r)=>{r(1876);var n=r(5703);t.exports=n("Array").reduce},4900:(t,e,r)=>{r(186);var n=r(5703);t.exports=n("Array").slice},3824:(t,e,r)=>{r(6026);var n=r(5703);t.exports=n("Array").some},2948:(t,e,r)=>{r(4115);var n=r(5703);t.exports=n("Array").sort},7700:(t,e,r)=>{r(3381);var n=r(5703);t.exports=n("Function").bind},6246:(t,e,r)=>{var n=r(7046),i=r(7700),o=Function.prototype;t.exports=function(t){var e=t.bind;return t===o||n(o,t)&&e===o.bind?i:e}},6043:(t,e,r)=>{var n=r(7046),i=r(5367),o=Array.prototype;t.exports=function(t){var e=t.concat;return t===o||n(o,t)&&e===o.concat?i:e}},3160:(t,e,r)=>{var n=r(7046),i=r(1459),o=Array.prototype;t.exports=function(t){var e=t.every;return t===o||n(o,t)&&e===o.every?i:e}},446:(t,e,r)=>{var n=r(7046),i=r(6172),o=Array.prototype;t.exports=function(t){var e=t.fill;return t===o||n(o,t)&&e===o.fill?i:e}},2480:(t,e,r)=>{var n=r(7046),i=r(2383),o=Array.prototype;t.exports=function(t){var e=t.filter;return t===o||n(o,t)&&e===o.filter?i:e}},7147:(t,e,r)=>{var n=r(7046),i=r(9),o=Array.prototype;t.exports=function(t){var e=t.findIndex;return t===o||n(o,t)&&e===o.findIndex?i:e}},2236:(t,e,r)=>{var n=r(7046),i=r(7671),o=Array.prototype;t.exports=function(t){var e=t.find;return t===o||n(o,t)&&e===o.find?i:e}},8557:(t,e,r)=>{var n=r(7046),i=r(991),o=r(1631),s=Array.prototype,u=String.prototype;t.exports=function(t){var e=t.includes;return t===s||n(s,t)&&e===s.includes?i:"string"==typeof t||t===u||n(u,t)&&e===u.includes?o:e}},4570:(t,e,r)=>{var n=r(7046),i=r(8700),o=Array.prototype;t.exports=function(t){var e=t.indexOf;return t===o||n(o,t)&&e===o.indexOf?i:e}},8287:(t,e,r)=>{var n=r(7046),i=r(3866),o=Array.prototype;t.exports=function(t){var e=t.map;return t===o||n(o,t)&&e===o.map?i:e}},8025:(t,e,r)=>{var n=r(7046),i=r(2999),o=Array.prototype;t.exports=function(t){var e=t.reduce;return t===o||n(o,t)&&e===o.reduce?i:e}},9601:(t,e,r)=>{var n=r(7046),i=r(4900),o=Array.prototype;t.exports=function(t){var e=t.slice;return t===o||n(o,t)&&e===o.slice?i:e}},8299:(t,e,r)=>{var n=r(7046),i=r(3824),o=Array.prototype;t.exports=function(t){var e=t.some;return t===o||n(o,t)&&e===o.some?i:e}},9355:(t,e,r)=>{var n=r(7046),i=r(2948),o=Array.prototype;t.exports=function(t){var e=t.sort;return t===o||n(o,t)&&e===o.sort?i:e}},1611:(t,e,r)=>{var n=r(7046),i=r(3269),o=String.prototype;t.exports=function(t){var e=t.startsWith;return"string"==typeof t||t===o||n(o,t)&&e===o.startsWith?i:e}},2774:(t,e,r)=>{var n=r(7046),i=r(3348),o=String.prototype;t.exports=function(t){var e=t.trim;return"string"==typeof t||t===o||n(o,t)&&e===o.trim?i:e}},4426:(t,e,r)=>{r(2619);var n=r(4058),i=r(9730);n.JSON||(n.JSON={stringify:JSON.stringify}),t.exports=function(t,e,r){return i(n.JSON.stringify,null,arguments)}},1018:(t,e,r)=>{r(6274),r(7501),r(5967),r(7971);var n=r(4058);t.exports=n.Map},5999:(t,e,r)=>{r(9221);var n=r(4058);t.exports=n.Object.assign},8171:(t,e,r)=>{r(6450);var n=r(4058).Object,i=t.exports=function(t,e,r){return n.defineProperty(t,e,r)};n.defineProperty.sham&&(i.sham=!0)},8494:(t,e,r)=>{r(1724);var n=r(4058);t.exports=n.Object.keys},1631:(t,e,r)=>{r(1035);var n=r(5703);t.exports=n("String").includes},3269:(t,e,r)=>{r(4761);var n=r(5703);t.exports=n("String").startsWith},3348:(t,e,r)=>{r(7398);var n=r(5703);t.exports=n("String").trim},4122:(t,e,r)=>{var n=r(93);t.exports=n},269:(t,e,r)=>{var n=r(5362);t.exports=n},3685:(t,e,r)=>{var n=r(3536);t.exports=n},4883:(t,e,r)=>{var n=r(1899),i=r(7475),o=r(9826),s=n.TypeError;t.exports=function(t){if(i(t))return t;throw s(o(t)+" is not a function")}},1851:(t,e,r)=>{var n=r(1899),i=r(7475),o=n.String,s=n.TypeError;t.exports=function(t){if("object"==typeof t||i(t))return t;throw s("Can't set "+o(t)+" as a prototype")}},8479:t=>{t.exports=function(){}},5743:(t,e,r)=>{var n=r(1899),i=r(7046),o=n.TypeError;t.exports=function(t,e){if(i(e,t))return t;throw o("Incorrect invocation")}},6059:(t,e,r)=>{var n=r(1899),i=r(941),o=n.String,s=n.TypeError;t.exports=function(t){if(i(t))return t;throw s(o(t)+" is not an object")}},7135:(t,e,r)=>{var n=r(5981);t.exports=n((function(){if("function"==typeof ArrayBuffer){var t=new ArrayBuffer(8);Object.isExtensible(t)&&Object.defineProperty(t,"a",{value:8})}}))},1860:(t,e,r)=>{"use strict";var n=r(9678),i=r(9413),o=r(623);t.exports=function(t){for(var e=n(this),r=o(e),s=arguments.length,u=i(s>1?arguments[1]:void 0,r),a=s>2?arguments[2]:void 0,c=void 0===a?r:i(a,r);c>u;)e[u++]=t;return e}},6837:(t,e,r)=>{"use strict";var n=r(3610).forEach,i=r(4194)("forEach");t.exports=i?[].forEach:function(t){return n(this,t,arguments.length>1?arguments[1]:void 0)}},1354:(t,e,r)=>{"use strict";var n=r(1899),i=r(6843),o=r(8834),s=r(9678),u=r(5196),a=r(6782),c=r(4284),f=r(623),l=r(5449),h=r(3476),p=r(2902),d=n.Array;t.exports=function(t){var e=s(t),r=c(this),n=arguments.length,y=n>1?arguments[1]:void 0,g=void 0!==y;g&&(y=i(y,n>2?arguments[2]:void 0));var v,w,M,L,_,m,b=p(e),j=0;if(!b||this==d&&a(b))for(v=f(e),w=r?new this(v):d(v);v>j;j++)m=g?y(e[j],j):e[j],l(w,j,m);else for(_=(L=h(e,b)).next,w=r?new this:[];!(M=o(_,L)).done;j++)m=g?u(L,y,[M.value,j],!0):M.value,l(w,j,m);return w.length=j,w}},1692:(t,e,r)=>{var n=r(4529),i=r(9413),o=r(623),s=function(t){return function(e,r,s){var u,a=n(e),c=o(a),f=i(s,c);if(t&&r!=r){for(;c>f;)if((u=a[f++])!=u)return!0}else for(;c>f;f++)if((t||f in a)&&a[f]===r)return t||f||0;return!t&&-1}};t.exports={includes:s(!0),indexOf:s(!1)}},3610:(t,e,r)=>{var n=r(6843),i=r(5329),o=r(7026),s=r(9678),u=r(623),a=r(4692),c=i([].push),f=function(t){var e=1==t,r=2==t,i=3==t,f=4==t,l=6==t,h=7==t,p=5==t||l;return function(d,y,g,v){for(var w,M,L=s(d),_=o(L),m=n(y,g),b=u(_),j=0,x=v||a,N=e?x(d,b):r||h?x(d,0):void 0;b>j;j++)if((p||j in _)&&(M=m(w=_[j],j,L),t))if(e)N[j]=M;else if(M)switch(t){case 3:return!0;case 5:return w;case 6:return j;case 2:c(N,w)}else switch(t){case 4:return!1;case 7:c(N,w)}return l?-1:i||f?f:N}};t.exports={forEach:f(0),map:f(1),filter:f(2),some:f(3),every:f(4),find:f(5),findIndex:f(6),filterReject:f(7)}},568:(t,e,r)=>{var n=r(5981),i=r(9813),o=r(3385),s=i("species");t.exports=function(t){return o>=51||!n((function(){var e=[];return(e.constructor={})[s]=function(){return{foo:1}},1!==e[t](Boolean).foo}))}},4194:(t,e,r)=>{"use strict";var n=r(5981);t.exports=function(t,e){var r=[][t];return!!r&&n((function(){r.call(null,e||function(){throw 1},1)}))}},6499:(t,e,r)=>{var n=r(1899),i=r(4883),o=r(9678),s=r(7026),u=r(623),a=n.TypeError,c=function(t){return function(e,r,n,c){i(r);var f=o(e),l=s(f),h=u(f),p=t?h-1:0,d=t?-1:1;if(n<2)for(;;){if(p in l){c=l[p],p+=d;break}if(p+=d,t?p<0:h<=p)throw a("Reduce of empty array with no initial value")}for(;t?p>=0:h>p;p+=d)p in l&&(c=r(c,l[p],p,f));return c}};t.exports={left:c(!1),right:c(!0)}},5790:(t,e,r)=>{var n=r(1899),i=r(9413),o=r(623),s=r(5449),u=n.Array,a=Math.max;t.exports=function(t,e,r){for(var n=o(t),c=i(e,n),f=i(void 0===r?n:r,n),l=u(a(f-c,0)),h=0;c<f;c++,h++)s(l,h,t[c]);return l.length=h,l}},3765:(t,e,r)=>{var n=r(5329);t.exports=n([].slice)},1388:(t,e,r)=>{var n=r(5790),i=Math.floor,o=function(t,e){var r=t.length,a=i(r/2);return r<8?s(t,e):u(t,o(n(t,0,a),e),o(n(t,a),e),e)},s=function(t,e){for(var r,n,i=t.length,o=1;o<i;){for(n=o,r=t[o];n&&e(t[n-1],r)>0;)t[n]=t[--n];n!==o++&&(t[n]=r)}return t},u=function(t,e,r,n){for(var i=e.length,o=r.length,s=0,u=0;s<i||u<o;)t[s+u]=s<i&&u<o?n(e[s],r[u])<=0?e[s++]:r[u++]:s<i?e[s++]:r[u++];return t};t.exports=o},5693:(t,e,r)=>{var n=r(1899),i=r(1052),o=r(4284),s=r(941),u=r(9813)("species"),a=n.Array;t.exports=function(t){var e;return i(t)&&(e=t.constructor,(o(e)&&(e===a||i(e.prototype))||s(e)&&null===(e=e[u]))&&(e=void 0)),void 0===e?a:e}},4692:(t,e,r)=>{var n=r(5693);t.exports=function(t,e){return new(n(t))(0===e?0:e)}},5196:(t,e,r)=>{var n=r(6059),i=r(7609);t.exports=function(t,e,r,o){try{return o?e(n(r)[0],r[1]):e(r)}catch(e){i(t,"throw",e)}}},1385:(t,e,r)=>{var n=r(9813)("iterator"),i=!1;try{var o=0,s={next:function(){return{done:!!o++}},return:function(){i=!0}};s[n]=function(){return this},Array.from(s,(function(){throw 2}))}catch(t){}t.exports=function(t,e){if(!e&&!i)return!1;var r=!1;try{var o={};o[n]=function(){return{next:function(){return{done:r=!0}}}},t(o)}catch(t){}return r}},2532:(t,e,r)=>{var n=r(5329),i=n({}.toString),o=n("".slice);t.exports=function(t){return o(i(t),8,-1)}},9697:(t,e,r)=>{var n=r(1899),i=r(2885),o=r(7475),s=r(2532),u=r(9813)("toStringTag"),a=n.Object,c="Arguments"==s(function(){return arguments}());t.exports=i?s:function(t){var e,r,n;return void 0===t?"Undefined":null===t?"Null":"string"==typeof(r=function(t,e){try{return t[e]}catch(t){}}(e=a(t),u))?r:c?s(e):"Object"==(n=s(e))&&o(e.callee)?"Arguments":n}},5616:(t,e,r)=>{"use strict";var n=r(5988).f,i=r(9290),o=r(7524),s=r(6843),u=r(5743),a=r(3091),c=r(7771),f=r(4431),l=r(5746),h=r(1647).fastKey,p=r(5402),d=p.set,y=p.getterFor;t.exports={getConstructor:function(t,e,r,c){var f=t((function(t,n){u(t,p),d(t,{type:e,index:i(null),first:void 0,last:void 0,size:0}),l||(t.size=0),null!=n&&a(n,t[c],{that:t,AS_ENTRIES:r})})),p=f.prototype,g=y(e),v=function(t,e,r){var n,i,o=g(t),s=w(t,e);return s?s.value=r:(o.last=s={index:i=h(e,!0),key:e,value:r,previous:n=o.last,next:void 0,removed:!1},o.first||(o.first=s),n&&(n.next=s),l?o.size++:t.size++,"F"!==i&&(o.index[i]=s)),t},w=function(t,e){var r,n=g(t),i=h(e);if("F"!==i)return n.index[i];for(r=n.first;r;r=r.next)if(r.key==e)return r};return o(p,{clear:function(){for(var t=g(this),e=t.index,r=t.first;r;)r.removed=!0,r.previous&&(r.previous=r.previous.next=void 0),delete e[r.index],r=r.next;t.first=t.last=void 0,l?t.size=0:this.size=0},delete:function(t){var e=this,r=g(e),n=w(e,t);if(n){var i=n.next,o=n.previous;delete r.index[n.index],n.removed=!0,o&&(o.next=i),i&&(i.previous=o),r.first==n&&(r.first=i),r.last==n&&(r.last=o),l?r.size--:e.size--}return!!n},forEach:function(t){for(var e,r=g(this),n=s(t,arguments.length>1?arguments[1]:void 0);e=e?e.next:r.first;)for(n(e.value,e.key,this);e&&e.removed;)e=e.previous},has:function(t){return!!w(this,t)}}),o(p,r?{get:function(t){var e=w(this,t);return e&&e.value},set:function(t,e){return v(this,0===t?0:t,e)}}:{add:function(t){return v(this,t=0===t?0:t,t)}}),l&&n(p,"size",{get:function(){return g(this).size}}),f},setStrong:function(t,e,r){var n=e+" Iterator",i=y(e),o=y(n);c(t,e,(function(t,e){d(this,{type:n,target:t,state:i(t),kind:e,last:void 0})}),(function(){for(var t=o(this),e=t.kind,r=t.last;r&&r.removed;)r=r.previous;return t.target&&(t.last=r=r?r.next:t.state.first)?"keys"==e?{value:r.key,done:!1}:"values"==e?{value:r.value,done:!1}:{value:[r.key,r.value],done:!1}:(t.target=void 0,{value:void 0,done:!0})}),r?"entries":"values",!r,!0),f(e)}}},4683:(t,e,r)=>{"use strict";var n=r(6887),i=r(1899),o=r(1647),s=r(5981),u=r(2029),a=r(3091),c=r(5743),f=r(7475),l=r(941),h=r(904),p=r(5988).f,d=r(3610).forEach,y=r(5746),g=r(5402),v=g.set,w=g.getterFor;t.exports=function(t,e,r){var g,M=-1!==t.indexOf("Map"),L=-1!==t.indexOf("Weak"),_=M?"set":"add",m=i[t],b=m&&m.prototype,j={};if(y&&f(m)&&(L||b.forEach&&!s((function(){(new m).entries().next()})))){var x=(g=e((function(e,r){v(c(e,x),{type:t,collection:new m}),null!=r&&a(r,e[_],{that:e,AS_ENTRIES:M})}))).prototype,N=w(t);d(["add","clear","delete","forEach","get","has","set","keys","values","entries"],(function(t){var e="add"==t||"set"==t;!(t in b)||L&&"clear"==t||u(x,t,(function(r,n){var i=N(this).collection;if(!e&&L&&!l(r))return"get"==t&&void 0;var o=i[t](0===r?0:r,n);return e?this:o}))})),L||p(x,"size",{configurable:!0,get:function(){return N(this).collection.size}})}else g=r.getConstructor(e,t,M,_),o.enable();return h(g,t,!1,!0),j[t]=g,n({global:!0,forced:!0},j),L||r.setStrong(g,t,M),g}},7772:(t,e,r)=>{var n=r(9813)("match");t.exports=function(t){var e=/./;try{"/./"[t](e)}catch(r){try{return e[n]=!1,"/./"[t](e)}catch(t){}}return!1}},4160:(t,e,r)=>{var n=r(5981);t.exports=!n((function(){function t(){}return t.prototype.constructor=null,Object.getPrototypeOf(new t)!==t.prototype}))},1046:(t,e,r)=>{"use strict";var n=r(5143).IteratorPrototype,i=r(9290),o=r(1887),s=r(904),u=r(2077),a=function(){return this};t.exports=function(t,e,r,c){var f=e+" Iterator";return t.prototype=i(n,{next:o(+!c,r)}),s(t,f,!1,!0),u[f]=a,t}},2029:(t,e,r)=>{var n=r(5746),i=r(5988),o=r(1887);t.exports=n?function(t,e,r){return i.f(t,e,o(1,r))}:function(t,e,r){return t[e]=r,t}},1887:t=>{t.exports=function(t,e){return{enumerable:!(1&t),configurable:!(2&t),writable:!(4&t),value:e}}},5449:(t,e,r)=>{"use strict";var n=r(3894),i=r(5988),o=r(1887);t.exports=function(t,e,r){var s=n(e);s in t?i.f(t,s,o(0,r)):t[s]=r}},7771:(t,e,r)=>{"use strict";var n=r(6887),i=r(8834),o=r(2529),s=r(9417),u=r(7475),a=r(1046),c=r(249),f=r(8929),l=r(904),h=r(2029),p=r(9754),d=r(9813),y=r(2077),g=r(5143),v=s.PROPER,w=s.CONFIGURABLE,M=g.IteratorPrototype,L=g.BUGGY_SAFARI_ITERATORS,_=d("iterator"),m="keys",b="values",j="entries",x=function(){return this};t.exports=function(t,e,r,s,d,g,N){a(r,e,s);var S,D,I,E=function(t){if(t===d&&z)return z;if(!L&&t in T)return T[t];switch(t){case m:case b:case j:return function(){return new r(this,t)}}return function(){return new r(this)}},A=e+" Iterator",C=!1,T=t.prototype,O=T[_]||T["@@iterator"]||d&&T[d],z=!L&&O||E(d),k="Array"==e&&T.entries||O;if(k&&(S=c(k.call(new t)))!==Object.prototype&&S.next&&(o||c(S)===M||(f?f(S,M):u(S[_])||p(S,_,x)),l(S,A,!0,!0),o&&(y[A]=x)),v&&d==b&&O&&O.name!==b&&(!o&&w?h(T,"name",b):(C=!0,z=function(){return i(O,this)})),d)if(D={values:E(b),keys:g?z:E(m),entries:E(j)},N)for(I in D)(L||C||!(I in T))&&p(T,I,D[I]);else n({target:e,proto:!0,forced:L||C},D);return o&&!N||T[_]===z||p(T,_,z,{name:d}),y[e]=z,D}},5746:(t,e,r)=>{var n=r(5981);t.exports=!n((function(){return 7!=Object.defineProperty({},1,{get:function(){return 7}})[1]}))},1333:(t,e,r)=>{var n=r(1899),i=r(941),o=n.document,s=i(o)&&i(o.createElement);t.exports=function(t){return s?o.createElement(t):{}}},3281:t=>{t.exports={CSSRuleList:0,CSSStyleDeclaration:0,CSSValueList:0,ClientRectList:0,DOMRectList:0,DOMStringList:0,DOMTokenList:1,DataTransferItemList:0,FileList:0,HTMLAllCollection:0,HTMLCollection:0,HTMLFormElement:0,HTMLSelectElement:0,MediaList:0,MimeTypeArray:0,NamedNodeMap:0,NodeList:1,PaintRequestList:0,Plugin:0,PluginArray:0,SVGLengthList:0,SVGNumberList:0,SVGPathSegList:0,SVGPointList:0,SVGStringList:0,SVGTransformList:0,SourceBufferList:0,StyleSheetList:0,TextTrackCueList:0,TextTrackList:0,TouchList:0}},4342:(t,e,r)=>{var n=r(2861).match(/firefox\/(\d+)/i);t.exports=!!n&&+n[1]},7797:(t,e,r)=>{var n=r(2861);t.exports=/MSIE|Trident/.test(n)},6049:(t,e,r)=>{var n=r(2532),i=r(1899);t.exports="process"==n(i.process)},2861:(t,e,r)=>{var n=r(626);t.exports=n("navigator","userAgent")||""},3385:(t,e,r)=>{var n,i,o=r(1899),s=r(2861),u=o.process,a=o.Deno,c=u&&u.versions||a&&a.version,f=c&&c.v8;f&&(i=(n=f.split("."))[0]>0&&n[0]<4?1:+(n[0]+n[1])),!i&&s&&(!(n=s.match(/Edge\/(\d+)/))||n[1]>=74)&&(n=s.match(/Chrome\/(\d+)/))&&(i=+n[1]),t.exports=i},8938:(t,e,r)=>{var n=r(2861).match(/AppleWebKit\/(\d+)\./);t.exports=!!n&&+n[1]},5703:(t,e,r)=>{var n=r(4058);t.exports=function(t){return n[t+"Prototype"]}},6759:t=>{t.exports=["constructor","hasOwnProperty","isPrototypeOf","propertyIsEnumerable","toLocaleString","toString","valueOf"]},6887:(t,e,r)=>{"use strict";var n=r(1899),i=r(9730),o=r(5329),s=r(7475),u=r(9677).f,a=r(7252),c=r(4058),f=r(6843),l=r(2029),h=r(953),p=function(t){var e=function(r,n,o){if(this instanceof e){switch(arguments.length){case 0:return new t;case 1:return new t(r);case 2:return new t(r,n)}return new t(r,n,o)}return i(t,this,arguments)};return e.prototype=t.prototype,e};t.exports=function(t,e){var r,i,d,y,g,v,w,M,L=t.target,_=t.global,m=t.stat,b=t.proto,j=_?n:m?n[L]:(n[L]||{}).prototype,x=_?c:c[L]||l(c,L,{})[L],N=x.prototype;for(d in e)r=!a(_?d:L+(m?".":"#")+d,t.forced)&&j&&h(j,d),g=x[d],r&&(v=t.noTargetGet?(M=u(j,d))&&M.value:j[d]),y=r&&v?v:e[d],r&&typeof g==typeof y||(w=t.bind&&r?f(y,n):t.wrap&&r?p(y):b&&s(y)?o(y):y,(t.sham||y&&y.sham||g&&g.sham)&&l(w,"sham",!0),l(x,d,w),b&&(h(c,i=L+"Prototype")||l(c,i,{}),l(c[i],d,y),t.real&&N&&!N[d]&&l(N,d,y)))}},5981:t=>{t.exports=function(t){try{return!!t()}catch(t){return!0}}},5602:(t,e,r)=>{var n=r(5981);t.exports=!n((function(){return Object.isExtensible(Object.preventExtensions({}))}))},9730:(t,e,r)=>{var n=r(8285),i=Function.prototype,o=i.apply,s=i.call;t.exports="object"==typeof Reflect&&Reflect.apply||(n?s.bind(o):function(){return s.apply(o,arguments)})},6843:(t,e,r)=>{var n=r(5329),i=r(4883),o=r(8285),s=n(n.bind);t.exports=function(t,e){return i(t),void 0===e?t:o?s(t,e):function(){return t.apply(e,arguments)}}},8285:(t,e,r)=>{var n=r(5981);t.exports=!n((function(){var t=function(){}.bind();return"function"!=typeof t||t.hasOwnProperty("prototype")}))},8308:(t,e,r)=>{"use strict";var n=r(1899),i=r(5329),o=r(4883),s=r(941),u=r(953),a=r(3765),c=r(8285),f=n.Function,l=i([].concat),h=i([].join),p={},d=function(t,e,r){if(!u(p,e)){for(var n=[],i=0;i<e;i++)n[i]="a["+i+"]";p[e]=f("C,a","return new C("+h(n,",")+")")}return p[e](t,r)};t.exports=c?f.bind:function(t){var e=o(this),r=e.prototype,n=a(arguments,1),i=function(){var r=l(n,a(arguments));return this instanceof i?d(e,r.length,r):e.apply(t,r)};return s(r)&&(i.prototype=r),i}},8834:(t,e,r)=>{var n=r(8285),i=Function.prototype.call;t.exports=n?i.bind(i):function(){return i.apply(i,arguments)}},9417:(t,e,r)=>{var n=r(5746),i=r(953),o=Function.prototype,s=n&&Object.getOwnPropertyDescriptor,u=i(o,"name"),a=u&&"something"===function(){}.name,c=u&&(!n||n&&s(o,"name").configurable);t.exports={EXISTS:u,PROPER:a,CONFIGURABLE:c}},5329:(t,e,r)=>{var n=r(8285),i=Function.prototype,o=i.bind,s=i.call,u=n&&o.bind(s,s);t.exports=n?function(t){return t&&u(t)}:function(t){return t&&function(){return s.apply(t,arguments)}}},626:(t,e,r)=>{var n=r(4058),i=r(1899),o=r(7475),s=function(t){return o(t)?t:void 0};t.exports=function(t,e){return arguments.length<2?s(n[t])||s(i[t]):n[t]&&n[t][e]||i[t]&&i[t][e]}},2902:(t,e,r)=>{var n=r(9697),i=r(4229),o=r(2077),s=r(9813)("iterator");t.exports=function(t){if(null!=t)return i(t,s)||i(t,"@@iterator")||o[n(t)]}},3476:(t,e,r)=>{var n=r(1899),i=r(8834),o=r(4883),s=r(6059),u=r(9826),a=r(2902),c=n.TypeError;t.exports=function(t,e){var r=arguments.length<2?a(t):e;if(o(r))return s(i(r,t));throw c(u(t)+" is not iterable")}},4229:(t,e,r)=>{var n=r(4883);t.exports=function(t,e){var r=t[e];return null==r?void 0:n(r)}},1899:(t,e,r)=>{var n=function(t){return t&&t.Math==Math&&t};t.exports=n("object"==typeof globalThis&&globalThis)||n("object"==typeof window&&window)||n("object"==typeof self&&self)||n("object"==typeof r.g&&r.g)||function(){return this}()||Function("return this")()},953:(t,e,r)=>{var n=r(5329),i=r(9678),o=n({}.hasOwnProperty);t.exports=Object.hasOwn||function(t,e){return o(i(t),e)}},7748:t=>{t.exports={}},5463:(t,e,r)=>{var n=r(626);t.exports=n("document","documentElement")},2840:(t,e,r)=>{var n=r(5746),i=r(5981),o=r(1333);t.exports=!n&&!i((function(){return 7!=Object.defineProperty(o("div"),"a",{get:function(){return 7}}).a}))},7026:(t,e,r)=>{var n=r(1899),i=r(5329),o=r(5981),s=r(2532),u=n.Object,a=i("".split);t.exports=o((function(){return!u("z").propertyIsEnumerable(0)}))?function(t){return"String"==s(t)?a(t,""):u(t)}:u},1302:(t,e,r)=>{var n=r(5329),i=r(7475),o=r(3030),s=n(Function.toString);i(o.inspectSource)||(o.inspectSource=function(t){return s(t)}),t.exports=o.inspectSource},1647:(t,e,r)=>{var n=r(6887),i=r(5329),o=r(7748),s=r(941),u=r(953),a=r(5988).f,c=r(946),f=r(684),l=r(1584),h=r(9418),p=r(5602),d=!1,y=h("meta"),g=0,v=function(t){a(t,y,{value:{objectID:"O"+g++,weakData:{}}})},w=t.exports={enable:function(){w.enable=function(){},d=!0;var t=c.f,e=i([].splice),r={};r[y]=1,t(r).length&&(c.f=function(r){for(var n=t(r),i=0,o=n.length;i<o;i++)if(n[i]===y){e(n,i,1);break}return n},n({target:"Object",stat:!0,forced:!0},{getOwnPropertyNames:f.f}))},fastKey:function(t,e){if(!s(t))return"symbol"==typeof t?t:("string"==typeof t?"S":"P")+t;if(!u(t,y)){if(!l(t))return"F";if(!e)return"E";v(t)}return t[y].objectID},getWeakData:function(t,e){if(!u(t,y)){if(!l(t))return!0;if(!e)return!1;v(t)}return t[y].weakData},onFreeze:function(t){return p&&d&&l(t)&&!u(t,y)&&v(t),t}};o[y]=!0},5402:(t,e,r)=>{var n,i,o,s=r(8019),u=r(1899),a=r(5329),c=r(941),f=r(2029),l=r(953),h=r(3030),p=r(4262),d=r(7748),y="Object already initialized",g=u.TypeError,v=u.WeakMap;if(s||h.state){var w=h.state||(h.state=new v),M=a(w.get),L=a(w.has),_=a(w.set);n=function(t,e){if(L(w,t))throw new g(y);return e.facade=t,_(w,t,e),e},i=function(t){return M(w,t)||{}},o=function(t){return L(w,t)}}else{var m=p("state");d[m]=!0,n=function(t,e){if(l(t,m))throw new g(y);return e.facade=t,f(t,m,e),e},i=function(t){return l(t,m)?t[m]:{}},o=function(t){return l(t,m)}}t.exports={set:n,get:i,has:o,enforce:function(t){return o(t)?i(t):n(t,{})},getterFor:function(t){return function(e){var r;if(!c(e)||(r=i(e)).type!==t)throw g("Incompatible receiver, "+t+" required");return r}}}},6782:(t,e,r)=>{var n=r(9813),i=r(2077),o=n("iterator"),s=Array.prototype;t.exports=function(t){return void 0!==t&&(i.Array===t||s[o]===t)}},1052:(t,e,r)=>{var n=r(2532);t.exports=Array.isArray||function(t){return"Array"==n(t)}},7475:t=>{t.exports=function(t){return"function"==typeof t}},4284:(t,e,r)=>{var n=r(5329),i=r(5981),o=r(7475),s=r(9697),u=r(626),a=r(1302),c=function(){},f=[],l=u("Reflect","construct"),h=/^\s*(?:class|function)\b/,p=n(h.exec),d=!h.exec(c),y=function(t){if(!o(t))return!1;try{return l(c,f,t),!0}catch(t){return!1}},g=function(t){if(!o(t))return!1;switch(s(t)){case"AsyncFunction":case"GeneratorFunction":case"AsyncGeneratorFunction":return!1}try{return d||!!p(h,a(t))}catch(t){return!0}};g.sham=!0,t.exports=!l||i((function(){var t;return y(y.call)||!y(Object)||!y((function(){t=!0}))||t}))?g:y},7252:(t,e,r)=>{var n=r(5981),i=r(7475),o=/#|\.prototype\./,s=function(t,e){var r=a[u(t)];return r==f||r!=c&&(i(e)?n(e):!!e)},u=s.normalize=function(t){return String(t).replace(o,".").toLowerCase()},a=s.data={},c=s.NATIVE="N",f=s.POLYFILL="P";t.exports=s},941:(t,e,r)=>{var n=r(7475);t.exports=function(t){return"object"==typeof t?null!==t:n(t)}},2529:t=>{t.exports=!0},685:(t,e,r)=>{var n=r(941),i=r(2532),o=r(9813)("match");t.exports=function(t){var e;return n(t)&&(void 0!==(e=t[o])?!!e:"RegExp"==i(t))}},6664:(t,e,r)=>{var n=r(1899),i=r(626),o=r(7475),s=r(7046),u=r(2302),a=n.Object;t.exports=u?function(t){return"symbol"==typeof t}:function(t){var e=i("Symbol");return o(e)&&s(e.prototype,a(t))}},3091:(t,e,r)=>{var n=r(1899),i=r(6843),o=r(8834),s=r(6059),u=r(9826),a=r(6782),c=r(623),f=r(7046),l=r(3476),h=r(2902),p=r(7609),d=n.TypeError,y=function(t,e){this.stopped=t,this.result=e},g=y.prototype;t.exports=function(t,e,r){var n,v,w,M,L,_,m,b=r&&r.that,j=!(!r||!r.AS_ENTRIES),x=!(!r||!r.IS_ITERATOR),N=!(!r||!r.INTERRUPTED),S=i(e,b),D=function(t){return n&&p(n,"normal",t),new y(!0,t)},I=function(t){return j?(s(t),N?S(t[0],t[1],D):S(t[0],t[1])):N?S(t,D):S(t)};if(x)n=t;else{if(!(v=h(t)))throw d(u(t)+" is not iterable");if(a(v)){for(w=0,M=c(t);M>w;w++)if((L=I(t[w]))&&f(g,L))return L;return new y(!1)}n=l(t,v)}for(_=n.next;!(m=o(_,n)).done;){try{L=I(m.value)}catch(t){p(n,"throw",t)}if("object"==typeof L&&L&&f(g,L))return L}return new y(!1)}},7609:(t,e,r)=>{var n=r(8834),i=r(6059),o=r(4229);t.exports=function(t,e,r){var s,u;i(t);try{if(!(s=o(t,"return"))){if("throw"===e)throw r;return r}s=n(s,t)}catch(t){u=!0,s=t}if("throw"===e)throw r;if(u)throw s;return i(s),r}},5143:(t,e,r)=>{"use strict";var n,i,o,s=r(5981),u=r(7475),a=r(9290),c=r(249),f=r(9754),l=r(9813),h=r(2529),p=l("iterator"),d=!1;[].keys&&("next"in(o=[].keys())?(i=c(c(o)))!==Object.prototype&&(n=i):d=!0),null==n||s((function(){var t={};return n[p].call(t)!==t}))?n={}:h&&(n=a(n)),u(n[p])||f(n,p,(function(){return this})),t.exports={IteratorPrototype:n,BUGGY_SAFARI_ITERATORS:d}},2077:t=>{t.exports={}},623:(t,e,r)=>{var n=r(3057);t.exports=function(t){return n(t.length)}},2497:(t,e,r)=>{var n=r(3385),i=r(5981);t.exports=!!Object.getOwnPropertySymbols&&!i((function(){var t=Symbol();return!String(t)||!(Object(t)instanceof Symbol)||!Symbol.sham&&n&&n<41}))},8019:(t,e,r)=>{var n=r(1899),i=r(7475),o=r(1302),s=n.WeakMap;t.exports=i(s)&&/native code/.test(o(s))},344:(t,e,r)=>{var n=r(1899),i=r(685),o=n.TypeError;t.exports=function(t){if(i(t))throw o("The method doesn't accept regular expressions");return t}},4420:(t,e,r)=>{"use strict";var n=r(5746),i=r(5329),o=r(8834),s=r(5981),u=r(4771),a=r(7857),c=r(6760),f=r(9678),l=r(7026),h=Object.assign,p=Object.defineProperty,d=i([].concat);t.exports=!h||s((function(){if(n&&1!==h({b:1},h(p({},"a",{enumerable:!0,get:function(){p(this,"b",{value:3,enumerable:!1})}}),{b:2})).b)return!0;var t={},e={},r=Symbol(),i="abcdefghijklmnopqrst";return t[r]=7,i.split("").forEach((function(t){e[t]=t})),7!=h({},t)[r]||u(h({},e)).join("")!=i}))?function(t,e){for(var r=f(t),i=arguments.length,s=1,h=a.f,p=c.f;i>s;)for(var y,g=l(arguments[s++]),v=h?d(u(g),h(g)):u(g),w=v.length,M=0;w>M;)y=v[M++],n&&!o(p,g,y)||(r[y]=g[y]);return r}:h},9290:(t,e,r)=>{var n,i=r(6059),o=r(9938),s=r(6759),u=r(7748),a=r(5463),c=r(1333),f=r(4262),l=f("IE_PROTO"),h=function(){},p=function(t){return"<script>"+t+"</"+"script>"},d=function(t){t.write(p("")),t.close();var e=t.parentWindow.Object;return t=null,e},y=function(){try{n=new ActiveXObject("htmlfile")}catch(t){}var t,e;y="undefined"!=typeof document?document.domain&&n?d(n):((e=c("iframe")).style.display="none",a.appendChild(e),e.src=String("javascript:"),(t=e.contentWindow.document).open(),t.write(p("document.F=Object")),t.close(),t.F):d(n);for(var r=s.length;r--;)delete y.prototype[s[r]];return y()};u[l]=!0,t.exports=Object.create||function(t,e){var r;return null!==t?(h.prototype=i(t),r=new h,h.prototype=null,r[l]=t):r=y(),void 0===e?r:o.f(r,e)}},9938:(t,e,r)=>{var n=r(5746),i=r(3937),o=r(5988),s=r(6059),u=r(4529),a=r(4771);e.f=n&&!i?Object.defineProperties:function(t,e){s(t);for(var r,n=u(e),i=a(e),c=i.length,f=0;c>f;)o.f(t,r=i[f++],n[r]);return t}},5988:(t,e,r)=>{var n=r(1899),i=r(5746),o=r(2840),s=r(3937),u=r(6059),a=r(3894),c=n.TypeError,f=Object.defineProperty,l=Object.getOwnPropertyDescriptor,h="enumerable",p="configurable",d="writable";e.f=i?s?function(t,e,r){if(u(t),e=a(e),u(r),"function"==typeof t&&"prototype"===e&&"value"in r&&d in r&&!r.writable){var n=l(t,e);n&&n.writable&&(t[e]=r.value,r={configurable:p in r?r.configurable:n.configurable,enumerable:h in r?r.enumerable:n.enumerable,writable:!1})}return f(t,e,r)}:f:function(t,e,r){if(u(t),e=a(e),u(r),o)try{return f(t,e,r)}catch(t){}if("get"in r||"set"in r)throw c("Accessors not supported");return"value"in r&&(t[e]=r.value),t}},9677:(t,e,r)=>{var n=r(5746),i=r(8834),o=r(6760),s=r(1887),u=r(4529),a=r(3894),c=r(953),f=r(2840),l=Object.getOwnPropertyDescriptor;e.f=n?l:function(t,e){if(t=u(t),e=a(e),f)try{return l(t,e)}catch(t){}if(c(t,e))return s(!i(o.f,t,e),t[e])}},684:(t,e,r)=>{var n=r(2532),i=r(4529),o=r(946).f,s=r(5790),u="object"==typeof window&&window&&Object.getOwnPropertyNames?Object.getOwnPropertyNames(window):[];t.exports.f=function(t){return u&&"Window"==n(t)?function(t){try{return o(t)}catch(t){return s(u)}}(t):o(i(t))}},946:(t,e,r)=>{var n=r(5629),i=r(6759).concat("length","prototype");e.f=Object.getOwnPropertyNames||function(t){return n(t,i)}},7857:(t,e)=>{e.f=Object.getOwnPropertySymbols},249:(t,e,r)=>{var n=r(1899),i=r(953),o=r(7475),s=r(9678),u=r(4262),a=r(4160),c=u("IE_PROTO"),f=n.Object,l=f.prototype;t.exports=a?f.getPrototypeOf:function(t){var e=s(t);if(i(e,c))return e[c];var r=e.constructor;return o(r)&&e instanceof r?r.prototype:e instanceof f?l:null}},1584:(t,e,r)=>{var n=r(5981),i=r(941),o=r(2532),s=r(7135),u=Object.isExtensible,a=n((function(){u(1)}));t.exports=a||s?function(t){return!!i(t)&&((!s||"ArrayBuffer"!=o(t))&&(!u||u(t)))}:u},7046:(t,e,r)=>{var n=r(5329);t.exports=n({}.isPrototypeOf)},5629:(t,e,r)=>{var n=r(5329),i=r(953),o=r(4529),s=r(1692).indexOf,u=r(7748),a=n([].push);t.exports=function(t,e){var r,n=o(t),c=0,f=[];for(r in n)!i(u,r)&&i(n,r)&&a(f,r);for(;e.length>c;)i(n,r=e[c++])&&(~s(f,r)||a(f,r));return f}},4771:(t,e,r)=>{var n=r(5629),i=r(6759);t.exports=Object.keys||function(t){return n(t,i)}},6760:(t,e)=>{"use strict";var r={}.propertyIsEnumerable,n=Object.getOwnPropertyDescriptor,i=n&&!r.call({1:2},1);e.f=i?function(t){var e=n(this,t);return!!e&&e.enumerable}:r},8929:(t,e,r)=>{var n=r(5329),i=r(6059),o=r(1851);t.exports=Object.setPrototypeOf||("__proto__"in{}?function(){var t,e=!1,r={};try{(t=n(Object.getOwnPropertyDescriptor(Object.prototype,"__proto__").set))(r,[]),e=r instanceof Array}catch(t){}return function(r,n){return i(r),o(n),e?t(r,n):r.__proto__=n,r}}():void 0)},5623:(t,e,r)=>{"use strict";var n=r(2885),i=r(9697);t.exports=n?{}.toString:function(){return"[object "+i(this)+"]"}},9811:(t,e,r)=>{var n=r(1899),i=r(8834),o=r(7475),s=r(941),u=n.TypeError;t.exports=function(t,e){var r,n;if("string"===e&&o(r=t.toString)&&!s(n=i(r,t)))return n;if(o(r=t.valueOf)&&!s(n=i(r,t)))return n;if("string"!==e&&o(r=t.toString)&&!s(n=i(r,t)))return n;throw u("Can't convert object to primitive value")}},4058:t=>{t.exports={}},7524:(t,e,r)=>{var n=r(9754);t.exports=function(t,e,r){for(var i in e)r&&r.unsafe&&t[i]?t[i]=e[i]:n(t,i,e[i],r);return t}},9754:(t,e,r)=>{var n=r(2029);t.exports=function(t,e,r,i){i&&i.enumerable?t[e]=r:n(t,e,r)}},8219:(t,e,r)=>{var n=r(1899).TypeError;t.exports=function(t){if(null==t)throw n("Can't call method on "+t);return t}},4911:(t,e,r)=>{var n=r(1899),i=Object.defineProperty;t.exports=function(t,e){try{i(n,t,{value:e,configurable:!0,writable:!0})}catch(r){n[t]=e}return e}},4431:(t,e,r)=>{"use strict";var n=r(626),i=r(5988),o=r(9813),s=r(5746),u=o("species");t.exports=function(t){var e=n(t),r=i.f;s&&e&&!e[u]&&r(e,u,{configurable:!0,get:function(){return this}})}},904:(t,e,r)=>{var n=r(2885),i=r(5988).f,o=r(2029),s=r(953),u=r(5623),a=r(9813)("toStringTag");t.exports=function(t,e,r,c){if(t){var f=r?t:t.prototype;s(f,a)||i(f,a,{configurable:!0,value:e}),c&&!n&&o(f,"toString",u)}}},4262:(t,e,r)=>{var n=r(8726),i=r(9418),o=n("keys");t.exports=function(t){return o[t]||(o[t]=i(t))}},3030:(t,e,r)=>{var n=r(1899),i=r(4911),o="__core-js_shared__",s=n[o]||i(o,{});t.exports=s},8726:(t,e,r)=>{var n=r(2529),i=r(3030);(t.exports=function(t,e){return i[t]||(i[t]=void 0!==e?e:{})})("versions",[]).push({version:"3.20.3",mode:n?"pure":"global",copyright:"© 2014-2022 Denis Pushkarev (zloirock.ru)",license:"https://github.com/zloirock/core-js/blob/v3.20.3/LICENSE",source:"https://github.com/zloirock/core-js"})},4620:(t,e,r)=>{var n=r(5329),i=r(2435),o=r(5803),s=r(8219),u=n("".charAt),a=n("".charCodeAt),c=n("".slice),f=function(t){return function(e,r){var n,f,l=o(s(e)),h=i(r),p=l.length;return h<0||h>=p?t?"":void 0:(n=a(l,h))<55296||n>56319||h+1===p||(f=a(l,h+1))<56320||f>57343?t?u(l,h):n:t?c(l,h,h+2):f-56320+(n-55296<<10)+65536}};t.exports={codeAt:f(!1),charAt:f(!0)}},3093:(t,e,r)=>{var n=r(9417).PROPER,i=r(5981),o=r(3483);t.exports=function(t){return i((function(){return!!o[t]()||"​᠎"!=="​᠎"[t]()||n&&o[t].name!==t}))}},4853:(t,e,r)=>{var n=r(5329),i=r(8219),o=r(5803),s=r(3483),u=n("".replace),a="["+s+"]",c=RegExp("^"+a+a+"*"),f=RegExp(a+a+"*$"),l=function(t){return function(e){var r=o(i(e));return 1&t&&(r=u(r,c,"")),2&t&&(r=u(r,f,"")),r}};t.exports={start:l(1),end:l(2),trim:l(3)}},9413:(t,e,r)=>{var n=r(2435),i=Math.max,o=Math.min;t.exports=function(t,e){var r=n(t);return r<0?i(r+e,0):o(r,e)}},4529:(t,e,r)=>{var n=r(7026),i=r(8219);t.exports=function(t){return n(i(t))}},2435:t=>{var e=Math.ceil,r=Math.floor;t.exports=function(t){var n=+t;return n!=n||0===n?0:(n>0?r:e)(n)}},3057:(t,e,r)=>{var n=r(2435),i=Math.min;t.exports=function(t){return t>0?i(n(t),9007199254740991):0}},9678:(t,e,r)=>{var n=r(1899),i=r(8219),o=n.Object;t.exports=function(t){return o(i(t))}},6935:(t,e,r)=>{var n=r(1899),i=r(8834),o=r(941),s=r(6664),u=r(4229),a=r(9811),c=r(9813),f=n.TypeError,l=c("toPrimitive");t.exports=function(t,e){if(!o(t)||s(t))return t;var r,n=u(t,l);if(n){if(void 0===e&&(e="default"),r=i(n,t,e),!o(r)||s(r))return r;throw f("Can't convert object to primitive value")}return void 0===e&&(e="number"),a(t,e)}},3894:(t,e,r)=>{var n=r(6935),i=r(6664);t.exports=function(t){var e=n(t,"string");return i(e)?e:e+""}},2885:(t,e,r)=>{var n={};n[r(9813)("toStringTag")]="z",t.exports="[object z]"===String(n)},5803:(t,e,r)=>{var n=r(1899),i=r(9697),o=n.String;t.exports=function(t){if("Symbol"===i(t))throw TypeError("Cannot convert a Symbol value to a string");return o(t)}},9826:(t,e,r)=>{var n=r(1899).String;t.exports=function(t){try{return n(t)}catch(t){return"Object"}}},9418:(t,e,r)=>{var n=r(5329),i=0,o=Math.random(),s=n(1..toString);t.exports=function(t){return"Symbol("+(void 0===t?"":t)+")_"+s(++i+o,36)}},2302:(t,e,r)=>{var n=r(2497);t.exports=n&&!Symbol.sham&&"symbol"==typeof Symbol.iterator},3937:(t,e,r)=>{var n=r(5746),i=r(5981);t.exports=n&&i((function(){return 42!=Object.defineProperty((function(){}),"prototype",{value:42,writable:!1}).prototype}))},9813:(t,e,r)=>{var n=r(1899),i=r(8726),o=r(953),s=r(9418),u=r(2497),a=r(2302),c=i("wks"),f=n.Symbol,l=f&&f.for,h=a?f:f&&f.withoutSetter||s;t.exports=function(t){if(!o(c,t)||!u&&"string"!=typeof c[t]){var e="Symbol."+t;u&&o(f,t)?c[t]=f[t]:c[t]=a&&l?l(e):h(e)}return c[t]}},3483:t=>{t.exports="\t\n\v\f\r                　\u2028\u2029\ufeff"},5906:(t,e,r)=>{"use strict";var n=r(6887),i=r(1899),o=r(5981),s=r(1052),u=r(941),a=r(9678),c=r(623),f=r(5449),l=r(4692),h=r(568),p=r(9813),d=r(3385),y=p("isConcatSpreadable"),g=9007199254740991,v="Maximum allowed index exceeded",w=i.TypeError,M=d>=51||!o((function(){var t=[];return t[y]=!1,t.concat()[0]!==t})),L=h("concat"),_=function(t){if(!u(t))return!1;var e=t[y];return void 0!==e?!!e:s(t)};n({target:"Array",proto:!0,forced:!M||!L},{concat:function(t){var e,r,n,i,o,s=a(this),u=l(s,0),h=0;for(e=-1,n=arguments.length;e<n;e++)if(_(o=-1===e?s:arguments[e])){if(h+(i=c(o))>g)throw w(v);for(r=0;r<i;r++,h++)r in o&&f(u,h,o[r])}else{if(h>=g)throw w(v);f(u,h++,o)}return u.length=h,u}})},8851:(t,e,r)=>{"use strict";var n=r(6887),i=r(3610).every;n({target:"Array",proto:!0,forced:!r(4194)("every")},{every:function(t){return i(this,t,arguments.length>1?arguments[1]:void 0)}})},290:(t,e,r)=>{var n=r(6887),i=r(1860),o=r(8479);n({target:"Array",proto:!0},{fill:i}),o("fill")},1501:(t,e,r)=>{"use strict";var n=r(6887),i=r(3610).filter;n({target:"Array",proto:!0,forced:!r(568)("filter")},{filter:function(t){return i(this,t,arguments.length>1?arguments[1]:void 0)}})},4929:(t,e,r)=>{"use strict";var n=r(6887),i=r(3610).findIndex,o=r(8479),s="findIndex",u=!0;s in[]&&Array(1).findIndex((function(){u=!1})),n({target:"Array",proto:!0,forced:u},{findIndex:function(t){return i(this,t,arguments.length>1?arguments[1]:void 0)}}),o(s)},833:(t,e,r)=>{"use strict";var n=r(6887),i=r(3610).find,o=r(8479),s="find",u=!0;s in[]&&Array(1).find((function(){u=!1})),n({target:"Array",proto:!0,forced:u},{find:function(t){return i(this,t,arguments.length>1?arguments[1]:void 0)}}),o(s)},2437:(t,e,r)=>{"use strict";var n=r(6887),i=r(6837);n({target:"Array",proto:!0,forced:[].forEach!=i},{forEach:i})},3242:(t,e,r)=>{var n=r(6887),i=r(1354);n({target:"Array",stat:!0,forced:!r(1385)((function(t){Array.from(t)}))},{from:i})},7690:(t,e,r)=>{"use strict";var n=r(6887),i=r(1692).includes,o=r(8479);n({target:"Array",proto:!0},{includes:function(t){return i(this,t,arguments.length>1?arguments[1]:void 0)}}),o("includes")},9076:(t,e,r)=>{"use strict";var n=r(6887),i=r(5329),o=r(1692).indexOf,s=r(4194),u=i([].indexOf),a=!!u&&1/u([1],1,-0)<0,c=s("indexOf");n({target:"Array",proto:!0,forced:a||!c},{indexOf:function(t){var e=arguments.length>1?arguments[1]:void 0;return a?u(this,t,e)||0:o(this,t,e)}})},2737:(t,e,r)=>{r(6887)({target:"Array",stat:!0},{isArray:r(1052)})},6274:(t,e,r)=>{"use strict";var n=r(4529),i=r(8479),o=r(2077),s=r(5402),u=r(5988).f,a=r(7771),c=r(2529),f=r(5746),l="Array Iterator",h=s.set,p=s.getterFor(l);t.exports=a(Array,"Array",(function(t,e){h(this,{type:l,target:n(t),index:0,kind:e})}),(function(){var t=p(this),e=t.target,r=t.kind,n=t.index++;return!e||n>=e.length?(t.target=void 0,{value:void 0,done:!0}):"keys"==r?{value:n,done:!1}:"values"==r?{value:e[n],done:!1}:{value:[n,e[n]],done:!1}}),"values");var d=o.Arguments=o.Array;if(i("keys"),i("values"),i("entries"),!c&&f&&"values"!==d.name)try{u(d,"name",{value:"values"})}catch(t){}},8787:(t,e,r)=>{"use strict";var n=r(6887),i=r(3610).map;n({target:"Array",proto:!0,forced:!r(568)("map")},{map:function(t){return i(this,t,arguments.length>1?arguments[1]:void 0)}})},1876:(t,e,r)=>{"use strict";var n=r(6887),i=r(6499).left,o=r(4194),s=r(3385),u=r(6049);n({target:"Array",proto:!0,forced:!o("reduce")||!u&&s>79&&s<83},{reduce:function(t){var e=arguments.length;return i(this,t,e,e>1?arguments[1]:void 0)}})},186:(t,e,r)=>{"use strict";var n=r(6887),i=r(1899),o=r(1052),s=r(4284),u=r(941),a=r(9413),c=r(623),f=r(4529),l=r(5449),h=r(9813),p=r(568),d=r(3765),y=p("slice"),g=h("species"),v=i.Array,w=Math.max;n({target:"Array",proto:!0,forced:!y},{slice:function(t,e){var r,n,i,h=f(this),p=c(h),y=a(t,p),M=a(void 0===e?p:e,p);if(o(h)&&(r=h.constructor,(s(r)&&(r===v||o(r.prototype))||u(r)&&null===(r=r[g]))&&(r=void 0),r===v||void 0===r))return d(h,y,M);for(n=new(void 0===r?v:r)(w(M-y,0)),i=0;y<M;y++,i++)y in h&&l(n,i,h[y]);return n.length=i,n}})},6026:(t,e,r)=>{"use strict";var n=r(6887),i=r(3610).some;n({target:"Array",proto:!0,forced:!r(4194)("some")},{some:function(t){return i(this,t,arguments.length>1?arguments[1]:void 0)}})},4115:(t,e,r)=>{"use strict";var n=r(6887),i=r(5329),o=r(4883),s=r(9678),u=r(623),a=r(5803),c=r(5981),f=r(1388),l=r(4194),h=r(4342),p=r(7797),d=r(3385),y=r(8938),g=[],v=i(g.sort),w=i(g.push),M=c((function(){g.sort(void 0)})),L=c((function(){g.sort(null)})),_=l("sort"),m=!c((function(){if(d)return d<70;if(!(h&&h>3)){if(p)return!0;if(y)return y<603;var t,e,r,n,i="";for(t=65;t<76;t++){switch(e=String.fromCharCode(t),t){case 66:case 69:case 70:case 72:r=3;break;case 68:case 71:r=4;break;default:r=2}for(n=0;n<47;n++)g.push({k:e+n,v:r})}for(g.sort((function(t,e){return e.v-t.v})),n=0;n<g.length;n++)e=g[n].k.charAt(0),i.charAt(i.length-1)!==e&&(i+=e);return"DGBEFHACIJK"!==i}}));n({target:"Array",proto:!0,forced:M||!L||!_||!m},{sort:function(t){void 0!==t&&o(t);var e=s(this);if(m)return void 0===t?v(e):v(e,t);var r,n,i=[],c=u(e);for(n=0;n<c;n++)n in e&&w(i,e[n]);for(f(i,function(t){return function(e,r){return void 0===r?-1:void 0===e?1:void 0!==t?+t(e,r)||0:a(e)>a(r)?1:-1}}(t)),r=i.length,n=0;n<r;)e[n]=i[n++];for(;n<c;)delete e[n++];return e}})},3381:(t,e,r)=>{var n=r(6887),i=r(8308);n({target:"Function",proto:!0,forced:Function.bind!==i},{bind:i})},2619:(t,e,r)=>{var n=r(6887),i=r(1899),o=r(626),s=r(9730),u=r(5329),a=r(5981),c=i.Array,f=o("JSON","stringify"),l=u(/./.exec),h=u("".charAt),p=u("".charCodeAt),d=u("".replace),y=u(1..toString),g=/[\uD800-\uDFFF]/g,v=/^[\uD800-\uDBFF]$/,w=/^[\uDC00-\uDFFF]$/,M=function(t,e,r){var n=h(r,e-1),i=h(r,e+1);return l(v,t)&&!l(w,i)||l(w,t)&&!l(v,n)?"\\u"+y(p(t,0),16):t},L=a((function(){return'"\\udf06\\ud834"'!==f("\udf06\ud834")||'"\\udead"'!==f("\udead")}));f&&n({target:"JSON",stat:!0,forced:L},{stringify:function(t,e,r){for(var n=0,i=arguments.length,o=c(i);n<i;n++)o[n]=arguments[n];var u=s(f,null,o);return"string"==typeof u?d(u,g,M):u}})},7501:(t,e,r)=>{"use strict";r(4683)("Map",(function(t){return function(){return t(this,arguments.length?arguments[0]:void 0)}}),r(5616))},9221:(t,e,r)=>{var n=r(6887),i=r(4420);n({target:"Object",stat:!0,forced:Object.assign!==i},{assign:i})},6450:(t,e,r)=>{var n=r(6887),i=r(5746),o=r(5988).f;n({target:"Object",stat:!0,forced:Object.defineProperty!==o,sham:!i},{defineProperty:o})},1724:(t,e,r)=>{var n=r(6887),i=r(9678),o=r(4771);n({target:"Object",stat:!0,forced:r(5981)((function(){o(1)}))},{keys:function(t){return o(i(t))}})},5967:()=>{},1035:(t,e,r)=>{"use strict";var n=r(6887),i=r(5329),o=r(344),s=r(8219),u=r(5803),a=r(7772),c=i("".indexOf);n({target:"String",proto:!0,forced:!a("includes")},{includes:function(t){return!!~c(u(s(this)),u(o(t)),arguments.length>1?arguments[1]:void 0)}})},7971:(t,e,r)=>{"use strict";var n=r(4620).charAt,i=r(5803),o=r(5402),s=r(7771),u="String Iterator",a=o.set,c=o.getterFor(u);s(String,"String",(function(t){a(this,{type:u,string:i(t),index:0})}),(function(){var t,e=c(this),r=e.string,i=e.index;return i>=r.length?{value:void 0,done:!0}:(t=n(r,i),e.index+=t.length,{value:t,done:!1})}))},4761:(t,e,r)=>{"use strict";var n,i=r(6887),o=r(5329),s=r(9677).f,u=r(3057),a=r(5803),c=r(344),f=r(8219),l=r(7772),h=r(2529),p=o("".startsWith),d=o("".slice),y=Math.min,g=l("startsWith");i({target:"String",proto:!0,forced:!!(h||g||(n=s(String.prototype,"startsWith"),!n||n.writable))&&!g},{startsWith:function(t){var e=a(f(this));c(t);var r=u(y(arguments.length>1?arguments[1]:void 0,e.length)),n=a(t);return p?p(e,n,r):d(e,r,r+n.length)===n}})},7398:(t,e,r)=>{"use strict";var n=r(6887),i=r(4853).trim;n({target:"String",proto:!0,forced:r(3093)("trim")},{trim:function(){return i(this)}})},7634:(t,e,r)=>{r(6274);var n=r(3281),i=r(1899),o=r(9697),s=r(2029),u=r(2077),a=r(9813)("toStringTag");for(var c in n){var f=i[c],l=f&&f.prototype;l&&o(l)!==a&&s(l,a,c),u[c]=u.Array}},7698:(t,e,r)=>{var n=r(4493);t.exports=n},3363:(t,e,r)=>{var n=r(4034);t.exports=n},2908:(t,e,r)=>{var n=r(2710);t.exports=n},9216:(t,e,r)=>{var n=r(9324);t.exports=n},6668:(t,e,r)=>{var n=r(5909);t.exports=n},8196:(t,e,r)=>{var n=r(6246);t.exports=n},8065:(t,e,r)=>{var n=r(6043);t.exports=n},7448:(t,e,r)=>{r(7634);var n=r(9697),i=r(953),o=r(7046),s=r(2908),u=Array.prototype,a={DOMTokenList:!0,NodeList:!0};t.exports=function(t){var e=t.entries;return t===u||o(u,t)&&e===u.entries||i(a,n(t))?s:e}},9455:(t,e,r)=>{var n=r(3160);t.exports=n},9743:(t,e,r)=>{var n=r(446);t.exports=n},1955:(t,e,r)=>{var n=r(2480);t.exports=n},6064:(t,e,r)=>{var n=r(7147);t.exports=n},1577:(t,e,r)=>{var n=r(2236);t.exports=n},6279:(t,e,r)=>{r(7634);var n=r(9697),i=r(953),o=r(7046),s=r(9216),u=Array.prototype,a={DOMTokenList:!0,NodeList:!0};t.exports=function(t){var e=t.forEach;return t===u||o(u,t)&&e===u.forEach||i(a,n(t))?s:e}},3778:(t,e,r)=>{var n=r(8557);t.exports=n},9373:(t,e,r)=>{var n=r(4570);t.exports=n},3819:(t,e,r)=>{r(7634);var n=r(9697),i=r(953),o=r(7046),s=r(6668),u=Array.prototype,a={DOMTokenList:!0,NodeList:!0};t.exports=function(t){var e=t.keys;return t===u||o(u,t)&&e===u.keys||i(a,n(t))?s:e}},1798:(t,e,r)=>{var n=r(8287);t.exports=n},2527:(t,e,r)=>{var n=r(8025);t.exports=n},2073:(t,e,r)=>{var n=r(9601);t.exports=n},5286:(t,e,r)=>{var n=r(8299);t.exports=n},2856:(t,e,r)=>{var n=r(9355);t.exports=n},5178:(t,e,r)=>{var n=r(1611);t.exports=n},6361:(t,e,r)=>{var n=r(2774);t.exports=n},8933:(t,e,r)=>{var n=r(4426);t.exports=n},5868:(t,e,r)=>{var n=r(1018);r(7634),t.exports=n},3383:(t,e,r)=>{var n=r(5999);t.exports=n},1910:(t,e,r)=>{var n=r(8171);t.exports=n},3059:(t,e,r)=>{var n=r(8494);t.exports=n},8269:function(t,e,r){var n;n=void 0!==r.g?r.g:this,t.exports=function(t){if(t.CSS&&t.CSS.escape)return t.CSS.escape;var e=function(t){if(0==arguments.length)throw new TypeError("`CSS.escape` requires an argument.");for(var e,r=String(t),n=r.length,i=-1,o="",s=r.charCodeAt(0);++i<n;)0!=(e=r.charCodeAt(i))?o+=e>=1&&e<=31||127==e||0==i&&e>=48&&e<=57||1==i&&e>=48&&e<=57&&45==s?"\\"+e.toString(16)+" ":0==i&&1==n&&45==e||!(e>=128||45==e||95==e||e>=48&&e<=57||e>=65&&e<=90||e>=97&&e<=122)?"\\"+r.charAt(i):r.charAt(i):o+="�";return o};return t.CSS||(t.CSS={}),t.CSS.escape=e,e}(n)},9450:t=>{"use strict";class e{constructor(t,e){this.low=t,this.high=e,this.length=1+e-t}overlaps(t){return!(this.high<t.low||this.low>t.high)}touches(t){return!(this.high+1<t.low||this.low-1>t.high)}add(t){return new e(Math.min(this.low,t.low),Math.max(this.high,t.high))}subtract(t){return t.low<=this.low&&t.high>=this.high?[]:t.low>this.low&&t.high<this.high?[new e(this.low,t.low-1),new e(t.high+1,this.high)]:t.low<=this.low?[new e(t.high+1,this.high)]:[new e(this.low,t.low-1)]}toString(){return this.low==this.high?this.low.toString():this.low+"-"+this.high}}class r{constructor(t,e){this.ranges=[],this.length=0,null!=t&&this.add(t,e)}_update_length(){this.length=this.ranges.reduce(((t,e)=>t+e.length),0)}add(t,n){var i=t=>{for(var e=0;e<this.ranges.length&&!t.touches(this.ranges[e]);)e++;for(var r=this.ranges.slice(0,e);e<this.ranges.length&&t.touches(this.ranges[e]);)t=t.add(this.ranges[e]),e++;r.push(t),this.ranges=r.concat(this.ranges.slice(e)),this._update_length()};return t instanceof r?t.ranges.forEach(i):(null==n&&(n=t),i(new e(t,n))),this}subtract(t,n){var i=t=>{for(var e=0;e<this.ranges.length&&!t.overlaps(this.ranges[e]);)e++;for(var r=this.ranges.slice(0,e);e<this.ranges.length&&t.overlaps(this.ranges[e]);)r=r.concat(this.ranges[e].subtract(t)),e++;this.ranges=r.concat(this.ranges.slice(e)),this._update_length()};return t instanceof r?t.ranges.forEach(i):(null==n&&(n=t),i(new e(t,n))),this}intersect(t,n){var i=[],o=t=>{for(var r=0;r<this.ranges.length&&!t.overlaps(this.ranges[r]);)r++;for(;r<this.ranges.length&&t.overlaps(this.ranges[r]);){var n=Math.max(this.ranges[r].low,t.low),o=Math.min(this.ranges[r].high,t.high);i.push(new e(n,o)),r++}};return t instanceof r?t.ranges.forEach(o):(null==n&&(n=t),o(new e(t,n))),this.ranges=i,this._update_length(),this}index(t){for(var e=0;e<this.ranges.length&&this.ranges[e].length<=t;)t-=this.ranges[e].length,e++;return this.ranges[e].low+t}toString(){return"[ "+this.ranges.join(", ")+" ]"}clone(){return new r(this)}numbers(){return this.ranges.reduce(((t,e)=>{for(var r=e.low;r<=e.high;)t.push(r),r++;return t}),[])}subranges(){return this.ranges.map((t=>({low:t.low,high:t.high,length:1+t.high-t.low})))}}t.exports=r},7187:t=>{"use strict";var e,r="object"==typeof Reflect?Reflect:null,n=r&&"function"==typeof r.apply?r.apply:function(t,e,r){return Function.prototype.apply.call(t,e,r)};e=r&&"function"==typeof r.ownKeys?r.ownKeys:Object.getOwnPropertySymbols?function(t){return Object.getOwnPropertyNames(t).concat(Object.getOwnPropertySymbols(t))}:function(t){return Object.getOwnPropertyNames(t)};var i=Number.isNaN||function(t){return t!=t};function o(){o.init.call(this)}t.exports=o,t.exports.once=function(t,e){return new Promise((function(r,n){function i(r){t.removeListener(e,o),n(r)}function o(){"function"==typeof t.removeListener&&t.removeListener("error",i),r([].slice.call(arguments))}y(t,e,o,{once:!0}),"error"!==e&&function(t,e,r){"function"==typeof t.on&&y(t,"error",e,r)}(t,i,{once:!0})}))},o.EventEmitter=o,o.prototype._events=void 0,o.prototype._eventsCount=0,o.prototype._maxListeners=void 0;var s=10;function u(t){if("function"!=typeof t)throw new TypeError('The "listener" argument must be of type Function. Received type '+typeof t)}function a(t){return void 0===t._maxListeners?o.defaultMaxListeners:t._maxListeners}function c(t,e,r,n){var i,o,s,c;if(u(r),void 0===(o=t._events)?(o=t._events=Object.create(null),t._eventsCount=0):(void 0!==o.newListener&&(t.emit("newListener",e,r.listener?r.listener:r),o=t._events),s=o[e]),void 0===s)s=o[e]=r,++t._eventsCount;else if("function"==typeof s?s=o[e]=n?[r,s]:[s,r]:n?s.unshift(r):s.push(r),(i=a(t))>0&&s.length>i&&!s.warned){s.warned=!0;var f=new Error("Possible EventEmitter memory leak detected. "+s.length+" "+String(e)+" listeners added. Use emitter.setMaxListeners() to increase limit");f.name="MaxListenersExceededWarning",f.emitter=t,f.type=e,f.count=s.length,c=f,console&&console.warn&&console.warn(c)}return t}function f(){if(!this.fired)return this.target.removeListener(this.type,this.wrapFn),this.fired=!0,0===arguments.length?this.listener.call(this.target):this.listener.apply(this.target,arguments)}function l(t,e,r){var n={fired:!1,wrapFn:void 0,target:t,type:e,listener:r},i=f.bind(n);return i.listener=r,n.wrapFn=i,i}function h(t,e,r){var n=t._events;if(void 0===n)return[];var i=n[e];return void 0===i?[]:"function"==typeof i?r?[i.listener||i]:[i]:r?function(t){for(var e=new Array(t.length),r=0;r<e.length;++r)e[r]=t[r].listener||t[r];return e}(i):d(i,i.length)}function p(t){var e=this._events;if(void 0!==e){var r=e[t];if("function"==typeof r)return 1;if(void 0!==r)return r.length}return 0}function d(t,e){for(var r=new Array(e),n=0;n<e;++n)r[n]=t[n];return r}function y(t,e,r,n){if("function"==typeof t.on)n.once?t.once(e,r):t.on(e,r);else{if("function"!=typeof t.addEventListener)throw new TypeError('The "emitter" argument must be of type EventEmitter. Received type '+typeof t);t.addEventListener(e,(function i(o){n.once&&t.removeEventListener(e,i),r(o)}))}}Object.defineProperty(o,"defaultMaxListeners",{enumerable:!0,get:function(){return s},set:function(t){if("number"!=typeof t||t<0||i(t))throw new RangeError('The value of "defaultMaxListeners" is out of range. It must be a non-negative number. Received '+t+".");s=t}}),o.init=function(){void 0!==this._events&&this._events!==Object.getPrototypeOf(this)._events||(this._events=Object.create(null),this._eventsCount=0),this._maxListeners=this._maxListeners||void 0},o.prototype.setMaxListeners=function(t){if("number"!=typeof t||t<0||i(t))throw new RangeError('The value of "n" is out of range. It must be a non-negative number. Received '+t+".");return this._maxListeners=t,this},o.prototype.getMaxListeners=function(){return a(this)},o.prototype.emit=function(t){for(var e=[],r=1;r<arguments.length;r++)e.push(arguments[r]);var i="error"===t,o=this._events;if(void 0!==o)i=i&&void 0===o.error;else if(!i)return!1;if(i){var s;if(e.length>0&&(s=e[0]),s instanceof Error)throw s;var u=new Error("Unhandled error."+(s?" ("+s.message+")":""));throw u.context=s,u}var a=o[t];if(void 0===a)return!1;if("function"==typeof a)n(a,this,e);else{var c=a.length,f=d(a,c);for(r=0;r<c;++r)n(f[r],this,e)}return!0},o.prototype.addListener=function(t,e){return c(this,t,e,!1)},o.prototype.on=o.prototype.addListener,o.prototype.prependListener=function(t,e){return c(this,t,e,!0)},o.prototype.once=function(t,e){return u(e),this.on(t,l(this,t,e)),this},o.prototype.prependOnceListener=function(t,e){return u(e),this.prependListener(t,l(this,t,e)),this},o.prototype.removeListener=function(t,e){var r,n,i,o,s;if(u(e),void 0===(n=this._events))return this;if(void 0===(r=n[t]))return this;if(r===e||r.listener===e)0==--this._eventsCount?this._events=Object.create(null):(delete n[t],n.removeListener&&this.emit("removeListener",t,r.listener||e));else if("function"!=typeof r){for(i=-1,o=r.length-1;o>=0;o--)if(r[o]===e||r[o].listener===e){s=r[o].listener,i=o;break}if(i<0)return this;0===i?r.shift():function(t,e){for(;e+1<t.length;e++)t[e]=t[e+1];t.pop()}(r,i),1===r.length&&(n[t]=r[0]),void 0!==n.removeListener&&this.emit("removeListener",t,s||e)}return this},o.prototype.off=o.prototype.removeListener,o.prototype.removeAllListeners=function(t){var e,r,n;if(void 0===(r=this._events))return this;if(void 0===r.removeListener)return 0===arguments.length?(this._events=Object.create(null),this._eventsCount=0):void 0!==r[t]&&(0==--this._eventsCount?this._events=Object.create(null):delete r[t]),this;if(0===arguments.length){var i,o=Object.keys(r);for(n=0;n<o.length;++n)"removeListener"!==(i=o[n])&&this.removeAllListeners(i);return this.removeAllListeners("removeListener"),this._events=Object.create(null),this._eventsCount=0,this}if("function"==typeof(e=r[t]))this.removeListener(t,e);else if(void 0!==e)for(n=e.length-1;n>=0;n--)this.removeListener(t,e[n]);return this},o.prototype.listeners=function(t){return h(this,t,!0)},o.prototype.rawListeners=function(t){return h(this,t,!1)},o.listenerCount=function(t,e){return"function"==typeof t.listenerCount?t.listenerCount(e):p.call(t,e)},o.prototype.listenerCount=p,o.prototype.eventNames=function(){return this._eventsCount>0?e(this._events):[]}},645:(t,e)=>{e.read=function(t,e,r,n,i){var o,s,u=8*i-n-1,a=(1<<u)-1,c=a>>1,f=-7,l=r?i-1:0,h=r?-1:1,p=t[e+l];for(l+=h,o=p&(1<<-f)-1,p>>=-f,f+=u;f>0;o=256*o+t[e+l],l+=h,f-=8);for(s=o&(1<<-f)-1,o>>=-f,f+=n;f>0;s=256*s+t[e+l],l+=h,f-=8);if(0===o)o=1-c;else{if(o===a)return s?NaN:1/0*(p?-1:1);s+=Math.pow(2,n),o-=c}return(p?-1:1)*s*Math.pow(2,o-n)},e.write=function(t,e,r,n,i,o){var s,u,a,c=8*o-i-1,f=(1<<c)-1,l=f>>1,h=23===i?Math.pow(2,-24)-Math.pow(2,-77):0,p=n?0:o-1,d=n?1:-1,y=e<0||0===e&&1/e<0?1:0;for(e=Math.abs(e),isNaN(e)||e===1/0?(u=isNaN(e)?1:0,s=f):(s=Math.floor(Math.log(e)/Math.LN2),e*(a=Math.pow(2,-s))<1&&(s--,a*=2),(e+=s+l>=1?h/a:h*Math.pow(2,1-l))*a>=2&&(s++,a/=2),s+l>=f?(u=0,s=f):s+l>=1?(u=(e*a-1)*Math.pow(2,i),s+=l):(u=e*Math.pow(2,l-1)*Math.pow(2,i),s=0));i>=8;t[r+p]=255&u,p+=d,u/=256,i-=8);for(s=s<<i|u,c+=i;c>0;t[r+p]=255&s,p+=d,s/=256,c-=8);t[r+p-d]|=128*y}},3393:function(t){t.exports=function(){"use strict";var t=Array.prototype.slice;function e(t,e){e&&(t.prototype=Object.create(e.prototype)),t.prototype.constructor=t}function r(t){return s(t)?t:H(t)}function n(t){return u(t)?t:J(t)}function i(t){return a(t)?t:$(t)}function o(t){return s(t)&&!c(t)?t:Z(t)}function s(t){return!(!t||!t[l])}function u(t){return!(!t||!t[h])}function a(t){return!(!t||!t[p])}function c(t){return u(t)||a(t)}function f(t){return!(!t||!t[d])}e(n,r),e(i,r),e(o,r),r.isIterable=s,r.isKeyed=u,r.isIndexed=a,r.isAssociative=c,r.isOrdered=f,r.Keyed=n,r.Indexed=i,r.Set=o;var l="@@__IMMUTABLE_ITERABLE__@@",h="@@__IMMUTABLE_KEYED__@@",p="@@__IMMUTABLE_INDEXED__@@",d="@@__IMMUTABLE_ORDERED__@@",y="delete",g=5,v=1<<g,w=v-1,M={},L={value:!1},_={value:!1};function m(t){return t.value=!1,t}function b(t){t&&(t.value=!0)}function j(){}function x(t,e){e=e||0;for(var r=Math.max(0,t.length-e),n=new Array(r),i=0;i<r;i++)n[i]=t[i+e];return n}function N(t){return void 0===t.size&&(t.size=t.__iterate(D)),t.size}function S(t,e){if("number"!=typeof e){var r=e>>>0;if(""+r!==e||4294967295===r)return NaN;e=r}return e<0?N(t)+e:e}function D(){return!0}function I(t,e,r){return(0===t||void 0!==r&&t<=-r)&&(void 0===e||void 0!==r&&e>=r)}function E(t,e){return C(t,e,0)}function A(t,e){return C(t,e,e)}function C(t,e,r){return void 0===t?r:t<0?Math.max(0,e+t):void 0===e?t:Math.min(e,t)}var T=0,O=1,z=2,k="function"==typeof Symbol&&Symbol.iterator,U="@@iterator",R=k||U;function Y(t){this.next=t}function B(t,e,r,n){var i=0===t?e:1===t?r:[e,r];return n?n.value=i:n={value:i,done:!1},n}function P(){return{value:void 0,done:!0}}function Q(t){return!!W(t)}function F(t){return t&&"function"==typeof t.next}function G(t){var e=W(t);return e&&e.call(t)}function W(t){var e=t&&(k&&t[k]||t[U]);if("function"==typeof e)return e}function q(t){return t&&"number"==typeof t.length}function H(t){return null==t?st():s(t)?t.toSeq():ct(t)}function J(t){return null==t?st().toKeyedSeq():s(t)?u(t)?t.toSeq():t.fromEntrySeq():ut(t)}function $(t){return null==t?st():s(t)?u(t)?t.entrySeq():t.toIndexedSeq():at(t)}function Z(t){return(null==t?st():s(t)?u(t)?t.entrySeq():t:at(t)).toSetSeq()}Y.prototype.toString=function(){return"[Iterator]"},Y.KEYS=T,Y.VALUES=O,Y.ENTRIES=z,Y.prototype.inspect=Y.prototype.toSource=function(){return this.toString()},Y.prototype[R]=function(){return this},e(H,r),H.of=function(){return H(arguments)},H.prototype.toSeq=function(){return this},H.prototype.toString=function(){return this.__toString("Seq {","}")},H.prototype.cacheResult=function(){return!this._cache&&this.__iterateUncached&&(this._cache=this.entrySeq().toArray(),this.size=this._cache.length),this},H.prototype.__iterate=function(t,e){return lt(this,t,e,!0)},H.prototype.__iterator=function(t,e){return ht(this,t,e,!0)},e(J,H),J.prototype.toKeyedSeq=function(){return this},e($,H),$.of=function(){return $(arguments)},$.prototype.toIndexedSeq=function(){return this},$.prototype.toString=function(){return this.__toString("Seq [","]")},$.prototype.__iterate=function(t,e){return lt(this,t,e,!1)},$.prototype.__iterator=function(t,e){return ht(this,t,e,!1)},e(Z,H),Z.of=function(){return Z(arguments)},Z.prototype.toSetSeq=function(){return this},H.isSeq=ot,H.Keyed=J,H.Set=Z,H.Indexed=$;var V,X,K,tt="@@__IMMUTABLE_SEQ__@@";function et(t){this._array=t,this.size=t.length}function rt(t){var e=Object.keys(t);this._object=t,this._keys=e,this.size=e.length}function nt(t){this._iterable=t,this.size=t.length||t.size}function it(t){this._iterator=t,this._iteratorCache=[]}function ot(t){return!(!t||!t[tt])}function st(){return V||(V=new et([]))}function ut(t){var e=Array.isArray(t)?new et(t).fromEntrySeq():F(t)?new it(t).fromEntrySeq():Q(t)?new nt(t).fromEntrySeq():"object"==typeof t?new rt(t):void 0;if(!e)throw new TypeError("Expected Array or iterable object of [k, v] entries, or keyed object: "+t);return e}function at(t){var e=ft(t);if(!e)throw new TypeError("Expected Array or iterable object of values: "+t);return e}function ct(t){var e=ft(t)||"object"==typeof t&&new rt(t);if(!e)throw new TypeError("Expected Array or iterable object of values, or keyed object: "+t);return e}function ft(t){return q(t)?new et(t):F(t)?new it(t):Q(t)?new nt(t):void 0}function lt(t,e,r,n){var i=t._cache;if(i){for(var o=i.length-1,s=0;s<=o;s++){var u=i[r?o-s:s];if(!1===e(u[1],n?u[0]:s,t))return s+1}return s}return t.__iterateUncached(e,r)}function ht(t,e,r,n){var i=t._cache;if(i){var o=i.length-1,s=0;return new Y((function(){var t=i[r?o-s:s];return s++>o?P():B(e,n?t[0]:s-1,t[1])}))}return t.__iteratorUncached(e,r)}function pt(t,e){return e?dt(e,t,"",{"":t}):yt(t)}function dt(t,e,r,n){return Array.isArray(e)?t.call(n,r,$(e).map((function(r,n){return dt(t,r,n,e)}))):gt(e)?t.call(n,r,J(e).map((function(r,n){return dt(t,r,n,e)}))):e}function yt(t){return Array.isArray(t)?$(t).map(yt).toList():gt(t)?J(t).map(yt).toMap():t}function gt(t){return t&&(t.constructor===Object||void 0===t.constructor)}function vt(t,e){if(t===e||t!=t&&e!=e)return!0;if(!t||!e)return!1;if("function"==typeof t.valueOf&&"function"==typeof e.valueOf){if((t=t.valueOf())===(e=e.valueOf())||t!=t&&e!=e)return!0;if(!t||!e)return!1}return!("function"!=typeof t.equals||"function"!=typeof e.equals||!t.equals(e))}function wt(t,e){if(t===e)return!0;if(!s(e)||void 0!==t.size&&void 0!==e.size&&t.size!==e.size||void 0!==t.__hash&&void 0!==e.__hash&&t.__hash!==e.__hash||u(t)!==u(e)||a(t)!==a(e)||f(t)!==f(e))return!1;if(0===t.size&&0===e.size)return!0;var r=!c(t);if(f(t)){var n=t.entries();return e.every((function(t,e){var i=n.next().value;return i&&vt(i[1],t)&&(r||vt(i[0],e))}))&&n.next().done}var i=!1;if(void 0===t.size)if(void 0===e.size)"function"==typeof t.cacheResult&&t.cacheResult();else{i=!0;var o=t;t=e,e=o}var l=!0,h=e.__iterate((function(e,n){if(r?!t.has(e):i?!vt(e,t.get(n,M)):!vt(t.get(n,M),e))return l=!1,!1}));return l&&t.size===h}function Mt(t,e){if(!(this instanceof Mt))return new Mt(t,e);if(this._value=t,this.size=void 0===e?1/0:Math.max(0,e),0===this.size){if(X)return X;X=this}}function Lt(t,e){if(!t)throw new Error(e)}function _t(t,e,r){if(!(this instanceof _t))return new _t(t,e,r);if(Lt(0!==r,"Cannot step a Range by 0"),t=t||0,void 0===e&&(e=1/0),r=void 0===r?1:Math.abs(r),e<t&&(r=-r),this._start=t,this._end=e,this._step=r,this.size=Math.max(0,Math.ceil((e-t)/r-1)+1),0===this.size){if(K)return K;K=this}}function mt(){throw TypeError("Abstract")}function bt(){}function jt(){}function xt(){}H.prototype[tt]=!0,e(et,$),et.prototype.get=function(t,e){return this.has(t)?this._array[S(this,t)]:e},et.prototype.__iterate=function(t,e){for(var r=this._array,n=r.length-1,i=0;i<=n;i++)if(!1===t(r[e?n-i:i],i,this))return i+1;return i},et.prototype.__iterator=function(t,e){var r=this._array,n=r.length-1,i=0;return new Y((function(){return i>n?P():B(t,i,r[e?n-i++:i++])}))},e(rt,J),rt.prototype.get=function(t,e){return void 0===e||this.has(t)?this._object[t]:e},rt.prototype.has=function(t){return this._object.hasOwnProperty(t)},rt.prototype.__iterate=function(t,e){for(var r=this._object,n=this._keys,i=n.length-1,o=0;o<=i;o++){var s=n[e?i-o:o];if(!1===t(r[s],s,this))return o+1}return o},rt.prototype.__iterator=function(t,e){var r=this._object,n=this._keys,i=n.length-1,o=0;return new Y((function(){var s=n[e?i-o:o];return o++>i?P():B(t,s,r[s])}))},rt.prototype[d]=!0,e(nt,$),nt.prototype.__iterateUncached=function(t,e){if(e)return this.cacheResult().__iterate(t,e);var r=G(this._iterable),n=0;if(F(r))for(var i;!(i=r.next()).done&&!1!==t(i.value,n++,this););return n},nt.prototype.__iteratorUncached=function(t,e){if(e)return this.cacheResult().__iterator(t,e);var r=G(this._iterable);if(!F(r))return new Y(P);var n=0;return new Y((function(){var e=r.next();return e.done?e:B(t,n++,e.value)}))},e(it,$),it.prototype.__iterateUncached=function(t,e){if(e)return this.cacheResult().__iterate(t,e);for(var r,n=this._iterator,i=this._iteratorCache,o=0;o<i.length;)if(!1===t(i[o],o++,this))return o;for(;!(r=n.next()).done;){var s=r.value;if(i[o]=s,!1===t(s,o++,this))break}return o},it.prototype.__iteratorUncached=function(t,e){if(e)return this.cacheResult().__iterator(t,e);var r=this._iterator,n=this._iteratorCache,i=0;return new Y((function(){if(i>=n.length){var e=r.next();if(e.done)return e;n[i]=e.value}return B(t,i,n[i++])}))},e(Mt,$),Mt.prototype.toString=function(){return 0===this.size?"Repeat []":"Repeat [ "+this._value+" "+this.size+" times ]"},Mt.prototype.get=function(t,e){return this.has(t)?this._value:e},Mt.prototype.includes=function(t){return vt(this._value,t)},Mt.prototype.slice=function(t,e){var r=this.size;return I(t,e,r)?this:new Mt(this._value,A(e,r)-E(t,r))},Mt.prototype.reverse=function(){return this},Mt.prototype.indexOf=function(t){return vt(this._value,t)?0:-1},Mt.prototype.lastIndexOf=function(t){return vt(this._value,t)?this.size:-1},Mt.prototype.__iterate=function(t,e){for(var r=0;r<this.size;r++)if(!1===t(this._value,r,this))return r+1;return r},Mt.prototype.__iterator=function(t,e){var r=this,n=0;return new Y((function(){return n<r.size?B(t,n++,r._value):P()}))},Mt.prototype.equals=function(t){return t instanceof Mt?vt(this._value,t._value):wt(t)},e(_t,$),_t.prototype.toString=function(){return 0===this.size?"Range []":"Range [ "+this._start+"..."+this._end+(1!==this._step?" by "+this._step:"")+" ]"},_t.prototype.get=function(t,e){return this.has(t)?this._start+S(this,t)*this._step:e},_t.prototype.includes=function(t){var e=(t-this._start)/this._step;return e>=0&&e<this.size&&e===Math.floor(e)},_t.prototype.slice=function(t,e){return I(t,e,this.size)?this:(t=E(t,this.size),(e=A(e,this.size))<=t?new _t(0,0):new _t(this.get(t,this._end),this.get(e,this._end),this._step))},_t.prototype.indexOf=function(t){var e=t-this._start;if(e%this._step==0){var r=e/this._step;if(r>=0&&r<this.size)return r}return-1},_t.prototype.lastIndexOf=function(t){return this.indexOf(t)},_t.prototype.__iterate=function(t,e){for(var r=this.size-1,n=this._step,i=e?this._start+r*n:this._start,o=0;o<=r;o++){if(!1===t(i,o,this))return o+1;i+=e?-n:n}return o},_t.prototype.__iterator=function(t,e){var r=this.size-1,n=this._step,i=e?this._start+r*n:this._start,o=0;return new Y((function(){var s=i;return i+=e?-n:n,o>r?P():B(t,o++,s)}))},_t.prototype.equals=function(t){return t instanceof _t?this._start===t._start&&this._end===t._end&&this._step===t._step:wt(this,t)},e(mt,r),e(bt,mt),e(jt,mt),e(xt,mt),mt.Keyed=bt,mt.Indexed=jt,mt.Set=xt;var Nt="function"==typeof Math.imul&&-2===Math.imul(4294967295,2)?Math.imul:function(t,e){var r=65535&(t|=0),n=65535&(e|=0);return r*n+((t>>>16)*n+r*(e>>>16)<<16>>>0)|0};function St(t){return t>>>1&1073741824|3221225471&t}function Dt(t){if(!1===t||null==t)return 0;if("function"==typeof t.valueOf&&(!1===(t=t.valueOf())||null==t))return 0;if(!0===t)return 1;var e=typeof t;if("number"===e){if(t!=t||t===1/0)return 0;var r=0|t;for(r!==t&&(r^=4294967295*t);t>4294967295;)r^=t/=4294967295;return St(r)}if("string"===e)return t.length>Yt?It(t):Et(t);if("function"==typeof t.hashCode)return t.hashCode();if("object"===e)return At(t);if("function"==typeof t.toString)return Et(t.toString());throw new Error("Value type "+e+" cannot be hashed.")}function It(t){var e=Qt[t];return void 0===e&&(e=Et(t),Pt===Bt&&(Pt=0,Qt={}),Pt++,Qt[t]=e),e}function Et(t){for(var e=0,r=0;r<t.length;r++)e=31*e+t.charCodeAt(r)|0;return St(e)}function At(t){var e;if(kt&&void 0!==(e=zt.get(t)))return e;if(void 0!==(e=t[Rt]))return e;if(!Tt){if(void 0!==(e=t.propertyIsEnumerable&&t.propertyIsEnumerable[Rt]))return e;if(void 0!==(e=Ot(t)))return e}if(e=++Ut,1073741824&Ut&&(Ut=0),kt)zt.set(t,e);else{if(void 0!==Ct&&!1===Ct(t))throw new Error("Non-extensible objects are not allowed as keys.");if(Tt)Object.defineProperty(t,Rt,{enumerable:!1,configurable:!1,writable:!1,value:e});else if(void 0!==t.propertyIsEnumerable&&t.propertyIsEnumerable===t.constructor.prototype.propertyIsEnumerable)t.propertyIsEnumerable=function(){return this.constructor.prototype.propertyIsEnumerable.apply(this,arguments)},t.propertyIsEnumerable[Rt]=e;else{if(void 0===t.nodeType)throw new Error("Unable to set a non-enumerable property on object.");t[Rt]=e}}return e}var Ct=Object.isExtensible,Tt=function(){try{return Object.defineProperty({},"@",{}),!0}catch(t){return!1}}();function Ot(t){if(t&&t.nodeType>0)switch(t.nodeType){case 1:return t.uniqueID;case 9:return t.documentElement&&t.documentElement.uniqueID}}var zt,kt="function"==typeof WeakMap;kt&&(zt=new WeakMap);var Ut=0,Rt="__immutablehash__";"function"==typeof Symbol&&(Rt=Symbol(Rt));var Yt=16,Bt=255,Pt=0,Qt={};function Ft(t){Lt(t!==1/0,"Cannot perform this action with an infinite size.")}function Gt(t){return null==t?ie():Wt(t)&&!f(t)?t:ie().withMutations((function(e){var r=n(t);Ft(r.size),r.forEach((function(t,r){return e.set(r,t)}))}))}function Wt(t){return!(!t||!t[Ht])}e(Gt,bt),Gt.of=function(){var e=t.call(arguments,0);return ie().withMutations((function(t){for(var r=0;r<e.length;r+=2){if(r+1>=e.length)throw new Error("Missing value for key: "+e[r]);t.set(e[r],e[r+1])}}))},Gt.prototype.toString=function(){return this.__toString("Map {","}")},Gt.prototype.get=function(t,e){return this._root?this._root.get(0,void 0,t,e):e},Gt.prototype.set=function(t,e){return oe(this,t,e)},Gt.prototype.setIn=function(t,e){return this.updateIn(t,M,(function(){return e}))},Gt.prototype.remove=function(t){return oe(this,t,M)},Gt.prototype.deleteIn=function(t){return this.updateIn(t,(function(){return M}))},Gt.prototype.update=function(t,e,r){return 1===arguments.length?t(this):this.updateIn([t],e,r)},Gt.prototype.updateIn=function(t,e,r){r||(r=e,e=void 0);var n=ge(this,_r(t),e,r);return n===M?void 0:n},Gt.prototype.clear=function(){return 0===this.size?this:this.__ownerID?(this.size=0,this._root=null,this.__hash=void 0,this.__altered=!0,this):ie()},Gt.prototype.merge=function(){return he(this,void 0,arguments)},Gt.prototype.mergeWith=function(e){return he(this,e,t.call(arguments,1))},Gt.prototype.mergeIn=function(e){var r=t.call(arguments,1);return this.updateIn(e,ie(),(function(t){return"function"==typeof t.merge?t.merge.apply(t,r):r[r.length-1]}))},Gt.prototype.mergeDeep=function(){return he(this,pe,arguments)},Gt.prototype.mergeDeepWith=function(e){var r=t.call(arguments,1);return he(this,de(e),r)},Gt.prototype.mergeDeepIn=function(e){var r=t.call(arguments,1);return this.updateIn(e,ie(),(function(t){return"function"==typeof t.mergeDeep?t.mergeDeep.apply(t,r):r[r.length-1]}))},Gt.prototype.sort=function(t){return Qe(fr(this,t))},Gt.prototype.sortBy=function(t,e){return Qe(fr(this,e,t))},Gt.prototype.withMutations=function(t){var e=this.asMutable();return t(e),e.wasAltered()?e.__ensureOwner(this.__ownerID):this},Gt.prototype.asMutable=function(){return this.__ownerID?this:this.__ensureOwner(new j)},Gt.prototype.asImmutable=function(){return this.__ensureOwner()},Gt.prototype.wasAltered=function(){return this.__altered},Gt.prototype.__iterator=function(t,e){return new te(this,t,e)},Gt.prototype.__iterate=function(t,e){var r=this,n=0;return this._root&&this._root.iterate((function(e){return n++,t(e[1],e[0],r)}),e),n},Gt.prototype.__ensureOwner=function(t){return t===this.__ownerID?this:t?ne(this.size,this._root,t,this.__hash):(this.__ownerID=t,this.__altered=!1,this)},Gt.isMap=Wt;var qt,Ht="@@__IMMUTABLE_MAP__@@",Jt=Gt.prototype;function $t(t,e){this.ownerID=t,this.entries=e}function Zt(t,e,r){this.ownerID=t,this.bitmap=e,this.nodes=r}function Vt(t,e,r){this.ownerID=t,this.count=e,this.nodes=r}function Xt(t,e,r){this.ownerID=t,this.keyHash=e,this.entries=r}function Kt(t,e,r){this.ownerID=t,this.keyHash=e,this.entry=r}function te(t,e,r){this._type=e,this._reverse=r,this._stack=t._root&&re(t._root)}function ee(t,e){return B(t,e[0],e[1])}function re(t,e){return{node:t,index:0,__prev:e}}function ne(t,e,r,n){var i=Object.create(Jt);return i.size=t,i._root=e,i.__ownerID=r,i.__hash=n,i.__altered=!1,i}function ie(){return qt||(qt=ne(0))}function oe(t,e,r){var n,i;if(t._root){var o=m(L),s=m(_);if(n=se(t._root,t.__ownerID,0,void 0,e,r,o,s),!s.value)return t;i=t.size+(o.value?r===M?-1:1:0)}else{if(r===M)return t;i=1,n=new $t(t.__ownerID,[[e,r]])}return t.__ownerID?(t.size=i,t._root=n,t.__hash=void 0,t.__altered=!0,t):n?ne(i,n):ie()}function se(t,e,r,n,i,o,s,u){return t?t.update(e,r,n,i,o,s,u):o===M?t:(b(u),b(s),new Kt(e,n,[i,o]))}function ue(t){return t.constructor===Kt||t.constructor===Xt}function ae(t,e,r,n,i){if(t.keyHash===n)return new Xt(e,n,[t.entry,i]);var o,s=(0===r?t.keyHash:t.keyHash>>>r)&w,u=(0===r?n:n>>>r)&w;return new Zt(e,1<<s|1<<u,s===u?[ae(t,e,r+g,n,i)]:(o=new Kt(e,n,i),s<u?[t,o]:[o,t]))}function ce(t,e,r,n){t||(t=new j);for(var i=new Kt(t,Dt(r),[r,n]),o=0;o<e.length;o++){var s=e[o];i=i.update(t,0,void 0,s[0],s[1])}return i}function fe(t,e,r,n){for(var i=0,o=0,s=new Array(r),u=0,a=1,c=e.length;u<c;u++,a<<=1){var f=e[u];void 0!==f&&u!==n&&(i|=a,s[o++]=f)}return new Zt(t,i,s)}function le(t,e,r,n,i){for(var o=0,s=new Array(v),u=0;0!==r;u++,r>>>=1)s[u]=1&r?e[o++]:void 0;return s[n]=i,new Vt(t,o+1,s)}function he(t,e,r){for(var i=[],o=0;o<r.length;o++){var u=r[o],a=n(u);s(u)||(a=a.map((function(t){return pt(t)}))),i.push(a)}return ye(t,e,i)}function pe(t,e,r){return t&&t.mergeDeep&&s(e)?t.mergeDeep(e):vt(t,e)?t:e}function de(t){return function(e,r,n){if(e&&e.mergeDeepWith&&s(r))return e.mergeDeepWith(t,r);var i=t(e,r,n);return vt(e,i)?e:i}}function ye(t,e,r){return 0===(r=r.filter((function(t){return 0!==t.size}))).length?t:0!==t.size||t.__ownerID||1!==r.length?t.withMutations((function(t){for(var n=e?function(r,n){t.update(n,M,(function(t){return t===M?r:e(t,r,n)}))}:function(e,r){t.set(r,e)},i=0;i<r.length;i++)r[i].forEach(n)})):t.constructor(r[0])}function ge(t,e,r,n){var i=t===M,o=e.next();if(o.done){var s=i?r:t,u=n(s);return u===s?t:u}Lt(i||t&&t.set,"invalid keyPath");var a=o.value,c=i?M:t.get(a,M),f=ge(c,e,r,n);return f===c?t:f===M?t.remove(a):(i?ie():t).set(a,f)}function ve(t){return t=(t=(858993459&(t-=t>>1&1431655765))+(t>>2&858993459))+(t>>4)&252645135,t+=t>>8,127&(t+=t>>16)}function we(t,e,r,n){var i=n?t:x(t);return i[e]=r,i}function Me(t,e,r,n){var i=t.length+1;if(n&&e+1===i)return t[e]=r,t;for(var o=new Array(i),s=0,u=0;u<i;u++)u===e?(o[u]=r,s=-1):o[u]=t[u+s];return o}function Le(t,e,r){var n=t.length-1;if(r&&e===n)return t.pop(),t;for(var i=new Array(n),o=0,s=0;s<n;s++)s===e&&(o=1),i[s]=t[s+o];return i}Jt[Ht]=!0,Jt[y]=Jt.remove,Jt.removeIn=Jt.deleteIn,$t.prototype.get=function(t,e,r,n){for(var i=this.entries,o=0,s=i.length;o<s;o++)if(vt(r,i[o][0]))return i[o][1];return n},$t.prototype.update=function(t,e,r,n,i,o,s){for(var u=i===M,a=this.entries,c=0,f=a.length;c<f&&!vt(n,a[c][0]);c++);var l=c<f;if(l?a[c][1]===i:u)return this;if(b(s),(u||!l)&&b(o),!u||1!==a.length){if(!l&&!u&&a.length>=_e)return ce(t,a,n,i);var h=t&&t===this.ownerID,p=h?a:x(a);return l?u?c===f-1?p.pop():p[c]=p.pop():p[c]=[n,i]:p.push([n,i]),h?(this.entries=p,this):new $t(t,p)}},Zt.prototype.get=function(t,e,r,n){void 0===e&&(e=Dt(r));var i=1<<((0===t?e:e>>>t)&w),o=this.bitmap;return 0==(o&i)?n:this.nodes[ve(o&i-1)].get(t+g,e,r,n)},Zt.prototype.update=function(t,e,r,n,i,o,s){void 0===r&&(r=Dt(n));var u=(0===e?r:r>>>e)&w,a=1<<u,c=this.bitmap,f=0!=(c&a);if(!f&&i===M)return this;var l=ve(c&a-1),h=this.nodes,p=f?h[l]:void 0,d=se(p,t,e+g,r,n,i,o,s);if(d===p)return this;if(!f&&d&&h.length>=me)return le(t,h,c,u,d);if(f&&!d&&2===h.length&&ue(h[1^l]))return h[1^l];if(f&&d&&1===h.length&&ue(d))return d;var y=t&&t===this.ownerID,v=f?d?c:c^a:c|a,L=f?d?we(h,l,d,y):Le(h,l,y):Me(h,l,d,y);return y?(this.bitmap=v,this.nodes=L,this):new Zt(t,v,L)},Vt.prototype.get=function(t,e,r,n){void 0===e&&(e=Dt(r));var i=(0===t?e:e>>>t)&w,o=this.nodes[i];return o?o.get(t+g,e,r,n):n},Vt.prototype.update=function(t,e,r,n,i,o,s){void 0===r&&(r=Dt(n));var u=(0===e?r:r>>>e)&w,a=i===M,c=this.nodes,f=c[u];if(a&&!f)return this;var l=se(f,t,e+g,r,n,i,o,s);if(l===f)return this;var h=this.count;if(f){if(!l&&--h<be)return fe(t,c,h,u)}else h++;var p=t&&t===this.ownerID,d=we(c,u,l,p);return p?(this.count=h,this.nodes=d,this):new Vt(t,h,d)},Xt.prototype.get=function(t,e,r,n){for(var i=this.entries,o=0,s=i.length;o<s;o++)if(vt(r,i[o][0]))return i[o][1];return n},Xt.prototype.update=function(t,e,r,n,i,o,s){void 0===r&&(r=Dt(n));var u=i===M;if(r!==this.keyHash)return u?this:(b(s),b(o),ae(this,t,e,r,[n,i]));for(var a=this.entries,c=0,f=a.length;c<f&&!vt(n,a[c][0]);c++);var l=c<f;if(l?a[c][1]===i:u)return this;if(b(s),(u||!l)&&b(o),u&&2===f)return new Kt(t,this.keyHash,a[1^c]);var h=t&&t===this.ownerID,p=h?a:x(a);return l?u?c===f-1?p.pop():p[c]=p.pop():p[c]=[n,i]:p.push([n,i]),h?(this.entries=p,this):new Xt(t,this.keyHash,p)},Kt.prototype.get=function(t,e,r,n){return vt(r,this.entry[0])?this.entry[1]:n},Kt.prototype.update=function(t,e,r,n,i,o,s){var u=i===M,a=vt(n,this.entry[0]);return(a?i===this.entry[1]:u)?this:(b(s),u?void b(o):a?t&&t===this.ownerID?(this.entry[1]=i,this):new Kt(t,this.keyHash,[n,i]):(b(o),ae(this,t,e,Dt(n),[n,i])))},$t.prototype.iterate=Xt.prototype.iterate=function(t,e){for(var r=this.entries,n=0,i=r.length-1;n<=i;n++)if(!1===t(r[e?i-n:n]))return!1},Zt.prototype.iterate=Vt.prototype.iterate=function(t,e){for(var r=this.nodes,n=0,i=r.length-1;n<=i;n++){var o=r[e?i-n:n];if(o&&!1===o.iterate(t,e))return!1}},Kt.prototype.iterate=function(t,e){return t(this.entry)},e(te,Y),te.prototype.next=function(){for(var t=this._type,e=this._stack;e;){var r,n=e.node,i=e.index++;if(n.entry){if(0===i)return ee(t,n.entry)}else if(n.entries){if(i<=(r=n.entries.length-1))return ee(t,n.entries[this._reverse?r-i:i])}else if(i<=(r=n.nodes.length-1)){var o=n.nodes[this._reverse?r-i:i];if(o){if(o.entry)return ee(t,o.entry);e=this._stack=re(o,e)}continue}e=this._stack=this._stack.__prev}return P()};var _e=v/4,me=v/2,be=v/4;function je(t){var e=Oe();if(null==t)return e;if(xe(t))return t;var r=i(t),n=r.size;return 0===n?e:(Ft(n),n>0&&n<v?Te(0,n,g,null,new De(r.toArray())):e.withMutations((function(t){t.setSize(n),r.forEach((function(e,r){return t.set(r,e)}))})))}function xe(t){return!(!t||!t[Ne])}e(je,jt),je.of=function(){return this(arguments)},je.prototype.toString=function(){return this.__toString("List [","]")},je.prototype.get=function(t,e){if((t=S(this,t))>=0&&t<this.size){var r=Re(this,t+=this._origin);return r&&r.array[t&w]}return e},je.prototype.set=function(t,e){return ze(this,t,e)},je.prototype.remove=function(t){return this.has(t)?0===t?this.shift():t===this.size-1?this.pop():this.splice(t,1):this},je.prototype.insert=function(t,e){return this.splice(t,0,e)},je.prototype.clear=function(){return 0===this.size?this:this.__ownerID?(this.size=this._origin=this._capacity=0,this._level=g,this._root=this._tail=null,this.__hash=void 0,this.__altered=!0,this):Oe()},je.prototype.push=function(){var t=arguments,e=this.size;return this.withMutations((function(r){Ye(r,0,e+t.length);for(var n=0;n<t.length;n++)r.set(e+n,t[n])}))},je.prototype.pop=function(){return Ye(this,0,-1)},je.prototype.unshift=function(){var t=arguments;return this.withMutations((function(e){Ye(e,-t.length);for(var r=0;r<t.length;r++)e.set(r,t[r])}))},je.prototype.shift=function(){return Ye(this,1)},je.prototype.merge=function(){return Be(this,void 0,arguments)},je.prototype.mergeWith=function(e){return Be(this,e,t.call(arguments,1))},je.prototype.mergeDeep=function(){return Be(this,pe,arguments)},je.prototype.mergeDeepWith=function(e){var r=t.call(arguments,1);return Be(this,de(e),r)},je.prototype.setSize=function(t){return Ye(this,0,t)},je.prototype.slice=function(t,e){var r=this.size;return I(t,e,r)?this:Ye(this,E(t,r),A(e,r))},je.prototype.__iterator=function(t,e){var r=0,n=Ce(this,e);return new Y((function(){var e=n();return e===Ae?P():B(t,r++,e)}))},je.prototype.__iterate=function(t,e){for(var r,n=0,i=Ce(this,e);(r=i())!==Ae&&!1!==t(r,n++,this););return n},je.prototype.__ensureOwner=function(t){return t===this.__ownerID?this:t?Te(this._origin,this._capacity,this._level,this._root,this._tail,t,this.__hash):(this.__ownerID=t,this)},je.isList=xe;var Ne="@@__IMMUTABLE_LIST__@@",Se=je.prototype;function De(t,e){this.array=t,this.ownerID=e}Se[Ne]=!0,Se[y]=Se.remove,Se.setIn=Jt.setIn,Se.deleteIn=Se.removeIn=Jt.removeIn,Se.update=Jt.update,Se.updateIn=Jt.updateIn,Se.mergeIn=Jt.mergeIn,Se.mergeDeepIn=Jt.mergeDeepIn,Se.withMutations=Jt.withMutations,Se.asMutable=Jt.asMutable,Se.asImmutable=Jt.asImmutable,Se.wasAltered=Jt.wasAltered,De.prototype.removeBefore=function(t,e,r){if(r===e?1<<e:0===this.array.length)return this;var n=r>>>e&w;if(n>=this.array.length)return new De([],t);var i,o=0===n;if(e>0){var s=this.array[n];if((i=s&&s.removeBefore(t,e-g,r))===s&&o)return this}if(o&&!i)return this;var u=Ue(this,t);if(!o)for(var a=0;a<n;a++)u.array[a]=void 0;return i&&(u.array[n]=i),u},De.prototype.removeAfter=function(t,e,r){if(r===(e?1<<e:0)||0===this.array.length)return this;var n,i=r-1>>>e&w;if(i>=this.array.length)return this;if(e>0){var o=this.array[i];if((n=o&&o.removeAfter(t,e-g,r))===o&&i===this.array.length-1)return this}var s=Ue(this,t);return s.array.splice(i+1),n&&(s.array[i]=n),s};var Ie,Ee,Ae={};function Ce(t,e){var r=t._origin,n=t._capacity,i=Pe(n),o=t._tail;return s(t._root,t._level,0);function s(t,e,r){return 0===e?u(t,r):a(t,e,r)}function u(t,s){var u=s===i?o&&o.array:t&&t.array,a=s>r?0:r-s,c=n-s;return c>v&&(c=v),function(){if(a===c)return Ae;var t=e?--c:a++;return u&&u[t]}}function a(t,i,o){var u,a=t&&t.array,c=o>r?0:r-o>>i,f=1+(n-o>>i);return f>v&&(f=v),function(){for(;;){if(u){var t=u();if(t!==Ae)return t;u=null}if(c===f)return Ae;var r=e?--f:c++;u=s(a&&a[r],i-g,o+(r<<i))}}}}function Te(t,e,r,n,i,o,s){var u=Object.create(Se);return u.size=e-t,u._origin=t,u._capacity=e,u._level=r,u._root=n,u._tail=i,u.__ownerID=o,u.__hash=s,u.__altered=!1,u}function Oe(){return Ie||(Ie=Te(0,0,g))}function ze(t,e,r){if((e=S(t,e))!=e)return t;if(e>=t.size||e<0)return t.withMutations((function(t){e<0?Ye(t,e).set(0,r):Ye(t,0,e+1).set(e,r)}));e+=t._origin;var n=t._tail,i=t._root,o=m(_);return e>=Pe(t._capacity)?n=ke(n,t.__ownerID,0,e,r,o):i=ke(i,t.__ownerID,t._level,e,r,o),o.value?t.__ownerID?(t._root=i,t._tail=n,t.__hash=void 0,t.__altered=!0,t):Te(t._origin,t._capacity,t._level,i,n):t}function ke(t,e,r,n,i,o){var s,u=n>>>r&w,a=t&&u<t.array.length;if(!a&&void 0===i)return t;if(r>0){var c=t&&t.array[u],f=ke(c,e,r-g,n,i,o);return f===c?t:((s=Ue(t,e)).array[u]=f,s)}return a&&t.array[u]===i?t:(b(o),s=Ue(t,e),void 0===i&&u===s.array.length-1?s.array.pop():s.array[u]=i,s)}function Ue(t,e){return e&&t&&e===t.ownerID?t:new De(t?t.array.slice():[],e)}function Re(t,e){if(e>=Pe(t._capacity))return t._tail;if(e<1<<t._level+g){for(var r=t._root,n=t._level;r&&n>0;)r=r.array[e>>>n&w],n-=g;return r}}function Ye(t,e,r){void 0!==e&&(e|=0),void 0!==r&&(r|=0);var n=t.__ownerID||new j,i=t._origin,o=t._capacity,s=i+e,u=void 0===r?o:r<0?o+r:i+r;if(s===i&&u===o)return t;if(s>=u)return t.clear();for(var a=t._level,c=t._root,f=0;s+f<0;)c=new De(c&&c.array.length?[void 0,c]:[],n),f+=1<<(a+=g);f&&(s+=f,i+=f,u+=f,o+=f);for(var l=Pe(o),h=Pe(u);h>=1<<a+g;)c=new De(c&&c.array.length?[c]:[],n),a+=g;var p=t._tail,d=h<l?Re(t,u-1):h>l?new De([],n):p;if(p&&h>l&&s<o&&p.array.length){for(var y=c=Ue(c,n),v=a;v>g;v-=g){var M=l>>>v&w;y=y.array[M]=Ue(y.array[M],n)}y.array[l>>>g&w]=p}if(u<o&&(d=d&&d.removeAfter(n,0,u)),s>=h)s-=h,u-=h,a=g,c=null,d=d&&d.removeBefore(n,0,s);else if(s>i||h<l){for(f=0;c;){var L=s>>>a&w;if(L!==h>>>a&w)break;L&&(f+=(1<<a)*L),a-=g,c=c.array[L]}c&&s>i&&(c=c.removeBefore(n,a,s-f)),c&&h<l&&(c=c.removeAfter(n,a,h-f)),f&&(s-=f,u-=f)}return t.__ownerID?(t.size=u-s,t._origin=s,t._capacity=u,t._level=a,t._root=c,t._tail=d,t.__hash=void 0,t.__altered=!0,t):Te(s,u,a,c,d)}function Be(t,e,r){for(var n=[],o=0,u=0;u<r.length;u++){var a=r[u],c=i(a);c.size>o&&(o=c.size),s(a)||(c=c.map((function(t){return pt(t)}))),n.push(c)}return o>t.size&&(t=t.setSize(o)),ye(t,e,n)}function Pe(t){return t<v?0:t-1>>>g<<g}function Qe(t){return null==t?We():Fe(t)?t:We().withMutations((function(e){var r=n(t);Ft(r.size),r.forEach((function(t,r){return e.set(r,t)}))}))}function Fe(t){return Wt(t)&&f(t)}function Ge(t,e,r,n){var i=Object.create(Qe.prototype);return i.size=t?t.size:0,i._map=t,i._list=e,i.__ownerID=r,i.__hash=n,i}function We(){return Ee||(Ee=Ge(ie(),Oe()))}function qe(t,e,r){var n,i,o=t._map,s=t._list,u=o.get(e),a=void 0!==u;if(r===M){if(!a)return t;s.size>=v&&s.size>=2*o.size?(n=(i=s.filter((function(t,e){return void 0!==t&&u!==e}))).toKeyedSeq().map((function(t){return t[0]})).flip().toMap(),t.__ownerID&&(n.__ownerID=i.__ownerID=t.__ownerID)):(n=o.remove(e),i=u===s.size-1?s.pop():s.set(u,void 0))}else if(a){if(r===s.get(u)[1])return t;n=o,i=s.set(u,[e,r])}else n=o.set(e,s.size),i=s.set(s.size,[e,r]);return t.__ownerID?(t.size=n.size,t._map=n,t._list=i,t.__hash=void 0,t):Ge(n,i)}function He(t,e){this._iter=t,this._useKeys=e,this.size=t.size}function Je(t){this._iter=t,this.size=t.size}function $e(t){this._iter=t,this.size=t.size}function Ze(t){this._iter=t,this.size=t.size}function Ve(t){var e=wr(t);return e._iter=t,e.size=t.size,e.flip=function(){return t},e.reverse=function(){var e=t.reverse.apply(this);return e.flip=function(){return t.reverse()},e},e.has=function(e){return t.includes(e)},e.includes=function(e){return t.has(e)},e.cacheResult=Mr,e.__iterateUncached=function(e,r){var n=this;return t.__iterate((function(t,r){return!1!==e(r,t,n)}),r)},e.__iteratorUncached=function(e,r){if(e===z){var n=t.__iterator(e,r);return new Y((function(){var t=n.next();if(!t.done){var e=t.value[0];t.value[0]=t.value[1],t.value[1]=e}return t}))}return t.__iterator(e===O?T:O,r)},e}function Xe(t,e,r){var n=wr(t);return n.size=t.size,n.has=function(e){return t.has(e)},n.get=function(n,i){var o=t.get(n,M);return o===M?i:e.call(r,o,n,t)},n.__iterateUncached=function(n,i){var o=this;return t.__iterate((function(t,i,s){return!1!==n(e.call(r,t,i,s),i,o)}),i)},n.__iteratorUncached=function(n,i){var o=t.__iterator(z,i);return new Y((function(){var i=o.next();if(i.done)return i;var s=i.value,u=s[0];return B(n,u,e.call(r,s[1],u,t),i)}))},n}function Ke(t,e){var r=wr(t);return r._iter=t,r.size=t.size,r.reverse=function(){return t},t.flip&&(r.flip=function(){var e=Ve(t);return e.reverse=function(){return t.flip()},e}),r.get=function(r,n){return t.get(e?r:-1-r,n)},r.has=function(r){return t.has(e?r:-1-r)},r.includes=function(e){return t.includes(e)},r.cacheResult=Mr,r.__iterate=function(e,r){var n=this;return t.__iterate((function(t,r){return e(t,r,n)}),!r)},r.__iterator=function(e,r){return t.__iterator(e,!r)},r}function tr(t,e,r,n){var i=wr(t);return n&&(i.has=function(n){var i=t.get(n,M);return i!==M&&!!e.call(r,i,n,t)},i.get=function(n,i){var o=t.get(n,M);return o!==M&&e.call(r,o,n,t)?o:i}),i.__iterateUncached=function(i,o){var s=this,u=0;return t.__iterate((function(t,o,a){if(e.call(r,t,o,a))return u++,i(t,n?o:u-1,s)}),o),u},i.__iteratorUncached=function(i,o){var s=t.__iterator(z,o),u=0;return new Y((function(){for(;;){var o=s.next();if(o.done)return o;var a=o.value,c=a[0],f=a[1];if(e.call(r,f,c,t))return B(i,n?c:u++,f,o)}}))},i}function er(t,e,r){var n=Gt().asMutable();return t.__iterate((function(i,o){n.update(e.call(r,i,o,t),0,(function(t){return t+1}))})),n.asImmutable()}function rr(t,e,r){var n=u(t),i=(f(t)?Qe():Gt()).asMutable();t.__iterate((function(o,s){i.update(e.call(r,o,s,t),(function(t){return(t=t||[]).push(n?[s,o]:o),t}))}));var o=vr(t);return i.map((function(e){return dr(t,o(e))}))}function nr(t,e,r,n){var i=t.size;if(void 0!==e&&(e|=0),void 0!==r&&(r===1/0?r=i:r|=0),I(e,r,i))return t;var o=E(e,i),s=A(r,i);if(o!=o||s!=s)return nr(t.toSeq().cacheResult(),e,r,n);var u,a=s-o;a==a&&(u=a<0?0:a);var c=wr(t);return c.size=0===u?u:t.size&&u||void 0,!n&&ot(t)&&u>=0&&(c.get=function(e,r){return(e=S(this,e))>=0&&e<u?t.get(e+o,r):r}),c.__iterateUncached=function(e,r){var i=this;if(0===u)return 0;if(r)return this.cacheResult().__iterate(e,r);var s=0,a=!0,c=0;return t.__iterate((function(t,r){if(!a||!(a=s++<o))return c++,!1!==e(t,n?r:c-1,i)&&c!==u})),c},c.__iteratorUncached=function(e,r){if(0!==u&&r)return this.cacheResult().__iterator(e,r);var i=0!==u&&t.__iterator(e,r),s=0,a=0;return new Y((function(){for(;s++<o;)i.next();if(++a>u)return P();var t=i.next();return n||e===O?t:B(e,a-1,e===T?void 0:t.value[1],t)}))},c}function ir(t,e,r){var n=wr(t);return n.__iterateUncached=function(n,i){var o=this;if(i)return this.cacheResult().__iterate(n,i);var s=0;return t.__iterate((function(t,i,u){return e.call(r,t,i,u)&&++s&&n(t,i,o)})),s},n.__iteratorUncached=function(n,i){var o=this;if(i)return this.cacheResult().__iterator(n,i);var s=t.__iterator(z,i),u=!0;return new Y((function(){if(!u)return P();var t=s.next();if(t.done)return t;var i=t.value,a=i[0],c=i[1];return e.call(r,c,a,o)?n===z?t:B(n,a,c,t):(u=!1,P())}))},n}function or(t,e,r,n){var i=wr(t);return i.__iterateUncached=function(i,o){var s=this;if(o)return this.cacheResult().__iterate(i,o);var u=!0,a=0;return t.__iterate((function(t,o,c){if(!u||!(u=e.call(r,t,o,c)))return a++,i(t,n?o:a-1,s)})),a},i.__iteratorUncached=function(i,o){var s=this;if(o)return this.cacheResult().__iterator(i,o);var u=t.__iterator(z,o),a=!0,c=0;return new Y((function(){var t,o,f;do{if((t=u.next()).done)return n||i===O?t:B(i,c++,i===T?void 0:t.value[1],t);var l=t.value;o=l[0],f=l[1],a&&(a=e.call(r,f,o,s))}while(a);return i===z?t:B(i,o,f,t)}))},i}function sr(t,e){var r=u(t),i=[t].concat(e).map((function(t){return s(t)?r&&(t=n(t)):t=r?ut(t):at(Array.isArray(t)?t:[t]),t})).filter((function(t){return 0!==t.size}));if(0===i.length)return t;if(1===i.length){var o=i[0];if(o===t||r&&u(o)||a(t)&&a(o))return o}var c=new et(i);return r?c=c.toKeyedSeq():a(t)||(c=c.toSetSeq()),(c=c.flatten(!0)).size=i.reduce((function(t,e){if(void 0!==t){var r=e.size;if(void 0!==r)return t+r}}),0),c}function ur(t,e,r){var n=wr(t);return n.__iterateUncached=function(n,i){var o=0,u=!1;function a(t,c){var f=this;t.__iterate((function(t,i){return(!e||c<e)&&s(t)?a(t,c+1):!1===n(t,r?i:o++,f)&&(u=!0),!u}),i)}return a(t,0),o},n.__iteratorUncached=function(n,i){var o=t.__iterator(n,i),u=[],a=0;return new Y((function(){for(;o;){var t=o.next();if(!1===t.done){var c=t.value;if(n===z&&(c=c[1]),e&&!(u.length<e)||!s(c))return r?t:B(n,a++,c,t);u.push(o),o=c.__iterator(n,i)}else o=u.pop()}return P()}))},n}function ar(t,e,r){var n=vr(t);return t.toSeq().map((function(i,o){return n(e.call(r,i,o,t))})).flatten(!0)}function cr(t,e){var r=wr(t);return r.size=t.size&&2*t.size-1,r.__iterateUncached=function(r,n){var i=this,o=0;return t.__iterate((function(t,n){return(!o||!1!==r(e,o++,i))&&!1!==r(t,o++,i)}),n),o},r.__iteratorUncached=function(r,n){var i,o=t.__iterator(O,n),s=0;return new Y((function(){return(!i||s%2)&&(i=o.next()).done?i:s%2?B(r,s++,e):B(r,s++,i.value,i)}))},r}function fr(t,e,r){e||(e=Lr);var n=u(t),i=0,o=t.toSeq().map((function(e,n){return[n,e,i++,r?r(e,n,t):e]})).toArray();return o.sort((function(t,r){return e(t[3],r[3])||t[2]-r[2]})).forEach(n?function(t,e){o[e].length=2}:function(t,e){o[e]=t[1]}),n?J(o):a(t)?$(o):Z(o)}function lr(t,e,r){if(e||(e=Lr),r){var n=t.toSeq().map((function(e,n){return[e,r(e,n,t)]})).reduce((function(t,r){return hr(e,t[1],r[1])?r:t}));return n&&n[0]}return t.reduce((function(t,r){return hr(e,t,r)?r:t}))}function hr(t,e,r){var n=t(r,e);return 0===n&&r!==e&&(null==r||r!=r)||n>0}function pr(t,e,n){var i=wr(t);return i.size=new et(n).map((function(t){return t.size})).min(),i.__iterate=function(t,e){for(var r,n=this.__iterator(O,e),i=0;!(r=n.next()).done&&!1!==t(r.value,i++,this););return i},i.__iteratorUncached=function(t,i){var o=n.map((function(t){return t=r(t),G(i?t.reverse():t)})),s=0,u=!1;return new Y((function(){var r;return u||(r=o.map((function(t){return t.next()})),u=r.some((function(t){return t.done}))),u?P():B(t,s++,e.apply(null,r.map((function(t){return t.value}))))}))},i}function dr(t,e){return ot(t)?e:t.constructor(e)}function yr(t){if(t!==Object(t))throw new TypeError("Expected [K, V] tuple: "+t)}function gr(t){return Ft(t.size),N(t)}function vr(t){return u(t)?n:a(t)?i:o}function wr(t){return Object.create((u(t)?J:a(t)?$:Z).prototype)}function Mr(){return this._iter.cacheResult?(this._iter.cacheResult(),this.size=this._iter.size,this):H.prototype.cacheResult.call(this)}function Lr(t,e){return t>e?1:t<e?-1:0}function _r(t){var e=G(t);if(!e){if(!q(t))throw new TypeError("Expected iterable or array-like: "+t);e=G(r(t))}return e}function mr(t,e){var r,n=function(o){if(o instanceof n)return o;if(!(this instanceof n))return new n(o);if(!r){r=!0;var s=Object.keys(t);Nr(i,s),i.size=s.length,i._name=e,i._keys=s,i._defaultValues=t}this._map=Gt(o)},i=n.prototype=Object.create(br);return i.constructor=n,n}e(Qe,Gt),Qe.of=function(){return this(arguments)},Qe.prototype.toString=function(){return this.__toString("OrderedMap {","}")},Qe.prototype.get=function(t,e){var r=this._map.get(t);return void 0!==r?this._list.get(r)[1]:e},Qe.prototype.clear=function(){return 0===this.size?this:this.__ownerID?(this.size=0,this._map.clear(),this._list.clear(),this):We()},Qe.prototype.set=function(t,e){return qe(this,t,e)},Qe.prototype.remove=function(t){return qe(this,t,M)},Qe.prototype.wasAltered=function(){return this._map.wasAltered()||this._list.wasAltered()},Qe.prototype.__iterate=function(t,e){var r=this;return this._list.__iterate((function(e){return e&&t(e[1],e[0],r)}),e)},Qe.prototype.__iterator=function(t,e){return this._list.fromEntrySeq().__iterator(t,e)},Qe.prototype.__ensureOwner=function(t){if(t===this.__ownerID)return this;var e=this._map.__ensureOwner(t),r=this._list.__ensureOwner(t);return t?Ge(e,r,t,this.__hash):(this.__ownerID=t,this._map=e,this._list=r,this)},Qe.isOrderedMap=Fe,Qe.prototype[d]=!0,Qe.prototype[y]=Qe.prototype.remove,e(He,J),He.prototype.get=function(t,e){return this._iter.get(t,e)},He.prototype.has=function(t){return this._iter.has(t)},He.prototype.valueSeq=function(){return this._iter.valueSeq()},He.prototype.reverse=function(){var t=this,e=Ke(this,!0);return this._useKeys||(e.valueSeq=function(){return t._iter.toSeq().reverse()}),e},He.prototype.map=function(t,e){var r=this,n=Xe(this,t,e);return this._useKeys||(n.valueSeq=function(){return r._iter.toSeq().map(t,e)}),n},He.prototype.__iterate=function(t,e){var r,n=this;return this._iter.__iterate(this._useKeys?function(e,r){return t(e,r,n)}:(r=e?gr(this):0,function(i){return t(i,e?--r:r++,n)}),e)},He.prototype.__iterator=function(t,e){if(this._useKeys)return this._iter.__iterator(t,e);var r=this._iter.__iterator(O,e),n=e?gr(this):0;return new Y((function(){var i=r.next();return i.done?i:B(t,e?--n:n++,i.value,i)}))},He.prototype[d]=!0,e(Je,$),Je.prototype.includes=function(t){return this._iter.includes(t)},Je.prototype.__iterate=function(t,e){var r=this,n=0;return this._iter.__iterate((function(e){return t(e,n++,r)}),e)},Je.prototype.__iterator=function(t,e){var r=this._iter.__iterator(O,e),n=0;return new Y((function(){var e=r.next();return e.done?e:B(t,n++,e.value,e)}))},e($e,Z),$e.prototype.has=function(t){return this._iter.includes(t)},$e.prototype.__iterate=function(t,e){var r=this;return this._iter.__iterate((function(e){return t(e,e,r)}),e)},$e.prototype.__iterator=function(t,e){var r=this._iter.__iterator(O,e);return new Y((function(){var e=r.next();return e.done?e:B(t,e.value,e.value,e)}))},e(Ze,J),Ze.prototype.entrySeq=function(){return this._iter.toSeq()},Ze.prototype.__iterate=function(t,e){var r=this;return this._iter.__iterate((function(e){if(e){yr(e);var n=s(e);return t(n?e.get(1):e[1],n?e.get(0):e[0],r)}}),e)},Ze.prototype.__iterator=function(t,e){var r=this._iter.__iterator(O,e);return new Y((function(){for(;;){var e=r.next();if(e.done)return e;var n=e.value;if(n){yr(n);var i=s(n);return B(t,i?n.get(0):n[0],i?n.get(1):n[1],e)}}}))},Je.prototype.cacheResult=He.prototype.cacheResult=$e.prototype.cacheResult=Ze.prototype.cacheResult=Mr,e(mr,bt),mr.prototype.toString=function(){return this.__toString(xr(this)+" {","}")},mr.prototype.has=function(t){return this._defaultValues.hasOwnProperty(t)},mr.prototype.get=function(t,e){if(!this.has(t))return e;var r=this._defaultValues[t];return this._map?this._map.get(t,r):r},mr.prototype.clear=function(){if(this.__ownerID)return this._map&&this._map.clear(),this;var t=this.constructor;return t._empty||(t._empty=jr(this,ie()))},mr.prototype.set=function(t,e){if(!this.has(t))throw new Error('Cannot set unknown key "'+t+'" on '+xr(this));if(this._map&&!this._map.has(t)&&e===this._defaultValues[t])return this;var r=this._map&&this._map.set(t,e);return this.__ownerID||r===this._map?this:jr(this,r)},mr.prototype.remove=function(t){if(!this.has(t))return this;var e=this._map&&this._map.remove(t);return this.__ownerID||e===this._map?this:jr(this,e)},mr.prototype.wasAltered=function(){return this._map.wasAltered()},mr.prototype.__iterator=function(t,e){var r=this;return n(this._defaultValues).map((function(t,e){return r.get(e)})).__iterator(t,e)},mr.prototype.__iterate=function(t,e){var r=this;return n(this._defaultValues).map((function(t,e){return r.get(e)})).__iterate(t,e)},mr.prototype.__ensureOwner=function(t){if(t===this.__ownerID)return this;var e=this._map&&this._map.__ensureOwner(t);return t?jr(this,e,t):(this.__ownerID=t,this._map=e,this)};var br=mr.prototype;function jr(t,e,r){var n=Object.create(Object.getPrototypeOf(t));return n._map=e,n.__ownerID=r,n}function xr(t){return t._name||t.constructor.name||"Record"}function Nr(t,e){try{e.forEach(Sr.bind(void 0,t))}catch(t){}}function Sr(t,e){Object.defineProperty(t,e,{get:function(){return this.get(e)},set:function(t){Lt(this.__ownerID,"Cannot set on an immutable record."),this.set(e,t)}})}function Dr(t){return null==t?zr():Ir(t)&&!f(t)?t:zr().withMutations((function(e){var r=o(t);Ft(r.size),r.forEach((function(t){return e.add(t)}))}))}function Ir(t){return!(!t||!t[Ar])}br[y]=br.remove,br.deleteIn=br.removeIn=Jt.removeIn,br.merge=Jt.merge,br.mergeWith=Jt.mergeWith,br.mergeIn=Jt.mergeIn,br.mergeDeep=Jt.mergeDeep,br.mergeDeepWith=Jt.mergeDeepWith,br.mergeDeepIn=Jt.mergeDeepIn,br.setIn=Jt.setIn,br.update=Jt.update,br.updateIn=Jt.updateIn,br.withMutations=Jt.withMutations,br.asMutable=Jt.asMutable,br.asImmutable=Jt.asImmutable,e(Dr,xt),Dr.of=function(){return this(arguments)},Dr.fromKeys=function(t){return this(n(t).keySeq())},Dr.prototype.toString=function(){return this.__toString("Set {","}")},Dr.prototype.has=function(t){return this._map.has(t)},Dr.prototype.add=function(t){return Tr(this,this._map.set(t,!0))},Dr.prototype.remove=function(t){return Tr(this,this._map.remove(t))},Dr.prototype.clear=function(){return Tr(this,this._map.clear())},Dr.prototype.union=function(){var e=t.call(arguments,0);return 0===(e=e.filter((function(t){return 0!==t.size}))).length?this:0!==this.size||this.__ownerID||1!==e.length?this.withMutations((function(t){for(var r=0;r<e.length;r++)o(e[r]).forEach((function(e){return t.add(e)}))})):this.constructor(e[0])},Dr.prototype.intersect=function(){var e=t.call(arguments,0);if(0===e.length)return this;e=e.map((function(t){return o(t)}));var r=this;return this.withMutations((function(t){r.forEach((function(r){e.every((function(t){return t.includes(r)}))||t.remove(r)}))}))},Dr.prototype.subtract=function(){var e=t.call(arguments,0);if(0===e.length)return this;e=e.map((function(t){return o(t)}));var r=this;return this.withMutations((function(t){r.forEach((function(r){e.some((function(t){return t.includes(r)}))&&t.remove(r)}))}))},Dr.prototype.merge=function(){return this.union.apply(this,arguments)},Dr.prototype.mergeWith=function(e){var r=t.call(arguments,1);return this.union.apply(this,r)},Dr.prototype.sort=function(t){return kr(fr(this,t))},Dr.prototype.sortBy=function(t,e){return kr(fr(this,e,t))},Dr.prototype.wasAltered=function(){return this._map.wasAltered()},Dr.prototype.__iterate=function(t,e){var r=this;return this._map.__iterate((function(e,n){return t(n,n,r)}),e)},Dr.prototype.__iterator=function(t,e){return this._map.map((function(t,e){return e})).__iterator(t,e)},Dr.prototype.__ensureOwner=function(t){if(t===this.__ownerID)return this;var e=this._map.__ensureOwner(t);return t?this.__make(e,t):(this.__ownerID=t,this._map=e,this)},Dr.isSet=Ir;var Er,Ar="@@__IMMUTABLE_SET__@@",Cr=Dr.prototype;function Tr(t,e){return t.__ownerID?(t.size=e.size,t._map=e,t):e===t._map?t:0===e.size?t.__empty():t.__make(e)}function Or(t,e){var r=Object.create(Cr);return r.size=t?t.size:0,r._map=t,r.__ownerID=e,r}function zr(){return Er||(Er=Or(ie()))}function kr(t){return null==t?Pr():Ur(t)?t:Pr().withMutations((function(e){var r=o(t);Ft(r.size),r.forEach((function(t){return e.add(t)}))}))}function Ur(t){return Ir(t)&&f(t)}Cr[Ar]=!0,Cr[y]=Cr.remove,Cr.mergeDeep=Cr.merge,Cr.mergeDeepWith=Cr.mergeWith,Cr.withMutations=Jt.withMutations,Cr.asMutable=Jt.asMutable,Cr.asImmutable=Jt.asImmutable,Cr.__empty=zr,Cr.__make=Or,e(kr,Dr),kr.of=function(){return this(arguments)},kr.fromKeys=function(t){return this(n(t).keySeq())},kr.prototype.toString=function(){return this.__toString("OrderedSet {","}")},kr.isOrderedSet=Ur;var Rr,Yr=kr.prototype;function Br(t,e){var r=Object.create(Yr);return r.size=t?t.size:0,r._map=t,r.__ownerID=e,r}function Pr(){return Rr||(Rr=Br(We()))}function Qr(t){return null==t?Jr():Fr(t)?t:Jr().unshiftAll(t)}function Fr(t){return!(!t||!t[Wr])}Yr[d]=!0,Yr.__empty=Pr,Yr.__make=Br,e(Qr,jt),Qr.of=function(){return this(arguments)},Qr.prototype.toString=function(){return this.__toString("Stack [","]")},Qr.prototype.get=function(t,e){var r=this._head;for(t=S(this,t);r&&t--;)r=r.next;return r?r.value:e},Qr.prototype.peek=function(){return this._head&&this._head.value},Qr.prototype.push=function(){if(0===arguments.length)return this;for(var t=this.size+arguments.length,e=this._head,r=arguments.length-1;r>=0;r--)e={value:arguments[r],next:e};return this.__ownerID?(this.size=t,this._head=e,this.__hash=void 0,this.__altered=!0,this):Hr(t,e)},Qr.prototype.pushAll=function(t){if(0===(t=i(t)).size)return this;Ft(t.size);var e=this.size,r=this._head;return t.reverse().forEach((function(t){e++,r={value:t,next:r}})),this.__ownerID?(this.size=e,this._head=r,this.__hash=void 0,this.__altered=!0,this):Hr(e,r)},Qr.prototype.pop=function(){return this.slice(1)},Qr.prototype.unshift=function(){return this.push.apply(this,arguments)},Qr.prototype.unshiftAll=function(t){return this.pushAll(t)},Qr.prototype.shift=function(){return this.pop.apply(this,arguments)},Qr.prototype.clear=function(){return 0===this.size?this:this.__ownerID?(this.size=0,this._head=void 0,this.__hash=void 0,this.__altered=!0,this):Jr()},Qr.prototype.slice=function(t,e){if(I(t,e,this.size))return this;var r=E(t,this.size);if(A(e,this.size)!==this.size)return jt.prototype.slice.call(this,t,e);for(var n=this.size-r,i=this._head;r--;)i=i.next;return this.__ownerID?(this.size=n,this._head=i,this.__hash=void 0,this.__altered=!0,this):Hr(n,i)},Qr.prototype.__ensureOwner=function(t){return t===this.__ownerID?this:t?Hr(this.size,this._head,t,this.__hash):(this.__ownerID=t,this.__altered=!1,this)},Qr.prototype.__iterate=function(t,e){if(e)return this.reverse().__iterate(t);for(var r=0,n=this._head;n&&!1!==t(n.value,r++,this);)n=n.next;return r},Qr.prototype.__iterator=function(t,e){if(e)return this.reverse().__iterator(t);var r=0,n=this._head;return new Y((function(){if(n){var e=n.value;return n=n.next,B(t,r++,e)}return P()}))},Qr.isStack=Fr;var Gr,Wr="@@__IMMUTABLE_STACK__@@",qr=Qr.prototype;function Hr(t,e,r,n){var i=Object.create(qr);return i.size=t,i._head=e,i.__ownerID=r,i.__hash=n,i.__altered=!1,i}function Jr(){return Gr||(Gr=Hr(0))}function $r(t,e){var r=function(r){t.prototype[r]=e[r]};return Object.keys(e).forEach(r),Object.getOwnPropertySymbols&&Object.getOwnPropertySymbols(e).forEach(r),t}qr[Wr]=!0,qr.withMutations=Jt.withMutations,qr.asMutable=Jt.asMutable,qr.asImmutable=Jt.asImmutable,qr.wasAltered=Jt.wasAltered,r.Iterator=Y,$r(r,{toArray:function(){Ft(this.size);var t=new Array(this.size||0);return this.valueSeq().__iterate((function(e,r){t[r]=e})),t},toIndexedSeq:function(){return new Je(this)},toJS:function(){return this.toSeq().map((function(t){return t&&"function"==typeof t.toJS?t.toJS():t})).__toJS()},toJSON:function(){return this.toSeq().map((function(t){return t&&"function"==typeof t.toJSON?t.toJSON():t})).__toJS()},toKeyedSeq:function(){return new He(this,!0)},toMap:function(){return Gt(this.toKeyedSeq())},toObject:function(){Ft(this.size);var t={};return this.__iterate((function(e,r){t[r]=e})),t},toOrderedMap:function(){return Qe(this.toKeyedSeq())},toOrderedSet:function(){return kr(u(this)?this.valueSeq():this)},toSet:function(){return Dr(u(this)?this.valueSeq():this)},toSetSeq:function(){return new $e(this)},toSeq:function(){return a(this)?this.toIndexedSeq():u(this)?this.toKeyedSeq():this.toSetSeq()},toStack:function(){return Qr(u(this)?this.valueSeq():this)},toList:function(){return je(u(this)?this.valueSeq():this)},toString:function(){return"[Iterable]"},__toString:function(t,e){return 0===this.size?t+e:t+" "+this.toSeq().map(this.__toStringMapper).join(", ")+" "+e},concat:function(){return dr(this,sr(this,t.call(arguments,0)))},includes:function(t){return this.some((function(e){return vt(e,t)}))},entries:function(){return this.__iterator(z)},every:function(t,e){Ft(this.size);var r=!0;return this.__iterate((function(n,i,o){if(!t.call(e,n,i,o))return r=!1,!1})),r},filter:function(t,e){return dr(this,tr(this,t,e,!0))},find:function(t,e,r){var n=this.findEntry(t,e);return n?n[1]:r},forEach:function(t,e){return Ft(this.size),this.__iterate(e?t.bind(e):t)},join:function(t){Ft(this.size),t=void 0!==t?""+t:",";var e="",r=!0;return this.__iterate((function(n){r?r=!1:e+=t,e+=null!=n?n.toString():""})),e},keys:function(){return this.__iterator(T)},map:function(t,e){return dr(this,Xe(this,t,e))},reduce:function(t,e,r){var n,i;return Ft(this.size),arguments.length<2?i=!0:n=e,this.__iterate((function(e,o,s){i?(i=!1,n=e):n=t.call(r,n,e,o,s)})),n},reduceRight:function(t,e,r){var n=this.toKeyedSeq().reverse();return n.reduce.apply(n,arguments)},reverse:function(){return dr(this,Ke(this,!0))},slice:function(t,e){return dr(this,nr(this,t,e,!0))},some:function(t,e){return!this.every(tn(t),e)},sort:function(t){return dr(this,fr(this,t))},values:function(){return this.__iterator(O)},butLast:function(){return this.slice(0,-1)},isEmpty:function(){return void 0!==this.size?0===this.size:!this.some((function(){return!0}))},count:function(t,e){return N(t?this.toSeq().filter(t,e):this)},countBy:function(t,e){return er(this,t,e)},equals:function(t){return wt(this,t)},entrySeq:function(){var t=this;if(t._cache)return new et(t._cache);var e=t.toSeq().map(Kr).toIndexedSeq();return e.fromEntrySeq=function(){return t.toSeq()},e},filterNot:function(t,e){return this.filter(tn(t),e)},findEntry:function(t,e,r){var n=r;return this.__iterate((function(r,i,o){if(t.call(e,r,i,o))return n=[i,r],!1})),n},findKey:function(t,e){var r=this.findEntry(t,e);return r&&r[0]},findLast:function(t,e,r){return this.toKeyedSeq().reverse().find(t,e,r)},findLastEntry:function(t,e,r){return this.toKeyedSeq().reverse().findEntry(t,e,r)},findLastKey:function(t,e){return this.toKeyedSeq().reverse().findKey(t,e)},first:function(){return this.find(D)},flatMap:function(t,e){return dr(this,ar(this,t,e))},flatten:function(t){return dr(this,ur(this,t,!0))},fromEntrySeq:function(){return new Ze(this)},get:function(t,e){return this.find((function(e,r){return vt(r,t)}),void 0,e)},getIn:function(t,e){for(var r,n=this,i=_r(t);!(r=i.next()).done;){var o=r.value;if((n=n&&n.get?n.get(o,M):M)===M)return e}return n},groupBy:function(t,e){return rr(this,t,e)},has:function(t){return this.get(t,M)!==M},hasIn:function(t){return this.getIn(t,M)!==M},isSubset:function(t){return t="function"==typeof t.includes?t:r(t),this.every((function(e){return t.includes(e)}))},isSuperset:function(t){return(t="function"==typeof t.isSubset?t:r(t)).isSubset(this)},keyOf:function(t){return this.findKey((function(e){return vt(e,t)}))},keySeq:function(){return this.toSeq().map(Xr).toIndexedSeq()},last:function(){return this.toSeq().reverse().first()},lastKeyOf:function(t){return this.toKeyedSeq().reverse().keyOf(t)},max:function(t){return lr(this,t)},maxBy:function(t,e){return lr(this,e,t)},min:function(t){return lr(this,t?en(t):on)},minBy:function(t,e){return lr(this,e?en(e):on,t)},rest:function(){return this.slice(1)},skip:function(t){return this.slice(Math.max(0,t))},skipLast:function(t){return dr(this,this.toSeq().reverse().skip(t).reverse())},skipWhile:function(t,e){return dr(this,or(this,t,e,!0))},skipUntil:function(t,e){return this.skipWhile(tn(t),e)},sortBy:function(t,e){return dr(this,fr(this,e,t))},take:function(t){return this.slice(0,Math.max(0,t))},takeLast:function(t){return dr(this,this.toSeq().reverse().take(t).reverse())},takeWhile:function(t,e){return dr(this,ir(this,t,e))},takeUntil:function(t,e){return this.takeWhile(tn(t),e)},valueSeq:function(){return this.toIndexedSeq()},hashCode:function(){return this.__hash||(this.__hash=sn(this))}});var Zr=r.prototype;Zr[l]=!0,Zr[R]=Zr.values,Zr.__toJS=Zr.toArray,Zr.__toStringMapper=rn,Zr.inspect=Zr.toSource=function(){return this.toString()},Zr.chain=Zr.flatMap,Zr.contains=Zr.includes,$r(n,{flip:function(){return dr(this,Ve(this))},mapEntries:function(t,e){var r=this,n=0;return dr(this,this.toSeq().map((function(i,o){return t.call(e,[o,i],n++,r)})).fromEntrySeq())},mapKeys:function(t,e){var r=this;return dr(this,this.toSeq().flip().map((function(n,i){return t.call(e,n,i,r)})).flip())}});var Vr=n.prototype;function Xr(t,e){return e}function Kr(t,e){return[e,t]}function tn(t){return function(){return!t.apply(this,arguments)}}function en(t){return function(){return-t.apply(this,arguments)}}function rn(t){return"string"==typeof t?JSON.stringify(t):String(t)}function nn(){return x(arguments)}function on(t,e){return t<e?1:t>e?-1:0}function sn(t){if(t.size===1/0)return 0;var e=f(t),r=u(t),n=e?1:0;return un(t.__iterate(r?e?function(t,e){n=31*n+an(Dt(t),Dt(e))|0}:function(t,e){n=n+an(Dt(t),Dt(e))|0}:e?function(t){n=31*n+Dt(t)|0}:function(t){n=n+Dt(t)|0}),n)}function un(t,e){return e=Nt(e,3432918353),e=Nt(e<<15|e>>>-15,461845907),e=Nt(e<<13|e>>>-13,5),e=Nt((e=(e+3864292196|0)^t)^e>>>16,2246822507),e=St((e=Nt(e^e>>>13,3266489909))^e>>>16)}function an(t,e){return t^e+2654435769+(t<<6)+(t>>2)|0}return Vr[h]=!0,Vr[R]=Zr.entries,Vr.__toJS=Zr.toObject,Vr.__toStringMapper=function(t,e){return JSON.stringify(e)+": "+rn(t)},$r(i,{toKeyedSeq:function(){return new He(this,!1)},filter:function(t,e){return dr(this,tr(this,t,e,!1))},findIndex:function(t,e){var r=this.findEntry(t,e);return r?r[0]:-1},indexOf:function(t){var e=this.keyOf(t);return void 0===e?-1:e},lastIndexOf:function(t){var e=this.lastKeyOf(t);return void 0===e?-1:e},reverse:function(){return dr(this,Ke(this,!1))},slice:function(t,e){return dr(this,nr(this,t,e,!1))},splice:function(t,e){var r=arguments.length;if(e=Math.max(0|e,0),0===r||2===r&&!e)return this;t=E(t,t<0?this.count():this.size);var n=this.slice(0,t);return dr(this,1===r?n:n.concat(x(arguments,2),this.slice(t+e)))},findLastIndex:function(t,e){var r=this.findLastEntry(t,e);return r?r[0]:-1},first:function(){return this.get(0)},flatten:function(t){return dr(this,ur(this,t,!1))},get:function(t,e){return(t=S(this,t))<0||this.size===1/0||void 0!==this.size&&t>this.size?e:this.find((function(e,r){return r===t}),void 0,e)},has:function(t){return(t=S(this,t))>=0&&(void 0!==this.size?this.size===1/0||t<this.size:-1!==this.indexOf(t))},interpose:function(t){return dr(this,cr(this,t))},interleave:function(){var t=[this].concat(x(arguments)),e=pr(this.toSeq(),$.of,t),r=e.flatten(!0);return e.size&&(r.size=e.size*t.length),dr(this,r)},keySeq:function(){return _t(0,this.size)},last:function(){return this.get(-1)},skipWhile:function(t,e){return dr(this,or(this,t,e,!1))},zip:function(){return dr(this,pr(this,nn,[this].concat(x(arguments))))},zipWith:function(t){var e=x(arguments);return e[0]=this,dr(this,pr(this,t,e))}}),i.prototype[p]=!0,i.prototype[d]=!0,$r(o,{get:function(t,e){return this.has(t)?t:e},includes:function(t){return this.has(t)},keySeq:function(){return this.valueSeq()}}),o.prototype.has=Zr.includes,o.prototype.contains=o.prototype.includes,$r(J,n.prototype),$r($,i.prototype),$r(Z,o.prototype),$r(bt,n.prototype),$r(jt,i.prototype),$r(xt,o.prototype),{Iterable:r,Seq:H,Collection:mt,Map:Gt,OrderedMap:Qe,List:je,Stack:Qr,Set:Dr,OrderedSet:kr,Record:mr,Range:_t,Repeat:Mt,is:vt,fromJS:pt}}()},5717:t=>{"function"==typeof Object.create?t.exports=function(t,e){e&&(t.super_=e,t.prototype=Object.create(e.prototype,{constructor:{value:t,enumerable:!1,writable:!0,configurable:!0}}))}:t.exports=function(t,e){if(e){t.super_=e;var r=function(){};r.prototype=e.prototype,t.prototype=new r,t.prototype.constructor=t}}},8552:(t,e,r)=>{var n=r(852)(r(5639),"DataView");t.exports=n},1989:(t,e,r)=>{var n=r(1789),i=r(401),o=r(7667),s=r(1327),u=r(1866);function a(t){var e=-1,r=null==t?0:t.length;for(this.clear();++e<r;){var n=t[e];this.set(n[0],n[1])}}a.prototype.clear=n,a.prototype.delete=i,a.prototype.get=o,a.prototype.has=s,a.prototype.set=u,t.exports=a},8407:(t,e,r)=>{var n=r(7040),i=r(4125),o=r(2117),s=r(7518),u=r(4705);function a(t){var e=-1,r=null==t?0:t.length;for(this.clear();++e<r;){var n=t[e];this.set(n[0],n[1])}}a.prototype.clear=n,a.prototype.delete=i,a.prototype.get=o,a.prototype.has=s,a.prototype.set=u,t.exports=a},7071:(t,e,r)=>{var n=r(852)(r(5639),"Map");t.exports=n},3369:(t,e,r)=>{var n=r(4785),i=r(1285),o=r(6e3),s=r(9916),u=r(5265);function a(t){var e=-1,r=null==t?0:t.length;for(this.clear();++e<r;){var n=t[e];this.set(n[0],n[1])}}a.prototype.clear=n,a.prototype.delete=i,a.prototype.get=o,a.prototype.has=s,a.prototype.set=u,t.exports=a},3818:(t,e,r)=>{var n=r(852)(r(5639),"Promise");t.exports=n},8525:(t,e,r)=>{var n=r(852)(r(5639),"Set");t.exports=n},8668:(t,e,r)=>{var n=r(3369),i=r(619),o=r(2385);function s(t){var e=-1,r=null==t?0:t.length;for(this.__data__=new n;++e<r;)this.add(t[e])}s.prototype.add=s.prototype.push=i,s.prototype.has=o,t.exports=s},6384:(t,e,r)=>{var n=r(8407),i=r(7465),o=r(3779),s=r(7599),u=r(4758),a=r(4309);function c(t){var e=this.__data__=new n(t);this.size=e.size}c.prototype.clear=i,c.prototype.delete=o,c.prototype.get=s,c.prototype.has=u,c.prototype.set=a,t.exports=c},2705:(t,e,r)=>{var n=r(5639).Symbol;t.exports=n},1149:(t,e,r)=>{var n=r(5639).Uint8Array;t.exports=n},577:(t,e,r)=>{var n=r(852)(r(5639),"WeakMap");t.exports=n},4963:t=>{t.exports=function(t,e){for(var r=-1,n=null==t?0:t.length,i=0,o=[];++r<n;){var s=t[r];e(s,r,t)&&(o[i++]=s)}return o}},4636:(t,e,r)=>{var n=r(2545),i=r(5694),o=r(1469),s=r(4144),u=r(5776),a=r(6719),c=Object.prototype.hasOwnProperty;t.exports=function(t,e){var r=o(t),f=!r&&i(t),l=!r&&!f&&s(t),h=!r&&!f&&!l&&a(t),p=r||f||l||h,d=p?n(t.length,String):[],y=d.length;for(var g in t)!e&&!c.call(t,g)||p&&("length"==g||l&&("offset"==g||"parent"==g)||h&&("buffer"==g||"byteLength"==g||"byteOffset"==g)||u(g,y))||d.push(g);return d}},9932:t=>{t.exports=function(t,e){for(var r=-1,n=null==t?0:t.length,i=Array(n);++r<n;)i[r]=e(t[r],r,t);return i}},2488:t=>{t.exports=function(t,e){for(var r=-1,n=e.length,i=t.length;++r<n;)t[i+r]=e[r];return t}},2663:t=>{t.exports=function(t,e,r,n){var i=-1,o=null==t?0:t.length;for(n&&o&&(r=t[++i]);++i<o;)r=e(r,t[i],i,t);return r}},4855:t=>{t.exports=function(t,e){for(var r=-1,n=null==t?0:t.length;++r<n;)if(e(t[r],r,t))return!0;return!1}},4286:t=>{t.exports=function(t){return t.split("")}},9029:t=>{var e=/[^\x00-\x2f\x3a-\x40\x5b-\x60\x7b-\x7f]+/g;t.exports=function(t){return t.match(e)||[]}},4865:(t,e,r)=>{var n=r(9465),i=r(7813),o=Object.prototype.hasOwnProperty;t.exports=function(t,e,r){var s=t[e];o.call(t,e)&&i(s,r)&&(void 0!==r||e in t)||n(t,e,r)}},8470:(t,e,r)=>{var n=r(7813);t.exports=function(t,e){for(var r=t.length;r--;)if(n(t[r][0],e))return r;return-1}},9465:(t,e,r)=>{var n=r(8777);t.exports=function(t,e,r){"__proto__"==e&&n?n(t,e,{configurable:!0,enumerable:!0,value:r,writable:!0}):t[e]=r}},9881:(t,e,r)=>{var n=r(7816),i=r(9291)(n);t.exports=i},1848:t=>{t.exports=function(t,e,r,n){for(var i=t.length,o=r+(n?1:-1);n?o--:++o<i;)if(e(t[o],o,t))return o;return-1}},8483:(t,e,r)=>{var n=r(5063)();t.exports=n},7816:(t,e,r)=>{var n=r(8483),i=r(3674);t.exports=function(t,e){return t&&n(t,e,i)}},7786:(t,e,r)=>{var n=r(1811),i=r(327);t.exports=function(t,e){for(var r=0,o=(e=n(e,t)).length;null!=t&&r<o;)t=t[i(e[r++])];return r&&r==o?t:void 0}},8866:(t,e,r)=>{var n=r(2488),i=r(1469);t.exports=function(t,e,r){var o=e(t);return i(t)?o:n(o,r(t))}},4239:(t,e,r)=>{var n=r(2705),i=r(9607),o=r(2333),s=n?n.toStringTag:void 0;t.exports=function(t){return null==t?void 0===t?"[object Undefined]":"[object Null]":s&&s in Object(t)?i(t):o(t)}},13:t=>{t.exports=function(t,e){return null!=t&&e in Object(t)}},9454:(t,e,r)=>{var n=r(4239),i=r(7005);t.exports=function(t){return i(t)&&"[object Arguments]"==n(t)}},939:(t,e,r)=>{var n=r(2492),i=r(7005);t.exports=function t(e,r,o,s,u){return e===r||(null==e||null==r||!i(e)&&!i(r)?e!=e&&r!=r:n(e,r,o,s,t,u))}},2492:(t,e,r)=>{var n=r(6384),i=r(7114),o=r(8351),s=r(6096),u=r(8882),a=r(1469),c=r(4144),f=r(6719),l="[object Arguments]",h="[object Array]",p="[object Object]",d=Object.prototype.hasOwnProperty;t.exports=function(t,e,r,y,g,v){var w=a(t),M=a(e),L=w?h:u(t),_=M?h:u(e),m=(L=L==l?p:L)==p,b=(_=_==l?p:_)==p,j=L==_;if(j&&c(t)){if(!c(e))return!1;w=!0,m=!1}if(j&&!m)return v||(v=new n),w||f(t)?i(t,e,r,y,g,v):o(t,e,L,r,y,g,v);if(!(1&r)){var x=m&&d.call(t,"__wrapped__"),N=b&&d.call(e,"__wrapped__");if(x||N){var S=x?t.value():t,D=N?e.value():e;return v||(v=new n),g(S,D,r,y,v)}}return!!j&&(v||(v=new n),s(t,e,r,y,g,v))}},2958:(t,e,r)=>{var n=r(6384),i=r(939);t.exports=function(t,e,r,o){var s=r.length,u=s,a=!o;if(null==t)return!u;for(t=Object(t);s--;){var c=r[s];if(a&&c[2]?c[1]!==t[c[0]]:!(c[0]in t))return!1}for(;++s<u;){var f=(c=r[s])[0],l=t[f],h=c[1];if(a&&c[2]){if(void 0===l&&!(f in t))return!1}else{var p=new n;if(o)var d=o(l,h,f,t,e,p);if(!(void 0===d?i(h,l,3,o,p):d))return!1}}return!0}},8458:(t,e,r)=>{var n=r(3560),i=r(5346),o=r(3218),s=r(346),u=/^\[object .+?Constructor\]$/,a=Function.prototype,c=Object.prototype,f=a.toString,l=c.hasOwnProperty,h=RegExp("^"+f.call(l).replace(/[\\^$.*+?()[\]{}|]/g,"\\$&").replace(/hasOwnProperty|(function).*?(?=\\\()| for .+?(?=\\\])/g,"$1.*?")+"$");t.exports=function(t){return!(!o(t)||i(t))&&(n(t)?h:u).test(s(t))}},8749:(t,e,r)=>{var n=r(4239),i=r(1780),o=r(7005),s={};s["[object Float32Array]"]=s["[object Float64Array]"]=s["[object Int8Array]"]=s["[object Int16Array]"]=s["[object Int32Array]"]=s["[object Uint8Array]"]=s["[object Uint8ClampedArray]"]=s["[object Uint16Array]"]=s["[object Uint32Array]"]=!0,s["[object Arguments]"]=s["[object Array]"]=s["[object ArrayBuffer]"]=s["[object Boolean]"]=s["[object DataView]"]=s["[object Date]"]=s["[object Error]"]=s["[object Function]"]=s["[object Map]"]=s["[object Number]"]=s["[object Object]"]=s["[object RegExp]"]=s["[object Set]"]=s["[object String]"]=s["[object WeakMap]"]=!1,t.exports=function(t){return o(t)&&i(t.length)&&!!s[n(t)]}},7206:(t,e,r)=>{var n=r(1573),i=r(6432),o=r(6557),s=r(1469),u=r(1733);t.exports=function(t){return"function"==typeof t?t:null==t?o:"object"==typeof t?s(t)?i(t[0],t[1]):n(t):u(t)}},280:(t,e,r)=>{var n=r(5726),i=r(6916),o=Object.prototype.hasOwnProperty;t.exports=function(t){if(!n(t))return i(t);var e=[];for(var r in Object(t))o.call(t,r)&&"constructor"!=r&&e.push(r);return e}},1573:(t,e,r)=>{var n=r(2958),i=r(1499),o=r(2634);t.exports=function(t){var e=i(t);return 1==e.length&&e[0][2]?o(e[0][0],e[0][1]):function(r){return r===t||n(r,t,e)}}},6432:(t,e,r)=>{var n=r(939),i=r(7361),o=r(9095),s=r(5403),u=r(9162),a=r(2634),c=r(327);t.exports=function(t,e){return s(t)&&u(e)?a(c(t),e):function(r){var s=i(r,t);return void 0===s&&s===e?o(r,t):n(e,s,3)}}},371:t=>{t.exports=function(t){return function(e){return null==e?void 0:e[t]}}},9152:(t,e,r)=>{var n=r(7786);t.exports=function(t){return function(e){return n(e,t)}}},8674:t=>{t.exports=function(t){return function(e){return null==t?void 0:t[e]}}},4259:t=>{t.exports=function(t,e,r){var n=-1,i=t.length;e<0&&(e=-e>i?0:i+e),(r=r>i?i:r)<0&&(r+=i),i=e>r?0:r-e>>>0,e>>>=0;for(var o=Array(i);++n<i;)o[n]=t[n+e];return o}},5076:(t,e,r)=>{var n=r(9881);t.exports=function(t,e){var r;return n(t,(function(t,n,i){return!(r=e(t,n,i))})),!!r}},2545:t=>{t.exports=function(t,e){for(var r=-1,n=Array(t);++r<t;)n[r]=e(r);return n}},531:(t,e,r)=>{var n=r(2705),i=r(9932),o=r(1469),s=r(3448),u=n?n.prototype:void 0,a=u?u.toString:void 0;t.exports=function t(e){if("string"==typeof e)return e;if(o(e))return i(e,t)+"";if(s(e))return a?a.call(e):"";var r=e+"";return"0"==r&&1/e==-Infinity?"-0":r}},7561:(t,e,r)=>{var n=r(7990),i=/^\s+/;t.exports=function(t){return t?t.slice(0,n(t)+1).replace(i,""):t}},1717:t=>{t.exports=function(t){return function(e){return t(e)}}},1757:t=>{t.exports=function(t,e,r){for(var n=-1,i=t.length,o=e.length,s={};++n<i;){var u=n<o?e[n]:void 0;r(s,t[n],u)}return s}},4757:t=>{t.exports=function(t,e){return t.has(e)}},1811:(t,e,r)=>{var n=r(1469),i=r(5403),o=r(5514),s=r(9833);t.exports=function(t,e){return n(t)?t:i(t,e)?[t]:o(s(t))}},180:(t,e,r)=>{var n=r(4259);t.exports=function(t,e,r){var i=t.length;return r=void 0===r?i:r,!e&&r>=i?t:n(t,e,r)}},4429:(t,e,r)=>{var n=r(5639)["__core-js_shared__"];t.exports=n},9291:(t,e,r)=>{var n=r(8612);t.exports=function(t,e){return function(r,i){if(null==r)return r;if(!n(r))return t(r,i);for(var o=r.length,s=e?o:-1,u=Object(r);(e?s--:++s<o)&&!1!==i(u[s],s,u););return r}}},5063:t=>{t.exports=function(t){return function(e,r,n){for(var i=-1,o=Object(e),s=n(e),u=s.length;u--;){var a=s[t?u:++i];if(!1===r(o[a],a,o))break}return e}}},8805:(t,e,r)=>{var n=r(180),i=r(2689),o=r(3140),s=r(9833);t.exports=function(t){return function(e){e=s(e);var r=i(e)?o(e):void 0,u=r?r[0]:e.charAt(0),a=r?n(r,1).join(""):e.slice(1);return u[t]()+a}}},5393:(t,e,r)=>{var n=r(2663),i=r(3816),o=r(8748),s=RegExp("['’]","g");t.exports=function(t){return function(e){return n(o(i(e).replace(s,"")),t,"")}}},7740:(t,e,r)=>{var n=r(7206),i=r(8612),o=r(3674);t.exports=function(t){return function(e,r,s){var u=Object(e);if(!i(e)){var a=n(r,3);e=o(e),r=function(t){return a(u[t],t,u)}}var c=t(e,r,s);return c>-1?u[a?e[c]:c]:void 0}}},9389:(t,e,r)=>{var n=r(8674)({À:"A",Á:"A",Â:"A",Ã:"A",Ä:"A",Å:"A",à:"a",á:"a",â:"a",ã:"a",ä:"a",å:"a",Ç:"C",ç:"c",Ð:"D",ð:"d",È:"E",É:"E",Ê:"E",Ë:"E",è:"e",é:"e",ê:"e",ë:"e",Ì:"I",Í:"I",Î:"I",Ï:"I",ì:"i",í:"i",î:"i",ï:"i",Ñ:"N",ñ:"n",Ò:"O",Ó:"O",Ô:"O",Õ:"O",Ö:"O",Ø:"O",ò:"o",ó:"o",ô:"o",õ:"o",ö:"o",ø:"o",Ù:"U",Ú:"U",Û:"U",Ü:"U",ù:"u",ú:"u",û:"u",ü:"u",Ý:"Y",ý:"y",ÿ:"y",Æ:"Ae",æ:"ae",Þ:"Th",þ:"th",ß:"ss",Ā:"A",Ă:"A",Ą:"A",ā:"a",ă:"a",ą:"a",Ć:"C",Ĉ:"C",Ċ:"C",Č:"C",ć:"c",ĉ:"c",ċ:"c",č:"c",Ď:"D",Đ:"D",ď:"d",đ:"d",Ē:"E",Ĕ:"E",Ė:"E",Ę:"E",Ě:"E",ē:"e",ĕ:"e",ė:"e",ę:"e",ě:"e",Ĝ:"G",Ğ:"G",Ġ:"G",Ģ:"G",ĝ:"g",ğ:"g",ġ:"g",ģ:"g",Ĥ:"H",Ħ:"H",ĥ:"h",ħ:"h",Ĩ:"I",Ī:"I",Ĭ:"I",Į:"I",İ:"I",ĩ:"i",ī:"i",ĭ:"i",į:"i",ı:"i",Ĵ:"J",ĵ:"j",Ķ:"K",ķ:"k",ĸ:"k",Ĺ:"L",Ļ:"L",Ľ:"L",Ŀ:"L",Ł:"L",ĺ:"l",ļ:"l",ľ:"l",ŀ:"l",ł:"l",Ń:"N",Ņ:"N",Ň:"N",Ŋ:"N",ń:"n",ņ:"n",ň:"n",ŋ:"n",Ō:"O",Ŏ:"O",Ő:"O",ō:"o",ŏ:"o",ő:"o",Ŕ:"R",Ŗ:"R",Ř:"R",ŕ:"r",ŗ:"r",ř:"r",Ś:"S",Ŝ:"S",Ş:"S",Š:"S",ś:"s",ŝ:"s",ş:"s",š:"s",Ţ:"T",Ť:"T",Ŧ:"T",ţ:"t",ť:"t",ŧ:"t",Ũ:"U",Ū:"U",Ŭ:"U",Ů:"U",Ű:"U",Ų:"U",ũ:"u",ū:"u",ŭ:"u",ů:"u",ű:"u",ų:"u",Ŵ:"W",ŵ:"w",Ŷ:"Y",ŷ:"y",Ÿ:"Y",Ź:"Z",Ż:"Z",Ž:"Z",ź:"z",ż:"z",ž:"z",Ĳ:"IJ",ĳ:"ij",Œ:"Oe",œ:"oe",ŉ:"'n",ſ:"s"});t.exports=n},8777:(t,e,r)=>{var n=r(852),i=function(){try{var t=n(Object,"defineProperty");return t({},"",{}),t}catch(t){}}();t.exports=i},7114:(t,e,r)=>{var n=r(8668),i=r(4855),o=r(4757);t.exports=function(t,e,r,s,u,a){var c=1&r,f=t.length,l=e.length;if(f!=l&&!(c&&l>f))return!1;var h=a.get(t),p=a.get(e);if(h&&p)return h==e&&p==t;var d=-1,y=!0,g=2&r?new n:void 0;for(a.set(t,e),a.set(e,t);++d<f;){var v=t[d],w=e[d];if(s)var M=c?s(w,v,d,e,t,a):s(v,w,d,t,e,a);if(void 0!==M){if(M)continue;y=!1;break}if(g){if(!i(e,(function(t,e){if(!o(g,e)&&(v===t||u(v,t,r,s,a)))return g.push(e)}))){y=!1;break}}else if(v!==w&&!u(v,w,r,s,a)){y=!1;break}}return a.delete(t),a.delete(e),y}},8351:(t,e,r)=>{var n=r(2705),i=r(1149),o=r(7813),s=r(7114),u=r(8776),a=r(1814),c=n?n.prototype:void 0,f=c?c.valueOf:void 0;t.exports=function(t,e,r,n,c,l,h){switch(r){case"[object DataView]":if(t.byteLength!=e.byteLength||t.byteOffset!=e.byteOffset)return!1;t=t.buffer,e=e.buffer;case"[object ArrayBuffer]":return!(t.byteLength!=e.byteLength||!l(new i(t),new i(e)));case"[object Boolean]":case"[object Date]":case"[object Number]":return o(+t,+e);case"[object Error]":return t.name==e.name&&t.message==e.message;case"[object RegExp]":case"[object String]":return t==e+"";case"[object Map]":var p=u;case"[object Set]":var d=1&n;if(p||(p=a),t.size!=e.size&&!d)return!1;var y=h.get(t);if(y)return y==e;n|=2,h.set(t,e);var g=s(p(t),p(e),n,c,l,h);return h.delete(t),g;case"[object Symbol]":if(f)return f.call(t)==f.call(e)}return!1}},6096:(t,e,r)=>{var n=r(8234),i=Object.prototype.hasOwnProperty;t.exports=function(t,e,r,o,s,u){var a=1&r,c=n(t),f=c.length;if(f!=n(e).length&&!a)return!1;for(var l=f;l--;){var h=c[l];if(!(a?h in e:i.call(e,h)))return!1}var p=u.get(t),d=u.get(e);if(p&&d)return p==e&&d==t;var y=!0;u.set(t,e),u.set(e,t);for(var g=a;++l<f;){var v=t[h=c[l]],w=e[h];if(o)var M=a?o(w,v,h,e,t,u):o(v,w,h,t,e,u);if(!(void 0===M?v===w||s(v,w,r,o,u):M)){y=!1;break}g||(g="constructor"==h)}if(y&&!g){var L=t.constructor,_=e.constructor;L==_||!("constructor"in t)||!("constructor"in e)||"function"==typeof L&&L instanceof L&&"function"==typeof _&&_ instanceof _||(y=!1)}return u.delete(t),u.delete(e),y}},1957:(t,e,r)=>{var n="object"==typeof r.g&&r.g&&r.g.Object===Object&&r.g;t.exports=n},8234:(t,e,r)=>{var n=r(8866),i=r(9551),o=r(3674);t.exports=function(t){return n(t,o,i)}},5050:(t,e,r)=>{var n=r(7019);t.exports=function(t,e){var r=t.__data__;return n(e)?r["string"==typeof e?"string":"hash"]:r.map}},1499:(t,e,r)=>{var n=r(9162),i=r(3674);t.exports=function(t){for(var e=i(t),r=e.length;r--;){var o=e[r],s=t[o];e[r]=[o,s,n(s)]}return e}},852:(t,e,r)=>{var n=r(8458),i=r(7801);t.exports=function(t,e){var r=i(t,e);return n(r)?r:void 0}},9607:(t,e,r)=>{var n=r(2705),i=Object.prototype,o=i.hasOwnProperty,s=i.toString,u=n?n.toStringTag:void 0;t.exports=function(t){var e=o.call(t,u),r=t[u];try{t[u]=void 0;var n=!0}catch(t){}var i=s.call(t);return n&&(e?t[u]=r:delete t[u]),i}},9551:(t,e,r)=>{var n=r(4963),i=r(479),o=Object.prototype.propertyIsEnumerable,s=Object.getOwnPropertySymbols,u=s?function(t){return null==t?[]:(t=Object(t),n(s(t),(function(e){return o.call(t,e)})))}:i;t.exports=u},8882:(t,e,r)=>{var n=r(8552),i=r(7071),o=r(3818),s=r(8525),u=r(577),a=r(4239),c=r(346),f="[object Map]",l="[object Promise]",h="[object Set]",p="[object WeakMap]",d="[object DataView]",y=c(n),g=c(i),v=c(o),w=c(s),M=c(u),L=a;(n&&L(new n(new ArrayBuffer(1)))!=d||i&&L(new i)!=f||o&&L(o.resolve())!=l||s&&L(new s)!=h||u&&L(new u)!=p)&&(L=function(t){var e=a(t),r="[object Object]"==e?t.constructor:void 0,n=r?c(r):"";if(n)switch(n){case y:return d;case g:return f;case v:return l;case w:return h;case M:return p}return e}),t.exports=L},7801:t=>{t.exports=function(t,e){return null==t?void 0:t[e]}},222:(t,e,r)=>{var n=r(1811),i=r(5694),o=r(1469),s=r(5776),u=r(1780),a=r(327);t.exports=function(t,e,r){for(var c=-1,f=(e=n(e,t)).length,l=!1;++c<f;){var h=a(e[c]);if(!(l=null!=t&&r(t,h)))break;t=t[h]}return l||++c!=f?l:!!(f=null==t?0:t.length)&&u(f)&&s(h,f)&&(o(t)||i(t))}},2689:t=>{var e=RegExp("[\\u200d\\ud800-\\udfff\\u0300-\\u036f\\ufe20-\\ufe2f\\u20d0-\\u20ff\\ufe0e\\ufe0f]");t.exports=function(t){return e.test(t)}},3157:t=>{var e=/[a-z][A-Z]|[A-Z]{2}[a-z]|[0-9][a-zA-Z]|[a-zA-Z][0-9]|[^a-zA-Z0-9 ]/;t.exports=function(t){return e.test(t)}},1789:(t,e,r)=>{var n=r(4536);t.exports=function(){this.__data__=n?n(null):{},this.size=0}},401:t=>{t.exports=function(t){var e=this.has(t)&&delete this.__data__[t];return this.size-=e?1:0,e}},7667:(t,e,r)=>{var n=r(4536),i=Object.prototype.hasOwnProperty;t.exports=function(t){var e=this.__data__;if(n){var r=e[t];return"__lodash_hash_undefined__"===r?void 0:r}return i.call(e,t)?e[t]:void 0}},1327:(t,e,r)=>{var n=r(4536),i=Object.prototype.hasOwnProperty;t.exports=function(t){var e=this.__data__;return n?void 0!==e[t]:i.call(e,t)}},1866:(t,e,r)=>{var n=r(4536);t.exports=function(t,e){var r=this.__data__;return this.size+=this.has(t)?0:1,r[t]=n&&void 0===e?"__lodash_hash_undefined__":e,this}},5776:t=>{var e=/^(?:0|[1-9]\d*)$/;t.exports=function(t,r){var n=typeof t;return!!(r=null==r?9007199254740991:r)&&("number"==n||"symbol"!=n&&e.test(t))&&t>-1&&t%1==0&&t<r}},6612:(t,e,r)=>{var n=r(7813),i=r(8612),o=r(5776),s=r(3218);t.exports=function(t,e,r){if(!s(r))return!1;var u=typeof e;return!!("number"==u?i(r)&&o(e,r.length):"string"==u&&e in r)&&n(r[e],t)}},5403:(t,e,r)=>{var n=r(1469),i=r(3448),o=/\.|\[(?:[^[\]]*|(["'])(?:(?!\1)[^\\]|\\.)*?\1)\]/,s=/^\w*$/;t.exports=function(t,e){if(n(t))return!1;var r=typeof t;return!("number"!=r&&"symbol"!=r&&"boolean"!=r&&null!=t&&!i(t))||(s.test(t)||!o.test(t)||null!=e&&t in Object(e))}},7019:t=>{t.exports=function(t){var e=typeof t;return"string"==e||"number"==e||"symbol"==e||"boolean"==e?"__proto__"!==t:null===t}},5346:(t,e,r)=>{var n,i=r(4429),o=(n=/[^.]+$/.exec(i&&i.keys&&i.keys.IE_PROTO||""))?"Symbol(src)_1."+n:"";t.exports=function(t){return!!o&&o in t}},5726:t=>{var e=Object.prototype;t.exports=function(t){var r=t&&t.constructor;return t===("function"==typeof r&&r.prototype||e)}},9162:(t,e,r)=>{var n=r(3218);t.exports=function(t){return t==t&&!n(t)}},7040:t=>{t.exports=function(){this.__data__=[],this.size=0}},4125:(t,e,r)=>{var n=r(8470),i=Array.prototype.splice;t.exports=function(t){var e=this.__data__,r=n(e,t);return!(r<0)&&(r==e.length-1?e.pop():i.call(e,r,1),--this.size,!0)}},2117:(t,e,r)=>{var n=r(8470);t.exports=function(t){var e=this.__data__,r=n(e,t);return r<0?void 0:e[r][1]}},7518:(t,e,r)=>{var n=r(8470);t.exports=function(t){return n(this.__data__,t)>-1}},4705:(t,e,r)=>{var n=r(8470);t.exports=function(t,e){var r=this.__data__,i=n(r,t);return i<0?(++this.size,r.push([t,e])):r[i][1]=e,this}},4785:(t,e,r)=>{var n=r(1989),i=r(8407),o=r(7071);t.exports=function(){this.size=0,this.__data__={hash:new n,map:new(o||i),string:new n}}},1285:(t,e,r)=>{var n=r(5050);t.exports=function(t){var e=n(this,t).delete(t);return this.size-=e?1:0,e}},6e3:(t,e,r)=>{var n=r(5050);t.exports=function(t){return n(this,t).get(t)}},9916:(t,e,r)=>{var n=r(5050);t.exports=function(t){return n(this,t).has(t)}},5265:(t,e,r)=>{var n=r(5050);t.exports=function(t,e){var r=n(this,t),i=r.size;return r.set(t,e),this.size+=r.size==i?0:1,this}},8776:t=>{t.exports=function(t){var e=-1,r=Array(t.size);return t.forEach((function(t,n){r[++e]=[n,t]})),r}},2634:t=>{t.exports=function(t,e){return function(r){return null!=r&&(r[t]===e&&(void 0!==e||t in Object(r)))}}},4523:(t,e,r)=>{var n=r(8306);t.exports=function(t){var e=n(t,(function(t){return 500===r.size&&r.clear(),t})),r=e.cache;return e}},4536:(t,e,r)=>{var n=r(852)(Object,"create");t.exports=n},6916:(t,e,r)=>{var n=r(5569)(Object.keys,Object);t.exports=n},1167:(t,e,r)=>{t=r.nmd(t);var n=r(1957),i=e&&!e.nodeType&&e,o=i&&t&&!t.nodeType&&t,s=o&&o.exports===i&&n.process,u=function(){try{var t=o&&o.require&&o.require("util").types;return t||s&&s.binding&&s.binding("util")}catch(t){}}();t.exports=u},2333:t=>{var e=Object.prototype.toString;t.exports=function(t){return e.call(t)}},5569:t=>{t.exports=function(t,e){return function(r){return t(e(r))}}},5639:(t,e,r)=>{var n=r(1957),i="object"==typeof self&&self&&self.Object===Object&&self,o=n||i||Function("return this")();t.exports=o},619:t=>{t.exports=function(t){return this.__data__.set(t,"__lodash_hash_undefined__"),this}},2385:t=>{t.exports=function(t){return this.__data__.has(t)}},1814:t=>{t.exports=function(t){var e=-1,r=Array(t.size);return t.forEach((function(t){r[++e]=t})),r}},7465:(t,e,r)=>{var n=r(8407);t.exports=function(){this.__data__=new n,this.size=0}},3779:t=>{t.exports=function(t){var e=this.__data__,r=e.delete(t);return this.size=e.size,r}},7599:t=>{t.exports=function(t){return this.__data__.get(t)}},4758:t=>{t.exports=function(t){return this.__data__.has(t)}},4309:(t,e,r)=>{var n=r(8407),i=r(7071),o=r(3369);t.exports=function(t,e){var r=this.__data__;if(r instanceof n){var s=r.__data__;if(!i||s.length<199)return s.push([t,e]),this.size=++r.size,this;r=this.__data__=new o(s)}return r.set(t,e),this.size=r.size,this}},3140:(t,e,r)=>{var n=r(4286),i=r(2689),o=r(676);t.exports=function(t){return i(t)?o(t):n(t)}},5514:(t,e,r)=>{var n=r(4523),i=/[^.[\]]+|\[(?:(-?\d+(?:\.\d+)?)|(["'])((?:(?!\2)[^\\]|\\.)*?)\2)\]|(?=(?:\.|\[\])(?:\.|\[\]|$))/g,o=/\\(\\)?/g,s=n((function(t){var e=[];return 46===t.charCodeAt(0)&&e.push(""),t.replace(i,(function(t,r,n,i){e.push(n?i.replace(o,"$1"):r||t)})),e}));t.exports=s},327:(t,e,r)=>{var n=r(3448);t.exports=function(t){if("string"==typeof t||n(t))return t;var e=t+"";return"0"==e&&1/t==-Infinity?"-0":e}},346:t=>{var e=Function.prototype.toString;t.exports=function(t){if(null!=t){try{return e.call(t)}catch(t){}try{return t+""}catch(t){}}return""}},7990:t=>{var e=/\s/;t.exports=function(t){for(var r=t.length;r--&&e.test(t.charAt(r)););return r}},676:t=>{var e="[\\ud800-\\udfff]",r="[\\u0300-\\u036f\\ufe20-\\ufe2f\\u20d0-\\u20ff]",n="\\ud83c[\\udffb-\\udfff]",i="[^\\ud800-\\udfff]",o="(?:\\ud83c[\\udde6-\\uddff]){2}",s="[\\ud800-\\udbff][\\udc00-\\udfff]",u="(?:"+r+"|"+n+")"+"?",a="[\\ufe0e\\ufe0f]?",c=a+u+("(?:\\u200d(?:"+[i,o,s].join("|")+")"+a+u+")*"),f="(?:"+[i+r+"?",r,o,s,e].join("|")+")",l=RegExp(n+"(?="+n+")|"+f+c,"g");t.exports=function(t){return t.match(l)||[]}},2757:t=>{var e="\\u2700-\\u27bf",r="a-z\\xdf-\\xf6\\xf8-\\xff",n="A-Z\\xc0-\\xd6\\xd8-\\xde",i="\\xac\\xb1\\xd7\\xf7\\x00-\\x2f\\x3a-\\x40\\x5b-\\x60\\x7b-\\xbf\\u2000-\\u206f \\t\\x0b\\f\\xa0\\ufeff\\n\\r\\u2028\\u2029\\u1680\\u180e\\u2000\\u2001\\u2002\\u2003\\u2004\\u2005\\u2006\\u2007\\u2008\\u2009\\u200a\\u202f\\u205f\\u3000",o="["+i+"]",s="\\d+",u="[\\u2700-\\u27bf]",a="["+r+"]",c="[^\\ud800-\\udfff"+i+s+e+r+n+"]",f="(?:\\ud83c[\\udde6-\\uddff]){2}",l="[\\ud800-\\udbff][\\udc00-\\udfff]",h="["+n+"]",p="(?:"+a+"|"+c+")",d="(?:"+h+"|"+c+")",y="(?:['’](?:d|ll|m|re|s|t|ve))?",g="(?:['’](?:D|LL|M|RE|S|T|VE))?",v="(?:[\\u0300-\\u036f\\ufe20-\\ufe2f\\u20d0-\\u20ff]|\\ud83c[\\udffb-\\udfff])?",w="[\\ufe0e\\ufe0f]?",M=w+v+("(?:\\u200d(?:"+["[^\\ud800-\\udfff]",f,l].join("|")+")"+w+v+")*"),L="(?:"+[u,f,l].join("|")+")"+M,_=RegExp([h+"?"+a+"+"+y+"(?="+[o,h,"$"].join("|")+")",d+"+"+g+"(?="+[o,h+p,"$"].join("|")+")",h+"?"+p+"+"+y,h+"+"+g,"\\d*(?:1ST|2ND|3RD|(?![123])\\dTH)(?=\\b|[a-z_])","\\d*(?:1st|2nd|3rd|(?![123])\\dth)(?=\\b|[A-Z_])",s,L].join("|"),"g");t.exports=function(t){return t.match(_)||[]}},1540:(t,e,r)=>{var n=r(8403),i=r(5393)((function(t,e,r){return e=e.toLowerCase(),t+(r?n(e):e)}));t.exports=i},8403:(t,e,r)=>{var n=r(9833),i=r(1700);t.exports=function(t){return i(n(t).toLowerCase())}},3816:(t,e,r)=>{var n=r(9389),i=r(9833),o=/[\xc0-\xd6\xd8-\xf6\xf8-\xff\u0100-\u017f]/g,s=RegExp("[\\u0300-\\u036f\\ufe20-\\ufe2f\\u20d0-\\u20ff]","g");t.exports=function(t){return(t=i(t))&&t.replace(o,n).replace(s,"")}},7813:t=>{t.exports=function(t,e){return t===e||t!=t&&e!=e}},3311:(t,e,r)=>{var n=r(7740)(r(998));t.exports=n},998:(t,e,r)=>{var n=r(1848),i=r(7206),o=r(554),s=Math.max;t.exports=function(t,e,r){var u=null==t?0:t.length;if(!u)return-1;var a=null==r?0:o(r);return a<0&&(a=s(u+a,0)),n(t,i(e,3),a)}},7361:(t,e,r)=>{var n=r(7786);t.exports=function(t,e,r){var i=null==t?void 0:n(t,e);return void 0===i?r:i}},9095:(t,e,r)=>{var n=r(13),i=r(222);t.exports=function(t,e){return null!=t&&i(t,e,n)}},6557:t=>{t.exports=function(t){return t}},5694:(t,e,r)=>{var n=r(9454),i=r(7005),o=Object.prototype,s=o.hasOwnProperty,u=o.propertyIsEnumerable,a=n(function(){return arguments}())?n:function(t){return i(t)&&s.call(t,"callee")&&!u.call(t,"callee")};t.exports=a},1469:t=>{var e=Array.isArray;t.exports=e},8612:(t,e,r)=>{var n=r(3560),i=r(1780);t.exports=function(t){return null!=t&&i(t.length)&&!n(t)}},4144:(t,e,r)=>{t=r.nmd(t);var n=r(5639),i=r(5062),o=e&&!e.nodeType&&e,s=o&&t&&!t.nodeType&&t,u=s&&s.exports===o?n.Buffer:void 0,a=(u?u.isBuffer:void 0)||i;t.exports=a},1609:(t,e,r)=>{var n=r(280),i=r(8882),o=r(5694),s=r(1469),u=r(8612),a=r(4144),c=r(5726),f=r(6719),l=Object.prototype.hasOwnProperty;t.exports=function(t){if(null==t)return!0;if(u(t)&&(s(t)||"string"==typeof t||"function"==typeof t.splice||a(t)||f(t)||o(t)))return!t.length;var e=i(t);if("[object Map]"==e||"[object Set]"==e)return!t.size;if(c(t))return!n(t).length;for(var r in t)if(l.call(t,r))return!1;return!0}},3560:(t,e,r)=>{var n=r(4239),i=r(3218);t.exports=function(t){if(!i(t))return!1;var e=n(t);return"[object Function]"==e||"[object GeneratorFunction]"==e||"[object AsyncFunction]"==e||"[object Proxy]"==e}},1780:t=>{t.exports=function(t){return"number"==typeof t&&t>-1&&t%1==0&&t<=9007199254740991}},3218:t=>{t.exports=function(t){var e=typeof t;return null!=t&&("object"==e||"function"==e)}},7005:t=>{t.exports=function(t){return null!=t&&"object"==typeof t}},3448:(t,e,r)=>{var n=r(4239),i=r(7005);t.exports=function(t){return"symbol"==typeof t||i(t)&&"[object Symbol]"==n(t)}},6719:(t,e,r)=>{var n=r(8749),i=r(1717),o=r(1167),s=o&&o.isTypedArray,u=s?i(s):n;t.exports=u},3674:(t,e,r)=>{var n=r(4636),i=r(280),o=r(8612);t.exports=function(t){return o(t)?n(t):i(t)}},8306:(t,e,r)=>{var n=r(3369);function i(t,e){if("function"!=typeof t||null!=e&&"function"!=typeof e)throw new TypeError("Expected a function");var r=function(){var n=arguments,i=e?e.apply(this,n):n[0],o=r.cache;if(o.has(i))return o.get(i);var s=t.apply(this,n);return r.cache=o.set(i,s)||o,s};return r.cache=new(i.Cache||n),r}i.Cache=n,t.exports=i},1733:(t,e,r)=>{var n=r(371),i=r(9152),o=r(5403),s=r(327);t.exports=function(t){return o(t)?n(s(t)):i(t)}},9704:(t,e,r)=>{var n=r(4855),i=r(7206),o=r(5076),s=r(1469),u=r(6612);t.exports=function(t,e,r){var a=s(t)?n:o;return r&&u(t,e,r)&&(e=void 0),a(t,i(e,3))}},479:t=>{t.exports=function(){return[]}},5062:t=>{t.exports=function(){return!1}},8601:(t,e,r)=>{var n=r(4841),i=1/0;t.exports=function(t){return t?(t=n(t))===i||t===-1/0?17976931348623157e292*(t<0?-1:1):t==t?t:0:0===t?t:0}},554:(t,e,r)=>{var n=r(8601);t.exports=function(t){var e=n(t),r=e%1;return e==e?r?e-r:e:0}},4841:(t,e,r)=>{var n=r(7561),i=r(3218),o=r(3448),s=/^[-+]0x[0-9a-f]+$/i,u=/^0b[01]+$/i,a=/^0o[0-7]+$/i,c=parseInt;t.exports=function(t){if("number"==typeof t)return t;if(o(t))return NaN;if(i(t)){var e="function"==typeof t.valueOf?t.valueOf():t;t=i(e)?e+"":e}if("string"!=typeof t)return 0===t?t:+t;t=n(t);var r=u.test(t);return r||a.test(t)?c(t.slice(2),r?2:8):s.test(t)?NaN:+t}},9833:(t,e,r)=>{var n=r(531);t.exports=function(t){return null==t?"":n(t)}},1700:(t,e,r)=>{var n=r(8805)("toUpperCase");t.exports=n},8748:(t,e,r)=>{var n=r(9029),i=r(3157),o=r(9833),s=r(2757);t.exports=function(t,e,r){return t=o(t),void 0===(e=r?void 0:e)?i(t)?s(t):n(t):t.match(e)||[]}},7287:(t,e,r)=>{var n=r(4865),i=r(1757);t.exports=function(t,e){return i(t||[],e||[],n)}},7418:t=>{"use strict";var e=Object.getOwnPropertySymbols,r=Object.prototype.hasOwnProperty,n=Object.prototype.propertyIsEnumerable;function i(t){if(null==t)throw new TypeError("Object.assign cannot be called with null or undefined");return Object(t)}t.exports=function(){try{if(!Object.assign)return!1;var t=new String("abc");if(t[5]="de","5"===Object.getOwnPropertyNames(t)[0])return!1;for(var e={},r=0;r<10;r++)e["_"+String.fromCharCode(r)]=r;if("0123456789"!==Object.getOwnPropertyNames(e).map((function(t){return e[t]})).join(""))return!1;var n={};return"abcdefghijklmnopqrst".split("").forEach((function(t){n[t]=t})),"abcdefghijklmnopqrst"===Object.keys(Object.assign({},n)).join("")}catch(t){return!1}}()?Object.assign:function(t,o){for(var s,u,a=i(t),c=1;c<arguments.length;c++){for(var f in s=Object(arguments[c]))r.call(s,f)&&(a[f]=s[f]);if(e){u=e(s);for(var l=0;l<u.length;l++)n.call(s,u[l])&&(a[u[l]]=s[u[l]])}}return a}},4155:t=>{var e,r,n=t.exports={};function i(){throw new Error("setTimeout has not been defined")}function o(){throw new Error("clearTimeout has not been defined")}function s(t){if(e===setTimeout)return setTimeout(t,0);if((e===i||!e)&&setTimeout)return e=setTimeout,setTimeout(t,0);try{return e(t,0)}catch(r){try{return e.call(null,t,0)}catch(r){return e.call(this,t,0)}}}!function(){try{e="function"==typeof setTimeout?setTimeout:i}catch(t){e=i}try{r="function"==typeof clearTimeout?clearTimeout:o}catch(t){r=o}}();var u,a=[],c=!1,f=-1;function l(){c&&u&&(c=!1,u.length?a=u.concat(a):f=-1,a.length&&h())}function h(){if(!c){var t=s(l);c=!0;for(var e=a.length;e;){for(u=a,a=[];++f<e;)u&&u[f].run();f=-1,e=a.length}u=null,c=!1,function(t){if(r===clearTimeout)return clearTimeout(t);if((r===o||!r)&&clearTimeout)return r=clearTimeout,clearTimeout(t);try{r(t)}catch(e){try{return r.call(null,t)}catch(e){return r.call(this,t)}}}(t)}}function p(t,e){this.fun=t,this.array=e}function d(){}n.nextTick=function(t){var e=new Array(arguments.length-1);if(arguments.length>1)for(var r=1;r<arguments.length;r++)e[r-1]=arguments[r];a.push(new p(t,e)),1!==a.length||c||s(h)},p.prototype.run=function(){this.fun.apply(null,this.array)},n.title="browser",n.browser=!0,n.env={},n.argv=[],n.version="",n.versions={},n.on=d,n.addListener=d,n.once=d,n.off=d,n.removeListener=d,n.removeAllListeners=d,n.emit=d,n.prependListener=d,n.prependOnceListener=d,n.listeners=function(t){return[]},n.binding=function(t){throw new Error("process.binding is not supported")},n.cwd=function(){return"/"},n.chdir=function(t){throw new Error("process.chdir is not supported")},n.umask=function(){return 0}},4419:(t,e,r)=>{const n=r(697),i=r(9450),o=n.types;t.exports=class t{constructor(t,e){if(this._setDefaults(t),t instanceof RegExp)this.ignoreCase=t.ignoreCase,this.multiline=t.multiline,t=t.source;else{if("string"!=typeof t)throw new Error("Expected a regexp or string");this.ignoreCase=e&&-1!==e.indexOf("i"),this.multiline=e&&-1!==e.indexOf("m")}this.tokens=n(t)}_setDefaults(e){this.max=null!=e.max?e.max:null!=t.prototype.max?t.prototype.max:100,this.defaultRange=e.defaultRange?e.defaultRange:this.defaultRange.clone(),e.randInt&&(this.randInt=e.randInt)}gen(){return this._gen(this.tokens,[])}_gen(t,e){var r,n,i,s,u;switch(t.type){case o.ROOT:case o.GROUP:if(t.followedBy||t.notFollowedBy)return"";for(t.remember&&void 0===t.groupNumber&&(t.groupNumber=e.push(null)-1),n="",s=0,u=(r=t.options?this._randSelect(t.options):t.stack).length;s<u;s++)n+=this._gen(r[s],e);return t.remember&&(e[t.groupNumber]=n),n;case o.POSITION:return"";case o.SET:var a=this._expand(t);return a.length?String.fromCharCode(this._randSelect(a)):"";case o.REPETITION:for(i=this.randInt(t.min,t.max===1/0?t.min+this.max:t.max),n="",s=0;s<i;s++)n+=this._gen(t.value,e);return n;case o.REFERENCE:return e[t.value-1]||"";case o.CHAR:var c=this.ignoreCase&&this._randBool()?this._toOtherCase(t.value):t.value;return String.fromCharCode(c)}}_toOtherCase(t){return t+(97<=t&&t<=122?-32:65<=t&&t<=90?32:0)}_randBool(){return!this.randInt(0,1)}_randSelect(t){return t instanceof i?t.index(this.randInt(0,t.length-1)):t[this.randInt(0,t.length-1)]}_expand(t){if(t.type===n.types.CHAR)return new i(t.value);if(t.type===n.types.RANGE)return new i(t.from,t.to);{let e=new i;for(let r=0;r<t.set.length;r++){let n=this._expand(t.set[r]);if(e.add(n),this.ignoreCase)for(let t=0;t<n.length;t++){let r=n.index(t),i=this._toOtherCase(r);r!==i&&e.add(i)}}return t.not?this.defaultRange.clone().subtract(e):this.defaultRange.clone().intersect(e)}}randInt(t,e){return t+Math.floor(Math.random()*(1+e-t))}get defaultRange(){return this._range=this._range||new i(32,126)}set defaultRange(t){this._range=t}static randexp(e,r){var n;return"string"==typeof e&&(e=new RegExp(e,r)),void 0===e._randexp?(n=new t(e,r),e._randexp=n):(n=e._randexp)._setDefaults(e),n.gen()}static sugar(){RegExp.prototype.gen=function(){return t.randexp(this)}}}},2282:(t,e,r)=>{"use strict";var n=r(4155),i=65536,o=4294967295;var s=r(396).Buffer,u=r.g.crypto||r.g.msCrypto;u&&u.getRandomValues?t.exports=function(t,e){if(t>o)throw new RangeError("requested too many random bytes");var r=s.allocUnsafe(t);if(t>0)if(t>i)for(var a=0;a<t;a+=i)u.getRandomValues(r.slice(a,a+i));else u.getRandomValues(r);if("function"==typeof e)return n.nextTick((function(){e(null,r)}));return r}:t.exports=function(){throw new Error("Secure random number generation is not supported by this browser.\nUse Chrome, Firefox or Internet Explorer 11")}},2408:(t,e,r)=>{"use strict";var n=r(7418),i=60103,o=60106;e.Fragment=60107,e.StrictMode=60108,e.Profiler=60114;var s=60109,u=60110,a=60112;e.Suspense=60113;var c=60115,f=60116;if("function"==typeof Symbol&&Symbol.for){var l=Symbol.for;i=l("react.element"),o=l("react.portal"),e.Fragment=l("react.fragment"),e.StrictMode=l("react.strict_mode"),e.Profiler=l("react.profiler"),s=l("react.provider"),u=l("react.context"),a=l("react.forward_ref"),e.Suspense=l("react.suspense"),c=l("react.memo"),f=l("react.lazy")}var h="function"==typeof Symbol&&Symbol.iterator;function p(t){for(var e="https://reactjs.org/docs/error-decoder.html?invariant="+t,r=1;r<arguments.length;r++)e+="&args[]="+encodeURIComponent(arguments[r]);return"Minified React error #"+t+"; visit "+e+" for the full message or use the non-minified dev environment for full errors and additional helpful warnings."}var d={isMounted:function(){return!1},enqueueForceUpdate:function(){},enqueueReplaceState:function(){},enqueueSetState:function(){}},y={};function g(t,e,r){this.props=t,this.context=e,this.refs=y,this.updater=r||d}function v(){}function w(t,e,r){this.props=t,this.context=e,this.refs=y,this.updater=r||d}g.prototype.isReactComponent={},g.prototype.setState=function(t,e){if("object"!=typeof t&&"function"!=typeof t&&null!=t)throw Error(p(85));this.updater.enqueueSetState(this,t,e,"setState")},g.prototype.forceUpdate=function(t){this.updater.enqueueForceUpdate(this,t,"forceUpdate")},v.prototype=g.prototype;var M=w.prototype=new v;M.constructor=w,n(M,g.prototype),M.isPureReactComponent=!0;var L={current:null},_=Object.prototype.hasOwnProperty,m={key:!0,ref:!0,__self:!0,__source:!0};function b(t,e,r){var n,o={},s=null,u=null;if(null!=e)for(n in void 0!==e.ref&&(u=e.ref),void 0!==e.key&&(s=""+e.key),e)_.call(e,n)&&!m.hasOwnProperty(n)&&(o[n]=e[n]);var a=arguments.length-2;if(1===a)o.children=r;else if(1<a){for(var c=Array(a),f=0;f<a;f++)c[f]=arguments[f+2];o.children=c}if(t&&t.defaultProps)for(n in a=t.defaultProps)void 0===o[n]&&(o[n]=a[n]);return{$$typeof:i,type:t,key:s,ref:u,props:o,_owner:L.current}}function j(t){return"object"==typeof t&&null!==t&&t.$$typeof===i}var x=/\/+/g;function N(t,e){return"object"==typeof t&&null!==t&&null!=t.key?function(t){var e={"=":"=0",":":"=2"};return"$"+t.replace(/[=:]/g,(function(t){return e[t]}))}(""+t.key):e.toString(36)}function S(t,e,r,n,s){var u=typeof t;"undefined"!==u&&"boolean"!==u||(t=null);var a=!1;if(null===t)a=!0;else switch(u){case"string":case"number":a=!0;break;case"object":switch(t.$$typeof){case i:case o:a=!0}}if(a)return s=s(a=t),t=""===n?"."+N(a,0):n,Array.isArray(s)?(r="",null!=t&&(r=t.replace(x,"$&/")+"/"),S(s,e,r,"",(function(t){return t}))):null!=s&&(j(s)&&(s=function(t,e){return{$$typeof:i,type:t.type,key:e,ref:t.ref,props:t.props,_owner:t._owner}}(s,r+(!s.key||a&&a.key===s.key?"":(""+s.key).replace(x,"$&/")+"/")+t)),e.push(s)),1;if(a=0,n=""===n?".":n+":",Array.isArray(t))for(var c=0;c<t.length;c++){var f=n+N(u=t[c],c);a+=S(u,e,r,f,s)}else if(f=function(t){return null===t||"object"!=typeof t?null:"function"==typeof(t=h&&t[h]||t["@@iterator"])?t:null}(t),"function"==typeof f)for(t=f.call(t),c=0;!(u=t.next()).done;)a+=S(u=u.value,e,r,f=n+N(u,c++),s);else if("object"===u)throw e=""+t,Error(p(31,"[object Object]"===e?"object with keys {"+Object.keys(t).join(", ")+"}":e));return a}function D(t,e,r){if(null==t)return t;var n=[],i=0;return S(t,n,"","",(function(t){return e.call(r,t,i++)})),n}function I(t){if(-1===t._status){var e=t._result;e=e(),t._status=0,t._result=e,e.then((function(e){0===t._status&&(e=e.default,t._status=1,t._result=e)}),(function(e){0===t._status&&(t._status=2,t._result=e)}))}if(1===t._status)return t._result;throw t._result}var E={current:null};function A(){var t=E.current;if(null===t)throw Error(p(321));return t}var C={ReactCurrentDispatcher:E,ReactCurrentBatchConfig:{transition:0},ReactCurrentOwner:L,IsSomeRendererActing:{current:!1},assign:n};e.Children={map:D,forEach:function(t,e,r){D(t,(function(){e.apply(this,arguments)}),r)},count:function(t){var e=0;return D(t,(function(){e++})),e},toArray:function(t){return D(t,(function(t){return t}))||[]},only:function(t){if(!j(t))throw Error(p(143));return t}},e.Component=g,e.PureComponent=w,e.__SECRET_INTERNALS_DO_NOT_USE_OR_YOU_WILL_BE_FIRED=C,e.cloneElement=function(t,e,r){if(null==t)throw Error(p(267,t));var o=n({},t.props),s=t.key,u=t.ref,a=t._owner;if(null!=e){if(void 0!==e.ref&&(u=e.ref,a=L.current),void 0!==e.key&&(s=""+e.key),t.type&&t.type.defaultProps)var c=t.type.defaultProps;for(f in e)_.call(e,f)&&!m.hasOwnProperty(f)&&(o[f]=void 0===e[f]&&void 0!==c?c[f]:e[f])}var f=arguments.length-2;if(1===f)o.children=r;else if(1<f){c=Array(f);for(var l=0;l<f;l++)c[l]=arguments[l+2];o.children=c}return{$$typeof:i,type:t.type,key:s,ref:u,props:o,_owner:a}},e.createContext=function(t,e){return void 0===e&&(e=null),(t={$$typeof:u,_calculateChangedBits:e,_currentValue:t,_currentValue2:t,_threadCount:0,Provider:null,Consumer:null}).Provider={$$typeof:s,_context:t},t.Consumer=t},e.createElement=b,e.createFactory=function(t){var e=b.bind(null,t);return e.type=t,e},e.createRef=function(){return{current:null}},e.forwardRef=function(t){return{$$typeof:a,render:t}},e.isValidElement=j,e.lazy=function(t){return{$$typeof:f,_payload:{_status:-1,_result:t},_init:I}},e.memo=function(t,e){return{$$typeof:c,type:t,compare:void 0===e?null:e}},e.useCallback=function(t,e){return A().useCallback(t,e)},e.useContext=function(t,e){return A().useContext(t,e)},e.useDebugValue=function(){},e.useEffect=function(t,e){return A().useEffect(t,e)},e.useImperativeHandle=function(t,e,r){return A().useImperativeHandle(t,e,r)},e.useLayoutEffect=function(t,e){return A().useLayoutEffect(t,e)},e.useMemo=function(t,e){return A().useMemo(t,e)},e.useReducer=function(t,e,r){return A().useReducer(t,e,r)},e.useRef=function(t){return A().useRef(t)},e.useState=function(t){return A().useState(t)},e.version="17.0.2"},7294:(t,e,r)=>{"use strict";t.exports=r(2408)},4281:t=>{"use strict";var e={};function r(t,r,n){n||(n=Error);var i=function(t){var e,n;function i(e,n,i){return t.call(this,function(t,e,n){return"string"==typeof r?r:r(t,e,n)}(e,n,i))||this}return n=t,(e=i).prototype=Object.create(n.prototype),e.prototype.constructor=e,e.__proto__=n,i}(n);i.prototype.name=n.name,i.prototype.code=t,e[t]=i}function n(t,e){if(Array.isArray(t)){var r=t.length;return t=t.map((function(t){return String(t)})),r>2?"one of ".concat(e," ").concat(t.slice(0,r-1).join(", "),", or ")+t[r-1]:2===r?"one of ".concat(e," ").concat(t[0]," or ").concat(t[1]):"of ".concat(e," ").concat(t[0])}return"of ".concat(e," ").concat(String(t))}r("ERR_INVALID_OPT_VALUE",(function(t,e){return'The value "'+e+'" is invalid for option "'+t+'"'}),TypeError),r("ERR_INVALID_ARG_TYPE",(function(t,e,r){var i,o,s,u;if("string"==typeof e&&(o="not ",e.substr(!s||s<0?0:+s,o.length)===o)?(i="must not be",e=e.replace(/^not /,"")):i="must be",function(t,e,r){return(void 0===r||r>t.length)&&(r=t.length),t.substring(r-e.length,r)===e}(t," argument"))u="The ".concat(t," ").concat(i," ").concat(n(e,"type"));else{var a=function(t,e,r){return"number"!=typeof r&&(r=0),!(r+e.length>t.length)&&-1!==t.indexOf(e,r)}(t,".")?"property":"argument";u='The "'.concat(t,'" ').concat(a," ").concat(i," ").concat(n(e,"type"))}return u+=". Received type ".concat(typeof r)}),TypeError),r("ERR_STREAM_PUSH_AFTER_EOF","stream.push() after EOF"),r("ERR_METHOD_NOT_IMPLEMENTED",(function(t){return"The "+t+" method is not implemented"})),r("ERR_STREAM_PREMATURE_CLOSE","Premature close"),r("ERR_STREAM_DESTROYED",(function(t){return"Cannot call "+t+" after a stream was destroyed"})),r("ERR_MULTIPLE_CALLBACK","Callback called multiple times"),r("ERR_STREAM_CANNOT_PIPE","Cannot pipe, not readable"),r("ERR_STREAM_WRITE_AFTER_END","write after end"),r("ERR_STREAM_NULL_VALUES","May not write null values to stream",TypeError),r("ERR_UNKNOWN_ENCODING",(function(t){return"Unknown encoding: "+t}),TypeError),r("ERR_STREAM_UNSHIFT_AFTER_END_EVENT","stream.unshift() after end event"),t.exports.q=e},6753:(t,e,r)=>{"use strict";var n=r(4155),i=Object.keys||function(t){var e=[];for(var r in t)e.push(r);return e};t.exports=f;var o=r(9481),s=r(3982);r(5717)(f,o);for(var u=i(s.prototype),a=0;a<u.length;a++){var c=u[a];f.prototype[c]||(f.prototype[c]=s.prototype[c])}function f(t){if(!(this instanceof f))return new f(t);o.call(this,t),s.call(this,t),this.allowHalfOpen=!0,t&&(!1===t.readable&&(this.readable=!1),!1===t.writable&&(this.writable=!1),!1===t.allowHalfOpen&&(this.allowHalfOpen=!1,this.once("end",l)))}function l(){this._writableState.ended||n.nextTick(h,this)}function h(t){t.end()}Object.defineProperty(f.prototype,"writableHighWaterMark",{enumerable:!1,get:function(){return this._writableState.highWaterMark}}),Object.defineProperty(f.prototype,"writableBuffer",{enumerable:!1,get:function(){return this._writableState&&this._writableState.getBuffer()}}),Object.defineProperty(f.prototype,"writableLength",{enumerable:!1,get:function(){return this._writableState.length}}),Object.defineProperty(f.prototype,"destroyed",{enumerable:!1,get:function(){return void 0!==this._readableState&&void 0!==this._writableState&&(this._readableState.destroyed&&this._writableState.destroyed)},set:function(t){void 0!==this._readableState&&void 0!==this._writableState&&(this._readableState.destroyed=t,this._writableState.destroyed=t)}})},2725:(t,e,r)=>{"use strict";t.exports=i;var n=r(4605);function i(t){if(!(this instanceof i))return new i(t);n.call(this,t)}r(5717)(i,n),i.prototype._transform=function(t,e,r){r(null,t)}},9481:(t,e,r)=>{"use strict";var n,i=r(4155);t.exports=x,x.ReadableState=j;r(7187).EventEmitter;var o=function(t,e){return t.listeners(e).length},s=r(2503),u=r(8764).Buffer,a=r.g.Uint8Array||function(){};var c,f=r(4616);c=f&&f.debuglog?f.debuglog("stream"):function(){};var l,h,p,d=r(7327),y=r(1195),g=r(2457).getHighWaterMark,v=r(4281).q,w=v.ERR_INVALID_ARG_TYPE,M=v.ERR_STREAM_PUSH_AFTER_EOF,L=v.ERR_METHOD_NOT_IMPLEMENTED,_=v.ERR_STREAM_UNSHIFT_AFTER_END_EVENT;r(5717)(x,s);var m=y.errorOrDestroy,b=["error","close","destroy","pause","resume"];function j(t,e,i){n=n||r(6753),t=t||{},"boolean"!=typeof i&&(i=e instanceof n),this.objectMode=!!t.objectMode,i&&(this.objectMode=this.objectMode||!!t.readableObjectMode),this.highWaterMark=g(this,t,"readableHighWaterMark",i),this.buffer=new d,this.length=0,this.pipes=null,this.pipesCount=0,this.flowing=null,this.ended=!1,this.endEmitted=!1,this.reading=!1,this.sync=!0,this.needReadable=!1,this.emittedReadable=!1,this.readableListening=!1,this.resumeScheduled=!1,this.paused=!0,this.emitClose=!1!==t.emitClose,this.autoDestroy=!!t.autoDestroy,this.destroyed=!1,this.defaultEncoding=t.defaultEncoding||"utf8",this.awaitDrain=0,this.readingMore=!1,this.decoder=null,this.encoding=null,t.encoding&&(l||(l=r(2553).s),this.decoder=new l(t.encoding),this.encoding=t.encoding)}function x(t){if(n=n||r(6753),!(this instanceof x))return new x(t);var e=this instanceof n;this._readableState=new j(t,this,e),this.readable=!0,t&&("function"==typeof t.read&&(this._read=t.read),"function"==typeof t.destroy&&(this._destroy=t.destroy)),s.call(this)}function N(t,e,r,n,i){c("readableAddChunk",e);var o,s=t._readableState;if(null===e)s.reading=!1,function(t,e){if(c("onEofChunk"),e.ended)return;if(e.decoder){var r=e.decoder.end();r&&r.length&&(e.buffer.push(r),e.length+=e.objectMode?1:r.length)}e.ended=!0,e.sync?E(t):(e.needReadable=!1,e.emittedReadable||(e.emittedReadable=!0,A(t)))}(t,s);else if(i||(o=function(t,e){var r;n=e,u.isBuffer(n)||n instanceof a||"string"==typeof e||void 0===e||t.objectMode||(r=new w("chunk",["string","Buffer","Uint8Array"],e));var n;return r}(s,e)),o)m(t,o);else if(s.objectMode||e&&e.length>0)if("string"==typeof e||s.objectMode||Object.getPrototypeOf(e)===u.prototype||(e=function(t){return u.from(t)}(e)),n)s.endEmitted?m(t,new _):S(t,s,e,!0);else if(s.ended)m(t,new M);else{if(s.destroyed)return!1;s.reading=!1,s.decoder&&!r?(e=s.decoder.write(e),s.objectMode||0!==e.length?S(t,s,e,!1):C(t,s)):S(t,s,e,!1)}else n||(s.reading=!1,C(t,s));return!s.ended&&(s.length<s.highWaterMark||0===s.length)}function S(t,e,r,n){e.flowing&&0===e.length&&!e.sync?(e.awaitDrain=0,t.emit("data",r)):(e.length+=e.objectMode?1:r.length,n?e.buffer.unshift(r):e.buffer.push(r),e.needReadable&&E(t)),C(t,e)}Object.defineProperty(x.prototype,"destroyed",{enumerable:!1,get:function(){return void 0!==this._readableState&&this._readableState.destroyed},set:function(t){this._readableState&&(this._readableState.destroyed=t)}}),x.prototype.destroy=y.destroy,x.prototype._undestroy=y.undestroy,x.prototype._destroy=function(t,e){e(t)},x.prototype.push=function(t,e){var r,n=this._readableState;return n.objectMode?r=!0:"string"==typeof t&&((e=e||n.defaultEncoding)!==n.encoding&&(t=u.from(t,e),e=""),r=!0),N(this,t,e,!1,r)},x.prototype.unshift=function(t){return N(this,t,null,!0,!1)},x.prototype.isPaused=function(){return!1===this._readableState.flowing},x.prototype.setEncoding=function(t){l||(l=r(2553).s);var e=new l(t);this._readableState.decoder=e,this._readableState.encoding=this._readableState.decoder.encoding;for(var n=this._readableState.buffer.head,i="";null!==n;)i+=e.write(n.data),n=n.next;return this._readableState.buffer.clear(),""!==i&&this._readableState.buffer.push(i),this._readableState.length=i.length,this};var D=1073741824;function I(t,e){return t<=0||0===e.length&&e.ended?0:e.objectMode?1:t!=t?e.flowing&&e.length?e.buffer.head.data.length:e.length:(t>e.highWaterMark&&(e.highWaterMark=function(t){return t>=D?t=D:(t--,t|=t>>>1,t|=t>>>2,t|=t>>>4,t|=t>>>8,t|=t>>>16,t++),t}(t)),t<=e.length?t:e.ended?e.length:(e.needReadable=!0,0))}function E(t){var e=t._readableState;c("emitReadable",e.needReadable,e.emittedReadable),e.needReadable=!1,e.emittedReadable||(c("emitReadable",e.flowing),e.emittedReadable=!0,i.nextTick(A,t))}function A(t){var e=t._readableState;c("emitReadable_",e.destroyed,e.length,e.ended),e.destroyed||!e.length&&!e.ended||(t.emit("readable"),e.emittedReadable=!1),e.needReadable=!e.flowing&&!e.ended&&e.length<=e.highWaterMark,U(t)}function C(t,e){e.readingMore||(e.readingMore=!0,i.nextTick(T,t,e))}function T(t,e){for(;!e.reading&&!e.ended&&(e.length<e.highWaterMark||e.flowing&&0===e.length);){var r=e.length;if(c("maybeReadMore read 0"),t.read(0),r===e.length)break}e.readingMore=!1}function O(t){var e=t._readableState;e.readableListening=t.listenerCount("readable")>0,e.resumeScheduled&&!e.paused?e.flowing=!0:t.listenerCount("data")>0&&t.resume()}function z(t){c("readable nexttick read 0"),t.read(0)}function k(t,e){c("resume",e.reading),e.reading||t.read(0),e.resumeScheduled=!1,t.emit("resume"),U(t),e.flowing&&!e.reading&&t.read(0)}function U(t){var e=t._readableState;for(c("flow",e.flowing);e.flowing&&null!==t.read(););}function R(t,e){return 0===e.length?null:(e.objectMode?r=e.buffer.shift():!t||t>=e.length?(r=e.decoder?e.buffer.join(""):1===e.buffer.length?e.buffer.first():e.buffer.concat(e.length),e.buffer.clear()):r=e.buffer.consume(t,e.decoder),r);var r}function Y(t){var e=t._readableState;c("endReadable",e.endEmitted),e.endEmitted||(e.ended=!0,i.nextTick(B,e,t))}function B(t,e){if(c("endReadableNT",t.endEmitted,t.length),!t.endEmitted&&0===t.length&&(t.endEmitted=!0,e.readable=!1,e.emit("end"),t.autoDestroy)){var r=e._writableState;(!r||r.autoDestroy&&r.finished)&&e.destroy()}}function P(t,e){for(var r=0,n=t.length;r<n;r++)if(t[r]===e)return r;return-1}x.prototype.read=function(t){c("read",t),t=parseInt(t,10);var e=this._readableState,r=t;if(0!==t&&(e.emittedReadable=!1),0===t&&e.needReadable&&((0!==e.highWaterMark?e.length>=e.highWaterMark:e.length>0)||e.ended))return c("read: emitReadable",e.length,e.ended),0===e.length&&e.ended?Y(this):E(this),null;if(0===(t=I(t,e))&&e.ended)return 0===e.length&&Y(this),null;var n,i=e.needReadable;return c("need readable",i),(0===e.length||e.length-t<e.highWaterMark)&&c("length less than watermark",i=!0),e.ended||e.reading?c("reading or ended",i=!1):i&&(c("do read"),e.reading=!0,e.sync=!0,0===e.length&&(e.needReadable=!0),this._read(e.highWaterMark),e.sync=!1,e.reading||(t=I(r,e))),null===(n=t>0?R(t,e):null)?(e.needReadable=e.length<=e.highWaterMark,t=0):(e.length-=t,e.awaitDrain=0),0===e.length&&(e.ended||(e.needReadable=!0),r!==t&&e.ended&&Y(this)),null!==n&&this.emit("data",n),n},x.prototype._read=function(t){m(this,new L("_read()"))},x.prototype.pipe=function(t,e){var r=this,n=this._readableState;switch(n.pipesCount){case 0:n.pipes=t;break;case 1:n.pipes=[n.pipes,t];break;default:n.pipes.push(t)}n.pipesCount+=1,c("pipe count=%d opts=%j",n.pipesCount,e);var s=(!e||!1!==e.end)&&t!==i.stdout&&t!==i.stderr?a:g;function u(e,i){c("onunpipe"),e===r&&i&&!1===i.hasUnpiped&&(i.hasUnpiped=!0,c("cleanup"),t.removeListener("close",d),t.removeListener("finish",y),t.removeListener("drain",f),t.removeListener("error",p),t.removeListener("unpipe",u),r.removeListener("end",a),r.removeListener("end",g),r.removeListener("data",h),l=!0,!n.awaitDrain||t._writableState&&!t._writableState.needDrain||f())}function a(){c("onend"),t.end()}n.endEmitted?i.nextTick(s):r.once("end",s),t.on("unpipe",u);var f=function(t){return function(){var e=t._readableState;c("pipeOnDrain",e.awaitDrain),e.awaitDrain&&e.awaitDrain--,0===e.awaitDrain&&o(t,"data")&&(e.flowing=!0,U(t))}}(r);t.on("drain",f);var l=!1;function h(e){c("ondata");var i=t.write(e);c("dest.write",i),!1===i&&((1===n.pipesCount&&n.pipes===t||n.pipesCount>1&&-1!==P(n.pipes,t))&&!l&&(c("false write response, pause",n.awaitDrain),n.awaitDrain++),r.pause())}function p(e){c("onerror",e),g(),t.removeListener("error",p),0===o(t,"error")&&m(t,e)}function d(){t.removeListener("finish",y),g()}function y(){c("onfinish"),t.removeListener("close",d),g()}function g(){c("unpipe"),r.unpipe(t)}return r.on("data",h),function(t,e,r){if("function"==typeof t.prependListener)return t.prependListener(e,r);t._events&&t._events[e]?Array.isArray(t._events[e])?t._events[e].unshift(r):t._events[e]=[r,t._events[e]]:t.on(e,r)}(t,"error",p),t.once("close",d),t.once("finish",y),t.emit("pipe",r),n.flowing||(c("pipe resume"),r.resume()),t},x.prototype.unpipe=function(t){var e=this._readableState,r={hasUnpiped:!1};if(0===e.pipesCount)return this;if(1===e.pipesCount)return t&&t!==e.pipes||(t||(t=e.pipes),e.pipes=null,e.pipesCount=0,e.flowing=!1,t&&t.emit("unpipe",this,r)),this;if(!t){var n=e.pipes,i=e.pipesCount;e.pipes=null,e.pipesCount=0,e.flowing=!1;for(var o=0;o<i;o++)n[o].emit("unpipe",this,{hasUnpiped:!1});return this}var s=P(e.pipes,t);return-1===s||(e.pipes.splice(s,1),e.pipesCount-=1,1===e.pipesCount&&(e.pipes=e.pipes[0]),t.emit("unpipe",this,r)),this},x.prototype.on=function(t,e){var r=s.prototype.on.call(this,t,e),n=this._readableState;return"data"===t?(n.readableListening=this.listenerCount("readable")>0,!1!==n.flowing&&this.resume()):"readable"===t&&(n.endEmitted||n.readableListening||(n.readableListening=n.needReadable=!0,n.flowing=!1,n.emittedReadable=!1,c("on readable",n.length,n.reading),n.length?E(this):n.reading||i.nextTick(z,this))),r},x.prototype.addListener=x.prototype.on,x.prototype.removeListener=function(t,e){var r=s.prototype.removeListener.call(this,t,e);return"readable"===t&&i.nextTick(O,this),r},x.prototype.removeAllListeners=function(t){var e=s.prototype.removeAllListeners.apply(this,arguments);return"readable"!==t&&void 0!==t||i.nextTick(O,this),e},x.prototype.resume=function(){var t=this._readableState;return t.flowing||(c("resume"),t.flowing=!t.readableListening,function(t,e){e.resumeScheduled||(e.resumeScheduled=!0,i.nextTick(k,t,e))}(this,t)),t.paused=!1,this},x.prototype.pause=function(){return c("call pause flowing=%j",this._readableState.flowing),!1!==this._readableState.flowing&&(c("pause"),this._readableState.flowing=!1,this.emit("pause")),this._readableState.paused=!0,this},x.prototype.wrap=function(t){var e=this,r=this._readableState,n=!1;for(var i in t.on("end",(function(){if(c("wrapped end"),r.decoder&&!r.ended){var t=r.decoder.end();t&&t.length&&e.push(t)}e.push(null)})),t.on("data",(function(i){(c("wrapped data"),r.decoder&&(i=r.decoder.write(i)),r.objectMode&&null==i)||(r.objectMode||i&&i.length)&&(e.push(i)||(n=!0,t.pause()))})),t)void 0===this[i]&&"function"==typeof t[i]&&(this[i]=function(e){return function(){return t[e].apply(t,arguments)}}(i));for(var o=0;o<b.length;o++)t.on(b[o],this.emit.bind(this,b[o]));return this._read=function(e){c("wrapped _read",e),n&&(n=!1,t.resume())},this},"function"==typeof Symbol&&(x.prototype[Symbol.asyncIterator]=function(){return void 0===h&&(h=r(5850)),h(this)}),Object.defineProperty(x.prototype,"readableHighWaterMark",{enumerable:!1,get:function(){return this._readableState.highWaterMark}}),Object.defineProperty(x.prototype,"readableBuffer",{enumerable:!1,get:function(){return this._readableState&&this._readableState.buffer}}),Object.defineProperty(x.prototype,"readableFlowing",{enumerable:!1,get:function(){return this._readableState.flowing},set:function(t){this._readableState&&(this._readableState.flowing=t)}}),x._fromList=R,Object.defineProperty(x.prototype,"readableLength",{enumerable:!1,get:function(){return this._readableState.length}}),"function"==typeof Symbol&&(x.from=function(t,e){return void 0===p&&(p=r(5167)),p(x,t,e)})},4605:(t,e,r)=>{"use strict";t.exports=f;var n=r(4281).q,i=n.ERR_METHOD_NOT_IMPLEMENTED,o=n.ERR_MULTIPLE_CALLBACK,s=n.ERR_TRANSFORM_ALREADY_TRANSFORMING,u=n.ERR_TRANSFORM_WITH_LENGTH_0,a=r(6753);function c(t,e){var r=this._transformState;r.transforming=!1;var n=r.writecb;if(null===n)return this.emit("error",new o);r.writechunk=null,r.writecb=null,null!=e&&this.push(e),n(t);var i=this._readableState;i.reading=!1,(i.needReadable||i.length<i.highWaterMark)&&this._read(i.highWaterMark)}function f(t){if(!(this instanceof f))return new f(t);a.call(this,t),this._transformState={afterTransform:c.bind(this),needTransform:!1,transforming:!1,writecb:null,writechunk:null,writeencoding:null},this._readableState.needReadable=!0,this._readableState.sync=!1,t&&("function"==typeof t.transform&&(this._transform=t.transform),"function"==typeof t.flush&&(this._flush=t.flush)),this.on("prefinish",l)}function l(){var t=this;"function"!=typeof this._flush||this._readableState.destroyed?h(this,null,null):this._flush((function(e,r){h(t,e,r)}))}function h(t,e,r){if(e)return t.emit("error",e);if(null!=r&&t.push(r),t._writableState.length)throw new u;if(t._transformState.transforming)throw new s;return t.push(null)}r(5717)(f,a),f.prototype.push=function(t,e){return this._transformState.needTransform=!1,a.prototype.push.call(this,t,e)},f.prototype._transform=function(t,e,r){r(new i("_transform()"))},f.prototype._write=function(t,e,r){var n=this._transformState;if(n.writecb=r,n.writechunk=t,n.writeencoding=e,!n.transforming){var i=this._readableState;(n.needTransform||i.needReadable||i.length<i.highWaterMark)&&this._read(i.highWaterMark)}},f.prototype._read=function(t){var e=this._transformState;null===e.writechunk||e.transforming?e.needTransform=!0:(e.transforming=!0,this._transform(e.writechunk,e.writeencoding,e.afterTransform))},f.prototype._destroy=function(t,e){a.prototype._destroy.call(this,t,(function(t){e(t)}))}},3982:(t,e,r)=>{"use strict";var n,i=r(4155);function o(t){var e=this;this.next=null,this.entry=null,this.finish=function(){!function(t,e,r){var n=t.entry;t.entry=null;for(;n;){var i=n.callback;e.pendingcb--,i(r),n=n.next}e.corkedRequestsFree.next=t}(e,t)}}t.exports=x,x.WritableState=j;var s={deprecate:r(4927)},u=r(2503),a=r(8764).Buffer,c=r.g.Uint8Array||function(){};var f,l=r(1195),h=r(2457).getHighWaterMark,p=r(4281).q,d=p.ERR_INVALID_ARG_TYPE,y=p.ERR_METHOD_NOT_IMPLEMENTED,g=p.ERR_MULTIPLE_CALLBACK,v=p.ERR_STREAM_CANNOT_PIPE,w=p.ERR_STREAM_DESTROYED,M=p.ERR_STREAM_NULL_VALUES,L=p.ERR_STREAM_WRITE_AFTER_END,_=p.ERR_UNKNOWN_ENCODING,m=l.errorOrDestroy;function b(){}function j(t,e,s){n=n||r(6753),t=t||{},"boolean"!=typeof s&&(s=e instanceof n),this.objectMode=!!t.objectMode,s&&(this.objectMode=this.objectMode||!!t.writableObjectMode),this.highWaterMark=h(this,t,"writableHighWaterMark",s),this.finalCalled=!1,this.needDrain=!1,this.ending=!1,this.ended=!1,this.finished=!1,this.destroyed=!1;var u=!1===t.decodeStrings;this.decodeStrings=!u,this.defaultEncoding=t.defaultEncoding||"utf8",this.length=0,this.writing=!1,this.corked=0,this.sync=!0,this.bufferProcessing=!1,this.onwrite=function(t){!function(t,e){var r=t._writableState,n=r.sync,o=r.writecb;if("function"!=typeof o)throw new g;if(function(t){t.writing=!1,t.writecb=null,t.length-=t.writelen,t.writelen=0}(r),e)!function(t,e,r,n,o){--e.pendingcb,r?(i.nextTick(o,n),i.nextTick(A,t,e),t._writableState.errorEmitted=!0,m(t,n)):(o(n),t._writableState.errorEmitted=!0,m(t,n),A(t,e))}(t,r,n,e,o);else{var s=I(r)||t.destroyed;s||r.corked||r.bufferProcessing||!r.bufferedRequest||D(t,r),n?i.nextTick(S,t,r,s,o):S(t,r,s,o)}}(e,t)},this.writecb=null,this.writelen=0,this.bufferedRequest=null,this.lastBufferedRequest=null,this.pendingcb=0,this.prefinished=!1,this.errorEmitted=!1,this.emitClose=!1!==t.emitClose,this.autoDestroy=!!t.autoDestroy,this.bufferedRequestCount=0,this.corkedRequestsFree=new o(this)}function x(t){var e=this instanceof(n=n||r(6753));if(!e&&!f.call(x,this))return new x(t);this._writableState=new j(t,this,e),this.writable=!0,t&&("function"==typeof t.write&&(this._write=t.write),"function"==typeof t.writev&&(this._writev=t.writev),"function"==typeof t.destroy&&(this._destroy=t.destroy),"function"==typeof t.final&&(this._final=t.final)),u.call(this)}function N(t,e,r,n,i,o,s){e.writelen=n,e.writecb=s,e.writing=!0,e.sync=!0,e.destroyed?e.onwrite(new w("write")):r?t._writev(i,e.onwrite):t._write(i,o,e.onwrite),e.sync=!1}function S(t,e,r,n){r||function(t,e){0===e.length&&e.needDrain&&(e.needDrain=!1,t.emit("drain"))}(t,e),e.pendingcb--,n(),A(t,e)}function D(t,e){e.bufferProcessing=!0;var r=e.bufferedRequest;if(t._writev&&r&&r.next){var n=e.bufferedRequestCount,i=new Array(n),s=e.corkedRequestsFree;s.entry=r;for(var u=0,a=!0;r;)i[u]=r,r.isBuf||(a=!1),r=r.next,u+=1;i.allBuffers=a,N(t,e,!0,e.length,i,"",s.finish),e.pendingcb++,e.lastBufferedRequest=null,s.next?(e.corkedRequestsFree=s.next,s.next=null):e.corkedRequestsFree=new o(e),e.bufferedRequestCount=0}else{for(;r;){var c=r.chunk,f=r.encoding,l=r.callback;if(N(t,e,!1,e.objectMode?1:c.length,c,f,l),r=r.next,e.bufferedRequestCount--,e.writing)break}null===r&&(e.lastBufferedRequest=null)}e.bufferedRequest=r,e.bufferProcessing=!1}function I(t){return t.ending&&0===t.length&&null===t.bufferedRequest&&!t.finished&&!t.writing}function E(t,e){t._final((function(r){e.pendingcb--,r&&m(t,r),e.prefinished=!0,t.emit("prefinish"),A(t,e)}))}function A(t,e){var r=I(e);if(r&&(function(t,e){e.prefinished||e.finalCalled||("function"!=typeof t._final||e.destroyed?(e.prefinished=!0,t.emit("prefinish")):(e.pendingcb++,e.finalCalled=!0,i.nextTick(E,t,e)))}(t,e),0===e.pendingcb&&(e.finished=!0,t.emit("finish"),e.autoDestroy))){var n=t._readableState;(!n||n.autoDestroy&&n.endEmitted)&&t.destroy()}return r}r(5717)(x,u),j.prototype.getBuffer=function(){for(var t=this.bufferedRequest,e=[];t;)e.push(t),t=t.next;return e},function(){try{Object.defineProperty(j.prototype,"buffer",{get:s.deprecate((function(){return this.getBuffer()}),"_writableState.buffer is deprecated. Use _writableState.getBuffer instead.","DEP0003")})}catch(t){}}(),"function"==typeof Symbol&&Symbol.hasInstance&&"function"==typeof Function.prototype[Symbol.hasInstance]?(f=Function.prototype[Symbol.hasInstance],Object.defineProperty(x,Symbol.hasInstance,{value:function(t){return!!f.call(this,t)||this===x&&(t&&t._writableState instanceof j)}})):f=function(t){return t instanceof this},x.prototype.pipe=function(){m(this,new v)},x.prototype.write=function(t,e,r){var n,o=this._writableState,s=!1,u=!o.objectMode&&(n=t,a.isBuffer(n)||n instanceof c);return u&&!a.isBuffer(t)&&(t=function(t){return a.from(t)}(t)),"function"==typeof e&&(r=e,e=null),u?e="buffer":e||(e=o.defaultEncoding),"function"!=typeof r&&(r=b),o.ending?function(t,e){var r=new L;m(t,r),i.nextTick(e,r)}(this,r):(u||function(t,e,r,n){var o;return null===r?o=new M:"string"==typeof r||e.objectMode||(o=new d("chunk",["string","Buffer"],r)),!o||(m(t,o),i.nextTick(n,o),!1)}(this,o,t,r))&&(o.pendingcb++,s=function(t,e,r,n,i,o){if(!r){var s=function(t,e,r){t.objectMode||!1===t.decodeStrings||"string"!=typeof e||(e=a.from(e,r));return e}(e,n,i);n!==s&&(r=!0,i="buffer",n=s)}var u=e.objectMode?1:n.length;e.length+=u;var c=e.length<e.highWaterMark;c||(e.needDrain=!0);if(e.writing||e.corked){var f=e.lastBufferedRequest;e.lastBufferedRequest={chunk:n,encoding:i,isBuf:r,callback:o,next:null},f?f.next=e.lastBufferedRequest:e.bufferedRequest=e.lastBufferedRequest,e.bufferedRequestCount+=1}else N(t,e,!1,u,n,i,o);return c}(this,o,u,t,e,r)),s},x.prototype.cork=function(){this._writableState.corked++},x.prototype.uncork=function(){var t=this._writableState;t.corked&&(t.corked--,t.writing||t.corked||t.bufferProcessing||!t.bufferedRequest||D(this,t))},x.prototype.setDefaultEncoding=function(t){if("string"==typeof t&&(t=t.toLowerCase()),!(["hex","utf8","utf-8","ascii","binary","base64","ucs2","ucs-2","utf16le","utf-16le","raw"].indexOf((t+"").toLowerCase())>-1))throw new _(t);return this._writableState.defaultEncoding=t,this},Object.defineProperty(x.prototype,"writableBuffer",{enumerable:!1,get:function(){return this._writableState&&this._writableState.getBuffer()}}),Object.defineProperty(x.prototype,"writableHighWaterMark",{enumerable:!1,get:function(){return this._writableState.highWaterMark}}),x.prototype._write=function(t,e,r){r(new y("_write()"))},x.prototype._writev=null,x.prototype.end=function(t,e,r){var n=this._writableState;return"function"==typeof t?(r=t,t=null,e=null):"function"==typeof e&&(r=e,e=null),null!=t&&this.write(t,e),n.corked&&(n.corked=1,this.uncork()),n.ending||function(t,e,r){e.ending=!0,A(t,e),r&&(e.finished?i.nextTick(r):t.once("finish",r));e.ended=!0,t.writable=!1}(this,n,r),this},Object.defineProperty(x.prototype,"writableLength",{enumerable:!1,get:function(){return this._writableState.length}}),Object.defineProperty(x.prototype,"destroyed",{enumerable:!1,get:function(){return void 0!==this._writableState&&this._writableState.destroyed},set:function(t){this._writableState&&(this._writableState.destroyed=t)}}),x.prototype.destroy=l.destroy,x.prototype._undestroy=l.undestroy,x.prototype._destroy=function(t,e){e(t)}},5850:(t,e,r)=>{"use strict";var n,i=r(4155);function o(t,e,r){return e in t?Object.defineProperty(t,e,{value:r,enumerable:!0,configurable:!0,writable:!0}):t[e]=r,t}var s=r(8610),u=Symbol("lastResolve"),a=Symbol("lastReject"),c=Symbol("error"),f=Symbol("ended"),l=Symbol("lastPromise"),h=Symbol("handlePromise"),p=Symbol("stream");function d(t,e){return{value:t,done:e}}function y(t){var e=t[u];if(null!==e){var r=t[p].read();null!==r&&(t[l]=null,t[u]=null,t[a]=null,e(d(r,!1)))}}function g(t){i.nextTick(y,t)}var v=Object.getPrototypeOf((function(){})),w=Object.setPrototypeOf((o(n={get stream(){return this[p]},next:function(){var t=this,e=this[c];if(null!==e)return Promise.reject(e);if(this[f])return Promise.resolve(d(void 0,!0));if(this[p].destroyed)return new Promise((function(e,r){i.nextTick((function(){t[c]?r(t[c]):e(d(void 0,!0))}))}));var r,n=this[l];if(n)r=new Promise(function(t,e){return function(r,n){t.then((function(){e[f]?r(d(void 0,!0)):e[h](r,n)}),n)}}(n,this));else{var o=this[p].read();if(null!==o)return Promise.resolve(d(o,!1));r=new Promise(this[h])}return this[l]=r,r}},Symbol.asyncIterator,(function(){return this})),o(n,"return",(function(){var t=this;return new Promise((function(e,r){t[p].destroy(null,(function(t){t?r(t):e(d(void 0,!0))}))}))})),n),v);t.exports=function(t){var e,r=Object.create(w,(o(e={},p,{value:t,writable:!0}),o(e,u,{value:null,writable:!0}),o(e,a,{value:null,writable:!0}),o(e,c,{value:null,writable:!0}),o(e,f,{value:t._readableState.endEmitted,writable:!0}),o(e,h,{value:function(t,e){var n=r[p].read();n?(r[l]=null,r[u]=null,r[a]=null,t(d(n,!1))):(r[u]=t,r[a]=e)},writable:!0}),e));return r[l]=null,s(t,(function(t){if(t&&"ERR_STREAM_PREMATURE_CLOSE"!==t.code){var e=r[a];return null!==e&&(r[l]=null,r[u]=null,r[a]=null,e(t)),void(r[c]=t)}var n=r[u];null!==n&&(r[l]=null,r[u]=null,r[a]=null,n(d(void 0,!0))),r[f]=!0})),t.on("readable",g.bind(null,r)),r}},7327:(t,e,r)=>{"use strict";function n(t,e){var r=Object.keys(t);if(Object.getOwnPropertySymbols){var n=Object.getOwnPropertySymbols(t);e&&(n=n.filter((function(e){return Object.getOwnPropertyDescriptor(t,e).enumerable}))),r.push.apply(r,n)}return r}function i(t,e,r){return e in t?Object.defineProperty(t,e,{value:r,enumerable:!0,configurable:!0,writable:!0}):t[e]=r,t}function o(t,e){for(var r=0;r<e.length;r++){var n=e[r];n.enumerable=n.enumerable||!1,n.configurable=!0,"value"in n&&(n.writable=!0),Object.defineProperty(t,n.key,n)}}var s=r(8764).Buffer,u=r(2361).inspect,a=u&&u.custom||"inspect";t.exports=function(){function t(){!function(t,e){if(!(t instanceof e))throw new TypeError("Cannot call a class as a function")}(this,t),this.head=null,this.tail=null,this.length=0}var e,r,c;return e=t,r=[{key:"push",value:function(t){var e={data:t,next:null};this.length>0?this.tail.next=e:this.head=e,this.tail=e,++this.length}},{key:"unshift",value:function(t){var e={data:t,next:this.head};0===this.length&&(this.tail=e),this.head=e,++this.length}},{key:"shift",value:function(){if(0!==this.length){var t=this.head.data;return 1===this.length?this.head=this.tail=null:this.head=this.head.next,--this.length,t}}},{key:"clear",value:function(){this.head=this.tail=null,this.length=0}},{key:"join",value:function(t){if(0===this.length)return"";for(var e=this.head,r=""+e.data;e=e.next;)r+=t+e.data;return r}},{key:"concat",value:function(t){if(0===this.length)return s.alloc(0);for(var e,r,n,i=s.allocUnsafe(t>>>0),o=this.head,u=0;o;)e=o.data,r=i,n=u,s.prototype.copy.call(e,r,n),u+=o.data.length,o=o.next;return i}},{key:"consume",value:function(t,e){var r;return t<this.head.data.length?(r=this.head.data.slice(0,t),this.head.data=this.head.data.slice(t)):r=t===this.head.data.length?this.shift():e?this._getString(t):this._getBuffer(t),r}},{key:"first",value:function(){return this.head.data}},{key:"_getString",value:function(t){var e=this.head,r=1,n=e.data;for(t-=n.length;e=e.next;){var i=e.data,o=t>i.length?i.length:t;if(o===i.length?n+=i:n+=i.slice(0,t),0==(t-=o)){o===i.length?(++r,e.next?this.head=e.next:this.head=this.tail=null):(this.head=e,e.data=i.slice(o));break}++r}return this.length-=r,n}},{key:"_getBuffer",value:function(t){var e=s.allocUnsafe(t),r=this.head,n=1;for(r.data.copy(e),t-=r.data.length;r=r.next;){var i=r.data,o=t>i.length?i.length:t;if(i.copy(e,e.length-t,0,o),0==(t-=o)){o===i.length?(++n,r.next?this.head=r.next:this.head=this.tail=null):(this.head=r,r.data=i.slice(o));break}++n}return this.length-=n,e}},{key:a,value:function(t,e){return u(this,function(t){for(var e=1;e<arguments.length;e++){var r=null!=arguments[e]?arguments[e]:{};e%2?n(Object(r),!0).forEach((function(e){i(t,e,r[e])})):Object.getOwnPropertyDescriptors?Object.defineProperties(t,Object.getOwnPropertyDescriptors(r)):n(Object(r)).forEach((function(e){Object.defineProperty(t,e,Object.getOwnPropertyDescriptor(r,e))}))}return t}({},e,{depth:0,customInspect:!1}))}}],r&&o(e.prototype,r),c&&o(e,c),t}()},1195:(t,e,r)=>{"use strict";var n=r(4155);function i(t,e){s(t,e),o(t)}function o(t){t._writableState&&!t._writableState.emitClose||t._readableState&&!t._readableState.emitClose||t.emit("close")}function s(t,e){t.emit("error",e)}t.exports={destroy:function(t,e){var r=this,u=this._readableState&&this._readableState.destroyed,a=this._writableState&&this._writableState.destroyed;return u||a?(e?e(t):t&&(this._writableState?this._writableState.errorEmitted||(this._writableState.errorEmitted=!0,n.nextTick(s,this,t)):n.nextTick(s,this,t)),this):(this._readableState&&(this._readableState.destroyed=!0),this._writableState&&(this._writableState.destroyed=!0),this._destroy(t||null,(function(t){!e&&t?r._writableState?r._writableState.errorEmitted?n.nextTick(o,r):(r._writableState.errorEmitted=!0,n.nextTick(i,r,t)):n.nextTick(i,r,t):e?(n.nextTick(o,r),e(t)):n.nextTick(o,r)})),this)},undestroy:function(){this._readableState&&(this._readableState.destroyed=!1,this._readableState.reading=!1,this._readableState.ended=!1,this._readableState.endEmitted=!1),this._writableState&&(this._writableState.destroyed=!1,this._writableState.ended=!1,this._writableState.ending=!1,this._writableState.finalCalled=!1,this._writableState.prefinished=!1,this._writableState.finished=!1,this._writableState.errorEmitted=!1)},errorOrDestroy:function(t,e){var r=t._readableState,n=t._writableState;r&&r.autoDestroy||n&&n.autoDestroy?t.destroy(e):t.emit("error",e)}}},8610:(t,e,r)=>{"use strict";var n=r(4281).q.ERR_STREAM_PREMATURE_CLOSE;function i(){}t.exports=function t(e,r,o){if("function"==typeof r)return t(e,null,r);r||(r={}),o=function(t){var e=!1;return function(){if(!e){e=!0;for(var r=arguments.length,n=new Array(r),i=0;i<r;i++)n[i]=arguments[i];t.apply(this,n)}}}(o||i);var s=r.readable||!1!==r.readable&&e.readable,u=r.writable||!1!==r.writable&&e.writable,a=function(){e.writable||f()},c=e._writableState&&e._writableState.finished,f=function(){u=!1,c=!0,s||o.call(e)},l=e._readableState&&e._readableState.endEmitted,h=function(){s=!1,l=!0,u||o.call(e)},p=function(t){o.call(e,t)},d=function(){var t;return s&&!l?(e._readableState&&e._readableState.ended||(t=new n),o.call(e,t)):u&&!c?(e._writableState&&e._writableState.ended||(t=new n),o.call(e,t)):void 0},y=function(){e.req.on("finish",f)};return!function(t){return t.setHeader&&"function"==typeof t.abort}(e)?u&&!e._writableState&&(e.on("end",a),e.on("close",a)):(e.on("complete",f),e.on("abort",d),e.req?y():e.on("request",y)),e.on("end",h),e.on("finish",f),!1!==r.error&&e.on("error",p),e.on("close",d),function(){e.removeListener("complete",f),e.removeListener("abort",d),e.removeListener("request",y),e.req&&e.req.removeListener("finish",f),e.removeListener("end",a),e.removeListener("close",a),e.removeListener("finish",f),e.removeListener("end",h),e.removeListener("error",p),e.removeListener("close",d)}}},5167:t=>{t.exports=function(){throw new Error("Readable.from is not available in the browser")}},9946:(t,e,r)=>{"use strict";var n;var i=r(4281).q,o=i.ERR_MISSING_ARGS,s=i.ERR_STREAM_DESTROYED;function u(t){if(t)throw t}function a(t,e,i,o){o=function(t){var e=!1;return function(){e||(e=!0,t.apply(void 0,arguments))}}(o);var u=!1;t.on("close",(function(){u=!0})),void 0===n&&(n=r(8610)),n(t,{readable:e,writable:i},(function(t){if(t)return o(t);u=!0,o()}));var a=!1;return function(e){if(!u&&!a)return a=!0,function(t){return t.setHeader&&"function"==typeof t.abort}(t)?t.abort():"function"==typeof t.destroy?t.destroy():void o(e||new s("pipe"))}}function c(t){t()}function f(t,e){return t.pipe(e)}function l(t){return t.length?"function"!=typeof t[t.length-1]?u:t.pop():u}t.exports=function(){for(var t=arguments.length,e=new Array(t),r=0;r<t;r++)e[r]=arguments[r];var n,i=l(e);if(Array.isArray(e[0])&&(e=e[0]),e.length<2)throw new o("streams");var s=e.map((function(t,r){var o=r<e.length-1;return a(t,o,r>0,(function(t){n||(n=t),t&&s.forEach(c),o||(s.forEach(c),i(n))}))}));return e.reduce(f)}},2457:(t,e,r)=>{"use strict";var n=r(4281).q.ERR_INVALID_OPT_VALUE;t.exports={getHighWaterMark:function(t,e,r,i){var o=function(t,e,r){return null!=t.highWaterMark?t.highWaterMark:e?t[r]:null}(e,i,r);if(null!=o){if(!isFinite(o)||Math.floor(o)!==o||o<0)throw new n(i?r:"highWaterMark",o);return Math.floor(o)}return t.objectMode?16:16384}}},2503:(t,e,r)=>{t.exports=r(7187).EventEmitter},697:(t,e,r)=>{const n=r(6245),i=r(504),o=r(4992),s=r(2407);t.exports=t=>{var e,r,u=0,a={type:i.ROOT,stack:[]},c=a,f=a.stack,l=[],h=e=>{n.error(t,"Nothing to repeat at column "+(e-1))},p=n.strToChars(t);for(e=p.length;u<e;)switch(r=p[u++]){case"\\":switch(r=p[u++]){case"b":f.push(s.wordBoundary());break;case"B":f.push(s.nonWordBoundary());break;case"w":f.push(o.words());break;case"W":f.push(o.notWords());break;case"d":f.push(o.ints());break;case"D":f.push(o.notInts());break;case"s":f.push(o.whitespace());break;case"S":f.push(o.notWhitespace());break;default:/\d/.test(r)?f.push({type:i.REFERENCE,value:parseInt(r,10)}):f.push({type:i.CHAR,value:r.charCodeAt(0)})}break;case"^":f.push(s.begin());break;case"$":f.push(s.end());break;case"[":var d;"^"===p[u]?(d=!0,u++):d=!1;var y=n.tokenizeClass(p.slice(u),t);u+=y[1],f.push({type:i.SET,set:y[0],not:d});break;case".":f.push(o.anyChar());break;case"(":var g={type:i.GROUP,stack:[],remember:!0};"?"===(r=p[u])&&(r=p[u+1],u+=2,"="===r?g.followedBy=!0:"!"===r?g.notFollowedBy=!0:":"!==r&&n.error(t,`Invalid group, character '${r}' after '?' at column `+(u-1)),g.remember=!1),f.push(g),l.push(c),c=g,f=g.stack;break;case")":0===l.length&&n.error(t,"Unmatched ) at column "+(u-1)),f=(c=l.pop()).options?c.options[c.options.length-1]:c.stack;break;case"|":c.options||(c.options=[c.stack],delete c.stack);var v=[];c.options.push(v),f=v;break;case"{":var w,M,L=/^(\d+)(,(\d+)?)?\}/.exec(p.slice(u));null!==L?(0===f.length&&h(u),w=parseInt(L[1],10),M=L[2]?L[3]?parseInt(L[3],10):1/0:w,u+=L[0].length,f.push({type:i.REPETITION,min:w,max:M,value:f.pop()})):f.push({type:i.CHAR,value:123});break;case"?":0===f.length&&h(u),f.push({type:i.REPETITION,min:0,max:1,value:f.pop()});break;case"+":0===f.length&&h(u),f.push({type:i.REPETITION,min:1,max:1/0,value:f.pop()});break;case"*":0===f.length&&h(u),f.push({type:i.REPETITION,min:0,max:1/0,value:f.pop()});break;default:f.push({type:i.CHAR,value:r.charCodeAt(0)})}return 0!==l.length&&n.error(t,"Unterminated group"),a},t.exports.types=i},2407:(t,e,r)=>{const n=r(504);e.wordBoundary=()=>({type:n.POSITION,value:"b"}),e.nonWordBoundary=()=>({type:n.POSITION,value:"B"}),e.begin=()=>({type:n.POSITION,value:"^"}),e.end=()=>({type:n.POSITION,value:"$"})},4992:(t,e,r)=>{const n=r(504),i=()=>[{type:n.RANGE,from:48,to:57}],o=()=>[{type:n.CHAR,value:95},{type:n.RANGE,from:97,to:122},{type:n.RANGE,from:65,to:90}].concat(i()),s=()=>[{type:n.CHAR,value:9},{type:n.CHAR,value:10},{type:n.CHAR,value:11},{type:n.CHAR,value:12},{type:n.CHAR,value:13},{type:n.CHAR,value:32},{type:n.CHAR,value:160},{type:n.CHAR,value:5760},{type:n.RANGE,from:8192,to:8202},{type:n.CHAR,value:8232},{type:n.CHAR,value:8233},{type:n.CHAR,value:8239},{type:n.CHAR,value:8287},{type:n.CHAR,value:12288},{type:n.CHAR,value:65279}];e.words=()=>({type:n.SET,set:o(),not:!1}),e.notWords=()=>({type:n.SET,set:o(),not:!0}),e.ints=()=>({type:n.SET,set:i(),not:!1}),e.notInts=()=>({type:n.SET,set:i(),not:!0}),e.whitespace=()=>({type:n.SET,set:s(),not:!1}),e.notWhitespace=()=>({type:n.SET,set:s(),not:!0}),e.anyChar=()=>({type:n.SET,set:[{type:n.CHAR,value:10},{type:n.CHAR,value:13},{type:n.CHAR,value:8232},{type:n.CHAR,value:8233}],not:!0})},504:t=>{t.exports={ROOT:0,GROUP:1,POSITION:2,SET:3,RANGE:4,REPETITION:5,REFERENCE:6,CHAR:7}},6245:(t,e,r)=>{const n=r(504),i=r(4992),o={0:0,t:9,n:10,v:11,f:12,r:13};e.strToChars=function(t){return t=t.replace(/(\[\\b\])|(\\)?\\(?:u([A-F0-9]{4})|x([A-F0-9]{2})|(0?[0-7]{2})|c([@A-Z[\\\]^?])|([0tnvfr]))/g,(function(t,e,r,n,i,s,u,a){if(r)return t;var c=e?8:n?parseInt(n,16):i?parseInt(i,16):s?parseInt(s,8):u?"@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^ ?".indexOf(u):o[a],f=String.fromCharCode(c);return/[[\]{}^$.|?*+()]/.test(f)&&(f="\\"+f),f}))},e.tokenizeClass=(t,r)=>{for(var o,s,u=[],a=/\\(?:(w)|(d)|(s)|(W)|(D)|(S))|((?:(?:\\)(.)|([^\]\\]))-(?:\\)?([^\]]))|(\])|(?:\\)?([^])/g;null!=(o=a.exec(t));)if(o[1])u.push(i.words());else if(o[2])u.push(i.ints());else if(o[3])u.push(i.whitespace());else if(o[4])u.push(i.notWords());else if(o[5])u.push(i.notInts());else if(o[6])u.push(i.notWhitespace());else if(o[7])u.push({type:n.RANGE,from:(o[8]||o[9]).charCodeAt(0),to:o[10].charCodeAt(0)});else{if(!(s=o[12]))return[u,a.lastIndex];u.push({type:n.CHAR,value:s.charCodeAt(0)})}e.error(r,"Unterminated character class")},e.error=(t,e)=>{throw new SyntaxError("Invalid regular expression: /"+t+"/: "+e)}},4189:(t,e,r)=>{var n=r(396).Buffer;function i(t,e){this._block=n.alloc(t),this._finalSize=e,this._blockSize=t,this._len=0}i.prototype.update=function(t,e){"string"==typeof t&&(e=e||"utf8",t=n.from(t,e));for(var r=this._block,i=this._blockSize,o=t.length,s=this._len,u=0;u<o;){for(var a=s%i,c=Math.min(o-u,i-a),f=0;f<c;f++)r[a+f]=t[u+f];u+=c,(s+=c)%i==0&&this._update(r)}return this._len+=o,this},i.prototype.digest=function(t){var e=this._len%this._blockSize;this._block[e]=128,this._block.fill(0,e+1),e>=this._finalSize&&(this._update(this._block),this._block.fill(0));var r=8*this._len;if(r<=4294967295)this._block.writeUInt32BE(r,this._blockSize-4);else{var n=(4294967295&r)>>>0,i=(r-n)/4294967296;this._block.writeUInt32BE(i,this._blockSize-8),this._block.writeUInt32BE(n,this._blockSize-4)}this._update(this._block);var o=this._hash();return t?o.toString(t):o},i.prototype._update=function(){throw new Error("_update must be implemented by subclass")},t.exports=i},9072:(t,e,r)=>{var n=t.exports=function(t){t=t.toLowerCase();var e=n[t];if(!e)throw new Error(t+" is not supported (we accept pull requests)");return new e};n.sha=r(4448),n.sha1=r(8336),n.sha224=r(8432),n.sha256=r(7499),n.sha384=r(1686),n.sha512=r(8862)},4448:(t,e,r)=>{var n=r(5717),i=r(4189),o=r(396).Buffer,s=[1518500249,1859775393,-1894007588,-899497514],u=new Array(80);function a(){this.init(),this._w=u,i.call(this,64,56)}function c(t){return t<<30|t>>>2}function f(t,e,r,n){return 0===t?e&r|~e&n:2===t?e&r|e&n|r&n:e^r^n}n(a,i),a.prototype.init=function(){return this._a=1732584193,this._b=4023233417,this._c=2562383102,this._d=271733878,this._e=3285377520,this},a.prototype._update=function(t){for(var e,r=this._w,n=0|this._a,i=0|this._b,o=0|this._c,u=0|this._d,a=0|this._e,l=0;l<16;++l)r[l]=t.readInt32BE(4*l);for(;l<80;++l)r[l]=r[l-3]^r[l-8]^r[l-14]^r[l-16];for(var h=0;h<80;++h){var p=~~(h/20),d=0|((e=n)<<5|e>>>27)+f(p,i,o,u)+a+r[h]+s[p];a=u,u=o,o=c(i),i=n,n=d}this._a=n+this._a|0,this._b=i+this._b|0,this._c=o+this._c|0,this._d=u+this._d|0,this._e=a+this._e|0},a.prototype._hash=function(){var t=o.allocUnsafe(20);return t.writeInt32BE(0|this._a,0),t.writeInt32BE(0|this._b,4),t.writeInt32BE(0|this._c,8),t.writeInt32BE(0|this._d,12),t.writeInt32BE(0|this._e,16),t},t.exports=a},8336:(t,e,r)=>{var n=r(5717),i=r(4189),o=r(396).Buffer,s=[1518500249,1859775393,-1894007588,-899497514],u=new Array(80);function a(){this.init(),this._w=u,i.call(this,64,56)}function c(t){return t<<5|t>>>27}function f(t){return t<<30|t>>>2}function l(t,e,r,n){return 0===t?e&r|~e&n:2===t?e&r|e&n|r&n:e^r^n}n(a,i),a.prototype.init=function(){return this._a=1732584193,this._b=4023233417,this._c=2562383102,this._d=271733878,this._e=3285377520,this},a.prototype._update=function(t){for(var e,r=this._w,n=0|this._a,i=0|this._b,o=0|this._c,u=0|this._d,a=0|this._e,h=0;h<16;++h)r[h]=t.readInt32BE(4*h);for(;h<80;++h)r[h]=(e=r[h-3]^r[h-8]^r[h-14]^r[h-16])<<1|e>>>31;for(var p=0;p<80;++p){var d=~~(p/20),y=c(n)+l(d,i,o,u)+a+r[p]+s[d]|0;a=u,u=o,o=f(i),i=n,n=y}this._a=n+this._a|0,this._b=i+this._b|0,this._c=o+this._c|0,this._d=u+this._d|0,this._e=a+this._e|0},a.prototype._hash=function(){var t=o.allocUnsafe(20);return t.writeInt32BE(0|this._a,0),t.writeInt32BE(0|this._b,4),t.writeInt32BE(0|this._c,8),t.writeInt32BE(0|this._d,12),t.writeInt32BE(0|this._e,16),t},t.exports=a},8432:(t,e,r)=>{var n=r(5717),i=r(7499),o=r(4189),s=r(396).Buffer,u=new Array(64);function a(){this.init(),this._w=u,o.call(this,64,56)}n(a,i),a.prototype.init=function(){return this._a=3238371032,this._b=914150663,this._c=812702999,this._d=4144912697,this._e=4290775857,this._f=1750603025,this._g=1694076839,this._h=3204075428,this},a.prototype._hash=function(){var t=s.allocUnsafe(28);return t.writeInt32BE(this._a,0),t.writeInt32BE(this._b,4),t.writeInt32BE(this._c,8),t.writeInt32BE(this._d,12),t.writeInt32BE(this._e,16),t.writeInt32BE(this._f,20),t.writeInt32BE(this._g,24),t},t.exports=a},7499:(t,e,r)=>{var n=r(5717),i=r(4189),o=r(396).Buffer,s=[1116352408,1899447441,3049323471,3921009573,961987163,1508970993,2453635748,2870763221,3624381080,310598401,607225278,1426881987,1925078388,2162078206,2614888103,3248222580,3835390401,4022224774,264347078,604807628,770255983,1249150122,1555081692,1996064986,2554220882,2821834349,2952996808,3210313671,3336571891,3584528711,113926993,338241895,666307205,773529912,1294757372,1396182291,1695183700,1986661051,2177026350,2456956037,2730485921,2820302411,3259730800,3345764771,3516065817,3600352804,4094571909,275423344,430227734,506948616,659060556,883997877,958139571,1322822218,1537002063,1747873779,1955562222,2024104815,2227730452,2361852424,2428436474,2756734187,3204031479,3329325298],u=new Array(64);function a(){this.init(),this._w=u,i.call(this,64,56)}function c(t,e,r){return r^t&(e^r)}function f(t,e,r){return t&e|r&(t|e)}function l(t){return(t>>>2|t<<30)^(t>>>13|t<<19)^(t>>>22|t<<10)}function h(t){return(t>>>6|t<<26)^(t>>>11|t<<21)^(t>>>25|t<<7)}function p(t){return(t>>>7|t<<25)^(t>>>18|t<<14)^t>>>3}n(a,i),a.prototype.init=function(){return this._a=1779033703,this._b=3144134277,this._c=1013904242,this._d=2773480762,this._e=1359893119,this._f=2600822924,this._g=528734635,this._h=1541459225,this},a.prototype._update=function(t){for(var e,r=this._w,n=0|this._a,i=0|this._b,o=0|this._c,u=0|this._d,a=0|this._e,d=0|this._f,y=0|this._g,g=0|this._h,v=0;v<16;++v)r[v]=t.readInt32BE(4*v);for(;v<64;++v)r[v]=0|(((e=r[v-2])>>>17|e<<15)^(e>>>19|e<<13)^e>>>10)+r[v-7]+p(r[v-15])+r[v-16];for(var w=0;w<64;++w){var M=g+h(a)+c(a,d,y)+s[w]+r[w]|0,L=l(n)+f(n,i,o)|0;g=y,y=d,d=a,a=u+M|0,u=o,o=i,i=n,n=M+L|0}this._a=n+this._a|0,this._b=i+this._b|0,this._c=o+this._c|0,this._d=u+this._d|0,this._e=a+this._e|0,this._f=d+this._f|0,this._g=y+this._g|0,this._h=g+this._h|0},a.prototype._hash=function(){var t=o.allocUnsafe(32);return t.writeInt32BE(this._a,0),t.writeInt32BE(this._b,4),t.writeInt32BE(this._c,8),t.writeInt32BE(this._d,12),t.writeInt32BE(this._e,16),t.writeInt32BE(this._f,20),t.writeInt32BE(this._g,24),t.writeInt32BE(this._h,28),t},t.exports=a},1686:(t,e,r)=>{var n=r(5717),i=r(8862),o=r(4189),s=r(396).Buffer,u=new Array(160);function a(){this.init(),this._w=u,o.call(this,128,112)}n(a,i),a.prototype.init=function(){return this._ah=3418070365,this._bh=1654270250,this._ch=2438529370,this._dh=355462360,this._eh=1731405415,this._fh=2394180231,this._gh=3675008525,this._hh=1203062813,this._al=3238371032,this._bl=914150663,this._cl=812702999,this._dl=4144912697,this._el=4290775857,this._fl=1750603025,this._gl=1694076839,this._hl=3204075428,this},a.prototype._hash=function(){var t=s.allocUnsafe(48);function e(e,r,n){t.writeInt32BE(e,n),t.writeInt32BE(r,n+4)}return e(this._ah,this._al,0),e(this._bh,this._bl,8),e(this._ch,this._cl,16),e(this._dh,this._dl,24),e(this._eh,this._el,32),e(this._fh,this._fl,40),t},t.exports=a},8862:(t,e,r)=>{var n=r(5717),i=r(4189),o=r(396).Buffer,s=[1116352408,3609767458,1899447441,602891725,3049323471,3964484399,3921009573,2173295548,961987163,4081628472,1508970993,3053834265,2453635748,2937671579,2870763221,3664609560,3624381080,2734883394,310598401,1164996542,607225278,1323610764,1426881987,3590304994,1925078388,4068182383,2162078206,991336113,2614888103,633803317,3248222580,3479774868,3835390401,2666613458,4022224774,944711139,264347078,2341262773,604807628,2007800933,770255983,1495990901,1249150122,1856431235,1555081692,3175218132,1996064986,2198950837,2554220882,3999719339,2821834349,766784016,2952996808,2566594879,3210313671,3203337956,3336571891,1034457026,3584528711,2466948901,113926993,3758326383,338241895,168717936,666307205,1188179964,773529912,1546045734,1294757372,1522805485,1396182291,2643833823,1695183700,2343527390,1986661051,1014477480,2177026350,1206759142,2456956037,344077627,2730485921,1290863460,2820302411,3158454273,3259730800,3505952657,3345764771,106217008,3516065817,3606008344,3600352804,1432725776,4094571909,1467031594,275423344,851169720,430227734,3100823752,506948616,1363258195,659060556,3750685593,883997877,3785050280,958139571,3318307427,1322822218,3812723403,1537002063,2003034995,1747873779,3602036899,1955562222,1575990012,2024104815,1125592928,2227730452,2716904306,2361852424,442776044,2428436474,593698344,2756734187,3733110249,3204031479,2999351573,3329325298,3815920427,3391569614,3928383900,3515267271,566280711,3940187606,3454069534,4118630271,4000239992,116418474,1914138554,174292421,2731055270,289380356,3203993006,460393269,320620315,685471733,587496836,852142971,1086792851,1017036298,365543100,1126000580,2618297676,1288033470,3409855158,1501505948,4234509866,1607167915,987167468,1816402316,1246189591],u=new Array(160);function a(){this.init(),this._w=u,i.call(this,128,112)}function c(t,e,r){return r^t&(e^r)}function f(t,e,r){return t&e|r&(t|e)}function l(t,e){return(t>>>28|e<<4)^(e>>>2|t<<30)^(e>>>7|t<<25)}function h(t,e){return(t>>>14|e<<18)^(t>>>18|e<<14)^(e>>>9|t<<23)}function p(t,e){return(t>>>1|e<<31)^(t>>>8|e<<24)^t>>>7}function d(t,e){return(t>>>1|e<<31)^(t>>>8|e<<24)^(t>>>7|e<<25)}function y(t,e){return(t>>>19|e<<13)^(e>>>29|t<<3)^t>>>6}function g(t,e){return(t>>>19|e<<13)^(e>>>29|t<<3)^(t>>>6|e<<26)}function v(t,e){return t>>>0<e>>>0?1:0}n(a,i),a.prototype.init=function(){return this._ah=1779033703,this._bh=3144134277,this._ch=1013904242,this._dh=2773480762,this._eh=1359893119,this._fh=2600822924,this._gh=528734635,this._hh=1541459225,this._al=4089235720,this._bl=2227873595,this._cl=4271175723,this._dl=1595750129,this._el=2917565137,this._fl=725511199,this._gl=4215389547,this._hl=327033209,this},a.prototype._update=function(t){for(var e=this._w,r=0|this._ah,n=0|this._bh,i=0|this._ch,o=0|this._dh,u=0|this._eh,a=0|this._fh,w=0|this._gh,M=0|this._hh,L=0|this._al,_=0|this._bl,m=0|this._cl,b=0|this._dl,j=0|this._el,x=0|this._fl,N=0|this._gl,S=0|this._hl,D=0;D<32;D+=2)e[D]=t.readInt32BE(4*D),e[D+1]=t.readInt32BE(4*D+4);for(;D<160;D+=2){var I=e[D-30],E=e[D-30+1],A=p(I,E),C=d(E,I),T=y(I=e[D-4],E=e[D-4+1]),O=g(E,I),z=e[D-14],k=e[D-14+1],U=e[D-32],R=e[D-32+1],Y=C+k|0,B=A+z+v(Y,C)|0;B=(B=B+T+v(Y=Y+O|0,O)|0)+U+v(Y=Y+R|0,R)|0,e[D]=B,e[D+1]=Y}for(var P=0;P<160;P+=2){B=e[P],Y=e[P+1];var Q=f(r,n,i),F=f(L,_,m),G=l(r,L),W=l(L,r),q=h(u,j),H=h(j,u),J=s[P],$=s[P+1],Z=c(u,a,w),V=c(j,x,N),X=S+H|0,K=M+q+v(X,S)|0;K=(K=(K=K+Z+v(X=X+V|0,V)|0)+J+v(X=X+$|0,$)|0)+B+v(X=X+Y|0,Y)|0;var tt=W+F|0,et=G+Q+v(tt,W)|0;M=w,S=N,w=a,N=x,a=u,x=j,u=o+K+v(j=b+X|0,b)|0,o=i,b=m,i=n,m=_,n=r,_=L,r=K+et+v(L=X+tt|0,X)|0}this._al=this._al+L|0,this._bl=this._bl+_|0,this._cl=this._cl+m|0,this._dl=this._dl+b|0,this._el=this._el+j|0,this._fl=this._fl+x|0,this._gl=this._gl+N|0,this._hl=this._hl+S|0,this._ah=this._ah+r+v(this._al,L)|0,this._bh=this._bh+n+v(this._bl,_)|0,this._ch=this._ch+i+v(this._cl,m)|0,this._dh=this._dh+o+v(this._dl,b)|0,this._eh=this._eh+u+v(this._el,j)|0,this._fh=this._fh+a+v(this._fl,x)|0,this._gh=this._gh+w+v(this._gl,N)|0,this._hh=this._hh+M+v(this._hl,S)|0},a.prototype._hash=function(){var t=o.allocUnsafe(64);function e(e,r,n){t.writeInt32BE(e,n),t.writeInt32BE(r,n+4)}return e(this._ah,this._al,0),e(this._bh,this._bl,8),e(this._ch,this._cl,16),e(this._dh,this._dl,24),e(this._eh,this._el,32),e(this._fh,this._fl,40),e(this._gh,this._gl,48),e(this._hh,this._hl,56),t},t.exports=a},2830:(t,e,r)=>{t.exports=i;var n=r(7187).EventEmitter;function i(){n.call(this)}r(5717)(i,n),i.Readable=r(9481),i.Writable=r(3982),i.Duplex=r(6753),i.Transform=r(4605),i.PassThrough=r(2725),i.finished=r(8610),i.pipeline=r(9946),i.Stream=i,i.prototype.pipe=function(t,e){var r=this;function i(e){t.writable&&!1===t.write(e)&&r.pause&&r.pause()}function o(){r.readable&&r.resume&&r.resume()}r.on("data",i),t.on("drain",o),t._isStdio||e&&!1===e.end||(r.on("end",u),r.on("close",a));var s=!1;function u(){s||(s=!0,t.end())}function a(){s||(s=!0,"function"==typeof t.destroy&&t.destroy())}function c(t){if(f(),0===n.listenerCount(this,"error"))throw t}function f(){r.removeListener("data",i),t.removeListener("drain",o),r.removeListener("end",u),r.removeListener("close",a),r.removeListener("error",c),t.removeListener("error",c),r.removeListener("end",f),r.removeListener("close",f),t.removeListener("close",f)}return r.on("error",c),t.on("error",c),r.on("end",f),r.on("close",f),t.on("close",f),t.emit("pipe",r),t}},2553:(t,e,r)=>{"use strict";var n=r(396).Buffer,i=n.isEncoding||function(t){switch((t=""+t)&&t.toLowerCase()){case"hex":case"utf8":case"utf-8":case"ascii":case"binary":case"base64":case"ucs2":case"ucs-2":case"utf16le":case"utf-16le":case"raw":return!0;default:return!1}};function o(t){var e;switch(this.encoding=function(t){var e=function(t){if(!t)return"utf8";for(var e;;)switch(t){case"utf8":case"utf-8":return"utf8";case"ucs2":case"ucs-2":case"utf16le":case"utf-16le":return"utf16le";case"latin1":case"binary":return"latin1";case"base64":case"ascii":case"hex":return t;default:if(e)return;t=(""+t).toLowerCase(),e=!0}}(t);if("string"!=typeof e&&(n.isEncoding===i||!i(t)))throw new Error("Unknown encoding: "+t);return e||t}(t),this.encoding){case"utf16le":this.text=a,this.end=c,e=4;break;case"utf8":this.fillLast=u,e=4;break;case"base64":this.text=f,this.end=l,e=3;break;default:return this.write=h,void(this.end=p)}this.lastNeed=0,this.lastTotal=0,this.lastChar=n.allocUnsafe(e)}function s(t){return t<=127?0:t>>5==6?2:t>>4==14?3:t>>3==30?4:t>>6==2?-1:-2}function u(t){var e=this.lastTotal-this.lastNeed,r=function(t,e,r){if(128!=(192&e[0]))return t.lastNeed=0,"�";if(t.lastNeed>1&&e.length>1){if(128!=(192&e[1]))return t.lastNeed=1,"�";if(t.lastNeed>2&&e.length>2&&128!=(192&e[2]))return t.lastNeed=2,"�"}}(this,t);return void 0!==r?r:this.lastNeed<=t.length?(t.copy(this.lastChar,e,0,this.lastNeed),this.lastChar.toString(this.encoding,0,this.lastTotal)):(t.copy(this.lastChar,e,0,t.length),void(this.lastNeed-=t.length))}function a(t,e){if((t.length-e)%2==0){var r=t.toString("utf16le",e);if(r){var n=r.charCodeAt(r.length-1);if(n>=55296&&n<=56319)return this.lastNeed=2,this.lastTotal=4,this.lastChar[0]=t[t.length-2],this.lastChar[1]=t[t.length-1],r.slice(0,-1)}return r}return this.lastNeed=1,this.lastTotal=2,this.lastChar[0]=t[t.length-1],t.toString("utf16le",e,t.length-1)}function c(t){var e=t&&t.length?this.write(t):"";if(this.lastNeed){var r=this.lastTotal-this.lastNeed;return e+this.lastChar.toString("utf16le",0,r)}return e}function f(t,e){var r=(t.length-e)%3;return 0===r?t.toString("base64",e):(this.lastNeed=3-r,this.lastTotal=3,1===r?this.lastChar[0]=t[t.length-1]:(this.lastChar[0]=t[t.length-2],this.lastChar[1]=t[t.length-1]),t.toString("base64",e,t.length-r))}function l(t){var e=t&&t.length?this.write(t):"";return this.lastNeed?e+this.lastChar.toString("base64",0,3-this.lastNeed):e}function h(t){return t.toString(this.encoding)}function p(t){return t&&t.length?this.write(t):""}e.s=o,o.prototype.write=function(t){if(0===t.length)return"";var e,r;if(this.lastNeed){if(void 0===(e=this.fillLast(t)))return"";r=this.lastNeed,this.lastNeed=0}else r=0;return r<t.length?e?e+this.text(t,r):this.text(t,r):e||""},o.prototype.end=function(t){var e=t&&t.length?this.write(t):"";return this.lastNeed?e+"�":e},o.prototype.text=function(t,e){var r=function(t,e,r){var n=e.length-1;if(n<r)return 0;var i=s(e[n]);if(i>=0)return i>0&&(t.lastNeed=i-1),i;if(--n<r||-2===i)return 0;if((i=s(e[n]))>=0)return i>0&&(t.lastNeed=i-2),i;if(--n<r||-2===i)return 0;if((i=s(e[n]))>=0)return i>0&&(2===i?i=0:t.lastNeed=i-3),i;return 0}(this,t,e);if(!this.lastNeed)return t.toString("utf8",e);this.lastTotal=r;var n=t.length-(r-this.lastNeed);return t.copy(this.lastChar,0,n),t.toString("utf8",e,n)},o.prototype.fillLast=function(t){if(this.lastNeed<=t.length)return t.copy(this.lastChar,this.lastTotal-this.lastNeed,0,this.lastNeed),this.lastChar.toString(this.encoding,0,this.lastTotal);t.copy(this.lastChar,this.lastTotal-this.lastNeed,0,t.length),this.lastNeed-=t.length}},396:(t,e,r)=>{var n=r(8764),i=n.Buffer;function o(t,e){for(var r in t)e[r]=t[r]}function s(t,e,r){return i(t,e,r)}i.from&&i.alloc&&i.allocUnsafe&&i.allocUnsafeSlow?t.exports=n:(o(n,e),e.Buffer=s),s.prototype=Object.create(i.prototype),o(i,s),s.from=function(t,e,r){if("number"==typeof t)throw new TypeError("Argument must not be a number");return i(t,e,r)},s.alloc=function(t,e,r){if("number"!=typeof t)throw new TypeError("Argument must be a number");var n=i(t);return void 0!==e?"string"==typeof r?n.fill(e,r):n.fill(e):n.fill(0),n},s.allocUnsafe=function(t){if("number"!=typeof t)throw new TypeError("Argument must be a number");return i(t)},s.allocUnsafeSlow=function(t){if("number"!=typeof t)throw new TypeError("Argument must be a number");return n.SlowBuffer(t)}},4927:(t,e,r)=>{function n(t){try{if(!r.g.localStorage)return!1}catch(t){return!1}var e=r.g.localStorage[t];return null!=e&&"true"===String(e).toLowerCase()}t.exports=function(t,e){if(n("noDeprecation"))return t;var r=!1;return function(){if(!r){if(n("throwDeprecation"))throw new Error(e);n("traceDeprecation")?console.trace(e):console.warn(e),r=!0}return t.apply(this,arguments)}}},255:t=>{var e={"&":"&amp;",'"':"&quot;","'":"&apos;","<":"&lt;",">":"&gt;"};t.exports=function(t){return t&&t.replace?t.replace(/([&"<>'])/g,(function(t,r){return e[r]})):t}},3479:(t,e,r)=>{var n=r(4155),i=r(255),o=r(2830).Stream;function s(t,e,r){r=r||0;var n,o,u=(n=e,new Array(r||0).join(n||"")),a=t;if("object"==typeof t&&((a=t[o=Object.keys(t)[0]])&&a._elem))return a._elem.name=o,a._elem.icount=r,a._elem.indent=e,a._elem.indents=u,a._elem.interrupt=a,a._elem;var c,f=[],l=[];function h(t){Object.keys(t).forEach((function(e){f.push(function(t,e){return t+'="'+i(e)+'"'}(e,t[e]))}))}switch(typeof a){case"object":if(null===a)break;a._attr&&h(a._attr),a._cdata&&l.push(("<![CDATA["+a._cdata).replace(/\]\]>/g,"]]]]><![CDATA[>")+"]]>"),a.forEach&&(c=!1,l.push(""),a.forEach((function(t){"object"==typeof t?"_attr"==Object.keys(t)[0]?h(t._attr):l.push(s(t,e,r+1)):(l.pop(),c=!0,l.push(i(t)))})),c||l.push(""));break;default:l.push(i(a))}return{name:o,interrupt:!1,attributes:f,content:l,icount:r,indents:u,indent:e}}function u(t,e,r){if("object"!=typeof e)return t(!1,e);var n=e.interrupt?1:e.content.length;function i(){for(;e.content.length;){var i=e.content.shift();if(void 0!==i){if(o(i))return;u(t,i)}}t(!1,(n>1?e.indents:"")+(e.name?"</"+e.name+">":"")+(e.indent&&!r?"\n":"")),r&&r()}function o(e){return!!e.interrupt&&(e.interrupt.append=t,e.interrupt.end=i,e.interrupt=!1,t(!0),!0)}if(t(!1,e.indents+(e.name?"<"+e.name:"")+(e.attributes.length?" "+e.attributes.join(" "):"")+(n?e.name?">":"":e.name?"/>":"")+(e.indent&&n>1?"\n":"")),!n)return t(!1,e.indent?"\n":"");o(e)||i()}t.exports=function(t,e){"object"!=typeof e&&(e={indent:e});var r,i,a=e.stream?new o:null,c="",f=!1,l=e.indent?!0===e.indent?"    ":e.indent:"",h=!0;function p(t){h?n.nextTick(t):t()}function d(t,e){if(void 0!==e&&(c+=e),t&&!f&&(a=a||new o,f=!0),t&&f){var r=c;p((function(){a.emit("data",r)})),c=""}}function y(t,e){u(d,s(t,l,l?1:0),e)}function g(){if(a){var t=c;p((function(){a.emit("data",t),a.emit("end"),a.readable=!1,a.emit("close")}))}}return p((function(){h=!1})),e.declaration&&(r=e.declaration,i={version:"1.0",encoding:r.encoding||"UTF-8"},r.standalone&&(i.standalone=r.standalone),y({"?xml":{_attr:i}}),c=c.replace("/>","?>")),t&&t.forEach?t.forEach((function(e,r){var n;r+1===t.length&&(n=g),y(e,n)})):y(t,g),a?(a.readable=!0,a):c},t.exports.element=t.exports.Element=function(){var t=Array.prototype.slice.call(arguments),e={_elem:s(t),push:function(t){if(!this.append)throw new Error("not assigned to a parent!");var e=this,r=this._elem.indent;u(this.append,s(t,r,this._elem.icount+(r?1:0)),(function(){e.append(!0)}))},close:function(t){void 0!==t&&this.push(t),this.end&&this.end()}};return e}},5996:t=>{"use strict";t.exports="data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHhtbG5zOnhsaW5rPSJodHRwOi8vd3d3LnczLm9yZy8xOTk5L3hsaW5rIiB2aWV3Qm94PSIwIDAgNDA3IDExNiI+DQogIDxkZWZzPg0KICAgIDxzdHlsZT4NCiAgICAgIC5jbHMtMSB7DQogICAgICAgIGNsaXAtcGF0aDogdXJsKCNjbGlwLVNXX1RNLWxvZ28tb24tZGFyayk7DQogICAgICB9DQoNCiAgICAgIC5jbHMtMiB7DQogICAgICAgIGZpbGw6ICNmZmY7DQogICAgICB9DQoNCiAgICAgIC5jbHMtMyB7DQogICAgICAgIGZpbGw6ICM4NWVhMmQ7DQogICAgICB9DQoNCiAgICAgIC5jbHMtNCB7DQogICAgICAgIGZpbGw6ICMxNzM2NDc7DQogICAgICB9DQogICAgPC9zdHlsZT4NCiAgICA8Y2xpcFBhdGggaWQ9ImNsaXAtU1dfVE0tbG9nby1vbi1kYXJrIj4NCiAgICAgIDxyZWN0IHdpZHRoPSI0MDciIGhlaWdodD0iMTE2Ii8+DQogICAgPC9jbGlwUGF0aD4NCiAgPC9kZWZzPg0KICA8ZyBpZD0iU1dfVE0tbG9nby1vbi1kYXJrIiBjbGFzcz0iY2xzLTEiPg0KICAgIDxnIGlkPSJTV19Jbi1Qcm9kdWN0IiB0cmFuc2Zvcm09InRyYW5zbGF0ZSgtMC4zMDEpIj4NCiAgICAgIDxwYXRoIGlkPSJQYXRoXzI5MzYiIGRhdGEtbmFtZT0iUGF0aCAyOTM2IiBjbGFzcz0iY2xzLTIiIGQ9Ik0zNTkuMTUsNzAuNjc0aC0uN1Y2Ni45OTJoLTEuMjZ2LS42aDMuMjE5di42SDM1OS4xNVoiLz4NCiAgICAgIDxwYXRoIGlkPSJQYXRoXzI5MzciIGRhdGEtbmFtZT0iUGF0aCAyOTM3IiBjbGFzcz0iY2xzLTIiIGQ9Ik0zNjMuMjE3LDcwLjY3NCwzNjEuOTc1LDY3LjFoLS4wMjNxLjA1LjguMDUsMS40OTR2Mi4wODNoLS42MzZWNjYuMzkxaC45ODdsMS4xOSwzLjQwN2guMDE3bDEuMjI1LTMuNDA3aC45OXY0LjI4M0gzNjUuMVY2OC41NTZjMC0uMjEzLjAwNi0uNDkuMDE2LS44MzJzLjAyLS41NDkuMDI4LS42MjFoLS4wMjNsLTEuMjg2LDMuNTcxWiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjkzOCIgZGF0YS1uYW1lPSJQYXRoIDI5MzgiIGNsYXNzPSJjbHMtMyIgZD0iTTUwLjMyOCw5Ny42NjlBNDcuNjQyLDQ3LjY0MiwwLDEsMSw5Ny45NzEsNTAuMDI3LDQ3LjY0Miw0Ny42NDIsMCwwLDEsNTAuMzI4LDk3LjY2OVoiLz4NCiAgICAgIDxwYXRoIGlkPSJQYXRoXzI5MzkiIGRhdGEtbmFtZT0iUGF0aCAyOTM5IiBjbGFzcz0iY2xzLTMiIGQ9Ik01MC4zMjgsNC43NjlBNDUuMjU4LDQ1LjI1OCwwLDEsMSw1LjA3LDUwLjAyNyw0NS4yNTgsNDUuMjU4LDAsMCwxLDUwLjMyOCw0Ljc2OW0wLTQuNzY5YTUwLjAyNyw1MC4wMjcsMCwxLDAsNTAuMDI3LDUwLjAyN0E1MC4wMjcsNTAuMDI3LDAsMCwwLDUwLjMyOCwwWiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjk0MCIgZGF0YS1uYW1lPSJQYXRoIDI5NDAiIGNsYXNzPSJjbHMtNCIgZD0iTTMxLjgsMzMuODU0Yy0uMTU0LDEuNzEyLjA1OCwzLjQ4Mi0uMDU3LDUuMjEzYTQyLjY2NSw0Mi42NjUsMCwwLDEtLjY5Myw1LjE1Niw5LjUzLDkuNTMsMCwwLDEtNC4xLDUuODI5YzQuMDc5LDIuNjU0LDQuNTQsNi43NzEsNC44MSwxMC45NDYuMTM1LDIuMjUuMDc3LDQuNTIuMzA4LDYuNzUyLjE3MywxLjczMS44NDYsMi4xNzQsMi42MzYsMi4yMzEuNzMuMDIsMS40OCwwLDIuMzI3LDBWNzUuMzNjLTUuMjkuOS05LjY1Ny0uNi0xMC43MzQtNS4wNzlhMzAuNzYsMzAuNzYsMCwwLDEtLjY1NC01Yy0uMTE3LTEuNzg5LjA3Ni0zLjU3OC0uMDU4LTUuMzY3LS4zODYtNC45MDYtMS4wMi02LjU2LTUuNzEzLTYuNzkxdi02LjFBOS4xOTEsOS4xOTEsMCwwLDEsMjAuOSw0Ni44MmMyLjU3Ny0uMTM1LDMuNjc0LS45MjQsNC4yMzEtMy40NjNhMjkuMywyOS4zLDAsMCwwLC40ODEtNC4zMjksODIuMSw4Mi4xLDAsMCwxLC42LTguNDA2Yy42NzMtMy45ODIsMy4xMzYtNS45MDYsNy4yMzQtNi4xMzcsMS4xNTQtLjA1NywyLjMyNywwLDMuNjU1LDB2NS40NjRjLS41NTguMDM4LTEuMDM5LjExNS0xLjUzOS4xMTVDMzIuMjI2LDI5Ljk0OSwzMi4wNTIsMzEuMDg0LDMxLjgsMzMuODU0Wm02LjQwNiwxMi42NThoLS4wNzdhMy41MTUsMy41MTUsMCwxLDAtLjM0Niw3LjAyMWguMjMxYTMuNDYxLDMuNDYxLDAsMCwwLDMuNjU1LTMuMjUxVjUwLjA5YTMuNTIzLDMuNTIzLDAsMCwwLTMuNDYxLTMuNTc4Wm0xMi4wNjIsMGEzLjM3MywzLjM3MywwLDAsMC0zLjQ4MiwzLjI1MSwxLjc5LDEuNzksMCwwLDAsLjAyLjMyNywzLjMsMy4zLDAsMCwwLDMuNTc4LDMuNDQzLDMuMjYzLDMuMjYzLDAsMCwwLDMuNDQzLTMuNTU4LDMuMzA4LDMuMzA4LDAsMCwwLTMuNTU3LTMuNDYzWm0xMi4zNTEsMGEzLjU5MiwzLjU5MiwwLDAsMC0zLjY1NSwzLjQ4MkEzLjUyOSwzLjUyOSwwLDAsMCw2Mi41LDUzLjUzM2guMDM5YzEuNzY5LjMwOSwzLjU1OS0xLjQsMy42NzQtMy40NjJhMy41NzEsMy41NzEsMCwwLDAtMy42LTMuNTU5Wm0xNi45NDguMjg4Yy0yLjIzMi0uMS0zLjM0OC0uODQ2LTMuOS0yLjk2MmEyMS40NDcsMjEuNDQ3LDAsMCwxLS42MzUtNC4xMzZjLS4xNTQtMi41NzgtLjEzNS01LjE3NS0uMzA4LTcuNzUzLS40LTYuMTE3LTQuODI4LTguMjUyLTExLjI1NC03LjE5NXY1LjMxYzEuMDE5LDAsMS44MDgsMCwyLjYuMDE5LDEuMzY2LjAxOSwyLjQuNTM5LDIuNTM5LDIuMDU5LjEzNSwxLjM4NS4xMzUsMi43ODkuMjcsNC4xOTMuMjY5LDIuNzkuNDIyLDUuNjE4LjksOC4zNjlBOC43MTUsOC43MTUsMCwwLDAsNzMuNyw1MC4wNTJjLTMuNCwyLjI4OS00LjQwNiw1LjU1OS00LjU3OCw5LjIzNC0uMSwyLjUyLS4xNTQsNS4wNTktLjI4OSw3LjYtLjExNSwyLjMwOC0uOTIzLDMuMDU4LTMuMjUxLDMuMTE2LS42NTQuMDE5LTEuMjg5LjA3Ny0yLjAxOS4xMTV2NS40NDVjMS4zNjUsMCwyLjYxNi4wNzcsMy44NjYsMCwzLjg4Ni0uMjMxLDYuMjMzLTIuMTE3LDctNS44ODdBNDkuMDc5LDQ5LjA3OSwwLDAsMCw3NSw2My40Yy4xMzUtMS45MjMuMTE2LTMuODY2LjMwOC01Ljc3MS4yODktMi45ODIsMS42NTUtNC4yMTMsNC42MzYtNC40YTQuMDM3LDQuMDM3LDAsMCwwLC44MjgtLjE5MnYtNi4xYy0uNS0uMDU4LS44NDMtLjExNS0xLjIwOC0uMTM1WiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjk0MSIgZGF0YS1uYW1lPSJQYXRoIDI5NDEiIGNsYXNzPSJjbHMtMiIgZD0iTTE1Mi4yNzMsNTguMTIyYTExLjIyOCwxMS4yMjgsMCwwLDEtNC4zODQsOS40MjRxLTQuMzgzLDMuMzgyLTExLjksMy4zODItOC4xNCwwLTEyLjUyNC0yLjFWNjMuN2EzMi45LDMyLjksMCwwLDAsNi4xMzcsMS44NzksMzIuMywzMi4zLDAsMCwwLDYuNTc1LjY4OXE1LjMyMiwwLDguMDE1LTIuMDJhNi42MjYsNi42MjYsMCwwLDAsMi42OTItNS42Miw3LjIyMiw3LjIyMiwwLDAsMC0uOTU0LTMuOSw4Ljg4NSw4Ljg4NSwwLDAsMC0zLjE5NC0yLjgsNDQuNjM0LDQ0LjYzNCwwLDAsMC02LjgxLTIuOTExcS02LjM4Ny0yLjI4Ni05LjEyNi01LjQxN2ExMS45NTUsMTEuOTU1LDAsMCwxLTIuNzQtOC4xNzJBMTAuMTY0LDEwLjE2NCwwLDAsMSwxMjguMDM5LDI3cTMuOTc3LTMuMTMxLDEwLjUyLTMuMTMxYTMxLDMxLDAsMCwxLDEyLjU1NSwyLjVMMTQ5LjQ1NSwzMWEyOC4zODIsMjguMzgyLDAsMCwwLTExLjAyMS0yLjM4LDEwLjY2OCwxMC42NjgsMCwwLDAtNi42MDYsMS44MTYsNS45ODQsNS45ODQsMCwwLDAtMi4zOCw1LjA0MSw3LjcyMiw3LjcyMiwwLDAsMCwuODc3LDMuOSw4LjI0Miw4LjI0MiwwLDAsMCwyLjk1OSwyLjc4NiwzNi43LDM2LjcsMCwwLDAsNi4zNzEsMi44cTcuMiwyLjU2Niw5LjkxLDUuNTFBMTAuODQsMTAuODQsMCwwLDEsMTUyLjI3Myw1OC4xMjJaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTQyIiBkYXRhLW5hbWU9IlBhdGggMjk0MiIgY2xhc3M9ImNscy0yIiBkPSJNMTg1LjI4OCw3MC4zLDE3OSw1MC4xN3EtLjU5NC0xLjg0OC0yLjIyMi04LjM5MWgtLjI1MXEtMS4yNTIsNS40NzktMi4xOTIsOC40NTNMMTY3Ljg0OSw3MC4zaC02LjAxMWwtOS4zNjEtMzQuMzE1aDUuNDQ3cTMuMzE4LDEyLjkzMSw1LjA1NywxOS42OTNhODAuMTEyLDgwLjExMiwwLDAsMSwxLjk4OCw5LjExMWguMjVxLjM0NS0xLjc4NSwxLjExMi00LjYxOHQxLjMzLTQuNDkzbDYuMjk0LTE5LjY5M2g1LjYzNWw2LjEzNywxOS42OTNhNjYuMzY5LDY2LjM2OSwwLDAsMSwyLjM3OSw5LjA0OGguMjUxYTMzLjE2MywzMy4xNjMsMCwwLDEsLjY3My0zLjQ3NXEuNTQ4LTIuMzQ3LDYuNTI4LTI1LjI2Nmg1LjM4NUwxOTEuNDU2LDcwLjNaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTQzIiBkYXRhLW5hbWU9IlBhdGggMjk0MyIgY2xhc3M9ImNscy0yIiBkPSJNMjI1LjExNSw3MC4zbC0xLjAzMy00Ljg4NWgtLjI1YTE0LjQ0NiwxNC40NDYsMCwwLDEtNS4xMTksNC4zNjgsMTUuNjA4LDE1LjYwOCwwLDAsMS02LjM3MiwxLjE0M3EtNS4xLDAtOC0yLjYzdC0yLjktNy40ODNxMC0xMC40LDE2LjYyNi0xMC45bDUuODIzLS4xODhWNDcuNnEwLTQuMDM4LTEuNzM4LTUuOTY0VDIxNi42LDM5LjcxM2EyMi42MzMsMjIuNjMzLDAsMCwwLTkuNzA2LDIuNjNsLTEuNi0zLjk3N2EyNC40MzcsMjQuNDM3LDAsMCwxLDUuNTU3LTIuMTYsMjQuMDU2LDI0LjA1NiwwLDAsMSw2LjA1OC0uNzgzcTYuMTM2LDAsOS4xLDIuNzI0dDIuOTU5LDguNzM1VjcwLjNabS0xMS43NDEtMy42NjNBMTAuNTQ5LDEwLjU0OSwwLDAsMCwyMjEsNjMuOTc3YTkuODQ1LDkuODQ1LDAsMCwwLDIuNzcxLTcuNDUxdi0zLjFsLTUuMi4yMTlxLTYuMi4yMTktOC45MzksMS45MjZhNS44LDUuOCwwLDAsMC0yLjc0LDUuMzA2LDUuMzU0LDUuMzU0LDAsMCwwLDEuNzA3LDQuMjksNy4wODEsNy4wODEsMCwwLDAsNC43NzUsMS40NzJaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTQ0IiBkYXRhLW5hbWU9IlBhdGggMjk0NCIgY2xhc3M9ImNscy0yIiBkPSJNMjY0LjYsMzUuOTg3djMuMjg3bC02LjM1Ni43NTJhMTEuMTYsMTEuMTYsMCwwLDEsMi4yNTUsNi44NTYsMTAuMTQ4LDEwLjE0OCwwLDAsMS0zLjQ0NCw4LjA0N3EtMy40NDQsMy05LjQ1NiwzYTE1LjczNCwxNS43MzQsMCwwLDEtMi44OC0uMjVRMjQxLjQsNTkuNDM4LDI0MS40LDYyLjFhMi4yNDIsMi4yNDIsMCwwLDAsMS4xNTksMi4wODIsOC40NTYsOC40NTYsMCwwLDAsMy45NzYuNjczaDYuMDc0cTUuNTczLDAsOC41NjMsMi4zNDhhOC4xNTgsOC4xNTgsMCwwLDEsMi45OSw2LjgyNSw5Ljc0Myw5Ljc0MywwLDAsMS00LjU3MSw4LjY4OHEtNC41NzIsMi45ODktMTMuMzM4LDIuOTktNi43MzIsMC0xMC4zNzktMi41YTguMDg3LDguMDg3LDAsMCwxLTMuNjQ3LTcuMDc2LDcuOTQ2LDcuOTQ2LDAsMCwxLDItNS40MTcsMTAuMjExLDEwLjIxMSwwLDAsMSw1LjYzNi0zLjEsNS40MjksNS40MjksMCwwLDEtMi4yMDctMS44NDcsNC44OSw0Ljg5LDAsMCwxLS44OTMtMi45MTIsNS41Myw1LjUzLDAsMCwxLDEtMy4yODgsMTAuNTI5LDEwLjUyOSwwLDAsMSwzLjE2Mi0yLjcyMyw5LjI3NSw5LjI3NSwwLDAsMS00LjMzNi0zLjcyNiwxMC45NDUsMTAuOTQ1LDAsMCwxLTEuNjc1LTYuMDEycTAtNS42MzQsMy4zODItOC42ODh0OS41OC0zLjA1MmExNy40MzksMTcuNDM5LDAsMCwxLDQuODUzLjYyNlpNMjM3LjIzMyw3Ni4wNjJhNC42Niw0LjY2LDAsMCwwLDIuMzQ4LDQuMjI3LDEyLjk3MywxMi45NzMsMCwwLDAsNi43MzIsMS40NHE2LjU0MywwLDkuNjktMS45NTZhNS45OTIsNS45OTIsMCwwLDAsMy4xNDctNS4zMDdxMC0yLjc4Ny0xLjcyMy0zLjg2N3QtNi40ODEtMS4wOGgtNi4yM2E4LjIwNSw4LjIwNSwwLDAsMC01LjUxLDEuNjksNi4wNDMsNi4wNDMsMCwwLDAtMS45NzMsNC44NTNabTIuODE4LTI5LjA4NmE2Ljk4NCw2Ljk4NCwwLDAsMCwyLjAzNSw1LjQ0OCw4LjEyMyw4LjEyMywwLDAsMCw1LjY2NywxLjg0N3E3LjYwOCwwLDcuNjA4LTcuMzg5LDAtNy43MzMtNy43LTcuNzMzYTcuNjI4LDcuNjI4LDAsMCwwLTUuNjM1LDEuOTcycS0xLjk3NiwxLjk3My0xLjk3NSw1Ljg1NVoiLz4NCiAgICAgIDxwYXRoIGlkPSJQYXRoXzI5NDUiIGRhdGEtbmFtZT0iUGF0aCAyOTQ1IiBjbGFzcz0iY2xzLTIiIGQ9Ik0yOTkuMTM2LDM1Ljk4N3YzLjI4N2wtNi4zNTYuNzUyYTExLjE2OCwxMS4xNjgsMCwwLDEsMi4yNTQsNi44NTYsMTAuMTQ1LDEwLjE0NSwwLDAsMS0zLjQ0NCw4LjA0N3EtMy40NDQsMy05LjQ1NSwzYTE1LjczNCwxNS43MzQsMCwwLDEtMi44OC0uMjVxLTMuMzIsMS43NTQtMy4zMTksNC40MTVhMi4yNDMsMi4yNDMsMCwwLDAsMS4xNTgsMi4wODIsOC40NTksOC40NTksMCwwLDAsMy45NzYuNjczaDYuMDc0cTUuNTc0LDAsOC41NjMsMi4zNDhhOC4xNTgsOC4xNTgsMCwwLDEsMi45OSw2LjgyNSw5Ljc0Myw5Ljc0MywwLDAsMS00LjU3MSw4LjY4OHEtNC41NywyLjk4OS0xMy4zMzcsMi45OS02LjczMiwwLTEwLjM3OS0yLjVhOC4wODgsOC4wODgsMCwwLDEtMy42NDgtNy4wNzYsNy45NDcsNy45NDcsMCwwLDEsMi01LjQxNywxMC4yMDcsMTAuMjA3LDAsMCwxLDUuNjM2LTMuMSw1LjQzMiw1LjQzMiwwLDAsMS0yLjIwOC0xLjg0Nyw0Ljg4OSw0Ljg4OSwwLDAsMS0uODkyLTIuOTEyLDUuNTMsNS41MywwLDAsMSwxLTMuMjg4LDEwLjUyOSwxMC41MjksMCwwLDEsMy4xNjItMi43MjMsOS4yNzEsOS4yNzEsMCwwLDEtNC4zMzYtMy43MjYsMTAuOTQ1LDEwLjk0NSwwLDAsMS0xLjY3NS02LjAxMnEwLTUuNjM0LDMuMzgxLTguNjg4dDkuNTgxLTMuMDUyYTE3LjQ0NCwxNy40NDQsMCwwLDEsNC44NTMuNjI2Wk0yNzEuNzcyLDc2LjA2MmE0LjY1OCw0LjY1OCwwLDAsMCwyLjM0OCw0LjIyNywxMi45NjksMTIuOTY5LDAsMCwwLDYuNzMxLDEuNDRxNi41NDQsMCw5LjY5MS0xLjk1NmE1Ljk5Myw1Ljk5MywwLDAsMCwzLjE0Ni01LjMwN3EwLTIuNzg3LTEuNzIyLTMuODY3dC02LjQ4MS0xLjA4aC02LjIzYTguMjA4LDguMjA4LDAsMCwwLTUuNTExLDEuNjlBNi4wNDIsNi4wNDIsMCwwLDAsMjcxLjc3Miw3Ni4wNjJabTIuODE4LTI5LjA4NmE2Ljk4NCw2Ljk4NCwwLDAsMCwyLjAzNSw1LjQ0OCw4LjEyMSw4LjEyMSwwLDAsMCw1LjY2NywxLjg0N3E3LjYwNywwLDcuNjA4LTcuMzg5LDAtNy43MzMtNy43LTcuNzMzYTcuNjI5LDcuNjI5LDAsMCwwLTUuNjM1LDEuOTcycS0xLjk3NSwxLjk3My0xLjk3NSw1Ljg1NVoiLz4NCiAgICAgIDxwYXRoIGlkPSJQYXRoXzI5NDYiIGRhdGEtbmFtZT0iUGF0aCAyOTQ2IiBjbGFzcz0iY2xzLTIiIGQ9Ik0zMTYuNzc4LDcwLjkyOHEtNy42MDgsMC0xMi4wMDctNC42MzR0LTQuNC0xMi44NjhxMC04LjMsNC4wODYtMTMuMTgxYTEzLjU3MywxMy41NzMsMCwwLDEsMTAuOTc0LTQuODg0QTEyLjkzOCwxMi45MzgsMCwwLDEsMzI1LjYzOCwzOS42cTMuNzYyLDQuMjQ3LDMuNzYyLDExLjJ2My4yODdIMzA1Ljc1N3EuMTU2LDYuMDQ0LDMuMDUzLDkuMTc0dDguMTU2LDMuMTMxYTI3LjYzMywyNy42MzMsMCwwLDAsMTAuOTU4LTIuMzE3djQuNjM0YTI3LjUsMjcuNSwwLDAsMS01LjIxMywxLjcwNiwyOS4yNTEsMjkuMjUxLDAsMCwxLTUuOTMzLjUxM1ptLTEuNDA5LTMxLjIxNWE4LjQ4OSw4LjQ4OSwwLDAsMC02LjU5MSwyLjY5MiwxMi40MTYsMTIuNDE2LDAsMCwwLTIuOSw3LjQ1MmgxNy45NHEwLTQuOTE2LTIuMTkxLTcuNTNhNy43MTQsNy43MTQsMCwwLDAtNi4yNTgtMi42MTRaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTQ3IiBkYXRhLW5hbWU9IlBhdGggMjk0NyIgY2xhc3M9ImNscy0yIiBkPSJNMzUwLjksMzUuMzYxYTIwLjM4LDIwLjM4LDAsMCwxLDQuMS4zNzVsLS43MjEsNC44MjJhMTcuNzEyLDE3LjcxMiwwLDAsMC0zLjc1Ny0uNDdBOS4xNDIsOS4xNDIsMCwwLDAsMzQzLjQsNDMuNDdhMTIuMzI3LDEyLjMyNywwLDAsMC0yLjk1OSw4LjQyMlY3MC4zaC01LjJWMzUuOTg3aDQuMjlsLjYsNi4zNTZoLjI1YTE1LjA3MiwxNS4wNzIsMCwwLDEsNC42LTUuMTY2LDEwLjM1NiwxMC4zNTYsMCwwLDEsNS45MTktMS44MTZaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTQ4IiBkYXRhLW5hbWU9IlBhdGggMjk0OCIgY2xhc3M9ImNscy0yIiBkPSJNMjU1Ljg1Nyw5Ni42MzhzLTMuNDMtLjM5MS00Ljg1LS4zOTFjLTIuMDU4LDAtMy4xMTEuNzM1LTMuMTExLDIuMTgsMCwxLjU2OC44ODIsMS45MzUsMy43NDgsMi43MTksMy41MjcuOTgsNC44LDEuOTExLDQuOCw0Ljc3NywwLDMuNjc1LTIuMyw1LjI2Ny01LjYxLDUuMjY3YTM1LjY4NywzNS42ODcsMCwwLDEtNS40ODctLjY2MmwuMjctMi4xOHMzLjMwNi40NDEsNS4wNDYuNDQxYzIuMDgyLDAsMy4wMzctLjkzMSwzLjAzNy0yLjcsMC0xLjQyMS0uNzU5LTEuOTEtMy4zMzEtMi41MjMtMy42MjYtLjkzLTUuMTkzLTIuMDMzLTUuMTkzLTQuOTQ4LDAtMy4zODEsMi4yMjktNC43NzYsNS41ODUtNC43NzZhMzcuMiwzNy4yLDAsMCwxLDUuMzE1LjU4N1oiLz4NCiAgICAgIDxwYXRoIGlkPSJQYXRoXzI5NDkiIGRhdGEtbmFtZT0iUGF0aCAyOTQ5IiBjbGFzcz0iY2xzLTIiIGQ9Ik0yNjIuOTY3LDk0LjE0SDI2Ny43bDMuNzQ4LDEzLjEwNkwyNzUuMiw5NC4xNGg0Ljc1MnYxNi43OEgyNzcuMlY5Ni40MmgtLjE0NWwtNC4xOTEsMTMuODE2aC0yLjg0MkwyNjUuODMxLDk2LjQyaC0uMTQ1djE0LjVoLTIuNzE5WiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjk1MCIgZGF0YS1uYW1lPSJQYXRoIDI5NTAiIGNsYXNzPSJjbHMtMiIgZD0iTTMyMi4wNTcsOTQuMTRIMzM0LjN2Mi40MjVoLTQuNzI4VjExMC45MmgtMi43NDNWOTYuNTY1aC00Ljc3N1oiLz4NCiAgICAgIDxwYXRoIGlkPSJQYXRoXzI5NTEiIGRhdGEtbmFtZT0iUGF0aCAyOTUxIiBjbGFzcz0iY2xzLTIiIGQ9Ik0zNDYuMTM3LDk0LjE0YzMuMzMyLDAsNS4xMiwxLjI0OSw1LjEyLDQuMzYxLDAsMi4wMzMtLjYzNywzLjAzNy0xLjk4NCwzLjc3MiwxLjQ0NS41NjMsMi40LDEuNTkyLDIuNCwzLjksMCwzLjQzLTIuMDgxLDQuNzUyLTUuMzM5LDQuNzUyaC02LjU2NlY5NC4xNFptLTMuNjUsMi4zNTJ2NC44aDMuNmMxLjY2NiwwLDIuNC0uODMyLDIuNC0yLjQ3NCwwLTEuNjE3LS44MzMtMi4zMjctMi41LTIuMzI3Wm0wLDcuMXY0Ljk3M2gzLjdjMS42ODksMCwyLjY5NC0uNTM5LDIuNjk0LTIuNTQ4LDAtMS45MTEtMS40MjEtMi40MjUtMi43NDQtMi40MjVaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTUyIiBkYXRhLW5hbWU9IlBhdGggMjk1MiIgY2xhc3M9ImNscy0yIiBkPSJNMzU4LjQxNCw5NC4xNEgzNjl2Mi4zNzdoLTcuODY0djQuNzUxaDYuMzk0VjEwMy42aC02LjM5NHY0LjkyNEgzNjl2Mi40SDM1OC40MTRaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTUzIiBkYXRhLW5hbWU9IlBhdGggMjk1MyIgY2xhc3M9ImNscy0yIiBkPSJNMzc4Ljc0Nyw5NC4xNGg1LjQxNGw0LjE2NCwxNi43OGgtMi43NDRMMzg0LjM0MiwxMDZoLTUuNzc3bC0xLjIzOSw0LjkyM2gtMi43MTlabS4zNjEsOS40NTZoNC43MDhsLTEuNzM3LTcuMTc4aC0xLjIyNVoiLz4NCiAgICAgIDxwYXRoIGlkPSJQYXRoXzI5NTQiIGRhdGEtbmFtZT0iUGF0aCAyOTU0IiBjbGFzcz0iY2xzLTIiIGQ9Ik0zOTcuMSwxMDUuOTQ3djQuOTczaC0yLjcxOVY5NC4xNGg2LjM3YzMuNywwLDUuNjgzLDIuMTIsNS42ODMsNS44NDMsMCwyLjM3Ni0uOTU2LDQuNTE5LTIuNzQ0LDUuMzUybDIuNzY5LDUuNTg1SDQwMy40N2wtMi40MjYtNC45NzNabTMuNjUxLTkuNDU1SDM5Ny4xdjcuMWgzLjdjMi4wNTcsMCwyLjg0MS0xLjg1LDIuODQxLTMuNTg5LDAtMS45LS45MzQtMy41MTEtMi44OTQtMy41MTFaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTU1IiBkYXRhLW5hbWU9IlBhdGggMjk1NSIgY2xhc3M9ImNscy0yIiBkPSJNMjkwLjAxMyw5NC4xNGg1LjQxM2w0LjE2NCwxNi43OGgtMi43NDNMMjk1LjYwOCwxMDZoLTUuNzc3bC0xLjIzOSw0LjkyM2gtMi43MTlabS4zNjEsOS40NTZoNC43MDdsLTEuNzM3LTcuMTc4aC0xLjIyNVoiLz4NCiAgICAgIDxwYXRoIGlkPSJQYXRoXzI5NTYiIGRhdGEtbmFtZT0iUGF0aCAyOTU2IiBjbGFzcz0iY2xzLTIiIGQ9Ik0zMDguMzYyLDEwNS45NDd2NC45NzNoLTIuNzE5Vjk0LjE0aDYuMzY5YzMuNywwLDUuNjgzLDIuMTIsNS42ODMsNS44NDMsMCwyLjM3Ni0uOTU1LDQuNTE5LTIuNzQzLDUuMzUybDIuNzY4LDUuNTg1aC0yLjk4OWwtMi40MjUtNC45NzNabTMuNjUtOS40NTVoLTMuNjV2Ny4xaDMuN2MyLjA1OCwwLDIuODQxLTEuODUsMi44NDEtMy41ODlDMzE0LjksOTguMSwzMTMuOTcyLDk2LjQ5MiwzMTIuMDEyLDk2LjQ5MloiLz4NCiAgICAgIDxwYXRoIGlkPSJQYXRoXzI5NTciIGRhdGEtbmFtZT0iUGF0aCAyOTU3IiBjbGFzcz0iY2xzLTIiIGQ9Ik0xMzAuNjA2LDEwNy42NDNhMy4wMiwzLjAyLDAsMCwxLTEuMTgsMi41MzcsNS4xMTMsNS4xMTMsMCwwLDEtMy4yLjkxLDguMDMsOC4wMywwLDAsMS0zLjM3MS0uNTY0di0xLjM4M2E4Ljc5Myw4Ljc5MywwLDAsMCwxLjY1Mi41MDYsOC42NzIsOC42NzIsMCwwLDAsMS43Ny4xODYsMy41NjUsMy41NjUsMCwwLDAsMi4xNTctLjU0NCwxLjc4MywxLjc4MywwLDAsMCwuNzI1LTEuNTEyLDEuOTQ3LDEuOTQ3LDAsMCwwLS4yNTctMS4wNSwyLjM5MywyLjM5MywwLDAsMC0uODYtLjc1NCwxMi4xNzEsMTIuMTcxLDAsMCwwLTEuODMzLS43ODQsNS44NDIsNS44NDIsMCwwLDEtMi40NTYtMS40NTgsMy4yMTMsMy4yMTMsMCwwLDEtLjczOC0yLjIsMi43MzYsMi43MzYsMCwwLDEsMS4wNzEtMi4yNjcsNC40NDQsNC40NDQsMCwwLDEsMi44MzEtLjg0Myw4LjM0MSw4LjM0MSwwLDAsMSwzLjM4LjY3NWwtLjQ0NywxLjI0N2E3LjYzOSw3LjYzOSwwLDAsMC0yLjk2Ni0uNjQxLDIuODc4LDIuODc4LDAsMCwwLTEuNzc5LjQ4OSwxLjYxMiwxLjYxMiwwLDAsMC0uNjQsMS4zNTcsMi4wODEsMi4wODEsMCwwLDAsLjIzNiwxLjA0OSwyLjIzMSwyLjIzMSwwLDAsMCwuOC43NSw5Ljg3OCw5Ljg3OCwwLDAsMCwxLjcxNS43NTQsNi44LDYuOCwwLDAsMSwyLjY2NywxLjQ4MywyLjkxOSwyLjkxOSwwLDAsMSwuNzIzLDIuMDU3WiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjk1OCIgZGF0YS1uYW1lPSJQYXRoIDI5NTgiIGNsYXNzPSJjbHMtMiIgZD0iTTEzNC40NDcsMTAxLjY4NnY1Ljk5MWEyLjQxMSwyLjQxMSwwLDAsMCwuNTE1LDEuNjg2LDIuMDksMi4wOSwwLDAsMCwxLjYwOS41NTYsMi42MjksMi42MjksMCwwLDAsMi4xMi0uNzkyLDQsNCwwLDAsMCwuNjctMi41ODd2LTQuODU0aDEuNHY5LjIzNkgxMzkuNmwtLjItMS4yMzloLS4wNzVhMi43OTMsMi43OTMsMCwwLDEtMS4xOTMsMS4wNDUsNCw0LDAsMCwxLTEuNzQuMzYyLDMuNTI5LDMuNTI5LDAsMCwxLTIuNTI0LS44LDMuNDA5LDMuNDA5LDAsMCwxLS44MzktMi41NjJ2LTYuMDQyWiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjk1OSIgZGF0YS1uYW1lPSJQYXRoIDI5NTkiIGNsYXNzPSJjbHMtMiIgZD0iTTE0OC4yMDYsMTExLjA5YTMuOTkzLDMuOTkzLDAsMCwxLTEuNjQ3LS4zMzMsMy4xLDMuMSwwLDAsMS0xLjI1Mi0xLjAyM2gtLjFhMTIuMjY1LDEyLjI2NSwwLDAsMSwuMSwxLjUzM3YzLjhoLTEuNFYxMDEuNjg2aDEuMTM3bC4xOTQsMS4yNjRoLjA2N2EzLjI1NywzLjI1NywwLDAsMSwxLjI1Ni0xLjEsMy44MzEsMy44MzEsMCwwLDEsMS42NDMtLjMzNywzLjQxMywzLjQxMywwLDAsMSwyLjgzNiwxLjI1Niw2LjY4Myw2LjY4MywwLDAsMS0uMDE3LDcuMDU3LDMuNDIsMy40MiwwLDAsMS0yLjgxNywxLjI2NFptLS4yLTguMzg1YTIuNDgyLDIuNDgyLDAsMCwwLTIuMDQ4Ljc4NCw0LjA0MSw0LjA0MSwwLDAsMC0uNjQ5LDIuNDk0di4zMTJhNC42MjUsNC42MjUsMCwwLDAsLjY0OSwyLjc4NSwyLjQ2NywyLjQ2NywwLDAsMCwyLjA4Mi44MzksMi4xNjQsMi4xNjQsMCwwLDAsMS44NzUtLjk2OSw0LjYsNC42LDAsMCwwLC42NzgtMi42NzEsNC40MjgsNC40MjgsMCwwLDAtLjY3OC0yLjY1MSwyLjIzMiwyLjIzMiwwLDAsMC0xLjkxNS0uOTIzWiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjk2MCIgZGF0YS1uYW1lPSJQYXRoIDI5NjAiIGNsYXNzPSJjbHMtMiIgZD0iTTE1OS4wMzksMTExLjA5YTMuOTkzLDMuOTkzLDAsMCwxLTEuNjQ3LS4zMzMsMy4xLDMuMSwwLDAsMS0xLjI1Mi0xLjAyM2gtLjFhMTIuMjY1LDEyLjI2NSwwLDAsMSwuMSwxLjUzM3YzLjhoLTEuNFYxMDEuNjg2aDEuMTM3bC4xOTQsMS4yNjRoLjA2N2EzLjI1NywzLjI1NywwLDAsMSwxLjI1Ni0xLjEsMy44MzEsMy44MzEsMCwwLDEsMS42NDMtLjMzNywzLjQxMywzLjQxMywwLDAsMSwyLjgzNiwxLjI1Niw2LjY4Myw2LjY4MywwLDAsMS0uMDE3LDcuMDU3LDMuNDIsMy40MiwwLDAsMS0yLjgxNywxLjI2NFptLS4yLTguMzg1YTIuNDgyLDIuNDgyLDAsMCwwLTIuMDQ4Ljc4NCw0LjA0MSw0LjA0MSwwLDAsMC0uNjQ5LDIuNDk0di4zMTJhNC42MjUsNC42MjUsMCwwLDAsLjY0OSwyLjc4NSwyLjQ2NywyLjQ2NywwLDAsMCwyLjA4Mi44MzksMi4xNjQsMi4xNjQsMCwwLDAsMS44NzUtLjk2OSw0LjYsNC42LDAsMCwwLC42NzgtMi42NzEsNC40MjgsNC40MjgsMCwwLDAtLjY3OC0yLjY1MSwyLjIzMiwyLjIzMiwwLDAsMC0xLjkxMS0uOTIzWiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjk2MSIgZGF0YS1uYW1lPSJQYXRoIDI5NjEiIGNsYXNzPSJjbHMtMiIgZD0iTTE3My42MTIsMTA2LjNhNS4wOTMsNS4wOTMsMCwwLDEtMS4xMzcsMy41MjcsNC4wMDUsNC4wMDUsMCwwLDEtMy4xNDMsMS4yNjgsNC4xNzIsNC4xNzIsMCwwLDEtMi4yLS41ODEsMy44NCwzLjg0LDAsMCwxLTEuNDgzLTEuNjY5LDUuOCw1LjgsMCwwLDEtLjUyMi0yLjU0NSw1LjA4Nyw1LjA4NywwLDAsMSwxLjEyOS0zLjUxOCwzLjk5MSwzLjk5MSwwLDAsMSwzLjEzNS0xLjI2LDMuOTA3LDMuOTA3LDAsMCwxLDMuMDgsMS4yOSw1LjA3MSw1LjA3MSwwLDAsMSwxLjE0MSwzLjQ4OFptLTcuMDM2LDBhNC4zODQsNC4zODQsMCwwLDAsLjcwOCwyLjcsMi44MDksMi44MDksMCwwLDAsNC4xNjcsMCw0LjM2NSw0LjM2NSwwLDAsMCwuNzEyLTIuNyw0LjI5Myw0LjI5MywwLDAsMC0uNzEyLTIuNjc1LDIuNSwyLjUsMCwwLDAtMi4xLS45MTUsMi40NjEsMi40NjEsMCwwLDAtMi4wNzIuOSw0LjMzNCw0LjMzNCwwLDAsMC0uNywyLjY5WiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjk2MiIgZGF0YS1uYW1lPSJQYXRoIDI5NjIiIGNsYXNzPSJjbHMtMiIgZD0iTTE4MC41MjUsMTAxLjUxN2E1LjUwNiw1LjUwNiwwLDAsMSwxLjEuMWwtLjE5NCwxLjNhNC43ODYsNC43ODYsMCwwLDAtMS4wMTEtLjEyNywyLjQ2LDIuNDYsMCwwLDAtMS45MTcuOTExLDMuMzE4LDMuMzE4LDAsMCwwLS44LDIuMjY3djQuOTU1aC0xLjR2LTkuMjM2aDEuMTU0bC4xNiwxLjcxaC4wNjhhNC4wNTQsNC4wNTQsMCwwLDEsMS4yMzgtMS4zOSwyLjc4NywyLjc4NywwLDAsMSwxLjYtLjQ5WiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjk2MyIgZGF0YS1uYW1lPSJQYXRoIDI5NjMiIGNsYXNzPSJjbHMtMiIgZD0iTTE4Ny4zNjMsMTA5LjkzNmE0LjUwNiw0LjUwNiwwLDAsMCwuNzE2LS4wNTUsNC4zODcsNC4zODcsMCwwLDAsLjU0OC0uMTE0djEuMDdhMi41LDIuNSwwLDAsMS0uNjcuMTgxLDUsNSwwLDAsMS0uOC4wNzJxLTIuNjgsMC0yLjY4LTIuODIzdi01LjQ5NGgtMS4zMjNWMTAyLjFsMS4zMjMtLjU4Mi41OS0xLjk3MmguODA5djIuMTQxaDIuNjh2MS4wODdoLTIuNjh2NS40MzVhMS44NjksMS44NjksMCwwLDAsLjQsMS4yODFBMS4zNzcsMS4zNzcsMCwwLDAsMTg3LjM2MywxMDkuOTM2WiIvPg0KICAgICAgPHBhdGggaWQ9IlBhdGhfMjk2NCIgZGF0YS1uYW1lPSJQYXRoIDI5NjQiIGNsYXNzPSJjbHMtMiIgZD0iTTE5NC41MzgsMTExLjA5YTQuMjM5LDQuMjM5LDAsMCwxLTMuMjMxLTEuMjQ3LDQuODI0LDQuODI0LDAsMCwxLTEuMTg0LTMuNDYzLDUuMzU1LDUuMzU1LDAsMCwxLDEuMS0zLjU0OCwzLjY1MiwzLjY1MiwwLDAsMSwyLjk1NC0xLjMxNSwzLjQ4NCwzLjQ4NCwwLDAsMSwyLjc0NywxLjE0Miw0LjM3OCw0LjM3OCwwLDAsMSwxLjAxMSwzLjAxM3YuODg1aC02LjM2MmEzLjY2LDMuNjYsMCwwLDAsLjgyMiwyLjQ2OSwyLjg0MywyLjg0MywwLDAsMCwyLjIuODQzLDcuNDMxLDcuNDMxLDAsMCwwLDIuOTQ5LS42MjR2MS4yNDdhNy4zNzcsNy4zNzcsMCwwLDEtMS40LjQ1OSw3Ljg2Myw3Ljg2MywwLDAsMS0xLjYuMTM5Wm0tLjM3OS04LjRhMi4yODYsMi4yODYsMCwwLDAtMS43NzQuNzI1LDMuMzM3LDMuMzM3LDAsMCwwLS43NzksMi4wMDZoNC44MjhhMy4wNzIsMy4wNzIsMCwwLDAtLjU5LTIuMDI3LDIuMDc2LDIuMDc2LDAsMCwwLTEuNjg1LS43MDZaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTY1IiBkYXRhLW5hbWU9IlBhdGggMjk2NSIgY2xhc3M9ImNscy0yIiBkPSJNMjA2Ljk1MSwxMDkuNjgzaC0uMDc2YTMuMjg3LDMuMjg3LDAsMCwxLTIuOSwxLjQwNywzLjQyNywzLjQyNywwLDAsMS0yLjgxOS0xLjIzOSw1LjQ1Miw1LjQ1MiwwLDAsMS0xLjAwNi0zLjUyMiw1LjU0Miw1LjU0MiwwLDAsMSwxLjAxMS0zLjU0OCwzLjQsMy40LDAsMCwxLDIuODE0LTEuMjY0LDMuMzYxLDMuMzYxLDAsMCwxLDIuODgzLDEuMzY1aC4xMDlsLS4wNTktLjY2NS0uMDM0LS42NDlWOTcuODA5aDEuNHYxMy4xMTNoLTEuMTM4Wm0tMi44LjIzNmEyLjU1MSwyLjU1MSwwLDAsMCwyLjA3OC0uNzc5LDMuOTQ3LDMuOTQ3LDAsMCwwLC42NDQtMi41MTZ2LS4zYTQuNjM4LDQuNjM4LDAsMCwwLS42NTMtMi44LDIuNDgxLDIuNDgxLDAsMCwwLTIuMDg2LS44MzksMi4xNCwyLjE0LDAsMCwwLTEuODgzLjk1Nyw0Ljc2LDQuNzYsMCwwLDAtLjY1MywyLjcsNC41NTQsNC41NTQsMCwwLDAsLjY0OSwyLjY3MSwyLjE5NCwyLjE5NCwwLDAsMCwxLjkwNi45MDZaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTY2IiBkYXRhLW5hbWU9IlBhdGggMjk2NiIgY2xhc3M9ImNscy0yIiBkPSJNMjIwLjcxMiwxMDEuNTM0YTMuNDM1LDMuNDM1LDAsMCwxLDIuODI3LDEuMjQzLDYuNjUzLDYuNjUzLDAsMCwxLS4wMDksNy4wNTMsMy40MTcsMy40MTcsMCwwLDEtMi44MTgsMS4yNiw0LDQsMCwwLDEtMS42NDgtLjMzMywzLjA5NCwzLjA5NCwwLDAsMS0xLjI1MS0xLjAyM2gtLjFsLS4yOTUsMS4xODhoLTFWOTcuODA5aDEuNFYxMDFxMCwxLjA2OS0uMDY4LDEuOTIxaC4wNjhhMy4zMjIsMy4zMjIsMCwwLDEsMi44OTQtMS4zODdabS0uMiwxLjE3MWEyLjQ0LDIuNDQsMCwwLDAtMi4wNjQuODIyLDYuMzM4LDYuMzM4LDAsMCwwLC4wMTcsNS41NTMsMi40NjQsMi40NjQsMCwwLDAsMi4wODEuODM5LDIuMTU4LDIuMTU4LDAsMCwwLDEuOTIyLS45NCw0LjgyOCw0LjgyOCwwLDAsMCwuNjMyLTIuNyw0LjY0NSw0LjY0NSwwLDAsMC0uNjMyLTIuNjg5LDIuMjQyLDIuMjQyLDAsMCwwLTEuOTU5LS44ODVaIi8+DQogICAgICA8cGF0aCBpZD0iUGF0aF8yOTY3IiBkYXRhLW5hbWU9IlBhdGggMjk2NyIgY2xhc3M9ImNscy0yIiBkPSJNMjI1Ljc1OCwxMDEuNjg2aDEuNWwyLjAyMyw1LjI2N2EyMC4xODgsMjAuMTg4LDAsMCwxLC44MjYsMi42aC4wNjdxLjEwOS0uNDMxLjQ1OS0xLjQ3MXQyLjI4OC02LjRoMS41TDIzMC40NTIsMTEyLjJhNS4yNTMsNS4yNTMsMCwwLDEtMS4zNzgsMi4yMTIsMi45MzIsMi45MzIsMCwwLDEtMS45MzQuNjUzLDUuNjU5LDUuNjU5LDAsMCwxLTEuMjY0LS4xNDNWMTEzLjhhNC45LDQuOSwwLDAsMCwxLjAzNy4xLDIuMTM2LDIuMTM2LDAsMCwwLDIuMDU2LTEuNjE4bC41MTQtMS4zMTRaIi8+DQogICAgPC9nPg0KICA8L2c+DQo8L3N2Zz4NCg=="},5163:t=>{"use strict";t.exports='---\nurl: "https://petstore.swagger.io/v2/swagger.json"\ndom_id: "#swagger-ui"\nvalidatorUrl: "https://validator.swagger.io/validator"\n'},2361:()=>{},4616:()=>{},5110:(t,e,r)=>{t.exports=r(7698)},8309:(t,e,r)=>{t.exports=r(3363)},1189:(t,e,r)=>{r(8196)},9022:(t,e,r)=>{t.exports=r(8065)},4386:(t,e,r)=>{r(7448)},2250:(t,e,r)=>{t.exports=r(9455)},2320:(t,e,r)=>{t.exports=r(9743)},4418:(t,e,r)=>{r(1955)},2373:(t,e,r)=>{t.exports=r(6064)},1679:(t,e,r)=>{t.exports=r(1577)},86:(t,e,r)=>{t.exports=r(6279)},8118:(t,e,r)=>{t.exports=r(3778)},1882:(t,e,r)=>{t.exports=r(9373)},8712:(t,e,r)=>{t.exports=r(3819)},7606:(t,e,r)=>{t.exports=r(1798)},4282:(t,e,r)=>{r(2527)},4278:(t,e,r)=>{t.exports=r(2073)},2039:(t,e,r)=>{t.exports=r(5286)},2578:(t,e,r)=>{r(2856)},7043:(t,e,r)=>{r(5178)},1607:(t,e,r)=>{r(6361)},5627:(t,e,r)=>{t.exports=r(8933)},8492:(t,e,r)=>{t.exports=r(5868)},6986:(t,e,r)=>{t.exports=r(3383)},8222:(t,e,r)=>{t.exports=r(3059)},8216:(t,e,r)=>{t.exports=r(4122)},7552:(t,e,r)=>{t.exports=r(269)},7445:(t,e,r)=>{t.exports=r(3685)},1125:(t,e,r)=>{var n=r(7445);t.exports=function(t,e,r){return e in t?n(t,e,{value:r,enumerable:!0,configurable:!0,writable:!0}):t[e]=r,t},t.exports.__esModule=!0,t.exports.default=t.exports},3101:(t,e,r)=>{var n=r(7552),i=r(8216);function o(){var e;return t.exports=o=n?i(e=n).call(e):function(t){for(var e=1;e<arguments.length;e++){var r=arguments[e];for(var n in r)Object.prototype.hasOwnProperty.call(r,n)&&(t[n]=r[n])}return t},t.exports.__esModule=!0,t.exports.default=t.exports,o.apply(this,arguments)}t.exports=o,t.exports.__esModule=!0,t.exports.default=t.exports}},e={};function r(n){var i=e[n];if(void 0!==i)return i.exports;var o=e[n]={id:n,loaded:!1,exports:{}};return t[n].call(o.exports,o,o.exports,r),o.loaded=!0,o.exports}r.n=t=>{var e=t&&t.__esModule?()=>t.default:()=>t;return r.d(e,{a:e}),e},r.d=(t,e)=>{for(var n in e)r.o(e,n)&&!r.o(t,n)&&Object.defineProperty(t,n,{enumerable:!0,get:e[n]})},r.g=function(){if("object"==typeof globalThis)return globalThis;try{return this||new Function("return this")()}catch(t){if("object"==typeof window)return window}}(),r.o=(t,e)=>Object.prototype.hasOwnProperty.call(t,e),r.r=t=>{"undefined"!=typeof Symbol&&Symbol.toStringTag&&Object.defineProperty(t,Symbol.toStringTag,{value:"Module"}),Object.defineProperty(t,"__esModule",{value:!0})},r.nmd=t=>(t.paths=[],t.children||(t.children=[]),t);var n={};return(()=>{"use strict";r.d(n,{default:()=>qr});var t={};r.r(t),r.d(t,{TOGGLE_CONFIGS:()=>xr,UPDATE_CONFIGS:()=>jr,loaded:()=>Dr,toggle:()=>Sr,update:()=>Nr});var e={};r.r(e),r.d(e,{downloadConfig:()=>Ir,getConfigByUrl:()=>Er});var i={};r.r(i),r.d(i,{get:()=>Ar});var o=r(7294);class s extends o.Component{render(){const{getComponent:t}=this.props,e=t("Container"),r=t("Row"),n=t("Col"),i=t("Topbar",!0),s=t("BaseLayout",!0),u=t("onlineValidatorBadge",!0);return o.createElement(e,{className:"swagger-ui"},i?o.createElement(i,null):null,o.createElement(s,null),o.createElement(r,null,o.createElement(n,null,o.createElement(u,null))))}}var u=r(1125),a=r.n(u),c=r(86),f=r.n(c),l=r(7606),h=r.n(l),p=r(8309),d=r.n(p),y=(r(4386),r(4418),r(8222)),g=r.n(y),v=(r(1189),r(4282),r(6986)),w=r.n(v),M=(r(2578),r(4278)),L=r.n(M),_=r(9022),m=r.n(_),b=r(2039),j=r.n(b),x=r(8118),N=r.n(x),S=r(5627),D=r.n(S),I=r(1882),E=r.n(I),A=r(1679),C=r.n(A),T=(r(7043),r(1607),r(3393)),O=r.n(T),z=(r(7967),r(1540),r(1700),r(8306)),k=r.n(z),U=(r(3311),r(9704),r(7813),r(3560),r(3479)),R=r.n(U),Y=r(4419),B=r.n(Y),P=r(1609),Q=r.n(P),F=r(2250),G=r.n(F),W=r(5110),q=r.n(W),H=r(8712),J=r.n(H),$=r(2373),Z=r.n($),V=r(8492),X=r.n(V);const K=t=>e=>d()(t)&&d()(e)&&t.length===e.length&&G()(t).call(t,((t,r)=>t===e[r])),tt=function(){for(var t=arguments.length,e=new Array(t),r=0;r<t;r++)e[r]=arguments[r];return e};class et extends(X()){delete(t){const e=q()(J()(this).call(this)),r=C()(e).call(e,K(t));return super.delete(r)}get(t){const e=q()(J()(this).call(this)),r=C()(e).call(e,K(t));return super.get(r)}has(t){const e=q()(J()(this).call(this));return-1!==Z()(e).call(e,K(t))}}const rt=function(t){let e=arguments.length>1&&void 0!==arguments[1]?arguments[1]:tt;const{Cache:r}=k();k().Cache=et;const n=k()(t,e);return k().Cache=r,n},nt={string:t=>t.pattern?(t=>{try{return new(B())(t).gen()}catch(t){return"string"}})(t.pattern):"string",string_email:()=>"user@example.com","string_date-time":()=>(new Date).toISOString(),string_date:()=>(new Date).toISOString().substring(0,10),string_uuid:()=>"3fa85f64-5717-4562-b3fc-2c963f66afa6",string_hostname:()=>"example.com",string_ipv4:()=>"198.51.100.42",string_ipv6:()=>"2001:0db8:5b96:0000:0000:426f:8e17:642a",number:()=>0,number_float:()=>0,integer:()=>0,boolean:t=>"boolean"!=typeof t.default||t.default},it=t=>{t=pr(t);let{type:e,format:r}=t,n=nt[`${e}_${r}`]||nt[e];return gr(n)?n(t):"Unknown Type: "+t.type},ot=t=>wr(t,"$$ref",(t=>"string"==typeof t&&E()(t).call(t,"#")>-1)),st=["maxProperties","minProperties"],ut=["minItems","maxItems"],at=["minimum","maximum","exclusiveMinimum","exclusiveMaximum"],ct=["minLength","maxLength"],ft=function(t,e){var r;let n=arguments.length>2&&void 0!==arguments[2]?arguments[2]:{};const i=r=>{void 0===e[r]&&void 0!==t[r]&&(e[r]=t[r])};var o;(f()(r=["example","default","enum","xml","type",...st,...ut,...at,...ct]).call(r,(t=>i(t))),void 0!==t.required&&d()(t.required))&&(void 0!==e.required&&e.required.length||(e.required=[]),f()(o=t.required).call(o,(t=>{var r;N()(r=e.required).call(r,t)||e.required.push(t)})));if(t.properties){e.properties||(e.properties={});let r=pr(t.properties);for(let i in r){var s;if(Object.prototype.hasOwnProperty.call(r,i))if(!r[i]||!r[i].deprecated)if(!r[i]||!r[i].readOnly||n.includeReadOnly)if(!r[i]||!r[i].writeOnly||n.includeWriteOnly)if(!e.properties[i])e.properties[i]=r[i],!t.required&&d()(t.required)&&-1!==E()(s=t.required).call(s,i)&&(e.required?e.required.push(i):e.required=[i])}}return t.items&&(e.items||(e.items={}),e.items=ft(t.items,e.items,n)),e},lt=function(t){let e=arguments.length>1&&void 0!==arguments[1]?arguments[1]:{},r=arguments.length>2&&void 0!==arguments[2]?arguments[2]:void 0,n=arguments.length>3&&void 0!==arguments[3]&&arguments[3];t&&gr(t.toJS)&&(t=t.toJS());let i=void 0!==r||t&&void 0!==t.example||t&&void 0!==t.default;const o=!i&&t&&t.oneOf&&t.oneOf.length>0,s=!i&&t&&t.anyOf&&t.anyOf.length>0;if(!i&&(o||s)){const r=pr(o?t.oneOf[0]:t.anyOf[0]);if(ft(r,t,e),!t.xml&&r.xml&&(t.xml=r.xml),void 0!==t.example&&void 0!==r.example)i=!0;else if(r.properties){t.properties||(t.properties={});let n=pr(r.properties);for(let i in n){var u;if(Object.prototype.hasOwnProperty.call(n,i))if(!n[i]||!n[i].deprecated)if(!n[i]||!n[i].readOnly||e.includeReadOnly)if(!n[i]||!n[i].writeOnly||e.includeWriteOnly)if(!t.properties[i])t.properties[i]=n[i],!r.required&&d()(r.required)&&-1!==E()(u=r.required).call(u,i)&&(t.required?t.required.push(i):t.required=[i])}}}const a={};let{xml:c,type:l,example:p,properties:y,additionalProperties:g,items:v}=t||{},{includeReadOnly:w,includeWriteOnly:M}=e;c=c||{};let _,{name:b,prefix:x,namespace:S}=c,D={};if(n&&(b=b||"notagname",_=(x?x+":":"")+b,S)){a[x?"xmlns:"+x:"xmlns"]=S}n&&(D[_]=[]);const I=e=>j()(e).call(e,(e=>Object.prototype.hasOwnProperty.call(t,e)));t&&!l&&(y||g||I(st)?l="object":v||I(ut)?l="array":I(at)?(l="number",t.type="number"):i||t.enum||(l="string",t.type="string"));const A=e=>{var r,n,i,o,s;null!==(null===(r=t)||void 0===r?void 0:r.maxItems)&&void 0!==(null===(n=t)||void 0===n?void 0:n.maxItems)&&(e=L()(e).call(e,0,null===(s=t)||void 0===s?void 0:s.maxItems));if(null!==(null===(i=t)||void 0===i?void 0:i.minItems)&&void 0!==(null===(o=t)||void 0===o?void 0:o.minItems)){let r=0;for(;e.length<(null===(u=t)||void 0===u?void 0:u.minItems);){var u;e.push(e[r++%e.length])}}return e},T=pr(y);let O,z=0;const k=()=>t&&null!==t.maxProperties&&void 0!==t.maxProperties&&z>=t.maxProperties,U=()=>{if(!t||!t.required)return 0;let e=0;var r,i;n?f()(r=t.required).call(r,(t=>e+=void 0===D[t]?0:1)):f()(i=t.required).call(i,(t=>{var r;return e+=void 0===(null===(r=D[_])||void 0===r?void 0:C()(r).call(r,(e=>void 0!==e[t])))?0:1}));return t.required.length-e},R=e=>{var r;return!(t&&t.required&&t.required.length)||!N()(r=t.required).call(r,e)},Y=e=>!t||null===t.maxProperties||void 0===t.maxProperties||!k()&&(!R(e)||t.maxProperties-z-U()>0);if(O=n?function(r){let i=arguments.length>1&&void 0!==arguments[1]?arguments[1]:void 0;if(t&&T[r]){if(T[r].xml=T[r].xml||{},T[r].xml.attribute){const t=d()(T[r].enum)?T[r].enum[0]:void 0,e=T[r].example,n=T[r].default;return void(a[T[r].xml.name||r]=void 0!==e?e:void 0!==n?n:void 0!==t?t:it(T[r]))}T[r].xml.name=T[r].xml.name||r}else T[r]||!1===g||(T[r]={xml:{name:r}});let o=lt(t&&T[r]||void 0,e,i,n);var s;Y(r)&&(z++,d()(o)?D[_]=m()(s=D[_]).call(s,o):D[_].push(o))}:(r,i)=>{if(Y(r)){if(Object.prototype.hasOwnProperty.call(t,"discriminator")&&t.discriminator&&Object.prototype.hasOwnProperty.call(t.discriminator,"mapping")&&t.discriminator.mapping&&Object.prototype.hasOwnProperty.call(t,"$$ref")&&t.$$ref&&t.discriminator.propertyName===r){for(let e in t.discriminator.mapping)if(-1!==t.$$ref.search(t.discriminator.mapping[e])){D[r]=e;break}}else D[r]=lt(T[r],e,i,n);z++}},i){let i;if(i=ot(void 0!==r?r:void 0!==p?p:t.default),!n){if("number"==typeof i&&"string"===l)return`${i}`;if("string"!=typeof i||"string"===l)return i;try{return JSON.parse(i)}catch(t){return i}}if(t||(l=d()(i)?"array":typeof i),"array"===l){if(!d()(i)){if("string"==typeof i)return i;i=[i]}const r=t?t.items:void 0;r&&(r.xml=r.xml||c||{},r.xml.name=r.xml.name||c.name);let o=h()(i).call(i,(t=>lt(r,e,t,n)));return o=A(o),c.wrapped?(D[_]=o,Q()(a)||D[_].push({_attr:a})):D=o,D}if("object"===l){if("string"==typeof i)return i;for(let e in i)Object.prototype.hasOwnProperty.call(i,e)&&(t&&T[e]&&T[e].readOnly&&!w||t&&T[e]&&T[e].writeOnly&&!M||(t&&T[e]&&T[e].xml&&T[e].xml.attribute?a[T[e].xml.name||e]=i[e]:O(e,i[e])));return Q()(a)||D[_].push({_attr:a}),D}return D[_]=Q()(a)?i:[{_attr:a},i],D}if("object"===l){for(let t in T)Object.prototype.hasOwnProperty.call(T,t)&&(T[t]&&T[t].deprecated||T[t]&&T[t].readOnly&&!w||T[t]&&T[t].writeOnly&&!M||O(t));if(n&&a&&D[_].push({_attr:a}),k())return D;if(!0===g)n?D[_].push({additionalProp:"Anything can be here"}):D.additionalProp1={},z++;else if(g){const r=pr(g),i=lt(r,e,void 0,n);if(n&&r.xml&&r.xml.name&&"notagname"!==r.xml.name)D[_].push(i);else{const e=null!==t.minProperties&&void 0!==t.minProperties&&z<t.minProperties?t.minProperties-z:3;for(let t=1;t<=e;t++){if(k())return D;if(n){const e={};e["additionalProp"+t]=i.notagname,D[_].push(e)}else D["additionalProp"+t]=i;z++}}}return D}if("array"===l){if(!v)return;let r;var B,P;if(n)v.xml=v.xml||(null===(B=t)||void 0===B?void 0:B.xml)||{},v.xml.name=v.xml.name||c.name;if(d()(v.anyOf))r=h()(P=v.anyOf).call(P,(t=>lt(ft(v,t,e),e,void 0,n)));else if(d()(v.oneOf)){var F;r=h()(F=v.oneOf).call(F,(t=>lt(ft(v,t,e),e,void 0,n)))}else{if(!(!n||n&&c.wrapped))return lt(v,e,void 0,n);r=[lt(v,e,void 0,n)]}return r=A(r),n&&c.wrapped?(D[_]=r,Q()(a)||D[_].push({_attr:a}),D):r}let G;if(t&&d()(t.enum))G=dr(t.enum)[0];else{if(!t)return;if(G=it(t),"number"==typeof G){let e=t.minimum;null!=e&&(t.exclusiveMinimum&&e++,G=e);let r=t.maximum;null!=r&&(t.exclusiveMaximum&&r--,G=r)}if("string"==typeof G&&(null!==t.maxLength&&void 0!==t.maxLength&&(G=L()(G).call(G,0,t.maxLength)),null!==t.minLength&&void 0!==t.minLength)){let e=0;for(;G.length<t.minLength;)G+=G[e++%G.length]}}if("file"!==l)return n?(D[_]=Q()(a)?G:[{_attr:a},G],D):G},ht=(t,e,r)=>[t,D()(e),D()(r)];rt(((t,e,r)=>{const n=lt(t,e,r,!0);if(n)return"string"==typeof n?n:R()(n,{declaration:!0,indent:"\t"})}),ht),rt(((t,e,r)=>lt(t,e,r,!1)),ht);const pt=function(){var t={location:{},history:{},open:()=>{},close:()=>{},File:function(){}};if("undefined"==typeof window)return t;try{t=window;for(var e of["File","Blob","FormData"])e in window&&(t[e]=window[e])}catch(t){console.error(t)}return t}();r(8269);O().Set.of("type","format","items","default","maximum","exclusiveMaximum","minimum","exclusiveMinimum","maxLength","minLength","pattern","maxItems","minItems","uniqueItems","enum","multipleOf");r(2282),r(9072);function dt(t){return null==t}var yt={isNothing:dt,isObject:function(t){return"object"==typeof t&&null!==t},toArray:function(t){return Array.isArray(t)?t:dt(t)?[]:[t]},repeat:function(t,e){var r,n="";for(r=0;r<e;r+=1)n+=t;return n},isNegativeZero:function(t){return 0===t&&Number.NEGATIVE_INFINITY===1/t},extend:function(t,e){var r,n,i,o;if(e)for(r=0,n=(o=Object.keys(e)).length;r<n;r+=1)t[i=o[r]]=e[i];return t}};function gt(t,e){var r="",n=t.reason||"(unknown reason)";return t.mark?(t.mark.name&&(r+='in "'+t.mark.name+'" '),r+="("+(t.mark.line+1)+":"+(t.mark.column+1)+")",!e&&t.mark.snippet&&(r+="\n\n"+t.mark.snippet),n+" "+r):n}function vt(t,e){Error.call(this),this.name="YAMLException",this.reason=t,this.mark=e,this.message=gt(this,!1),Error.captureStackTrace?Error.captureStackTrace(this,this.constructor):this.stack=(new Error).stack||""}vt.prototype=Object.create(Error.prototype),vt.prototype.constructor=vt,vt.prototype.toString=function(t){return this.name+": "+gt(this,t)};var wt=vt;function Mt(t,e,r,n,i){var o="",s="",u=Math.floor(i/2)-1;return n-e>u&&(e=n-u+(o=" ... ").length),r-n>u&&(r=n+u-(s=" ...").length),{str:o+t.slice(e,r).replace(/\t/g,"→")+s,pos:n-e+o.length}}function Lt(t,e){return yt.repeat(" ",e-t.length)+t}var _t=function(t,e){if(e=Object.create(e||null),!t.buffer)return null;e.maxLength||(e.maxLength=79),"number"!=typeof e.indent&&(e.indent=1),"number"!=typeof e.linesBefore&&(e.linesBefore=3),"number"!=typeof e.linesAfter&&(e.linesAfter=2);for(var r,n=/\r?\n|\r|\0/g,i=[0],o=[],s=-1;r=n.exec(t.buffer);)o.push(r.index),i.push(r.index+r[0].length),t.position<=r.index&&s<0&&(s=i.length-2);s<0&&(s=i.length-1);var u,a,c="",f=Math.min(t.line+e.linesAfter,o.length).toString().length,l=e.maxLength-(e.indent+f+3);for(u=1;u<=e.linesBefore&&!(s-u<0);u++)a=Mt(t.buffer,i[s-u],o[s-u],t.position-(i[s]-i[s-u]),l),c=yt.repeat(" ",e.indent)+Lt((t.line-u+1).toString(),f)+" | "+a.str+"\n"+c;for(a=Mt(t.buffer,i[s],o[s],t.position,l),c+=yt.repeat(" ",e.indent)+Lt((t.line+1).toString(),f)+" | "+a.str+"\n",c+=yt.repeat("-",e.indent+f+3+a.pos)+"^\n",u=1;u<=e.linesAfter&&!(s+u>=o.length);u++)a=Mt(t.buffer,i[s+u],o[s+u],t.position-(i[s]-i[s+u]),l),c+=yt.repeat(" ",e.indent)+Lt((t.line+u+1).toString(),f)+" | "+a.str+"\n";return c.replace(/\n$/,"")},mt=["kind","multi","resolve","construct","instanceOf","predicate","represent","representName","defaultStyle","styleAliases"],bt=["scalar","sequence","mapping"];var jt=function(t,e){if(e=e||{},Object.keys(e).forEach((function(e){if(-1===mt.indexOf(e))throw new wt('Unknown option "'+e+'" is met in definition of "'+t+'" YAML type.')})),this.options=e,this.tag=t,this.kind=e.kind||null,this.resolve=e.resolve||function(){return!0},this.construct=e.construct||function(t){return t},this.instanceOf=e.instanceOf||null,this.predicate=e.predicate||null,this.represent=e.represent||null,this.representName=e.representName||null,this.defaultStyle=e.defaultStyle||null,this.multi=e.multi||!1,this.styleAliases=function(t){var e={};return null!==t&&Object.keys(t).forEach((function(r){t[r].forEach((function(t){e[String(t)]=r}))})),e}(e.styleAliases||null),-1===bt.indexOf(this.kind))throw new wt('Unknown kind "'+this.kind+'" is specified for "'+t+'" YAML type.')};function xt(t,e){var r=[];return t[e].forEach((function(t){var e=r.length;r.forEach((function(r,n){r.tag===t.tag&&r.kind===t.kind&&r.multi===t.multi&&(e=n)})),r[e]=t})),r}function Nt(t){return this.extend(t)}Nt.prototype.extend=function(t){var e=[],r=[];if(t instanceof jt)r.push(t);else if(Array.isArray(t))r=r.concat(t);else{if(!t||!Array.isArray(t.implicit)&&!Array.isArray(t.explicit))throw new wt("Schema.extend argument should be a Type, [ Type ], or a schema definition ({ implicit: [...], explicit: [...] })");t.implicit&&(e=e.concat(t.implicit)),t.explicit&&(r=r.concat(t.explicit))}e.forEach((function(t){if(!(t instanceof jt))throw new wt("Specified list of YAML types (or a single Type object) contains a non-Type object.");if(t.loadKind&&"scalar"!==t.loadKind)throw new wt("There is a non-scalar type in the implicit list of a schema. Implicit resolving of such types is not supported.");if(t.multi)throw new wt("There is a multi type in the implicit list of a schema. Multi tags can only be listed as explicit.")})),r.forEach((function(t){if(!(t instanceof jt))throw new wt("Specified list of YAML types (or a single Type object) contains a non-Type object.")}));var n=Object.create(Nt.prototype);return n.implicit=(this.implicit||[]).concat(e),n.explicit=(this.explicit||[]).concat(r),n.compiledImplicit=xt(n,"implicit"),n.compiledExplicit=xt(n,"explicit"),n.compiledTypeMap=function(){var t,e,r={scalar:{},sequence:{},mapping:{},fallback:{},multi:{scalar:[],sequence:[],mapping:[],fallback:[]}};function n(t){t.multi?(r.multi[t.kind].push(t),r.multi.fallback.push(t)):r[t.kind][t.tag]=r.fallback[t.tag]=t}for(t=0,e=arguments.length;t<e;t+=1)arguments[t].forEach(n);return r}(n.compiledImplicit,n.compiledExplicit),n};var St=Nt,Dt=new jt("tag:yaml.org,2002:str",{kind:"scalar",construct:function(t){return null!==t?t:""}}),It=new jt("tag:yaml.org,2002:seq",{kind:"sequence",construct:function(t){return null!==t?t:[]}}),Et=new jt("tag:yaml.org,2002:map",{kind:"mapping",construct:function(t){return null!==t?t:{}}}),At=new St({explicit:[Dt,It,Et]});var Ct=new jt("tag:yaml.org,2002:null",{kind:"scalar",resolve:function(t){if(null===t)return!0;var e=t.length;return 1===e&&"~"===t||4===e&&("null"===t||"Null"===t||"NULL"===t)},construct:function(){return null},predicate:function(t){return null===t},represent:{canonical:function(){return"~"},lowercase:function(){return"null"},uppercase:function(){return"NULL"},camelcase:function(){return"Null"},empty:function(){return""}},defaultStyle:"lowercase"});var Tt=new jt("tag:yaml.org,2002:bool",{kind:"scalar",resolve:function(t){if(null===t)return!1;var e=t.length;return 4===e&&("true"===t||"True"===t||"TRUE"===t)||5===e&&("false"===t||"False"===t||"FALSE"===t)},construct:function(t){return"true"===t||"True"===t||"TRUE"===t},predicate:function(t){return"[object Boolean]"===Object.prototype.toString.call(t)},represent:{lowercase:function(t){return t?"true":"false"},uppercase:function(t){return t?"TRUE":"FALSE"},camelcase:function(t){return t?"True":"False"}},defaultStyle:"lowercase"});function Ot(t){return 48<=t&&t<=55}function zt(t){return 48<=t&&t<=57}var kt=new jt("tag:yaml.org,2002:int",{kind:"scalar",resolve:function(t){if(null===t)return!1;var e,r,n=t.length,i=0,o=!1;if(!n)return!1;if("-"!==(e=t[i])&&"+"!==e||(e=t[++i]),"0"===e){if(i+1===n)return!0;if("b"===(e=t[++i])){for(i++;i<n;i++)if("_"!==(e=t[i])){if("0"!==e&&"1"!==e)return!1;o=!0}return o&&"_"!==e}if("x"===e){for(i++;i<n;i++)if("_"!==(e=t[i])){if(!(48<=(r=t.charCodeAt(i))&&r<=57||65<=r&&r<=70||97<=r&&r<=102))return!1;o=!0}return o&&"_"!==e}if("o"===e){for(i++;i<n;i++)if("_"!==(e=t[i])){if(!Ot(t.charCodeAt(i)))return!1;o=!0}return o&&"_"!==e}}if("_"===e)return!1;for(;i<n;i++)if("_"!==(e=t[i])){if(!zt(t.charCodeAt(i)))return!1;o=!0}return!(!o||"_"===e)},construct:function(t){var e,r=t,n=1;if(-1!==r.indexOf("_")&&(r=r.replace(/_/g,"")),"-"!==(e=r[0])&&"+"!==e||("-"===e&&(n=-1),e=(r=r.slice(1))[0]),"0"===r)return 0;if("0"===e){if("b"===r[1])return n*parseInt(r.slice(2),2);if("x"===r[1])return n*parseInt(r.slice(2),16);if("o"===r[1])return n*parseInt(r.slice(2),8)}return n*parseInt(r,10)},predicate:function(t){return"[object Number]"===Object.prototype.toString.call(t)&&t%1==0&&!yt.isNegativeZero(t)},represent:{binary:function(t){return t>=0?"0b"+t.toString(2):"-0b"+t.toString(2).slice(1)},octal:function(t){return t>=0?"0o"+t.toString(8):"-0o"+t.toString(8).slice(1)},decimal:function(t){return t.toString(10)},hexadecimal:function(t){return t>=0?"0x"+t.toString(16).toUpperCase():"-0x"+t.toString(16).toUpperCase().slice(1)}},defaultStyle:"decimal",styleAliases:{binary:[2,"bin"],octal:[8,"oct"],decimal:[10,"dec"],hexadecimal:[16,"hex"]}}),Ut=new RegExp("^(?:[-+]?(?:[0-9][0-9_]*)(?:\\.[0-9_]*)?(?:[eE][-+]?[0-9]+)?|\\.[0-9_]+(?:[eE][-+]?[0-9]+)?|[-+]?\\.(?:inf|Inf|INF)|\\.(?:nan|NaN|NAN))$");var Rt=/^[-+]?[0-9]+e/;var Yt=new jt("tag:yaml.org,2002:float",{kind:"scalar",resolve:function(t){return null!==t&&!(!Ut.test(t)||"_"===t[t.length-1])},construct:function(t){var e,r;return r="-"===(e=t.replace(/_/g,"").toLowerCase())[0]?-1:1,"+-".indexOf(e[0])>=0&&(e=e.slice(1)),".inf"===e?1===r?Number.POSITIVE_INFINITY:Number.NEGATIVE_INFINITY:".nan"===e?NaN:r*parseFloat(e,10)},predicate:function(t){return"[object Number]"===Object.prototype.toString.call(t)&&(t%1!=0||yt.isNegativeZero(t))},represent:function(t,e){var r;if(isNaN(t))switch(e){case"lowercase":return".nan";case"uppercase":return".NAN";case"camelcase":return".NaN"}else if(Number.POSITIVE_INFINITY===t)switch(e){case"lowercase":return".inf";case"uppercase":return".INF";case"camelcase":return".Inf"}else if(Number.NEGATIVE_INFINITY===t)switch(e){case"lowercase":return"-.inf";case"uppercase":return"-.INF";case"camelcase":return"-.Inf"}else if(yt.isNegativeZero(t))return"-0.0";return r=t.toString(10),Rt.test(r)?r.replace("e",".e"):r},defaultStyle:"lowercase"}),Bt=At.extend({implicit:[Ct,Tt,kt,Yt]}),Pt=Bt,Qt=new RegExp("^([0-9][0-9][0-9][0-9])-([0-9][0-9])-([0-9][0-9])$"),Ft=new RegExp("^([0-9][0-9][0-9][0-9])-([0-9][0-9]?)-([0-9][0-9]?)(?:[Tt]|[ \\t]+)([0-9][0-9]?):([0-9][0-9]):([0-9][0-9])(?:\\.([0-9]*))?(?:[ \\t]*(Z|([-+])([0-9][0-9]?)(?::([0-9][0-9]))?))?$");var Gt=new jt("tag:yaml.org,2002:timestamp",{kind:"scalar",resolve:function(t){return null!==t&&(null!==Qt.exec(t)||null!==Ft.exec(t))},construct:function(t){var e,r,n,i,o,s,u,a,c=0,f=null;if(null===(e=Qt.exec(t))&&(e=Ft.exec(t)),null===e)throw new Error("Date resolve error");if(r=+e[1],n=+e[2]-1,i=+e[3],!e[4])return new Date(Date.UTC(r,n,i));if(o=+e[4],s=+e[5],u=+e[6],e[7]){for(c=e[7].slice(0,3);c.length<3;)c+="0";c=+c}return e[9]&&(f=6e4*(60*+e[10]+ +(e[11]||0)),"-"===e[9]&&(f=-f)),a=new Date(Date.UTC(r,n,i,o,s,u,c)),f&&a.setTime(a.getTime()-f),a},instanceOf:Date,represent:function(t){return t.toISOString()}});var Wt=new jt("tag:yaml.org,2002:merge",{kind:"scalar",resolve:function(t){return"<<"===t||null===t}}),qt="ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=\n\r";var Ht=new jt("tag:yaml.org,2002:binary",{kind:"scalar",resolve:function(t){if(null===t)return!1;var e,r,n=0,i=t.length,o=qt;for(r=0;r<i;r++)if(!((e=o.indexOf(t.charAt(r)))>64)){if(e<0)return!1;n+=6}return n%8==0},construct:function(t){var e,r,n=t.replace(/[\r\n=]/g,""),i=n.length,o=qt,s=0,u=[];for(e=0;e<i;e++)e%4==0&&e&&(u.push(s>>16&255),u.push(s>>8&255),u.push(255&s)),s=s<<6|o.indexOf(n.charAt(e));return 0===(r=i%4*6)?(u.push(s>>16&255),u.push(s>>8&255),u.push(255&s)):18===r?(u.push(s>>10&255),u.push(s>>2&255)):12===r&&u.push(s>>4&255),new Uint8Array(u)},predicate:function(t){return"[object Uint8Array]"===Object.prototype.toString.call(t)},represent:function(t){var e,r,n="",i=0,o=t.length,s=qt;for(e=0;e<o;e++)e%3==0&&e&&(n+=s[i>>18&63],n+=s[i>>12&63],n+=s[i>>6&63],n+=s[63&i]),i=(i<<8)+t[e];return 0===(r=o%3)?(n+=s[i>>18&63],n+=s[i>>12&63],n+=s[i>>6&63],n+=s[63&i]):2===r?(n+=s[i>>10&63],n+=s[i>>4&63],n+=s[i<<2&63],n+=s[64]):1===r&&(n+=s[i>>2&63],n+=s[i<<4&63],n+=s[64],n+=s[64]),n}}),Jt=Object.prototype.hasOwnProperty,$t=Object.prototype.toString;var Zt=new jt("tag:yaml.org,2002:omap",{kind:"sequence",resolve:function(t){if(null===t)return!0;var e,r,n,i,o,s=[],u=t;for(e=0,r=u.length;e<r;e+=1){if(n=u[e],o=!1,"[object Object]"!==$t.call(n))return!1;for(i in n)if(Jt.call(n,i)){if(o)return!1;o=!0}if(!o)return!1;if(-1!==s.indexOf(i))return!1;s.push(i)}return!0},construct:function(t){return null!==t?t:[]}}),Vt=Object.prototype.toString;var Xt=new jt("tag:yaml.org,2002:pairs",{kind:"sequence",resolve:function(t){if(null===t)return!0;var e,r,n,i,o,s=t;for(o=new Array(s.length),e=0,r=s.length;e<r;e+=1){if(n=s[e],"[object Object]"!==Vt.call(n))return!1;if(1!==(i=Object.keys(n)).length)return!1;o[e]=[i[0],n[i[0]]]}return!0},construct:function(t){if(null===t)return[];var e,r,n,i,o,s=t;for(o=new Array(s.length),e=0,r=s.length;e<r;e+=1)n=s[e],i=Object.keys(n),o[e]=[i[0],n[i[0]]];return o}}),Kt=Object.prototype.hasOwnProperty;var te=new jt("tag:yaml.org,2002:set",{kind:"mapping",resolve:function(t){if(null===t)return!0;var e,r=t;for(e in r)if(Kt.call(r,e)&&null!==r[e])return!1;return!0},construct:function(t){return null!==t?t:{}}}),ee=Pt.extend({implicit:[Gt,Wt],explicit:[Ht,Zt,Xt,te]}),re=Object.prototype.hasOwnProperty,ne=/[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x84\x86-\x9F\uFFFE\uFFFF]|[\uD800-\uDBFF](?![\uDC00-\uDFFF])|(?:[^\uD800-\uDBFF]|^)[\uDC00-\uDFFF]/,ie=/[\x85\u2028\u2029]/,oe=/[,\[\]\{\}]/,se=/^(?:!|!!|![a-z\-]+!)$/i,ue=/^(?:!|[^,\[\]\{\}])(?:%[0-9a-f]{2}|[0-9a-z\-#;\/\?:@&=\+\$,_\.!~\*'\(\)\[\]])*$/i;function ae(t){return Object.prototype.toString.call(t)}function ce(t){return 10===t||13===t}function fe(t){return 9===t||32===t}function le(t){return 9===t||32===t||10===t||13===t}function he(t){return 44===t||91===t||93===t||123===t||125===t}function pe(t){var e;return 48<=t&&t<=57?t-48:97<=(e=32|t)&&e<=102?e-97+10:-1}function de(t){return 48===t?"\0":97===t?"":98===t?"\b":116===t||9===t?"\t":110===t?"\n":118===t?"\v":102===t?"\f":114===t?"\r":101===t?"":32===t?" ":34===t?'"':47===t?"/":92===t?"\\":78===t?"":95===t?" ":76===t?"\u2028":80===t?"\u2029":""}function ye(t){return t<=65535?String.fromCharCode(t):String.fromCharCode(55296+(t-65536>>10),56320+(t-65536&1023))}for(var ge=new Array(256),ve=new Array(256),we=0;we<256;we++)ge[we]=de(we)?1:0,ve[we]=de(we);function Me(t,e){this.input=t,this.filename=e.filename||null,this.schema=e.schema||ee,this.onWarning=e.onWarning||null,this.legacy=e.legacy||!1,this.json=e.json||!1,this.listener=e.listener||null,this.implicitTypes=this.schema.compiledImplicit,this.typeMap=this.schema.compiledTypeMap,this.length=t.length,this.position=0,this.line=0,this.lineStart=0,this.lineIndent=0,this.firstTabInLine=-1,this.documents=[]}function Le(t,e){var r={name:t.filename,buffer:t.input.slice(0,-1),position:t.position,line:t.line,column:t.position-t.lineStart};return r.snippet=_t(r),new wt(e,r)}function _e(t,e){throw Le(t,e)}function me(t,e){t.onWarning&&t.onWarning.call(null,Le(t,e))}var be={YAML:function(t,e,r){var n,i,o;null!==t.version&&_e(t,"duplication of %YAML directive"),1!==r.length&&_e(t,"YAML directive accepts exactly one argument"),null===(n=/^([0-9]+)\.([0-9]+)$/.exec(r[0]))&&_e(t,"ill-formed argument of the YAML directive"),i=parseInt(n[1],10),o=parseInt(n[2],10),1!==i&&_e(t,"unacceptable YAML version of the document"),t.version=r[0],t.checkLineBreaks=o<2,1!==o&&2!==o&&me(t,"unsupported YAML version of the document")},TAG:function(t,e,r){var n,i;2!==r.length&&_e(t,"TAG directive accepts exactly two arguments"),n=r[0],i=r[1],se.test(n)||_e(t,"ill-formed tag handle (first argument) of the TAG directive"),re.call(t.tagMap,n)&&_e(t,'there is a previously declared suffix for "'+n+'" tag handle'),ue.test(i)||_e(t,"ill-formed tag prefix (second argument) of the TAG directive");try{i=decodeURIComponent(i)}catch(e){_e(t,"tag prefix is malformed: "+i)}t.tagMap[n]=i}};function je(t,e,r,n){var i,o,s,u;if(e<r){if(u=t.input.slice(e,r),n)for(i=0,o=u.length;i<o;i+=1)9===(s=u.charCodeAt(i))||32<=s&&s<=1114111||_e(t,"expected valid JSON character");else ne.test(u)&&_e(t,"the stream contains non-printable characters");t.result+=u}}function xe(t,e,r,n){var i,o,s,u;for(yt.isObject(r)||_e(t,"cannot merge mappings; the provided source object is unacceptable"),s=0,u=(i=Object.keys(r)).length;s<u;s+=1)o=i[s],re.call(e,o)||(e[o]=r[o],n[o]=!0)}function Ne(t,e,r,n,i,o,s,u,a){var c,f;if(Array.isArray(i))for(c=0,f=(i=Array.prototype.slice.call(i)).length;c<f;c+=1)Array.isArray(i[c])&&_e(t,"nested arrays are not supported inside keys"),"object"==typeof i&&"[object Object]"===ae(i[c])&&(i[c]="[object Object]");if("object"==typeof i&&"[object Object]"===ae(i)&&(i="[object Object]"),i=String(i),null===e&&(e={}),"tag:yaml.org,2002:merge"===n)if(Array.isArray(o))for(c=0,f=o.length;c<f;c+=1)xe(t,e,o[c],r);else xe(t,e,o,r);else t.json||re.call(r,i)||!re.call(e,i)||(t.line=s||t.line,t.lineStart=u||t.lineStart,t.position=a||t.position,_e(t,"duplicated mapping key")),"__proto__"===i?Object.defineProperty(e,i,{configurable:!0,enumerable:!0,writable:!0,value:o}):e[i]=o,delete r[i];return e}function Se(t){var e;10===(e=t.input.charCodeAt(t.position))?t.position++:13===e?(t.position++,10===t.input.charCodeAt(t.position)&&t.position++):_e(t,"a line break is expected"),t.line+=1,t.lineStart=t.position,t.firstTabInLine=-1}function De(t,e,r){for(var n=0,i=t.input.charCodeAt(t.position);0!==i;){for(;fe(i);)9===i&&-1===t.firstTabInLine&&(t.firstTabInLine=t.position),i=t.input.charCodeAt(++t.position);if(e&&35===i)do{i=t.input.charCodeAt(++t.position)}while(10!==i&&13!==i&&0!==i);if(!ce(i))break;for(Se(t),i=t.input.charCodeAt(t.position),n++,t.lineIndent=0;32===i;)t.lineIndent++,i=t.input.charCodeAt(++t.position)}return-1!==r&&0!==n&&t.lineIndent<r&&me(t,"deficient indentation"),n}function Ie(t){var e,r=t.position;return!(45!==(e=t.input.charCodeAt(r))&&46!==e||e!==t.input.charCodeAt(r+1)||e!==t.input.charCodeAt(r+2)||(r+=3,0!==(e=t.input.charCodeAt(r))&&!le(e)))}function Ee(t,e){1===e?t.result+=" ":e>1&&(t.result+=yt.repeat("\n",e-1))}function Ae(t,e){var r,n,i=t.tag,o=t.anchor,s=[],u=!1;if(-1!==t.firstTabInLine)return!1;for(null!==t.anchor&&(t.anchorMap[t.anchor]=s),n=t.input.charCodeAt(t.position);0!==n&&(-1!==t.firstTabInLine&&(t.position=t.firstTabInLine,_e(t,"tab characters must not be used in indentation")),45===n)&&le(t.input.charCodeAt(t.position+1));)if(u=!0,t.position++,De(t,!0,-1)&&t.lineIndent<=e)s.push(null),n=t.input.charCodeAt(t.position);else if(r=t.line,Oe(t,e,3,!1,!0),s.push(t.result),De(t,!0,-1),n=t.input.charCodeAt(t.position),(t.line===r||t.lineIndent>e)&&0!==n)_e(t,"bad indentation of a sequence entry");else if(t.lineIndent<e)break;return!!u&&(t.tag=i,t.anchor=o,t.kind="sequence",t.result=s,!0)}function Ce(t){var e,r,n,i,o=!1,s=!1;if(33!==(i=t.input.charCodeAt(t.position)))return!1;if(null!==t.tag&&_e(t,"duplication of a tag property"),60===(i=t.input.charCodeAt(++t.position))?(o=!0,i=t.input.charCodeAt(++t.position)):33===i?(s=!0,r="!!",i=t.input.charCodeAt(++t.position)):r="!",e=t.position,o){do{i=t.input.charCodeAt(++t.position)}while(0!==i&&62!==i);t.position<t.length?(n=t.input.slice(e,t.position),i=t.input.charCodeAt(++t.position)):_e(t,"unexpected end of the stream within a verbatim tag")}else{for(;0!==i&&!le(i);)33===i&&(s?_e(t,"tag suffix cannot contain exclamation marks"):(r=t.input.slice(e-1,t.position+1),se.test(r)||_e(t,"named tag handle cannot contain such characters"),s=!0,e=t.position+1)),i=t.input.charCodeAt(++t.position);n=t.input.slice(e,t.position),oe.test(n)&&_e(t,"tag suffix cannot contain flow indicator characters")}n&&!ue.test(n)&&_e(t,"tag name cannot contain such characters: "+n);try{n=decodeURIComponent(n)}catch(e){_e(t,"tag name is malformed: "+n)}return o?t.tag=n:re.call(t.tagMap,r)?t.tag=t.tagMap[r]+n:"!"===r?t.tag="!"+n:"!!"===r?t.tag="tag:yaml.org,2002:"+n:_e(t,'undeclared tag handle "'+r+'"'),!0}function Te(t){var e,r;if(38!==(r=t.input.charCodeAt(t.position)))return!1;for(null!==t.anchor&&_e(t,"duplication of an anchor property"),r=t.input.charCodeAt(++t.position),e=t.position;0!==r&&!le(r)&&!he(r);)r=t.input.charCodeAt(++t.position);return t.position===e&&_e(t,"name of an anchor node must contain at least one character"),t.anchor=t.input.slice(e,t.position),!0}function Oe(t,e,r,n,i){var o,s,u,a,c,f,l,h,p,d=1,y=!1,g=!1;if(null!==t.listener&&t.listener("open",t),t.tag=null,t.anchor=null,t.kind=null,t.result=null,o=s=u=4===r||3===r,n&&De(t,!0,-1)&&(y=!0,t.lineIndent>e?d=1:t.lineIndent===e?d=0:t.lineIndent<e&&(d=-1)),1===d)for(;Ce(t)||Te(t);)De(t,!0,-1)?(y=!0,u=o,t.lineIndent>e?d=1:t.lineIndent===e?d=0:t.lineIndent<e&&(d=-1)):u=!1;if(u&&(u=y||i),1!==d&&4!==r||(h=1===r||2===r?e:e+1,p=t.position-t.lineStart,1===d?u&&(Ae(t,p)||function(t,e,r){var n,i,o,s,u,a,c,f=t.tag,l=t.anchor,h={},p=Object.create(null),d=null,y=null,g=null,v=!1,w=!1;if(-1!==t.firstTabInLine)return!1;for(null!==t.anchor&&(t.anchorMap[t.anchor]=h),c=t.input.charCodeAt(t.position);0!==c;){if(v||-1===t.firstTabInLine||(t.position=t.firstTabInLine,_e(t,"tab characters must not be used in indentation")),n=t.input.charCodeAt(t.position+1),o=t.line,63!==c&&58!==c||!le(n)){if(s=t.line,u=t.lineStart,a=t.position,!Oe(t,r,2,!1,!0))break;if(t.line===o){for(c=t.input.charCodeAt(t.position);fe(c);)c=t.input.charCodeAt(++t.position);if(58===c)le(c=t.input.charCodeAt(++t.position))||_e(t,"a whitespace character is expected after the key-value separator within a block mapping"),v&&(Ne(t,h,p,d,y,null,s,u,a),d=y=g=null),w=!0,v=!1,i=!1,d=t.tag,y=t.result;else{if(!w)return t.tag=f,t.anchor=l,!0;_e(t,"can not read an implicit mapping pair; a colon is missed")}}else{if(!w)return t.tag=f,t.anchor=l,!0;_e(t,"can not read a block mapping entry; a multiline key may not be an implicit key")}}else 63===c?(v&&(Ne(t,h,p,d,y,null,s,u,a),d=y=g=null),w=!0,v=!0,i=!0):v?(v=!1,i=!0):_e(t,"incomplete explicit mapping pair; a key node is missed; or followed by a non-tabulated empty line"),t.position+=1,c=n;if((t.line===o||t.lineIndent>e)&&(v&&(s=t.line,u=t.lineStart,a=t.position),Oe(t,e,4,!0,i)&&(v?y=t.result:g=t.result),v||(Ne(t,h,p,d,y,g,s,u,a),d=y=g=null),De(t,!0,-1),c=t.input.charCodeAt(t.position)),(t.line===o||t.lineIndent>e)&&0!==c)_e(t,"bad indentation of a mapping entry");else if(t.lineIndent<e)break}return v&&Ne(t,h,p,d,y,null,s,u,a),w&&(t.tag=f,t.anchor=l,t.kind="mapping",t.result=h),w}(t,p,h))||function(t,e){var r,n,i,o,s,u,a,c,f,l,h,p,d=!0,y=t.tag,g=t.anchor,v=Object.create(null);if(91===(p=t.input.charCodeAt(t.position)))s=93,c=!1,o=[];else{if(123!==p)return!1;s=125,c=!0,o={}}for(null!==t.anchor&&(t.anchorMap[t.anchor]=o),p=t.input.charCodeAt(++t.position);0!==p;){if(De(t,!0,e),(p=t.input.charCodeAt(t.position))===s)return t.position++,t.tag=y,t.anchor=g,t.kind=c?"mapping":"sequence",t.result=o,!0;d?44===p&&_e(t,"expected the node content, but found ','"):_e(t,"missed comma between flow collection entries"),h=null,u=a=!1,63===p&&le(t.input.charCodeAt(t.position+1))&&(u=a=!0,t.position++,De(t,!0,e)),r=t.line,n=t.lineStart,i=t.position,Oe(t,e,1,!1,!0),l=t.tag,f=t.result,De(t,!0,e),p=t.input.charCodeAt(t.position),!a&&t.line!==r||58!==p||(u=!0,p=t.input.charCodeAt(++t.position),De(t,!0,e),Oe(t,e,1,!1,!0),h=t.result),c?Ne(t,o,v,l,f,h,r,n,i):u?o.push(Ne(t,null,v,l,f,h,r,n,i)):o.push(f),De(t,!0,e),44===(p=t.input.charCodeAt(t.position))?(d=!0,p=t.input.charCodeAt(++t.position)):d=!1}_e(t,"unexpected end of the stream within a flow collection")}(t,h)?g=!0:(s&&function(t,e){var r,n,i,o,s,u=1,a=!1,c=!1,f=e,l=0,h=!1;if(124===(o=t.input.charCodeAt(t.position)))n=!1;else{if(62!==o)return!1;n=!0}for(t.kind="scalar",t.result="";0!==o;)if(43===(o=t.input.charCodeAt(++t.position))||45===o)1===u?u=43===o?3:2:_e(t,"repeat of a chomping mode identifier");else{if(!((i=48<=(s=o)&&s<=57?s-48:-1)>=0))break;0===i?_e(t,"bad explicit indentation width of a block scalar; it cannot be less than one"):c?_e(t,"repeat of an indentation width identifier"):(f=e+i-1,c=!0)}if(fe(o)){do{o=t.input.charCodeAt(++t.position)}while(fe(o));if(35===o)do{o=t.input.charCodeAt(++t.position)}while(!ce(o)&&0!==o)}for(;0!==o;){for(Se(t),t.lineIndent=0,o=t.input.charCodeAt(t.position);(!c||t.lineIndent<f)&&32===o;)t.lineIndent++,o=t.input.charCodeAt(++t.position);if(!c&&t.lineIndent>f&&(f=t.lineIndent),ce(o))l++;else{if(t.lineIndent<f){3===u?t.result+=yt.repeat("\n",a?1+l:l):1===u&&a&&(t.result+="\n");break}for(n?fe(o)?(h=!0,t.result+=yt.repeat("\n",a?1+l:l)):h?(h=!1,t.result+=yt.repeat("\n",l+1)):0===l?a&&(t.result+=" "):t.result+=yt.repeat("\n",l):t.result+=yt.repeat("\n",a?1+l:l),a=!0,c=!0,l=0,r=t.position;!ce(o)&&0!==o;)o=t.input.charCodeAt(++t.position);je(t,r,t.position,!1)}}return!0}(t,h)||function(t,e){var r,n,i;if(39!==(r=t.input.charCodeAt(t.position)))return!1;for(t.kind="scalar",t.result="",t.position++,n=i=t.position;0!==(r=t.input.charCodeAt(t.position));)if(39===r){if(je(t,n,t.position,!0),39!==(r=t.input.charCodeAt(++t.position)))return!0;n=t.position,t.position++,i=t.position}else ce(r)?(je(t,n,i,!0),Ee(t,De(t,!1,e)),n=i=t.position):t.position===t.lineStart&&Ie(t)?_e(t,"unexpected end of the document within a single quoted scalar"):(t.position++,i=t.position);_e(t,"unexpected end of the stream within a single quoted scalar")}(t,h)||function(t,e){var r,n,i,o,s,u,a;if(34!==(u=t.input.charCodeAt(t.position)))return!1;for(t.kind="scalar",t.result="",t.position++,r=n=t.position;0!==(u=t.input.charCodeAt(t.position));){if(34===u)return je(t,r,t.position,!0),t.position++,!0;if(92===u){if(je(t,r,t.position,!0),ce(u=t.input.charCodeAt(++t.position)))De(t,!1,e);else if(u<256&&ge[u])t.result+=ve[u],t.position++;else if((s=120===(a=u)?2:117===a?4:85===a?8:0)>0){for(i=s,o=0;i>0;i--)(s=pe(u=t.input.charCodeAt(++t.position)))>=0?o=(o<<4)+s:_e(t,"expected hexadecimal character");t.result+=ye(o),t.position++}else _e(t,"unknown escape sequence");r=n=t.position}else ce(u)?(je(t,r,n,!0),Ee(t,De(t,!1,e)),r=n=t.position):t.position===t.lineStart&&Ie(t)?_e(t,"unexpected end of the document within a double quoted scalar"):(t.position++,n=t.position)}_e(t,"unexpected end of the stream within a double quoted scalar")}(t,h)?g=!0:!function(t){var e,r,n;if(42!==(n=t.input.charCodeAt(t.position)))return!1;for(n=t.input.charCodeAt(++t.position),e=t.position;0!==n&&!le(n)&&!he(n);)n=t.input.charCodeAt(++t.position);return t.position===e&&_e(t,"name of an alias node must contain at least one character"),r=t.input.slice(e,t.position),re.call(t.anchorMap,r)||_e(t,'unidentified alias "'+r+'"'),t.result=t.anchorMap[r],De(t,!0,-1),!0}(t)?function(t,e,r){var n,i,o,s,u,a,c,f,l=t.kind,h=t.result;if(le(f=t.input.charCodeAt(t.position))||he(f)||35===f||38===f||42===f||33===f||124===f||62===f||39===f||34===f||37===f||64===f||96===f)return!1;if((63===f||45===f)&&(le(n=t.input.charCodeAt(t.position+1))||r&&he(n)))return!1;for(t.kind="scalar",t.result="",i=o=t.position,s=!1;0!==f;){if(58===f){if(le(n=t.input.charCodeAt(t.position+1))||r&&he(n))break}else if(35===f){if(le(t.input.charCodeAt(t.position-1)))break}else{if(t.position===t.lineStart&&Ie(t)||r&&he(f))break;if(ce(f)){if(u=t.line,a=t.lineStart,c=t.lineIndent,De(t,!1,-1),t.lineIndent>=e){s=!0,f=t.input.charCodeAt(t.position);continue}t.position=o,t.line=u,t.lineStart=a,t.lineIndent=c;break}}s&&(je(t,i,o,!1),Ee(t,t.line-u),i=o=t.position,s=!1),fe(f)||(o=t.position+1),f=t.input.charCodeAt(++t.position)}return je(t,i,o,!1),!!t.result||(t.kind=l,t.result=h,!1)}(t,h,1===r)&&(g=!0,null===t.tag&&(t.tag="?")):(g=!0,null===t.tag&&null===t.anchor||_e(t,"alias node should not have any properties")),null!==t.anchor&&(t.anchorMap[t.anchor]=t.result)):0===d&&(g=u&&Ae(t,p))),null===t.tag)null!==t.anchor&&(t.anchorMap[t.anchor]=t.result);else if("?"===t.tag){for(null!==t.result&&"scalar"!==t.kind&&_e(t,'unacceptable node kind for !<?> tag; it should be "scalar", not "'+t.kind+'"'),a=0,c=t.implicitTypes.length;a<c;a+=1)if((l=t.implicitTypes[a]).resolve(t.result)){t.result=l.construct(t.result),t.tag=l.tag,null!==t.anchor&&(t.anchorMap[t.anchor]=t.result);break}}else if("!"!==t.tag){if(re.call(t.typeMap[t.kind||"fallback"],t.tag))l=t.typeMap[t.kind||"fallback"][t.tag];else for(l=null,a=0,c=(f=t.typeMap.multi[t.kind||"fallback"]).length;a<c;a+=1)if(t.tag.slice(0,f[a].tag.length)===f[a].tag){l=f[a];break}l||_e(t,"unknown tag !<"+t.tag+">"),null!==t.result&&l.kind!==t.kind&&_e(t,"unacceptable node kind for !<"+t.tag+'> tag; it should be "'+l.kind+'", not "'+t.kind+'"'),l.resolve(t.result,t.tag)?(t.result=l.construct(t.result,t.tag),null!==t.anchor&&(t.anchorMap[t.anchor]=t.result)):_e(t,"cannot resolve a node with !<"+t.tag+"> explicit tag")}return null!==t.listener&&t.listener("close",t),null!==t.tag||null!==t.anchor||g}function ze(t){var e,r,n,i,o=t.position,s=!1;for(t.version=null,t.checkLineBreaks=t.legacy,t.tagMap=Object.create(null),t.anchorMap=Object.create(null);0!==(i=t.input.charCodeAt(t.position))&&(De(t,!0,-1),i=t.input.charCodeAt(t.position),!(t.lineIndent>0||37!==i));){for(s=!0,i=t.input.charCodeAt(++t.position),e=t.position;0!==i&&!le(i);)i=t.input.charCodeAt(++t.position);for(n=[],(r=t.input.slice(e,t.position)).length<1&&_e(t,"directive name must not be less than one character in length");0!==i;){for(;fe(i);)i=t.input.charCodeAt(++t.position);if(35===i){do{i=t.input.charCodeAt(++t.position)}while(0!==i&&!ce(i));break}if(ce(i))break;for(e=t.position;0!==i&&!le(i);)i=t.input.charCodeAt(++t.position);n.push(t.input.slice(e,t.position))}0!==i&&Se(t),re.call(be,r)?be[r](t,r,n):me(t,'unknown document directive "'+r+'"')}De(t,!0,-1),0===t.lineIndent&&45===t.input.charCodeAt(t.position)&&45===t.input.charCodeAt(t.position+1)&&45===t.input.charCodeAt(t.position+2)?(t.position+=3,De(t,!0,-1)):s&&_e(t,"directives end mark is expected"),Oe(t,t.lineIndent-1,4,!1,!0),De(t,!0,-1),t.checkLineBreaks&&ie.test(t.input.slice(o,t.position))&&me(t,"non-ASCII line breaks are interpreted as content"),t.documents.push(t.result),t.position===t.lineStart&&Ie(t)?46===t.input.charCodeAt(t.position)&&(t.position+=3,De(t,!0,-1)):t.position<t.length-1&&_e(t,"end of the stream or a document separator is expected")}function ke(t,e){e=e||{},0!==(t=String(t)).length&&(10!==t.charCodeAt(t.length-1)&&13!==t.charCodeAt(t.length-1)&&(t+="\n"),65279===t.charCodeAt(0)&&(t=t.slice(1)));var r=new Me(t,e),n=t.indexOf("\0");for(-1!==n&&(r.position=n,_e(r,"null byte is not allowed in input")),r.input+="\0";32===r.input.charCodeAt(r.position);)r.lineIndent+=1,r.position+=1;for(;r.position<r.length-1;)ze(r);return r.documents}var Ue={loadAll:function(t,e,r){null!==e&&"object"==typeof e&&void 0===r&&(r=e,e=null);var n=ke(t,r);if("function"!=typeof e)return n;for(var i=0,o=n.length;i<o;i+=1)e(n[i])},load:function(t,e){var r=ke(t,e);if(0!==r.length){if(1===r.length)return r[0];throw new wt("expected a single document in the stream, but found more")}}},Re=Object.prototype.toString,Ye=Object.prototype.hasOwnProperty,Be=65279,Pe={0:"\\0",7:"\\a",8:"\\b",9:"\\t",10:"\\n",11:"\\v",12:"\\f",13:"\\r",27:"\\e",34:'\\"',92:"\\\\",133:"\\N",160:"\\_",8232:"\\L",8233:"\\P"},Qe=["y","Y","yes","Yes","YES","on","On","ON","n","N","no","No","NO","off","Off","OFF"],Fe=/^[-+]?[0-9_]+(?::[0-9_]+)+(?:\.[0-9_]*)?$/;function Ge(t){var e,r,n;if(e=t.toString(16).toUpperCase(),t<=255)r="x",n=2;else if(t<=65535)r="u",n=4;else{if(!(t<=4294967295))throw new wt("code point within a string may not be greater than 0xFFFFFFFF");r="U",n=8}return"\\"+r+yt.repeat("0",n-e.length)+e}function We(t){this.schema=t.schema||ee,this.indent=Math.max(1,t.indent||2),this.noArrayIndent=t.noArrayIndent||!1,this.skipInvalid=t.skipInvalid||!1,this.flowLevel=yt.isNothing(t.flowLevel)?-1:t.flowLevel,this.styleMap=function(t,e){var r,n,i,o,s,u,a;if(null===e)return{};for(r={},i=0,o=(n=Object.keys(e)).length;i<o;i+=1)s=n[i],u=String(e[s]),"!!"===s.slice(0,2)&&(s="tag:yaml.org,2002:"+s.slice(2)),(a=t.compiledTypeMap.fallback[s])&&Ye.call(a.styleAliases,u)&&(u=a.styleAliases[u]),r[s]=u;return r}(this.schema,t.styles||null),this.sortKeys=t.sortKeys||!1,this.lineWidth=t.lineWidth||80,this.noRefs=t.noRefs||!1,this.noCompatMode=t.noCompatMode||!1,this.condenseFlow=t.condenseFlow||!1,this.quotingType='"'===t.quotingType?2:1,this.forceQuotes=t.forceQuotes||!1,this.replacer="function"==typeof t.replacer?t.replacer:null,this.implicitTypes=this.schema.compiledImplicit,this.explicitTypes=this.schema.compiledExplicit,this.tag=null,this.result="",this.duplicates=[],this.usedDuplicates=null}function qe(t,e){for(var r,n=yt.repeat(" ",e),i=0,o=-1,s="",u=t.length;i<u;)-1===(o=t.indexOf("\n",i))?(r=t.slice(i),i=u):(r=t.slice(i,o+1),i=o+1),r.length&&"\n"!==r&&(s+=n),s+=r;return s}function He(t,e){return"\n"+yt.repeat(" ",t.indent*e)}function Je(t){return 32===t||9===t}function $e(t){return 32<=t&&t<=126||161<=t&&t<=55295&&8232!==t&&8233!==t||57344<=t&&t<=65533&&t!==Be||65536<=t&&t<=1114111}function Ze(t){return $e(t)&&t!==Be&&13!==t&&10!==t}function Ve(t,e,r){var n=Ze(t),i=n&&!Je(t);return(r?n:n&&44!==t&&91!==t&&93!==t&&123!==t&&125!==t)&&35!==t&&!(58===e&&!i)||Ze(e)&&!Je(e)&&35===t||58===e&&i}function Xe(t,e){var r,n=t.charCodeAt(e);return n>=55296&&n<=56319&&e+1<t.length&&(r=t.charCodeAt(e+1))>=56320&&r<=57343?1024*(n-55296)+r-56320+65536:n}function Ke(t){return/^\n* /.test(t)}function tr(t,e,r,n,i,o,s,u){var a,c,f=0,l=null,h=!1,p=!1,d=-1!==n,y=-1,g=$e(c=Xe(t,0))&&c!==Be&&!Je(c)&&45!==c&&63!==c&&58!==c&&44!==c&&91!==c&&93!==c&&123!==c&&125!==c&&35!==c&&38!==c&&42!==c&&33!==c&&124!==c&&61!==c&&62!==c&&39!==c&&34!==c&&37!==c&&64!==c&&96!==c&&function(t){return!Je(t)&&58!==t}(Xe(t,t.length-1));if(e||s)for(a=0;a<t.length;f>=65536?a+=2:a++){if(!$e(f=Xe(t,a)))return 5;g=g&&Ve(f,l,u),l=f}else{for(a=0;a<t.length;f>=65536?a+=2:a++){if(10===(f=Xe(t,a)))h=!0,d&&(p=p||a-y-1>n&&" "!==t[y+1],y=a);else if(!$e(f))return 5;g=g&&Ve(f,l,u),l=f}p=p||d&&a-y-1>n&&" "!==t[y+1]}return h||p?r>9&&Ke(t)?5:s?2===o?5:2:p?4:3:!g||s||i(t)?2===o?5:2:1}function er(t,e,r,n,i){t.dump=function(){if(0===e.length)return 2===t.quotingType?'""':"''";if(!t.noCompatMode&&(-1!==Qe.indexOf(e)||Fe.test(e)))return 2===t.quotingType?'"'+e+'"':"'"+e+"'";var o=t.indent*Math.max(1,r),s=-1===t.lineWidth?-1:Math.max(Math.min(t.lineWidth,40),t.lineWidth-o),u=n||t.flowLevel>-1&&r>=t.flowLevel;switch(tr(e,u,t.indent,s,(function(e){return function(t,e){var r,n;for(r=0,n=t.implicitTypes.length;r<n;r+=1)if(t.implicitTypes[r].resolve(e))return!0;return!1}(t,e)}),t.quotingType,t.forceQuotes&&!n,i)){case 1:return e;case 2:return"'"+e.replace(/'/g,"''")+"'";case 3:return"|"+rr(e,t.indent)+nr(qe(e,o));case 4:return">"+rr(e,t.indent)+nr(qe(function(t,e){var r,n,i=/(\n+)([^\n]*)/g,o=(u=t.indexOf("\n"),u=-1!==u?u:t.length,i.lastIndex=u,ir(t.slice(0,u),e)),s="\n"===t[0]||" "===t[0];var u;for(;n=i.exec(t);){var a=n[1],c=n[2];r=" "===c[0],o+=a+(s||r||""===c?"":"\n")+ir(c,e),s=r}return o}(e,s),o));case 5:return'"'+function(t){for(var e,r="",n=0,i=0;i<t.length;n>=65536?i+=2:i++)n=Xe(t,i),!(e=Pe[n])&&$e(n)?(r+=t[i],n>=65536&&(r+=t[i+1])):r+=e||Ge(n);return r}(e)+'"';default:throw new wt("impossible error: invalid scalar style")}}()}function rr(t,e){var r=Ke(t)?String(e):"",n="\n"===t[t.length-1];return r+(n&&("\n"===t[t.length-2]||"\n"===t)?"+":n?"":"-")+"\n"}function nr(t){return"\n"===t[t.length-1]?t.slice(0,-1):t}function ir(t,e){if(""===t||" "===t[0])return t;for(var r,n,i=/ [^ ]/g,o=0,s=0,u=0,a="";r=i.exec(t);)(u=r.index)-o>e&&(n=s>o?s:u,a+="\n"+t.slice(o,n),o=n+1),s=u;return a+="\n",t.length-o>e&&s>o?a+=t.slice(o,s)+"\n"+t.slice(s+1):a+=t.slice(o),a.slice(1)}function or(t,e,r,n){var i,o,s,u="",a=t.tag;for(i=0,o=r.length;i<o;i+=1)s=r[i],t.replacer&&(s=t.replacer.call(r,String(i),s)),(ur(t,e+1,s,!0,!0,!1,!0)||void 0===s&&ur(t,e+1,null,!0,!0,!1,!0))&&(n&&""===u||(u+=He(t,e)),t.dump&&10===t.dump.charCodeAt(0)?u+="-":u+="- ",u+=t.dump);t.tag=a,t.dump=u||"[]"}function sr(t,e,r){var n,i,o,s,u,a;for(o=0,s=(i=r?t.explicitTypes:t.implicitTypes).length;o<s;o+=1)if(((u=i[o]).instanceOf||u.predicate)&&(!u.instanceOf||"object"==typeof e&&e instanceof u.instanceOf)&&(!u.predicate||u.predicate(e))){if(r?u.multi&&u.representName?t.tag=u.representName(e):t.tag=u.tag:t.tag="?",u.represent){if(a=t.styleMap[u.tag]||u.defaultStyle,"[object Function]"===Re.call(u.represent))n=u.represent(e,a);else{if(!Ye.call(u.represent,a))throw new wt("!<"+u.tag+'> tag resolver accepts not "'+a+'" style');n=u.represent[a](e,a)}t.dump=n}return!0}return!1}function ur(t,e,r,n,i,o,s){t.tag=null,t.dump=r,sr(t,r,!1)||sr(t,r,!0);var u,a=Re.call(t.dump),c=n;n&&(n=t.flowLevel<0||t.flowLevel>e);var f,l,h="[object Object]"===a||"[object Array]"===a;if(h&&(l=-1!==(f=t.duplicates.indexOf(r))),(null!==t.tag&&"?"!==t.tag||l||2!==t.indent&&e>0)&&(i=!1),l&&t.usedDuplicates[f])t.dump="*ref_"+f;else{if(h&&l&&!t.usedDuplicates[f]&&(t.usedDuplicates[f]=!0),"[object Object]"===a)n&&0!==Object.keys(t.dump).length?(!function(t,e,r,n){var i,o,s,u,a,c,f="",l=t.tag,h=Object.keys(r);if(!0===t.sortKeys)h.sort();else if("function"==typeof t.sortKeys)h.sort(t.sortKeys);else if(t.sortKeys)throw new wt("sortKeys must be a boolean or a function");for(i=0,o=h.length;i<o;i+=1)c="",n&&""===f||(c+=He(t,e)),u=r[s=h[i]],t.replacer&&(u=t.replacer.call(r,s,u)),ur(t,e+1,s,!0,!0,!0)&&((a=null!==t.tag&&"?"!==t.tag||t.dump&&t.dump.length>1024)&&(t.dump&&10===t.dump.charCodeAt(0)?c+="?":c+="? "),c+=t.dump,a&&(c+=He(t,e)),ur(t,e+1,u,!0,a)&&(t.dump&&10===t.dump.charCodeAt(0)?c+=":":c+=": ",f+=c+=t.dump));t.tag=l,t.dump=f||"{}"}(t,e,t.dump,i),l&&(t.dump="&ref_"+f+t.dump)):(!function(t,e,r){var n,i,o,s,u,a="",c=t.tag,f=Object.keys(r);for(n=0,i=f.length;n<i;n+=1)u="",""!==a&&(u+=", "),t.condenseFlow&&(u+='"'),s=r[o=f[n]],t.replacer&&(s=t.replacer.call(r,o,s)),ur(t,e,o,!1,!1)&&(t.dump.length>1024&&(u+="? "),u+=t.dump+(t.condenseFlow?'"':"")+":"+(t.condenseFlow?"":" "),ur(t,e,s,!1,!1)&&(a+=u+=t.dump));t.tag=c,t.dump="{"+a+"}"}(t,e,t.dump),l&&(t.dump="&ref_"+f+" "+t.dump));else if("[object Array]"===a)n&&0!==t.dump.length?(t.noArrayIndent&&!s&&e>0?or(t,e-1,t.dump,i):or(t,e,t.dump,i),l&&(t.dump="&ref_"+f+t.dump)):(!function(t,e,r){var n,i,o,s="",u=t.tag;for(n=0,i=r.length;n<i;n+=1)o=r[n],t.replacer&&(o=t.replacer.call(r,String(n),o)),(ur(t,e,o,!1,!1)||void 0===o&&ur(t,e,null,!1,!1))&&(""!==s&&(s+=","+(t.condenseFlow?"":" ")),s+=t.dump);t.tag=u,t.dump="["+s+"]"}(t,e,t.dump),l&&(t.dump="&ref_"+f+" "+t.dump));else{if("[object String]"!==a){if("[object Undefined]"===a)return!1;if(t.skipInvalid)return!1;throw new wt("unacceptable kind of an object to dump "+a)}"?"!==t.tag&&er(t,t.dump,e,o,c)}null!==t.tag&&"?"!==t.tag&&(u=encodeURI("!"===t.tag[0]?t.tag.slice(1):t.tag).replace(/!/g,"%21"),u="!"===t.tag[0]?"!"+u:"tag:yaml.org,2002:"===u.slice(0,18)?"!!"+u.slice(18):"!<"+u+">",t.dump=u+" "+t.dump)}return!0}function ar(t,e){var r,n,i=[],o=[];for(cr(t,i,o),r=0,n=o.length;r<n;r+=1)e.duplicates.push(i[o[r]]);e.usedDuplicates=new Array(n)}function cr(t,e,r){var n,i,o;if(null!==t&&"object"==typeof t)if(-1!==(i=e.indexOf(t)))-1===r.indexOf(i)&&r.push(i);else if(e.push(t),Array.isArray(t))for(i=0,o=t.length;i<o;i+=1)cr(t[i],e,r);else for(i=0,o=(n=Object.keys(t)).length;i<o;i+=1)cr(t[n[i]],e,r)}function fr(t,e){return function(){throw new Error("Function yaml."+t+" is removed in js-yaml 4. Use yaml."+e+" instead, which is now safe by default.")}}const lr={Type:jt,Schema:St,FAILSAFE_SCHEMA:At,JSON_SCHEMA:Bt,CORE_SCHEMA:Pt,DEFAULT_SCHEMA:ee,load:Ue.load,loadAll:Ue.loadAll,dump:{dump:function(t,e){var r=new We(e=e||{});r.noRefs||ar(t,r);var n=t;return r.replacer&&(n=r.replacer.call({"":n},"",n)),ur(r,0,n,!0,!0)?r.dump+"\n":""}}.dump,YAMLException:wt,types:{binary:Ht,float:Yt,map:Et,null:Ct,pairs:Xt,set:te,timestamp:Gt,bool:Tt,int:kt,merge:Wt,omap:Zt,seq:It,str:Dt},safeLoad:fr("safeLoad","load"),safeLoadAll:fr("safeLoadAll","loadAll"),safeDump:fr("safeDump","dump")};r(8764).Buffer;const hr=t=>O().Iterable.isIterable(t);function pr(t){return yr(t)?hr(t)?t.toJS():t:{}}function dr(t){return d()(t)?t:[t]}function yr(t){return!!t&&"object"==typeof t}function gr(t){return"function"==typeof t}const vr=()=>{let t={},e=pt.location.search;if(!e)return{};if(""!=e){let r=e.substr(1).split("&");for(let e in r)Object.prototype.hasOwnProperty.call(r,e)&&(e=r[e].split("="),t[decodeURIComponent(e[0])]=e[1]&&decodeURIComponent(e[1])||"")}return t};function wr(t,e){var r;let n=arguments.length>2&&void 0!==arguments[2]?arguments[2]:()=>!0;if("object"!=typeof t||d()(t)||null===t||!e)return t;const i=w()({},t);return f()(r=g()(i)).call(r,(t=>{t===e&&n(i[t],t)?delete i[t]:i[t]=wr(i[t],e,n)})),i}class Mr extends o.Component{constructor(t,e){super(t,e),a()(this,"onUrlChange",(t=>{let{target:{value:e}}=t;this.setState({url:e})})),a()(this,"loadSpec",(t=>{this.flushAuthData(),this.props.specActions.updateUrl(t),this.props.specActions.download(t)})),a()(this,"onUrlSelect",(t=>{let e=t.target.value||t.target.href;this.loadSpec(e),this.setSelectedUrl(e),t.preventDefault()})),a()(this,"downloadUrl",(t=>{this.loadSpec(this.state.url),t.preventDefault()})),a()(this,"setSearch",(t=>{let e=vr();e["urls.primaryName"]=t.name;const r=`${window.location.protocol}//${window.location.host}${window.location.pathname}`;var n,i;window&&window.history&&window.history.pushState&&window.history.replaceState(null,"",`${r}?${n=e,h()(i=g()(n)).call(i,(t=>encodeURIComponent(t)+"="+encodeURIComponent(n[t]))).join("&")}`)})),a()(this,"setSelectedUrl",(t=>{const e=this.props.getConfigs().urls||[];e&&e.length&&t&&f()(e).call(e,((e,r)=>{e.url===t&&(this.setState({selectedIndex:r}),this.setSearch(e))}))})),a()(this,"onFilterChange",(t=>{let{target:{value:e}}=t;this.props.layoutActions.updateFilter(e)})),this.state={url:t.specSelectors.url(),selectedIndex:0}}UNSAFE_componentWillReceiveProps(t){this.setState({url:t.specSelectors.url()})}flushAuthData(){const{persistAuthorization:t}=this.props.getConfigs();t||this.props.authActions.restoreAuthorization({authorized:{}})}componentDidMount(){const t=this.props.getConfigs(),e=t.urls||[];if(e&&e.length){var r=this.state.selectedIndex;let n=vr()["urls.primaryName"]||t["urls.primaryName"];n&&f()(e).call(e,((t,e)=>{t.name===n&&(this.setState({selectedIndex:e}),r=e)})),this.loadSpec(e[r].url)}}render(){let{getComponent:t,specSelectors:e,getConfigs:r}=this.props;const n=t("Button"),i=t("Link"),s=t("Logo");let u="loading"===e.loadingStatus();const a=["download-url-input"];"failed"===e.loadingStatus()&&a.push("failed"),u&&a.push("loading");const{urls:c}=r();let l=[],p=null;if(c){let t=[];f()(c).call(c,((e,r)=>{t.push(o.createElement("option",{key:r,value:e.url},e.name))})),l.push(o.createElement("label",{className:"select-label",htmlFor:"select"},o.createElement("span",null,"Select a definition"),o.createElement("select",{id:"select",disabled:u,onChange:this.onUrlSelect,value:c[this.state.selectedIndex].url},t)))}else p=this.downloadUrl,l.push(o.createElement("input",{className:a.join(" "),type:"text",onChange:this.onUrlChange,value:this.state.url,disabled:u})),l.push(o.createElement(n,{className:"download-url-button",onClick:this.downloadUrl},"Explore"));return o.createElement("div",{className:"topbar"},o.createElement("div",{className:"wrapper"},o.createElement("div",{className:"topbar-wrapper"},o.createElement(i,null,o.createElement(s,null)),o.createElement("form",{className:"download-url-wrapper",onSubmit:p},h()(l).call(l,((t,e)=>(0,o.cloneElement)(t,{key:e})))))))}}var Lr=r(5996);const _r=()=>o.createElement("img",{height:"40",src:Lr,alt:"Swagger UI"});var mr=r(5163);const br=(t,e)=>{try{return lr.load(t)}catch(t){return e&&e.errActions.newThrownErr(new Error(t)),{}}},jr="configs_update",xr="configs_toggle";function Nr(t,e){return{type:jr,payload:{[t]:e}}}function Sr(t){return{type:xr,payload:t}}const Dr=()=>t=>{let{getConfigs:e,authActions:r}=t;if(e().persistAuthorization){const t=localStorage.getItem("authorized");t&&r.restoreAuthorization({authorized:JSON.parse(t)})}},Ir=t=>e=>{const{fn:{fetch:r}}=e;return r(t)},Er=(t,e)=>r=>{let{specActions:n}=r;if(t)return n.downloadConfig(t).then(i,i);function i(r){r instanceof Error||r.status>=400?(n.updateLoadingStatus("failedConfig"),n.updateLoadingStatus("failedConfig"),n.updateUrl(""),console.error(r.statusText+" "+t.url),e(null)):e(br(r.text))}},Ar=(t,e)=>t.getIn(d()(e)?e:[e]),Cr={[jr]:(t,e)=>t.merge((0,T.fromJS)(e.payload)),[xr]:(t,e)=>{const r=e.payload,n=t.get(r);return t.set(r,!n)}},Tr={getLocalConfig:()=>br(mr)};var Or=r(2320),zr=r.n(Or),kr=r(7287),Ur=r.n(kr),Rr=r(3101),Yr=r.n(Rr);const Br=console.error,Pr=t=>e=>{const{getComponent:r,fn:n}=t(),i=r("ErrorBoundary"),s=n.getDisplayName(e);class u extends o.Component{render(){return o.createElement(i,{targetName:s,getComponent:r,fn:n},o.createElement(e,Yr()({},this.props,this.context)))}}var a;return u.displayName=`WithErrorBoundary(${s})`,(a=e).prototype&&a.prototype.isReactComponent&&(u.prototype.mapStateToProps=e.prototype.mapStateToProps),u},Qr=t=>{let{name:e}=t;return o.createElement("div",{className:"fallback"},"😱 ",o.createElement("i",null,"Could not render ","t"===e?"this component":e,", see the console."))};class Fr extends o.Component{static getDerivedStateFromError(t){return{hasError:!0,error:t}}constructor(){super(...arguments),this.state={hasError:!1,error:null}}componentDidCatch(t,e){this.props.fn.componentDidCatch(t,e)}render(){const{getComponent:t,targetName:e,children:r}=this.props;if(this.state.hasError){const r=t("Fallback");return o.createElement(r,{name:e})}return r}}Fr.defaultProps={targetName:"this component",getComponent:()=>Qr,fn:{componentDidCatch:Br},children:null};const Gr=Fr,Wr=function(){let{componentList:t=[],fullOverride:e=!1}=arguments.length>0&&void 0!==arguments[0]?arguments[0]:{};return r=>{var n;let{getSystem:i}=r;const o=e?t:["App","BaseLayout","VersionPragmaFilter","InfoContainer","ServersContainer","SchemesContainer","AuthorizeBtnContainer","FilterContainer","Operations","OperationContainer","parameters","responses","OperationServers","Models","ModelWrapper",...t],s=Ur()(o,zr()(n=Array(o.length)).call(n,((t,e)=>{let{fn:r}=e;return r.withErrorBoundary(t)})));return{fn:{componentDidCatch:Br,withErrorBoundary:Pr(i)},components:{ErrorBoundary:Gr,Fallback:Qr},wrapComponents:s}}},qr=[function(){return{components:{Topbar:Mr,Logo:_r}}},function(){return{statePlugins:{spec:{actions:e,selectors:Tr},configs:{reducers:Cr,actions:t,selectors:i}}}},()=>({components:{StandaloneLayout:s}}),Wr({fullOverride:!0,componentList:["Topbar","StandaloneLayout","onlineValidatorBadge"]})]})(),n=n.default})()}));
+//# sourceMappingURL=swagger-ui-standalone-preset.js.map
\ No newline at end of file
@@ -0,0 +1,233 @@
+import codecs
+import json
+from typing import IO, Any, Callable, Iterable, Iterator, Optional, Type
+
+from flask import json as flask_json
+
+from .compat import BaseModel
+from .encoders import ResponseEncoder
+from .exceptions import ApiException
+from .validation import ValidationBackend
+
+NDJSON = "ndjson"
+JSON_ARRAY = "json"
+STREAM_MIMETYPES = {NDJSON: "application/x-ndjson", JSON_ARRAY: "application/json"}
+CHUNK_SIZE = 64 * 1024
+
+
+def is_streamable(result: Any) -> bool:
+    """Whether a view result is a collection of items rather than a single response value."""
+    return isinstance(result, Iterable) and not isinstance(result, (BaseModel, str, bytes, dict, tuple))
+
+
+def encode_items(
+    items: Iterable[Any], schema: Type[Any], encoder: Optional[ResponseEncoder], backend: ValidationBackend
+) -> Iterator[bytes]:
+    """Validate and encode the items one at a time.
+
+    Args:
+        items (Iterable[Any]): Models or dictionaries produced by the view.
+        schema (Type[Any]): Item model, dictionaries are validated against it.
+        encoder (ResponseEncoder, optional): Api response encoder, falls back to Flask's JSON provider.
+        backend (ValidationBackend): Api validation backend.
+    """
+    for item in items:
+        if not isinstance(item, schema):
+            item = backend.validate(schema, item)
+
+        if encoder is not None:
+            yield encoder.encode(item)
+        else:
+            yield flask_json.dumps(backend.dump(item)).encode()
+
+
+def stream_items(
+    items: Iterable[Any],
+    schema: Type[Any],
+    encoder: Optional[ResponseEncoder],
+    stream: str,
+    backend: ValidationBackend,
+) -> Iterator[bytes]:
+    """Stream the items as NDJSON or as a JSON array, in chunks of about `CHUNK_SIZE` bytes."""
+    if stream == NDJSON:
+        separator, start, end = b"\n", b"", b"\n"
+    else:
+        separator, start, end = b",", b"[", b"]"
+
+    chunk = bytearray(start)
+    first = True
+    for data in encode_items(items, schema, encoder, backend):
+        if first:
+            first = False
+        else:
+            chunk += separator
+        chunk += data
+        if len(chunk) >= CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+
+    if stream == JSON_ARRAY or not first:
+        chunk += end
+
+    if chunk:
+        yield bytes(chunk)
+
+
+class LimitedReader:
+    def __init__(self, stream: IO[bytes], max_bytes: Optional[int]) -> None:
+        """Read a request stream and reject it with 413 once more than `max_bytes` were read.
+
+        Args:
+            stream (IO[bytes]): Request input stream.
+            max_bytes (int, optional): Maximum body size, None for no limit.
+        """
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if self.max_bytes is not None and (size < 0 or size > self.max_bytes - self.size):
+            # Read one byte past the limit, which is enough to tell the body is too large.
+            size = self.max_bytes - self.size + 1
+
+        data = self.stream.read(size)
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise_too_large(self.max_bytes)
+
+        return data
+
+
+def raise_too_large(max_bytes: int) -> None:
+    raise ApiException(413, description=f"Request body is larger than {max_bytes} bytes")
+
+
+def iter_chunks(reader: LimitedReader) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        data = reader.read(CHUNK_SIZE)
+        if not data:
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+            return
+
+        yield decoder.decode(data)
+
+
+def iter_ndjson(reader: LimitedReader) -> Iterator[Any]:
+    """Parse one JSON value per line, skipping blank lines."""
+    buffer = ""
+    for chunk in iter_chunks(reader):
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+def iter_json_array(reader: LimitedReader) -> Iterator[Any]:
+    """Parse the items of a top level JSON array, yielding each one as soon as it is complete."""
+    decoder = json.JSONDecoder()
+    chunks = iter_chunks(reader)
+    buffer = ""
+    position = 0
+
+    def read_more() -> bool:
+        nonlocal buffer, position
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+
+        buffer, position = buffer[position:] + chunk, 0
+        return True
+
+    def next_char() -> str:
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not read_more():
+                return ""
+
+    if next_char() != "[":
+        raise ValueError("Request body must be a JSON array")
+    position += 1
+    if next_char() == "]":
+        return
+
+    while True:
+        if not next_char():
+            raise ValueError("Unexpected end of JSON array")
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not read_more():
+                    raise
+                continue
+
+            # A value cut at a chunk boundary, e.g. "1.5" of "1.5e3", may continue in the next chunk.
+            if (end == len(buffer) or buffer[end] not in " \t\r\n,]") and read_more():
+                continue
+            break
+
+        position = end
+        yield item
+
+        char = next_char()
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError("Expecting ',' or ']' in JSON array")
+        position += 1
+
+
+def read_json(stream: IO[bytes], max_bytes: Optional[int], on_error: Callable[[ValueError], Any] = None) -> Any:
+    """Read and parse a whole JSON body, rejecting it with 413 once it grows past `max_bytes`.
+
+    Args:
+        stream (IO[bytes]): Request input stream.
+        max_bytes (int, optional): Maximum body size, None for no limit.
+        on_error (Callable[[ValueError], Any], optional): Called with the error of an empty or invalid body, e.g.
+            `request.on_json_loading_failed`. Defaults to None, which raises a 400 ApiException.
+    """
+    data = LimitedReader(stream, max_bytes).read()
+    try:
+        return json.loads(data)
+    except ValueError as e:
+        if on_error is not None:
+            return on_error(e)
+        raise ApiException(400, description=f"Invalid JSON body: {e}")
+
+
+def iter_request_items(
+    stream: IO[bytes], schema: Type[Any], body_stream: str, max_bytes: Optional[int], backend: ValidationBackend
+) -> Iterator[Any]:
+    """Lazily parse and validate the items of an NDJSON or JSON array request body.
+
+    Args:
+        stream (IO[bytes]): Request input stream.
+        schema (Type[Any]): Item model.
+        body_stream (str): "ndjson" or "json".
+        max_bytes (int, optional): Maximum body size, None for no limit.
+        backend (ValidationBackend): Api validation backend.
+    """
+    parse = iter_ndjson if body_stream == NDJSON else iter_json_array
+    items = parse(LimitedReader(stream, max_bytes))
+    while True:
+        # Only JSON errors become 400, validation errors of the items are raised as they are.
+        try:
+            item = next(items)
+        except StopIteration:
+            return
+        except ValueError as e:
+            raise ApiException(400, description=f"Invalid JSON body: {e}")
+
+        yield backend.validate(schema, item)
@@ -1,6 +1,5 @@
-from typing import Generic, Optional, TypeVar
+from typing import Any, Dict, Generic, Optional, TypeVar
 
-from pydantic.generics import GenericModel
 from werkzeug.datastructures import FileStorage
 
 DataT = TypeVar("DataT")
@@ -21,10 +20,40 @@ class FileStorageType(bytes):
         return f"FilesType({super().__repr__()})"
 
 
-class RequestParametersType(GenericModel, Generic[DataT]):
-    path: Optional[DataT]
-    query: Optional[DataT]
-    body: Optional[DataT]
-    header: Optional[DataT]
-    form: Optional[DataT]
-    auth: Optional[str]
+class RequestParametersType(Generic[DataT]):
+    """Validated request parameters handed to the view.
+
+    A plain `__slots__` container is used because one instance is created on every request.
+    """
+
+    __slots__ = ("path", "query", "body", "header", "form", "auth", "claims")
+
+    def __init__(
+        self,
+        path: Optional[DataT] = None,
+        query: Optional[DataT] = None,
+        body: Optional[DataT] = None,
+        header: Optional[DataT] = None,
+        form: Optional[DataT] = None,
+        auth: Optional[str] = None,
+        claims: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.path = path
+        self.query = query
+        self.body = body
+        self.header = header
+        self.form = form
+        self.auth = auth
+        self.claims = claims
+
+    def dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, RequestParametersType):
+            return NotImplemented
+        return self.dict() == other.dict()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"RequestParametersType({fields})"
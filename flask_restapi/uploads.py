@@ -0,0 +1,208 @@
+import io
+import mmap
+import tempfile
+from typing import IO, Any, Dict, Iterator, List, Optional, Type
+
+from werkzeug.datastructures import FileStorage
+
+from .compat import BaseModel
+from .types import FileStorageType
+
+
+class UploadFile:
+    def __init__(self, file: FileStorage) -> None:
+        """Uploaded file kept in memory or spooled to disk, which can be read without copying it into bytes.
+
+        Args:
+            file (FileStorage): Werkzeug file storage of the upload.
+        """
+        self.file = file
+        self.filename = file.filename
+        self.content_type = file.mimetype
+        stream = file.stream
+        stream.seek(0, io.SEEK_END)
+        self.size: int = stream.tell()
+        stream.seek(0)
+        self._mmap: Optional[mmap.mmap] = None
+
+    @property
+    def stream(self) -> IO[bytes]:
+        return self.file.stream
+
+    @property
+    def path(self) -> Optional[str]:
+        """Path of the spooled file on disk, None while the upload is kept in memory."""
+        name = getattr(self.file.stream, "name", None)
+        return name if isinstance(name, str) else None
+
+    def view(self) -> memoryview:
+        """Read only view of the content, backed by the in-memory buffer or by a memory map of the spooled file."""
+        stream = self.file.stream
+        if isinstance(stream, SpooledStream):
+            stream = stream.file
+        if isinstance(stream, io.BytesIO):
+            return stream.getbuffer().toreadonly()
+
+        if self.size == 0:
+            return memoryview(b"")
+
+        if self._mmap is None:
+            self._mmap = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return memoryview(self._mmap)
+
+    def save(self, dst: Any, buffer_size: int = 16384) -> None:
+        self.file.save(dst, buffer_size)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A view of it is still referenced, the map is released with the last view.
+                pass
+            self._mmap = None
+
+        self.file.close()
+
+    def __repr__(self) -> str:
+        return f"UploadFile(filename={self.filename!r}, content_type={self.content_type!r}, size={self.size})"
+
+
+class UploadFileType(FileStorageType):
+    max_size: Optional[int] = None
+    spool_size: Optional[int] = None
+    content_types: Optional[List[str]] = None
+
+    @classmethod
+    def validate(cls, v):
+        if not isinstance(v, FileStorage):
+            raise TypeError("FileStorage required")
+
+        if cls.content_types and v.mimetype not in cls.content_types:
+            raise ValueError(f"content type must be one of {', '.join(cls.content_types)}")
+
+        upload = UploadFile(v)
+        if cls.max_size is not None and upload.size > cls.max_size:
+            raise ValueError(f"file is larger than {cls.max_size} bytes")
+
+        return upload
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: Dict[str, Any]) -> None:
+        field_schema.update(type="string", format="binary")
+        if cls.max_size is not None:
+            field_schema["maxLength"] = cls.max_size
+
+
+def upload_file(max_size: int = None, spool_size: int = None, content_types: List[str] = None) -> Type[UploadFileType]:
+    """Upload file field type with limits, validated to an `UploadFile`.
+
+    Args:
+        max_size (int, optional): Maximum file size in bytes. Defaults to None.
+        spool_size (int, optional): Keep uploads up to this size in memory and spool larger ones to disk. Defaults to None.
+        content_types (List[str], optional): Allowed content types. Defaults to None.
+    """
+    namespace = {"max_size": max_size, "spool_size": spool_size, "content_types": content_types}
+    return type("UploadFileValue", (UploadFileType,), namespace)
+
+
+def get_upload_fields(schema: Type[Any]) -> Dict[str, Type[UploadFileType]]:
+    # Upload types are pydantic v1 types, models of other validation backends have none.
+    if not (isinstance(schema, type) and issubclass(schema, BaseModel)):
+        return {}
+
+    return {
+        field.alias: field.type_
+        for field in schema.__fields__.values()
+        if isinstance(field.type_, type) and issubclass(field.type_, UploadFileType)
+    }
+
+
+def get_spool_size(schema: Type[Any]) -> Optional[int]:
+    spool_sizes = [field.spool_size for field in get_upload_fields(schema).values() if field.spool_size is not None]
+    return min(spool_sizes) if spool_sizes else None
+
+
+class SpooledStream:
+    def __init__(self, spool_size: int) -> None:
+        """Stream of one uploaded file, kept in memory until it grows past `spool_size` and then moved to a named
+        temporary file.
+
+        Args:
+            spool_size (int): Maximum size in bytes kept in memory.
+        """
+        self.spool_size = spool_size
+        self.file: IO[bytes] = io.BytesIO()
+
+    @property
+    def is_spooled(self) -> bool:
+        return not isinstance(self.file, io.BytesIO)
+
+    def write(self, data: bytes) -> int:
+        if not self.is_spooled and self.file.tell() + len(data) > self.spool_size:
+            self.rollover()
+        return self.file.write(data)
+
+    def rollover(self) -> None:
+        if self.is_spooled:
+            return
+
+        buffer = self.file
+        self.file = tempfile.NamedTemporaryFile("rb+")
+        self.file.write(buffer.getbuffer())
+        self.file.seek(buffer.tell())
+        buffer.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.file, name)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.file)
+
+
+class UploadRequestMixin:
+    """Flask request mixin giving each uploaded file of a form decorator with `spool_size` a `SpooledStream`."""
+
+    upload_spool_size: Optional[int] = None
+
+    def _get_file_stream(
+        self,
+        total_content_length: Optional[int],
+        content_type: Optional[str],
+        filename: Optional[str] = None,
+        content_length: Optional[int] = None,
+    ) -> IO[bytes]:
+        spool_size = self.upload_spool_size
+        if spool_size is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+        # Browsers seldom send the length of a part, the stream rolls over once the part outgrows spool_size.
+        stream = SpooledStream(spool_size)
+        if content_length is not None and content_length > spool_size:
+            stream.rollover()
+        return stream
+
+
+def set_spool_size(request: Any, spool_size: int) -> None:
+    """Make the uploaded files of `request` spool past `spool_size`, which must happen before its form is parsed."""
+    if not isinstance(request, UploadRequestMixin):
+        raise RuntimeError(
+            "upload_file(spool_size=...) needs a request class with UploadRequestMixin, the app.request_class set "
+            "after Api.init_app has none: set it before init_app or add the mixin to it"
+        )
+    if "files" in request.__dict__:
+        raise RuntimeError(
+            "upload_file(spool_size=...) cannot apply once the form was parsed, do not read request.form or "
+            "request.files before the form decorator, e.g. in a before_request function"
+        )
+
+    request.upload_spool_size = spool_size
+
+
+def close_uploads(form: Any) -> None:
+    """Close the memory maps and spooled files of the `UploadFile` fields of a validated form."""
+    for value in getattr(form, "__dict__", {}).values():
+        for item in value if isinstance(value, (list, tuple)) else (value,):
+            if isinstance(item, UploadFile):
+                item.close()
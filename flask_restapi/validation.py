@@ -0,0 +1,292 @@
+import collections
+import re
+from collections import abc
+from typing import Any, Dict, List, Tuple, Type, Union
+
+from .compat import (
+    SHAPE_DEQUE,
+    SHAPE_FROZENSET,
+    SHAPE_ITERABLE,
+    SHAPE_LIST,
+    SHAPE_SEQUENCE,
+    SHAPE_SET,
+    SHAPE_TUPLE,
+    SHAPE_TUPLE_ELLIPSIS,
+    BaseModel,
+    Extra,
+    ValidationError,
+)
+
+SEQUENCE_SHAPES = {
+    SHAPE_DEQUE,
+    SHAPE_FROZENSET,
+    SHAPE_ITERABLE,
+    SHAPE_LIST,
+    SHAPE_SEQUENCE,
+    SHAPE_SET,
+    SHAPE_TUPLE,
+    SHAPE_TUPLE_ELLIPSIS,
+}
+SEQUENCE_TYPES = (list, tuple, set, frozenset, collections.deque)
+ABSTRACT_SEQUENCE_TYPES = (abc.Iterable, abc.Collection, abc.Sequence, abc.MutableSequence, abc.Set, abc.MutableSet)
+JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def is_sequence_type(annotation: Any) -> bool:
+    """Whether a type annotation is a list-like type, looking through Optional and Union."""
+    origin = getattr(annotation, "__origin__", None)
+    if origin is Union or type(annotation).__name__ == "UnionType":
+        return any(is_sequence_type(arg) for arg in annotation.__args__ if arg is not type(None))
+
+    cls = origin or annotation
+    return cls in ABSTRACT_SEQUENCE_TYPES or (isinstance(cls, type) and issubclass(cls, SEQUENCE_TYPES))
+
+
+def to_nullable(schema: Any) -> Any:
+    """Replace the `{"type": "null"}` members of the `anyOf` lists in a JSON schema, which OpenAPI 3.0 does not
+    know, with `nullable: true`.
+    """
+    if isinstance(schema, list):
+        return [to_nullable(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+
+    schema = {key: to_nullable(value) for key, value in schema.items()}
+    any_of = schema.get("anyOf")
+    if not isinstance(any_of, list) or {"type": "null"} not in any_of:
+        return schema
+
+    members = [member for member in any_of if member != {"type": "null"}]
+    del schema["anyOf"]
+    if len(members) > 1:
+        schema["anyOf"] = members
+    elif members and "$ref" in members[0]:
+        # Siblings of a $ref are ignored, the reference is wrapped instead.
+        schema["allOf"] = members
+    elif members:
+        schema = {**members[0], **schema}
+    schema["nullable"] = True
+    return schema
+
+
+class ValidationBackend:
+    """Validate request data into the schemas of the decorators, dump the returned models and generate
+    their JSON schemas. This default backend runs the pydantic v1 API.
+
+    Subclasses handle other model libraries and fall back to this backend for pydantic v1 models, so both
+    kinds can be used side by side while migrating.
+    """
+
+    validation_errors: Tuple[Type[Exception], ...] = (ValidationError,)
+
+    def is_schema(self, schema: Any) -> bool:
+        return isinstance(schema, type) and issubclass(schema, BaseModel)
+
+    def is_model(self, obj: Any) -> bool:
+        return isinstance(obj, BaseModel)
+
+    def validate(self, schema: Type[Any], data: Any) -> Any:
+        return schema.parse_obj(data)
+
+    def dump(self, result: Any) -> Any:
+        """Convert a model returned by a view to data for Flask's JSON provider, without its headers."""
+        return result.dict(exclude={"headers"})
+
+    def json_schema(self, schema: Type[Any], ref_template: str) -> Dict[str, Any]:
+        """JSON schema of a model, with its title and the nested models under "definitions"."""
+        return schema.schema(ref_template=ref_template)
+
+    def field_names(self, schema: Type[Any]) -> List[Tuple[str, bool]]:
+        """Names a model accepts for its fields, with whether each field is a sequence."""
+        names = []
+        for field in schema.__fields__.values():
+            is_sequence = field.shape in SEQUENCE_SHAPES
+            names.append((field.alias, is_sequence))
+            if field.name != field.alias and schema.__config__.allow_population_by_field_name:
+                names.append((field.name, is_sequence))
+
+        return names
+
+    def allows_extra(self, schema: Type[Any]) -> bool:
+        """Whether undeclared keys must reach the model, because it allows or forbids extra fields."""
+        return schema.__config__.extra is not Extra.ignore
+
+    def errors(self, error: Exception) -> List[Dict[str, Any]]:
+        return error.errors()
+
+
+class PydanticV2Backend(ValidationBackend):
+    def __init__(self) -> None:
+        """Validation backend for pydantic v2 models, validated by pydantic-core.
+
+        pydantic v1 models, e.g. `pydantic.v1.BaseModel`, are still handled by the default backend.
+        """
+        import pydantic
+
+        if pydantic.VERSION.startswith("1."):
+            raise ImportError("PydanticV2Backend requires pydantic v2, install it with `pip install pydantic>=2`")
+
+        self._base_model = pydantic.BaseModel
+        self._validation_error = pydantic.ValidationError
+        self.validation_errors = (ValidationError, pydantic.ValidationError)
+
+    def is_schema(self, schema: Any) -> bool:
+        return isinstance(schema, type) and issubclass(schema, self._base_model)
+
+    def is_model(self, obj: Any) -> bool:
+        return isinstance(obj, self._base_model) or super().is_model(obj)
+
+    def validate(self, schema: Type[Any], data: Any) -> Any:
+        if not self.is_schema(schema):
+            return super().validate(schema, data)
+
+        return schema.model_validate(data)
+
+    def dump(self, result: Any) -> Any:
+        if not isinstance(result, self._base_model):
+            return super().dump(result)
+
+        return result.model_dump(mode="json", exclude={"headers"})
+
+    def json_schema(self, schema: Type[Any], ref_template: str) -> Dict[str, Any]:
+        if not self.is_schema(schema):
+            return super().json_schema(schema, ref_template)
+
+        schema_dict = to_nullable(schema.model_json_schema(ref_template=ref_template))
+        if "$defs" in schema_dict:
+            schema_dict["definitions"] = schema_dict.pop("$defs")
+
+        return schema_dict
+
+    def field_names(self, schema: Type[Any]) -> List[Tuple[str, bool]]:
+        if not self.is_schema(schema):
+            return super().field_names(schema)
+
+        config = schema.model_config
+        by_name = config.get("populate_by_name") or config.get("validate_by_name")
+        names = []
+        for name, field in schema.model_fields.items():
+            is_sequence = is_sequence_type(field.annotation)
+            alias = field.validation_alias if isinstance(field.validation_alias, str) else field.alias or name
+            names.append((alias, is_sequence))
+            if alias != name and by_name:
+                names.append((name, is_sequence))
+
+        return names
+
+    def allows_extra(self, schema: Type[Any]) -> bool:
+        if not self.is_schema(schema):
+            return super().allows_extra(schema)
+
+        return schema.model_config.get("extra") in ("allow", "forbid")
+
+    def errors(self, error: Exception) -> List[Dict[str, Any]]:
+        if not isinstance(error, self._validation_error):
+            return super().errors(error)
+
+        results = []
+        for e in error.errors():
+            ctx = e.get("ctx")
+            if ctx is not None:
+                # The context may hold the exception raised by a validator, which is not JSON serializable.
+                ctx = {key: value if isinstance(value, JSON_SCALARS) else str(value) for key, value in ctx.items()}
+            results.append({"loc": list(e["loc"]), "type": e["type"], "msg": e["msg"], "ctx": ctx})
+
+        return results
+
+
+class MsgspecBackend(ValidationBackend):
+    _error_path_pattern = re.compile(r" - at `\$(.*)`$")
+    _path_part_pattern = re.compile(r"\.([^.\[]+)|\[(\d+)\]")
+
+    def __init__(self) -> None:
+        """Validation backend for `msgspec.Struct` models. Query, header and path values are converted from
+        strings, e.g. "1" to an int field.
+
+        pydantic v1 models are still handled by the default backend.
+        """
+        try:
+            import msgspec
+        except ImportError as e:  # pragma: no cover
+            raise ImportError(
+                "MsgspecBackend requires msgspec, install it with `pip install flask-restapi[msgspec]`"
+            ) from e
+
+        self._msgspec = msgspec
+        self.validation_errors = (ValidationError, msgspec.ValidationError)
+
+    def is_schema(self, schema: Any) -> bool:
+        return isinstance(schema, type) and issubclass(schema, self._msgspec.Struct)
+
+    def is_model(self, obj: Any) -> bool:
+        return isinstance(obj, self._msgspec.Struct) or super().is_model(obj)
+
+    def validate(self, schema: Type[Any], data: Any) -> Any:
+        if not self.is_schema(schema):
+            return super().validate(schema, data)
+
+        return self._msgspec.convert(data, schema, strict=False)
+
+    def dump(self, result: Any) -> Any:
+        if not isinstance(result, self._msgspec.Struct):
+            return super().dump(result)
+
+        data = self._msgspec.to_builtins(result)
+        data.pop("headers", None)
+        return data
+
+    def json_schema(self, schema: Type[Any], ref_template: str) -> Dict[str, Any]:
+        if not self.is_schema(schema):
+            return super().json_schema(schema, ref_template)
+
+        # msgspec returns a reference to the struct, its own schema is taken out of the definitions.
+        _ref_template = ref_template.replace("{model}", "{name}")
+        result = to_nullable(self._msgspec.json.schema(schema, ref_template=_ref_template))
+        definitions = result.get("$defs", {})
+        name = next(name for name in definitions if _ref_template.format(name=name) == result["$ref"])
+        schema_dict = dict(definitions.pop(name))
+        schema_dict.setdefault("title", name)
+        schema_dict.setdefault("properties", {})
+        if definitions:
+            schema_dict["definitions"] = definitions
+
+        return schema_dict
+
+    def field_names(self, schema: Type[Any]) -> List[Tuple[str, bool]]:
+        if not self.is_schema(schema):
+            return super().field_names(schema)
+
+        return [(field.encode_name, is_sequence_type(field.type)) for field in self._msgspec.structs.fields(schema)]
+
+    def allows_extra(self, schema: Type[Any]) -> bool:
+        if not self.is_schema(schema):
+            return super().allows_extra(schema)
+
+        return schema.__struct_config__.forbid_unknown_fields
+
+    def errors(self, error: Exception) -> List[Dict[str, Any]]:
+        if not isinstance(error, self._msgspec.ValidationError):
+            return super().errors(error)
+
+        # msgspec reports a single error, e.g. "Expected `int`, got `str` - at `$.items[0].id`".
+        message = str(error)
+        loc: List[Union[str, int]] = []
+        match = self._error_path_pattern.search(message)
+        if match:
+            message = message[: match.start()]
+            for name, index in self._path_part_pattern.findall(match.group(1)):
+                loc.append(name if name else int(index))
+
+        return [{"loc": loc, "type": "value_error", "msg": message, "ctx": None}]
+
+
+def get_default_backend() -> ValidationBackend:
+    """The backend of the installed pydantic: `PydanticV2Backend` on pydantic v2, which still handles
+    `pydantic.v1` models, or the default backend on pydantic v1.
+    """
+    import pydantic
+
+    if pydantic.VERSION.startswith("1."):
+        return ValidationBackend()
+
+    return PydanticV2Backend()